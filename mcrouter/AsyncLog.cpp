@@ -16,17 +16,25 @@
 #include <time.h>
 #include <unistd.h>
 
+#include <sys/uio.h>
+
+#include <algorithm>
+#include <climits>
 #include <memory>
 
 #include <folly/Conv.h>
 #include <folly/File.h>
 #include <folly/FileUtil.h>
+#include <folly/fibers/Baton.h>
 #include <folly/fibers/EventBaseLoopController.h>
+#include <folly/io/async/AsyncTimeout.h>
 #include <folly/json.h>
 #include <folly/system/ThreadName.h>
 
+#include "mcrouter/AsyncWriter.h"
 #include "mcrouter/CarbonRouterInstance.h"
 #include "mcrouter/McrouterLogFailure.h"
+#include "mcrouter/ProxyBase.h"
 #include "mcrouter/lib/fbi/cpp/util.h"
 #include "mcrouter/options.h"
 #include "mcrouter/stats.h"
@@ -210,17 +218,15 @@ bool AsyncLog::openFile() {
 
 AsyncLog::AsyncLog(const McrouterOptions& options) : options_(options) {}
 
-/** Adds an asynchronous request to the event log. */
-void AsyncLog::writeDelete(
-    const AccessPoint& ap,
+AsyncLog::~AsyncLog() = default;
+
+std::string AsyncLog::makeDeleteLine(
+    folly::StringPiece host,
+    uint16_t port,
     folly::StringPiece key,
-    folly::StringPiece poolName) {
+    folly::StringPiece poolName,
+    int64_t timestampMs) const {
   dynamic json = dynamic::array;
-  const auto& host = ap.getHost();
-  const auto port = options_.asynclog_port_override == 0
-      ? ap.getPort()
-      : options_.asynclog_port_override;
-
   if (options_.use_asynclog_version2) {
     json = dynamic::object;
     json["f"] = options_.flavor_name;
@@ -234,16 +240,6 @@ void AsyncLog::writeDelete(
     json.push_back(folly::sformat("delete {}\r\n", key));
   }
 
-  if (!openFile()) {
-    MC_LOG_FAILURE(
-        options_,
-        memcache::failure::Category::kSystemError,
-        "asynclog_open() failed (key {}, pool {})",
-        key,
-        poolName);
-    return;
-  }
-
   // ["AS1.0", 1289416829.836, "C", ["10.0.0.1", 11302, "delete foo\r\n"]]
   // OR ["AS2.0", 1289416829.836, "C", {"f":"flavor","h":"[10.0.0.1]:11302",
   //                                    "p":"pool_name","k":"foo\r\n"}]
@@ -254,16 +250,37 @@ void AsyncLog::writeDelete(
     jsonOut.push_back(kAsyncLogMagic);
   }
 
-  auto timestamp_ms = std::chrono::duration_cast<std::chrono::milliseconds>(
-                          std::chrono::system_clock::now().time_since_epoch())
-                          .count();
-  jsonOut.push_back(1e-3 * timestamp_ms);
+  jsonOut.push_back(1e-3 * timestampMs);
 
   jsonOut.push_back(std::string("C"));
 
   jsonOut.push_back(json);
 
-  auto jstr = folly::toJson(jsonOut) + "\n";
+  return folly::toJson(jsonOut) + "\n";
+}
+
+/** Adds an asynchronous request to the event log. */
+void AsyncLog::writeDelete(
+    const AccessPoint& ap,
+    folly::StringPiece key,
+    folly::StringPiece poolName) {
+  if (!openFile()) {
+    MC_LOG_FAILURE(
+        options_,
+        memcache::failure::Category::kSystemError,
+        "asynclog_open() failed (key {}, pool {})",
+        key,
+        poolName);
+    return;
+  }
+
+  const auto port = options_.asynclog_port_override == 0
+      ? ap.getPort()
+      : options_.asynclog_port_override;
+  auto timestamp_ms = std::chrono::duration_cast<std::chrono::milliseconds>(
+                          std::chrono::system_clock::now().time_since_epoch())
+                          .count();
+  auto jstr = makeDeleteLine(ap.getHost(), port, key, poolName, timestamp_ms);
 
   ssize_t size = folly::writeFull(file_->fd(), jstr.data(), jstr.size());
   if (size == -1 || size_t(size) < jstr.size()) {
@@ -276,6 +293,152 @@ void AsyncLog::writeDelete(
   }
 }
 
+bool AsyncLog::queueDelete(
+    ProxyBase& proxy,
+    const AccessPoint& ap,
+    folly::StringPiece key,
+    folly::StringPiece poolName,
+    folly::fibers::Baton& done,
+    bool& written) {
+  const auto& host = ap.getHost();
+  const size_t bytes =
+      sizeof(Entry) + host.size() + key.size() + poolName.size();
+  if (queuedBytes_.load() + bytes > options_.asynclog_batch_max_queued_bytes) {
+    proxy.stats().increment(asynclog_dropped_requests_stat);
+    MC_LOG_FAILURE(
+        options_,
+        memcache::failure::Category::kOutOfResources,
+        "Asynclog queue is full, dropping request (key {}, pool {})",
+        key,
+        poolName);
+    return false;
+  }
+  queuedBytes_ += bytes;
+
+  const uint16_t port = options_.asynclog_port_override == 0
+      ? ap.getPort()
+      : options_.asynclog_port_override;
+  auto timestampMs = std::chrono::duration_cast<std::chrono::milliseconds>(
+                         std::chrono::system_clock::now().time_since_epoch())
+                         .count();
+  written = false;
+  batch_.push_back(Entry{
+      host, port, key.str(), poolName.str(), timestampMs, &done, &written});
+  batchBytes_ += bytes;
+
+  if (batchBytes_ >= options_.asynclog_batch_max_bytes) {
+    if (flushTimer_) {
+      flushTimer_->cancelTimeout();
+    }
+    flushBatch(proxy);
+    return true;
+  }
+
+  if (!flushTimer_) {
+    flushTimer_ = folly::AsyncTimeout::make(
+        proxy.eventBase(), [this, &proxy]() noexcept { flushBatch(proxy); });
+  }
+  if (!flushTimer_->isScheduled() &&
+      !flushTimer_->scheduleTimeout(
+          options_.asynclog_batch_flush_interval_ms)) {
+    MC_LOG_FAILURE(
+        options_,
+        memcache::failure::Category::kSystemError,
+        "failed to schedule asynclog flush timer");
+    flushBatch(proxy);
+  }
+  return true;
+}
+
+void AsyncLog::flushBatch(ProxyBase& proxy) {
+  if (batch_.empty()) {
+    return;
+  }
+  auto batch = std::make_shared<std::vector<Entry>>(std::move(batch_));
+  const auto bytes = batchBytes_;
+  batch_.clear();
+  batchBytes_ = 0;
+
+  auto res = false;
+  if (auto asyncWriter = proxy.router().asyncWriter()) {
+    res = asyncWriter->run([this, &proxy, batch, bytes]() {
+      writeBatch(proxy, *batch, bytes);
+    });
+  }
+  if (!res) {
+    MC_LOG_FAILURE(
+        options_,
+        memcache::failure::Category::kOutOfResources,
+        "Could not enqueue asynclog batch ({} requests)",
+        batch->size());
+    proxy.stats().increment(asynclog_dropped_requests_stat, batch->size());
+    queuedBytes_ -= bytes;
+    for (auto& entry : *batch) {
+      *entry.written = false;
+      entry.done->post();
+    }
+  }
+}
+
+void AsyncLog::writeBatch(
+    ProxyBase& proxy,
+    std::vector<Entry>& batch,
+    size_t bytes) {
+  std::vector<std::string> lines;
+  lines.reserve(batch.size());
+  for (const auto& entry : batch) {
+    lines.push_back(makeDeleteLine(
+        entry.host,
+        entry.port,
+        entry.key,
+        entry.poolName,
+        entry.timestampMs));
+  }
+
+  bool written = false;
+  if (!openFile()) {
+    MC_LOG_FAILURE(
+        options_,
+        memcache::failure::Category::kSystemError,
+        "asynclog_open() failed ({} requests)",
+        batch.size());
+  } else {
+    std::vector<iovec> iovs(lines.size());
+    size_t total = 0;
+    for (size_t i = 0; i < lines.size(); ++i) {
+      iovs[i].iov_base = const_cast<char*>(lines[i].data());
+      iovs[i].iov_len = lines[i].size();
+      total += lines[i].size();
+    }
+    // A single writev() takes at most IOV_MAX buffers
+    ssize_t size = 0;
+    for (size_t i = 0; i < iovs.size() && size != -1; i += IOV_MAX) {
+      auto count = std::min<size_t>(IOV_MAX, iovs.size() - i);
+      auto ret = folly::writevFull(file_->fd(), iovs.data() + i, count);
+      size = ret == -1 ? -1 : size + ret;
+    }
+    written = size != -1 && size_t(size) == total;
+    if (!written) {
+      MC_LOG_FAILURE(
+          options_,
+          memcache::failure::Category::kSystemError,
+          "Error fully writing asynclog batch ({} requests)",
+          batch.size());
+    }
+  }
+
+  if (written) {
+    proxy.stats().incrementSafe(asynclog_batches_stat);
+  } else {
+    proxy.stats().incrementSafe(asynclog_dropped_requests_stat, batch.size());
+  }
+  queuedBytes_ -= bytes;
+  for (auto& entry : batch) {
+    *entry.written = written;
+    entry.done->post();
+  }
+}
+
 } // mcrouter
 } // memcache
 } // facebook
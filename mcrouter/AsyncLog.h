@@ -7,11 +7,21 @@
  */
 #pragma once
 
+#include <atomic>
 #include <memory>
+#include <string>
+#include <vector>
 
 #include <folly/File.h>
 #include <folly/Range.h>
 
+namespace folly {
+class AsyncTimeout;
+namespace fibers {
+class Baton;
+}
+} // folly
+
 namespace facebook {
 namespace memcache {
 
@@ -20,9 +30,12 @@ class McrouterOptions;
 
 namespace mcrouter {
 
+class ProxyBase;
+
 class AsyncLog {
  public:
   explicit AsyncLog(const McrouterOptions& options);
+  ~AsyncLog();
 
   /**
    * Appends a 'delete' request entry to the asynclog.
@@ -34,11 +47,67 @@ class AsyncLog {
       folly::StringPiece key,
       folly::StringPiece poolName);
 
+  /**
+   * Queues a 'delete' request entry for the batched writer
+   * (asynclog_batch_flush_interval_ms > 0). Must be called from
+   * the proxy thread.
+   *
+   * The queued entries are written with a single writev() once they reach
+   * asynclog_batch_max_bytes or asynclog_batch_flush_interval_ms after the
+   * first one was queued. done is posted after the batch is written
+   * or dropped, written is set before that to tell which one happened.
+   *
+   * @return False if the entry was dropped because the proxy already has
+   *         asynclog_batch_max_queued_bytes queued. done is not posted then.
+   */
+  bool queueDelete(
+      ProxyBase& proxy,
+      const AccessPoint& ap,
+      folly::StringPiece key,
+      folly::StringPiece poolName,
+      folly::fibers::Baton& done,
+      bool& written);
+
  private:
+  struct Entry {
+    std::string host;
+    uint16_t port;
+    std::string key;
+    std::string poolName;
+    int64_t timestampMs;
+    folly::fibers::Baton* done;
+    bool* written;
+  };
+
   const McrouterOptions& options_;
   std::unique_ptr<folly::File> file_;
   time_t spoolTime_{0};
 
+  // Batched mode. batch_, batchBytes_ and flushTimer_ are only used
+  // from the proxy thread.
+  std::vector<Entry> batch_;
+  size_t batchBytes_{0};
+  std::unique_ptr<folly::AsyncTimeout> flushTimer_;
+  // Bytes queued in batch_ and in batches not yet written.
+  std::atomic<size_t> queuedBytes_{0};
+
+  /**
+   * Hands the queued entries over to the router's AsyncWriter.
+   */
+  void flushBatch(ProxyBase& proxy);
+
+  /**
+   * Writes the batch to the spool file. Runs on the AsyncWriter thread.
+   */
+  void writeBatch(ProxyBase& proxy, std::vector<Entry>& batch, size_t bytes);
+
+  std::string makeDeleteLine(
+      folly::StringPiece host,
+      uint16_t port,
+      folly::StringPiece key,
+      folly::StringPiece poolName,
+      int64_t timestampMs) const;
+
   /**
    * Open async log file.
    *
@@ -168,10 +168,16 @@ void CarbonRouterInstanceBase::updateStats() {
   }
 
   const auto idx = statsIndex();
+  const auto now = time(nullptr);
   for (size_t i = 0; i < opts_.num_proxies; ++i) {
     auto* const proxy = getProxyBase(i);
     proxy->stats().aggregate(idx);
     proxy->advanceRequestStatsBin();
+    proxy->hotKeys().tick(now);
+    if (idx + 1 == BIN_NUM) {
+      // Halve the histograms every window so they follow recent traffic
+      proxy->stats().decayHistograms();
+    }
   }
   statsIndex((idx + 1) % BIN_NUM);
 }
@@ -0,0 +1,114 @@
+/*
+ *  Copyright (c) 2018-present, Facebook, Inc.
+ *
+ *  This source code is licensed under the MIT license found in the LICENSE
+ *  file in the root directory of this source tree.
+ *
+ */
+#include "Histogram.h"
+
+#include <algorithm>
+#include <cmath>
+#include <limits>
+#include <utility>
+
+#include <folly/Bits.h>
+#include <folly/Conv.h>
+
+namespace facebook {
+namespace memcache {
+namespace mcrouter {
+
+constexpr size_t Histogram::kSubBucketBits;
+constexpr size_t Histogram::kSubBuckets;
+constexpr size_t Histogram::kMaxValueBits;
+constexpr size_t Histogram::kNumBuckets;
+
+size_t Histogram::bucketIndex(uint64_t value) {
+  if (value < kSubBuckets) {
+    return value;
+  }
+  const size_t msb = folly::findLastSet(value) - 1;
+  if (msb >= kMaxValueBits) {
+    return kNumBuckets - 1;
+  }
+  const size_t shift = msb - kSubBucketBits;
+  return (shift + 1) * kSubBuckets + (value >> shift) - kSubBuckets;
+}
+
+uint64_t Histogram::bucketUpperBound(size_t index) {
+  if (index < kSubBuckets) {
+    return index;
+  }
+  if (index == kNumBuckets - 1) {
+    return std::numeric_limits<uint64_t>::max();
+  }
+  const size_t shift = index / kSubBuckets - 1;
+  const uint64_t lower = (kSubBuckets + index % kSubBuckets) << shift;
+  return lower + (uint64_t(1) << shift) - 1;
+}
+
+void Histogram::addValue(uint64_t value) {
+  ++buckets_[bucketIndex(value)];
+  ++count_;
+  max_ = std::max(max_, value);
+}
+
+void Histogram::merge(const Histogram& other) {
+  for (size_t i = 0; i < kNumBuckets; ++i) {
+    buckets_[i] += other.buckets_[i];
+  }
+  count_ += other.count_;
+  max_ = std::max(max_, other.max_);
+}
+
+void Histogram::decay() {
+  count_ = 0;
+  for (auto& bucket : buckets_) {
+    bucket /= 2;
+    count_ += bucket;
+  }
+  if (count_ == 0) {
+    max_ = 0;
+  }
+}
+
+uint64_t Histogram::percentile(double pct) const {
+  if (count_ == 0) {
+    return 0;
+  }
+  auto rank = static_cast<uint64_t>(std::ceil(pct / 100.0 * count_));
+  rank = std::min(std::max<uint64_t>(rank, 1), count_);
+  uint64_t seen = 0;
+  for (size_t i = 0; i < kNumBuckets; ++i) {
+    seen += buckets_[i];
+    if (seen >= rank) {
+      return std::min(bucketUpperBound(i), max_);
+    }
+  }
+  return max_;
+}
+
+void Histogram::appendStats(
+    folly::StringPiece prefix,
+    folly::dynamic& stats) const {
+  static constexpr std::pair<const char*, double> kPercentiles[] = {
+      {"p50", 50.0}, {"p95", 95.0}, {"p99", 99.0}, {"p999", 99.9}};
+
+  stats[folly::to<std::string>(prefix, ".count")] = count_;
+  stats[folly::to<std::string>(prefix, ".max")] = max_;
+  for (const auto& p : kPercentiles) {
+    stats[folly::to<std::string>(prefix, ".", p.first)] = percentile(p.second);
+  }
+}
+
+void RequestHistograms::appendStats(
+    folly::StringPiece prefix,
+    folly::dynamic& stats) const {
+  durationUs.appendStats(folly::to<std::string>(prefix, ".duration_us"), stats);
+  valueBytes.appendStats(folly::to<std::string>(prefix, ".value_bytes"), stats);
+}
+
+} // mcrouter
+} // memcache
+} // facebook
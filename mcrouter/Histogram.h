@@ -0,0 +1,111 @@
+/*
+ *  Copyright (c) 2018-present, Facebook, Inc.
+ *
+ *  This source code is licensed under the MIT license found in the LICENSE
+ *  file in the root directory of this source tree.
+ *
+ */
+#pragma once
+
+#include <array>
+#include <cstddef>
+#include <cstdint>
+
+#include <folly/Range.h>
+#include <folly/dynamic.h>
+
+namespace facebook {
+namespace memcache {
+namespace mcrouter {
+
+/**
+ * Fixed size log-linear histogram of non-negative integer samples
+ * (latencies in us, sizes in bytes).
+ *
+ * Every power of two range is split into kSubBuckets buckets, so a
+ * percentile is reported at most 1/kSubBuckets above the true value.
+ * Values of 2^kMaxValueBits and more share the last bucket.
+ *
+ * Histograms of different threads are merged by adding their buckets.
+ * Not thread-safe.
+ */
+class Histogram {
+ public:
+  static constexpr size_t kSubBucketBits = 3;
+  static constexpr size_t kSubBuckets = 1 << kSubBucketBits;
+  static constexpr size_t kMaxValueBits = 40;
+  static constexpr size_t kNumBuckets =
+      kSubBuckets * (kMaxValueBits - kSubBucketBits + 1);
+
+  void addValue(uint64_t value);
+
+  void merge(const Histogram& other);
+
+  /**
+   * Halves all buckets, so old samples weigh less than recent ones.
+   */
+  void decay();
+
+  /**
+   * Smallest bucket bound below which at least pct percent of the samples
+   * are (capped by the largest sample), 0 if there are no samples.
+   *
+   * @param pct  Percentile in [0, 100]
+   */
+  uint64_t percentile(double pct) const;
+
+  uint64_t count() const {
+    return count_;
+  }
+
+  uint64_t max() const {
+    return max_;
+  }
+
+  /**
+   * Adds "<prefix>.count", "<prefix>.max" and "<prefix>.p50", p95, p99 and
+   * p999 to stats.
+   */
+  void appendStats(folly::StringPiece prefix, folly::dynamic& stats) const;
+
+  static size_t bucketIndex(uint64_t value);
+
+  /**
+   * Largest value that falls in the bucket.
+   */
+  static uint64_t bucketUpperBound(size_t index);
+
+ private:
+  std::array<uint64_t, kNumBuckets> buckets_{};
+  uint64_t count_{0};
+  uint64_t max_{0};
+};
+
+/**
+ * Latency and value size histograms of a group of requests
+ * (a pool or a routing prefix).
+ */
+struct RequestHistograms {
+  Histogram durationUs;
+  Histogram valueBytes;
+
+  void merge(const RequestHistograms& other) {
+    durationUs.merge(other.durationUs);
+    valueBytes.merge(other.valueBytes);
+  }
+
+  void decay() {
+    durationUs.decay();
+    valueBytes.decay();
+  }
+
+  /**
+   * "<prefix>.duration_us.<stat>" and "<prefix>.value_bytes.<stat>",
+   * see Histogram::appendStats().
+   */
+  void appendStats(folly::StringPiece prefix, folly::dynamic& stats) const;
+};
+
+} // mcrouter
+} // memcache
+} // facebook
@@ -0,0 +1,186 @@
+/*
+ *  Copyright (c) 2018-present, Facebook, Inc.
+ *
+ *  This source code is licensed under the MIT license found in the LICENSE
+ *  file in the root directory of this source tree.
+ *
+ */
+#include "HotKeys.h"
+
+#include <algorithm>
+#include <utility>
+
+namespace facebook {
+namespace memcache {
+namespace mcrouter {
+
+SpaceSaving::SpaceSaving(size_t capacity) : capacity_(capacity) {
+  entries_.reserve(capacity_);
+  heap_.reserve(capacity_);
+  heapPos_.reserve(capacity_);
+}
+
+void SpaceSaving::addWithError(
+    folly::StringPiece key,
+    uint64_t weight,
+    uint64_t error) {
+  if (capacity_ == 0) {
+    return;
+  }
+  total_ += weight;
+
+  auto it = index_.find(key);
+  if (it != index_.end()) {
+    auto& entry = entries_[it->second];
+    entry.count += weight;
+    entry.error += error;
+    siftDown(heapPos_[it->second]);
+    return;
+  }
+
+  if (entries_.size() < capacity_) {
+    auto idx = entries_.size();
+    entries_.push_back(Entry{key.str(), weight, error});
+    heap_.push_back(idx);
+    heapPos_.push_back(idx);
+    index_.emplace(key, idx);
+    siftUp(heapPos_[idx]);
+    return;
+  }
+
+  // Evict the lightest key, the new one may have had up to its count
+  auto idx = heap_[0];
+  auto& entry = entries_[idx];
+  index_.erase(entry.key);
+  entry.key.assign(key.begin(), key.end());
+  entry.error = entry.count + error;
+  entry.count += weight;
+  index_.emplace(key, idx);
+  siftDown(0);
+}
+
+void SpaceSaving::merge(const SpaceSaving& other) {
+  auto total = total_;
+  for (const auto& entry : other.entries_) {
+    addWithError(entry.key, entry.count, entry.error);
+  }
+  total_ = total + other.total_;
+}
+
+void SpaceSaving::decay() {
+  // Halving keeps the order, so the heap stays valid
+  for (auto& entry : entries_) {
+    entry.count /= 2;
+    entry.error /= 2;
+  }
+  total_ /= 2;
+}
+
+std::vector<SpaceSaving::Entry> SpaceSaving::top(size_t n) const {
+  std::vector<Entry> result(entries_);
+  n = std::min(n, result.size());
+  std::partial_sort(
+      result.begin(),
+      result.begin() + n,
+      result.end(),
+      [](const Entry& a, const Entry& b) {
+        return a.count > b.count || (a.count == b.count && a.key < b.key);
+      });
+  result.resize(n);
+  return result;
+}
+
+void SpaceSaving::swapHeap(size_t i, size_t j) {
+  std::swap(heap_[i], heap_[j]);
+  heapPos_[heap_[i]] = i;
+  heapPos_[heap_[j]] = j;
+}
+
+void SpaceSaving::siftUp(size_t pos) {
+  while (pos > 0) {
+    auto parent = (pos - 1) / 2;
+    if (entries_[heap_[parent]].count <= entries_[heap_[pos]].count) {
+      break;
+    }
+    swapHeap(pos, parent);
+    pos = parent;
+  }
+}
+
+void SpaceSaving::siftDown(size_t pos) {
+  while (true) {
+    auto smallest = pos;
+    for (auto child : {2 * pos + 1, 2 * pos + 2}) {
+      if (child < heap_.size() &&
+          entries_[heap_[child]].count < entries_[heap_[smallest]].count) {
+        smallest = child;
+      }
+    }
+    if (smallest == pos) {
+      return;
+    }
+    swapHeap(pos, smallest);
+    pos = smallest;
+  }
+}
+
+HotKeys::HotKeys(size_t capacity, uint32_t decayIntervalSec)
+    : capacity_(capacity),
+      decayIntervalSec_(decayIntervalSec),
+      lastDecay_(time(nullptr)),
+      requests_(capacity),
+      bytes_(capacity) {}
+
+void HotKeys::record(folly::StringPiece key, uint64_t replyBytes) {
+  if (!enabled()) {
+    return;
+  }
+  std::lock_guard<std::mutex> lock(mutex_);
+  requests_.add(key);
+  if (replyBytes > 0) {
+    bytes_.add(key, replyBytes);
+  }
+}
+
+void HotKeys::tick(time_t now) {
+  if (!enabled() || decayIntervalSec_ == 0 ||
+      now - lastDecay_ < static_cast<time_t>(decayIntervalSec_)) {
+    return;
+  }
+  lastDecay_ = now;
+  std::lock_guard<std::mutex> lock(mutex_);
+  requests_.decay();
+  bytes_.decay();
+}
+
+void HotKeys::mergeInto(SpaceSaving& requests, SpaceSaving& bytes) const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  requests.merge(requests_);
+  bytes.merge(bytes_);
+}
+
+namespace {
+
+folly::dynamic sketchToDynamic(const SpaceSaving& sketch, size_t n) {
+  auto top = folly::dynamic::array();
+  for (const auto& entry : sketch.top(n)) {
+    top.push_back(folly::dynamic::object("key", entry.key)(
+        "count", entry.count)("error", entry.error));
+  }
+  return folly::dynamic::object("total", sketch.total())("top", std::move(top));
+}
+
+} // anonymous namespace
+
+folly::dynamic hotKeysToDynamic(
+    const SpaceSaving& requests,
+    const SpaceSaving& bytes,
+    size_t n) {
+  return folly::dynamic::object("capacity", requests.capacity())(
+      "requests", sketchToDynamic(requests, n))(
+      "bytes", sketchToDynamic(bytes, n));
+}
+
+} // mcrouter
+} // memcache
+} // facebook
@@ -0,0 +1,149 @@
+/*
+ *  Copyright (c) 2018-present, Facebook, Inc.
+ *
+ *  This source code is licensed under the MIT license found in the LICENSE
+ *  file in the root directory of this source tree.
+ *
+ */
+#pragma once
+
+#include <cstdint>
+#include <ctime>
+#include <mutex>
+#include <string>
+#include <vector>
+
+#include <folly/Range.h>
+#include <folly/dynamic.h>
+#include <folly/experimental/StringKeyedUnorderedMap.h>
+
+namespace facebook {
+namespace memcache {
+namespace mcrouter {
+
+/**
+ * Space-Saving sketch of the heaviest keys of a weighted stream.
+ *
+ * At most capacity keys are monitored. A key that isn't monitored replaces
+ * the one with the smallest count and inherits that count as its error, so
+ * a key's true weight is in [count - error, count], and every key heavier
+ * than total() / capacity() is guaranteed to be monitored.
+ *
+ * Memory is bounded by capacity; add() is O(log(capacity)).
+ * Not thread-safe.
+ */
+class SpaceSaving {
+ public:
+  struct Entry {
+    std::string key;
+    uint64_t count{0};
+    uint64_t error{0};
+  };
+
+  explicit SpaceSaving(size_t capacity);
+
+  void add(folly::StringPiece key, uint64_t weight = 1) {
+    addWithError(key, weight, 0);
+  }
+
+  /**
+   * Adds the entries of other, with their errors.
+   */
+  void merge(const SpaceSaving& other);
+
+  /**
+   * Halves all counts, so old traffic weighs less than recent traffic.
+   */
+  void decay();
+
+  /**
+   * At most n entries, heaviest first.
+   */
+  std::vector<Entry> top(size_t n) const;
+
+  size_t capacity() const {
+    return capacity_;
+  }
+
+  size_t size() const {
+    return entries_.size();
+  }
+
+  /**
+   * Weight of the whole stream (decayed like the counts).
+   */
+  uint64_t total() const {
+    return total_;
+  }
+
+ private:
+  const size_t capacity_;
+  uint64_t total_{0};
+  std::vector<Entry> entries_;
+  // Min-heap of indices into entries_, ordered by count
+  std::vector<size_t> heap_;
+  // Position of every entry in heap_
+  std::vector<size_t> heapPos_;
+  folly::StringKeyedUnorderedMap<size_t> index_;
+
+  void addWithError(folly::StringPiece key, uint64_t weight, uint64_t error);
+  void swapHeap(size_t i, size_t j);
+  void siftUp(size_t pos);
+  void siftDown(size_t pos);
+};
+
+/**
+ * Heavy hitters of one proxy: the keys with the most requests and the keys
+ * returning the most value bytes.
+ *
+ * Recorded on the proxy thread and read by the stats threads, hence the
+ * (uncontended on the request path) lock.
+ */
+class HotKeys {
+ public:
+  /**
+   * @param capacity          Number of keys monitored per sketch,
+   *                          0 disables recording.
+   * @param decayIntervalSec  Counts are halved every decayIntervalSec
+   *                          seconds, 0 never decays them.
+   */
+  HotKeys(size_t capacity, uint32_t decayIntervalSec);
+
+  bool enabled() const {
+    return capacity_ > 0;
+  }
+
+  void record(folly::StringPiece key, uint64_t replyBytes);
+
+  /**
+   * Decays the sketches if decayIntervalSec passed since the last decay.
+   */
+  void tick(time_t now);
+
+  /**
+   * Merges both sketches into the given ones.
+   */
+  void mergeInto(SpaceSaving& requests, SpaceSaving& bytes) const;
+
+ private:
+  const size_t capacity_;
+  const uint32_t decayIntervalSec_;
+  time_t lastDecay_{0};
+
+  mutable std::mutex mutex_;
+  SpaceSaving requests_;
+  SpaceSaving bytes_;
+};
+
+/**
+ * {"capacity": ..., "requests": {"total": ..., "top": [...]}, "bytes": ...}
+ * where top lists the n heaviest {"key", "count", "error"}.
+ */
+folly::dynamic hotKeysToDynamic(
+    const SpaceSaving& requests,
+    const SpaceSaving& bytes,
+    size_t n);
+
+} // mcrouter
+} // memcache
+} // facebook
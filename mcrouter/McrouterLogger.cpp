@@ -38,6 +38,7 @@ namespace {
 const char* kStatsSfx = "stats";
 const char* kStatsStartupOptionsSfx = "startup_options";
 const char* kConfigSourcesInfoFileName = "config_sources_info";
+const char* kHotKeysSfx = "hotkeys";
 
 std::string stats_file_path(
     const McrouterOptions& opts,
@@ -218,6 +219,7 @@ void McrouterLogger::log() {
       requestStats.setDefault(k, 0) += proxyRequestStats[k];
     }
   }
+  requestStats.update(histogram_stats(router_));
 
   for (int i = 0; i < num_stats; ++i) {
     if (stats[i].group & rate_stats) {
@@ -234,6 +236,9 @@ void McrouterLogger::log() {
 
   write_stats_to_disk(router_.opts(), stats, requestStats);
   write_config_sources_info_to_disk(router_);
+  if (router_.opts().hot_keys_capacity > 0) {
+    write_stats_file(router_.opts(), kHotKeysSfx, hot_keys_stats(router_));
+  }
 
   for (const auto& filepath : touchStatsFilepaths_) {
     touchFile(filepath);
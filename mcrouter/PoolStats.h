@@ -10,6 +10,7 @@
 #include <folly/experimental/StringKeyedUnorderedMap.h>
 
 #include "mcrouter/ExponentialSmoothData.h"
+#include "mcrouter/Histogram.h"
 #include "mcrouter/stats.h"
 
 namespace facebook {
@@ -19,7 +20,8 @@ namespace mcrouter {
 class PoolStats {
  public:
   PoolStats(folly::StringPiece poolName)
-      : requestsCountStatName_(
+      : poolName_(poolName.str()),
+        requestsCountStatName_(
             folly::to<std::string>(poolName, ".requests.sum")),
         finalResultErrorStatName_(
             folly::to<std::string>(poolName, ".final_result_error.sum")),
@@ -57,6 +59,22 @@ class PoolStats {
     durationUsStat_.insertSample(duration);
   }
 
+  const std::string& poolName() const {
+    return poolName_;
+  }
+
+  /**
+   * Latency (as in duration_us) and value size histograms of the pool.
+   * Only accessed under ProxyStats' histograms lock, see
+   * ProxyStats::addPoolHistogramSamples().
+   */
+  RequestHistograms& histograms() {
+    return histograms_;
+  }
+  const RequestHistograms& histograms() const {
+    return histograms_;
+  }
+
   void addTotalDurationSample(int64_t duration) {
     totalDurationUsStat_.insertSample(duration);
   }
@@ -70,6 +88,7 @@ class PoolStats {
     stat.data.uint64 = 0;
   }
 
+  const std::string poolName_;
   const std::string requestsCountStatName_;
   const std::string finalResultErrorStatName_;
   const std::string durationUsStatName_;
@@ -78,6 +97,7 @@ class PoolStats {
   stat_t finalResultErrorStat_;
   ExponentialSmoothData<64> totalDurationUsStat_;
   ExponentialSmoothData<64> durationUsStat_;
+  RequestHistograms histograms_;
 };
 
 } // namespace mcrouter
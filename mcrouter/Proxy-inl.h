@@ -11,6 +11,7 @@
 #include "mcrouter/McrouterFiberContext.h"
 #include "mcrouter/ProxyRequestContextTyped.h"
 #include "mcrouter/lib/MessageQueue.h"
+#include "mcrouter/lib/carbon/RequestReplyUtil.h"
 #include "mcrouter/lib/carbon/RoutingGroups.h"
 #include "mcrouter/lib/carbon/Stats.h"
 #include "mcrouter/lib/network/gen/Memcache.h"
@@ -43,6 +44,45 @@ bool processGetServiceInfoRequest(
   return true;
 }
 
+template <class Request>
+typename std::enable_if<Request::hasKey>::type recordHotKey(
+    ProxyBase& proxy,
+    const Request& req,
+    const ReplyT<Request>& reply) {
+  auto& hotKeys = proxy.hotKeys();
+  if (!hotKeys.enabled()) {
+    return;
+  }
+  const auto* value = carbon::valuePtrUnsafe(reply);
+  hotKeys.record(
+      req.key().fullKey(), value ? value->computeChainDataLength() : 0);
+}
+
+template <class Request>
+typename std::enable_if<!Request::hasKey>::type
+recordHotKey(ProxyBase&, const Request&, const ReplyT<Request>&) {}
+
+template <class Request>
+typename std::enable_if<Request::hasKey>::type recordRoutingPrefixStats(
+    ProxyBase& proxy,
+    const Request& req,
+    const ReplyT<Request>& reply,
+    int64_t durationUs) {
+  auto routingPrefix = req.key().routingPrefix();
+  if (routingPrefix.empty()) {
+    routingPrefix = proxy.getRouterOptions().default_route.str();
+  }
+  proxy.stats().addRoutingPrefixHistogramSamples(
+      routingPrefix, durationUs, valueBytes(req, reply));
+}
+
+template <class Request>
+typename std::enable_if<!Request::hasKey>::type recordRoutingPrefixStats(
+    ProxyBase&,
+    const Request&,
+    const ReplyT<Request>&,
+    int64_t) {}
+
 } // detail
 
 template <class RouterInfo>
@@ -82,6 +122,7 @@ Proxy<RouterInfo>::addRouteTask(
   requestStats_.template bump<Request>(carbon::RouterStatTypes::Incoming);
 
   auto funcCtx = sharedCtx;
+  const auto startTimeUs = nowUs();
 
   fiberManager().addTaskFinally(
       [&req, ctx = std::move(funcCtx)]() mutable {
@@ -100,7 +141,13 @@ Proxy<RouterInfo>::addRouteTask(
           return reply;
         }
       },
-      [ctx = std::move(sharedCtx)](folly::Try<ReplyT<Request>>&& reply) {
+      [this, &req, startTimeUs, ctx = std::move(sharedCtx)](
+          folly::Try<ReplyT<Request>>&& reply) {
+        detail::recordHotKey(*this, req, *reply);
+        if (getRouterOptions().enable_routing_prefix_stats) {
+          detail::recordRoutingPrefixStats(
+              *this, req, *reply, nowUs() - startTimeUs);
+        }
         ctx->sendReply(std::move(*reply));
       });
 }
@@ -33,6 +33,9 @@ ProxyBase::ProxyBase(
           getFiberManagerOptions(router_.opts())),
       asyncLog_(router_.opts()),
       stats_(router_.getStatsEnabledPools()),
+      hotKeys_(
+          router_.opts().hot_keys_capacity,
+          router_.opts().hot_keys_decay_interval_sec),
       flushCallback_(*this),
       destinationMap_(std::make_unique<ProxyDestinationMap>(this)) {
   // Setup a full random seed sequence
@@ -16,6 +16,7 @@
 #include <folly/io/async/VirtualEventBase.h>
 
 #include "mcrouter/AsyncLog.h"
+#include "mcrouter/HotKeys.h"
 #include "mcrouter/ProxyStats.h"
 #include "mcrouter/config.h"
 
@@ -89,6 +90,13 @@ class ProxyBase {
     return stats_;
   }
 
+  HotKeys& hotKeys() {
+    return hotKeys_;
+  }
+  const HotKeys& hotKeys() const {
+    return hotKeys_;
+  }
+
   ProxyStatsContainer* statsContainer() {
     return statsContainer_.get();
   }
@@ -124,6 +132,8 @@ class ProxyBase {
   ProxyStats stats_;
   std::unique_ptr<ProxyStatsContainer> statsContainer_;
 
+  HotKeys hotKeys_;
+
   static folly::fibers::FiberManager::Options getFiberManagerOptions(
       const McrouterOptions& opts);
 
@@ -13,6 +13,7 @@
 #include "mcrouter/ProxyRequestLogger.h"
 #include "mcrouter/lib/RequestLoggerContext.h"
 #include "mcrouter/lib/carbon/NoopAdditionalLogger.h"
+#include "mcrouter/lib/carbon/RequestReplyUtil.h"
 
 namespace facebook {
 namespace memcache {
@@ -40,6 +41,19 @@ struct RouterAdditionalLogger<
   using type = typename RouterInfo::AdditionalLogger;
 };
 
+/**
+ * Size of the value carried by the request (e.g. set) or else by the reply
+ * (e.g. get), 0 if there is none.
+ */
+template <class Request>
+uint64_t valueBytes(const Request& request, const ReplyT<Request>& reply) {
+  const auto* value = carbon::valuePtrUnsafe(request);
+  if (value == nullptr) {
+    value = carbon::valuePtrUnsafe(reply);
+  }
+  return value != nullptr ? value->computeChainDataLength() : 0;
+}
+
 } // detail
 
 template <class RouterInfo>
@@ -124,6 +138,10 @@ class ProxyRequestContextWithInfo : public ProxyRequestContext {
     if (auto poolStats = proxy_.stats().getPoolStats(poolStatIndex)) {
       poolStats->incrementRequestCount(1);
       poolStats->addDurationSample(endTimeUs - startTimeUs);
+      proxy_.stats().addPoolHistogramSamples(
+          poolStatIndex,
+          endTimeUs - startTimeUs,
+          detail::valueBytes(request, reply));
     }
     RequestLoggerContext loggerContext(
         poolName,
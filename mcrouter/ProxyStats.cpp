@@ -44,6 +44,72 @@ std::unique_lock<std::mutex> ProxyStats::lock() const {
   return std::unique_lock<std::mutex>(mutex_);
 }
 
+constexpr size_t ProxyStats::kMaxRoutingPrefixes;
+
+namespace {
+
+void addSamples(
+    RequestHistograms& histograms,
+    int64_t durationUs,
+    uint64_t valueBytes) {
+  histograms.durationUs.addValue(durationUs > 0 ? durationUs : 0);
+  if (valueBytes > 0) {
+    histograms.valueBytes.addValue(valueBytes);
+  }
+}
+
+} // anonymous namespace
+
+void ProxyStats::addPoolHistogramSamples(
+    int32_t poolIdx,
+    int64_t durationUs,
+    uint64_t valueBytes) {
+  auto* poolStats = getPoolStats(poolIdx);
+  if (poolStats == nullptr) {
+    return;
+  }
+  std::lock_guard<std::mutex> guard(histogramsMutex_);
+  addSamples(poolStats->histograms(), durationUs, valueBytes);
+}
+
+void ProxyStats::addRoutingPrefixHistogramSamples(
+    folly::StringPiece prefix,
+    int64_t durationUs,
+    uint64_t valueBytes) {
+  std::lock_guard<std::mutex> guard(histogramsMutex_);
+  auto it = routingPrefixHistograms_.find(prefix);
+  if (it == routingPrefixHistograms_.end()) {
+    if (routingPrefixHistograms_.size() >= kMaxRoutingPrefixes) {
+      return;
+    }
+    it = routingPrefixHistograms_.emplace(prefix, RequestHistograms()).first;
+  }
+  addSamples(it->second, durationUs, valueBytes);
+}
+
+void ProxyStats::mergeHistograms(
+    folly::StringKeyedUnorderedMap<RequestHistograms>& pools,
+    folly::StringKeyedUnorderedMap<RequestHistograms>& routingPrefixes)
+    const {
+  std::lock_guard<std::mutex> guard(histogramsMutex_);
+  for (const auto& poolStats : poolStats_) {
+    pools[poolStats.poolName()].merge(poolStats.histograms());
+  }
+  for (const auto& it : routingPrefixHistograms_) {
+    routingPrefixes[it.first].merge(it.second);
+  }
+}
+
+void ProxyStats::decayHistograms() {
+  std::lock_guard<std::mutex> guard(histogramsMutex_);
+  for (auto& poolStats : poolStats_) {
+    poolStats.histograms().decay();
+  }
+  for (auto& it : routingPrefixHistograms_) {
+    it.second.decay();
+  }
+}
+
 } // namespace mcrouter
 } // namespace memcache
 } // namespace facebook
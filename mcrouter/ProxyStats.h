@@ -12,6 +12,7 @@
 #include <folly/experimental/StringKeyedUnorderedMap.h>
 
 #include "mcrouter/ExponentialSmoothData.h"
+#include "mcrouter/Histogram.h"
 #include "mcrouter/PoolStats.h"
 #include "mcrouter/stats.h"
 
@@ -165,6 +166,45 @@ class ProxyStats {
     return &poolStats_[idx];
   }
 
+  /**
+   * Records a request in the histograms of the stats enabled pool with the
+   * given index (see getPoolStats()).
+   *
+   * @param valueBytes  Size of the value of the request, 0 if it has none.
+   */
+  void addPoolHistogramSamples(
+      int32_t poolIdx,
+      int64_t durationUs,
+      uint64_t valueBytes);
+
+  /**
+   * Records a request in the histograms of the given routing prefix, created
+   * on first use. Requests of new prefixes are dropped once
+   * kMaxRoutingPrefixes prefixes are tracked.
+   *
+   * @param valueBytes  Size of the value of the request, 0 if it has none.
+   */
+  void addRoutingPrefixHistogramSamples(
+      folly::StringPiece prefix,
+      int64_t durationUs,
+      uint64_t valueBytes);
+
+  /**
+   * Adds the histograms of every stats enabled pool and of every routing
+   * prefix to the given maps, keyed by pool name and routing prefix.
+   */
+  void mergeHistograms(
+      folly::StringKeyedUnorderedMap<RequestHistograms>& pools,
+      folly::StringKeyedUnorderedMap<RequestHistograms>& routingPrefixes)
+      const;
+
+  /**
+   * Halves all histograms so they reflect recent traffic.
+   */
+  void decayHistograms();
+
+  static constexpr size_t kMaxRoutingPrefixes = 128;
+
  private:
   mutable std::mutex mutex_;
   stat_t stats_[num_stats]{};
@@ -173,6 +213,11 @@ class ProxyStats {
 
   ExponentialSmoothData<64> durationUs_;
 
+  // Guards the pool and routing prefix histograms: the proxy thread
+  // records into them while the stats threads merge and decay them
+  mutable std::mutex histogramsMutex_;
+  folly::StringKeyedUnorderedMap<RequestHistograms> routingPrefixHistograms_;
+
   ExponentialSmoothData<64> inactiveConnectionClosedIntervalSec_;
 
   // we are wasting some memory here to get faster mapping from stat name to
@@ -175,12 +175,32 @@ bool ConnectionFifo::isConnected() const noexcept {
   return debugFifo_ && debugFifo_->isConnected();
 }
 
+void ConnectionFifo::refreshFilter() noexcept {
+  auto version = debugFifo_->filterVersion();
+  if (version == filterVersion_) {
+    return;
+  }
+  filter_ = debugFifo_->filter();
+  filterVersion_ = version;
+  connectionSampled_ = !filter_ ||
+      filter_->matchesConnection(currentMessageHeader_.connectionId());
+}
+
 bool ConnectionFifo::startMessage(
     MessageDirection direction,
-    uint32_t typeId) noexcept {
+    uint32_t typeId,
+    folly::StringPiece key,
+    bool streamed) noexcept {
   if (!isConnected()) {
     return false;
   }
+  refreshFilter();
+  checkSize_ = !streamed;
+  skipMessage_ = filter_ &&
+      (!connectionSampled_ || !filter_->matchesMessage(direction, typeId, key));
+  if (skipMessage_) {
+    return false;
+  }
   currentMessageHeader_.setDirection(direction);
   currentMessageHeader_.setTypeId(typeId);
   currentMessageHeader_.setTimeUs(timeSinceEpoch());
@@ -246,10 +266,21 @@ bool ConnectionFifo::writeData(
   // | PACKET HEADER | PACKET BODY |
   // -------------------------------
 
-  if (!isConnected() || iovcnt == 0) {
+  if (!isConnected() || iovcnt == 0 || skipMessage_) {
     return false;
   }
 
+  if (nextPacketId_ == 0 && checkSize_ && filter_) {
+    size_t size = 0;
+    for (size_t i = 0; i < iovcnt; ++i) {
+      size += iov[i].iov_len;
+    }
+    if (!filter_->matchesSize(size)) {
+      skipMessage_ = true;
+      return false;
+    }
+  }
+
   PipeIov pipeIov;
   IovecIterator iovIter(iov, iovcnt);
 
@@ -12,6 +12,7 @@
 
 #include "mcrouter/lib/debug/ConnectionFifoProtocol.h"
 #include "mcrouter/lib/debug/Fifo.h"
+#include "mcrouter/lib/debug/FifoFilter.h"
 
 namespace facebook {
 namespace memcache {
@@ -52,8 +53,21 @@ class ConnectionFifo {
    *
    * @param direction   Whether the data was received or sent by connection.
    * @param typeId      Id of the type of the message.
+   * @param key         Key of the message, if known.
+   * @param streamed    True if the data of the message is passed to
+   *                    writeData() in several chunks as it is read. The size
+   *                    of such a message is not known upfront, so the
+   *                    min_message_size filter does not apply to it.
+   *
+   * @return            False if there is no reader or if the message is
+   *                    rejected by the fifo filter, in which case the data
+   *                    of the message is dropped by writeData().
    */
-  bool startMessage(MessageDirection direction, uint32_t typeId) noexcept;
+  bool startMessage(
+      MessageDirection direction,
+      uint32_t typeId,
+      folly::StringPiece key = folly::StringPiece(),
+      bool streamed = false) noexcept;
 
   /**
    * Writes data to the FIFO, but only if there is reader (i.e. mcpiper)
@@ -69,6 +83,19 @@ class ConnectionFifo {
   std::shared_ptr<Fifo> debugFifo_;
   MessageHeader currentMessageHeader_;
   uint32_t nextPacketId_{0};
+
+  // Filter of the fifo, refreshed when its version changes.
+  std::shared_ptr<const FifoFilter> filter_;
+  uint64_t filterVersion_{0};
+  // Whether the connection is sampled by the filter.
+  bool connectionSampled_{true};
+  // Whether the data of the current message must be dropped.
+  bool skipMessage_{false};
+  // Whether the current message is written in one call, so that its size
+  // can be checked against the filter.
+  bool checkSize_{true};
+
+  void refreshFilter() noexcept;
 };
 
 } // memcache
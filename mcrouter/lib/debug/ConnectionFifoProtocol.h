@@ -24,6 +24,14 @@ enum class MessageDirection : uint8_t { Sent = 0, Received = 1 };
 
 constexpr folly::StringPiece kUnixSocketPrefix{"US:"};
 
+/**
+ * Name of the file, next to the fifos, holding the filter (see FifoFilter)
+ * applied to the messages before they are written to the fifos. Readers
+ * (i.e. mcpiper or tests) set a filter by atomically replacing this file and
+ * clear it by removing the file.
+ */
+constexpr folly::StringPiece kFifoFilterFileName{"debug_fifo_filter.json"};
+
 /**
  * Header of the message of ConnectionFifo.
  */
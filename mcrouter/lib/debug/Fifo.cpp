@@ -18,6 +18,7 @@
 
 #include <glog/logging.h>
 
+#include <folly/Conv.h>
 #include <folly/FileUtil.h>
 
 #include "mcrouter/lib/fbi/cpp/util.h"
@@ -50,7 +51,12 @@ bool isFifo(const char* fifoPath) {
 
 } // anonymous namespace
 
-Fifo::Fifo(std::string path) : path_(std::move(path)) {
+Fifo::Fifo(std::string path)
+    : path_(std::move(path)),
+      filterPath_(folly::to<std::string>(
+          boost::filesystem::path(path_).parent_path().string(),
+          "/",
+          kFifoFilterFileName)) {
   if (UNLIKELY(path_.empty())) {
     throw std::invalid_argument("Fifo path cannot be empty");
   }
@@ -106,6 +112,50 @@ void Fifo::disconnect() noexcept {
   }
 }
 
+void Fifo::updateFilter() noexcept {
+  struct stat st;
+  if (stat(filterPath_.c_str(), &st) != 0) {
+    if (filterSignature_.ino != 0) {
+      // Filter file removed, write everything again.
+      filterSignature_ = FilterFileSignature();
+      setFilter(nullptr);
+    }
+    return;
+  }
+
+  FilterFileSignature signature;
+  signature.ino = st.st_ino;
+  signature.size = st.st_size;
+  signature.mtimeSec = st.st_mtim.tv_sec;
+  signature.mtimeNsec = st.st_mtim.tv_nsec;
+  if (signature.ino == filterSignature_.ino &&
+      signature.size == filterSignature_.size &&
+      signature.mtimeSec == filterSignature_.mtimeSec &&
+      signature.mtimeNsec == filterSignature_.mtimeNsec) {
+    return;
+  }
+
+  std::string json;
+  if (!folly::readFile(filterPath_.c_str(), json)) {
+    VLOG(1) << "Error reading debug fifo filter at \"" << filterPath_
+            << "\": " << strerror(errno);
+    return;
+  }
+  filterSignature_ = signature;
+
+  try {
+    setFilter(FifoFilter::fromJson(json));
+  } catch (const std::exception& e) {
+    LOG(ERROR) << "Invalid debug fifo filter at \"" << filterPath_
+               << "\", keeping the previous one: " << e.what();
+  }
+}
+
+void Fifo::setFilter(std::shared_ptr<const FifoFilter> filter) noexcept {
+  *filter_.wlock() = std::move(filter);
+  filterVersion_.fetch_add(1, std::memory_order_release);
+}
+
 bool Fifo::write(void* buf, size_t len) noexcept {
   iovec iov[1];
   iov[0].iov_base = buf;
@@ -7,11 +7,17 @@
  */
 #pragma once
 
+#include <sys/types.h>
 #include <sys/uio.h>
 
 #include <atomic>
+#include <memory>
 #include <string>
 
+#include <folly/Synchronized.h>
+
+#include "mcrouter/lib/debug/FifoFilter.h"
+
 namespace facebook {
 namespace memcache {
 
@@ -65,6 +71,22 @@ class Fifo {
   bool write(const struct iovec* iov, size_t iovcnt) noexcept;
   bool write(void* buf, size_t len) noexcept;
 
+  /**
+   * Returns the filter of the messages written to this fifo, or nullptr if
+   * every message should be written.
+   */
+  std::shared_ptr<const FifoFilter> filter() const noexcept {
+    return filter_.copy();
+  }
+
+  /**
+   * Version of the filter, incremented every time it changes. Allows
+   * writers to cache the filter and only fetch it again when it changed.
+   */
+  uint64_t filterVersion() const noexcept {
+    return filterVersion_.load(std::memory_order_acquire);
+  }
+
  private:
   /**
    * Creates a fifo on the given path.
@@ -78,11 +100,32 @@ class Fifo {
   // Fifo file descriptor.
   std::atomic<int> fd_{-1};
 
+  // Path of the filter file, in the directory of the fifo.
+  const std::string filterPath_;
+  // Filter read from filterPath_.
+  folly::Synchronized<std::shared_ptr<const FifoFilter>> filter_;
+  std::atomic<uint64_t> filterVersion_{0};
+  // Inode, size and modification time of the filter file last read.
+  struct FilterFileSignature {
+    ino_t ino{0};
+    off_t size{0};
+    time_t mtimeSec{0};
+    long mtimeNsec{0};
+  } filterSignature_;
+
   /**
    * Disconnects the pipe.
    */
   void disconnect() noexcept;
 
+  /**
+   * Reads the filter file again if it was replaced or removed since the
+   * last call. If the file is invalid, the previous filter is kept.
+   * Note: This method is not thread-safe.
+   */
+  void updateFilter() noexcept;
+  void setFilter(std::shared_ptr<const FifoFilter> filter) noexcept;
+
   friend class FifoManager;
 };
 
@@ -0,0 +1,145 @@
+/*
+ *  Copyright (c) 2017-present, Facebook, Inc.
+ *
+ *  This source code is licensed under the MIT license found in the LICENSE
+ *  file in the root directory of this source tree.
+ *
+ */
+#include "FifoFilter.h"
+
+#include <stdexcept>
+
+#include <folly/Format.h>
+#include <folly/Hash.h>
+#include <folly/json.h>
+
+namespace facebook {
+namespace memcache {
+
+namespace {
+
+const folly::dynamic& getField(
+    const folly::dynamic& json,
+    folly::StringPiece name,
+    folly::dynamic::Type type) {
+  static const folly::dynamic kNull = nullptr;
+  auto it = json.find(name);
+  if (it == json.items().end()) {
+    return kNull;
+  }
+  if (it->second.type() != type &&
+      !(type == folly::dynamic::DOUBLE && it->second.isInt())) {
+    throw std::runtime_error(folly::sformat(
+        "debug fifo filter: '{}' is a {}, expected {}",
+        name,
+        it->second.typeName(),
+        folly::dynamic::typeName(type)));
+  }
+  return it->second;
+}
+
+} // anonymous namespace
+
+/* static */ std::shared_ptr<const FifoFilter> FifoFilter::fromJson(
+    folly::StringPiece json) {
+  auto parsed = folly::parseJson(json);
+  if (!parsed.isObject()) {
+    throw std::runtime_error("debug fifo filter must be a JSON object");
+  }
+  for (const auto& kv : parsed.items()) {
+    static const std::unordered_set<std::string> kFields{"key_prefix",
+                                                         "key_regex",
+                                                         "type_ids",
+                                                         "direction",
+                                                         "min_message_size",
+                                                         "sample_rate"};
+    if (!kv.first.isString() || !kFields.count(kv.first.getString())) {
+      throw std::runtime_error(folly::sformat(
+          "debug fifo filter: unknown field {}", folly::toJson(kv.first)));
+    }
+  }
+
+  auto filter = std::make_shared<FifoFilter>();
+  const auto& keyPrefix =
+      getField(parsed, "key_prefix", folly::dynamic::STRING);
+  if (keyPrefix.isString()) {
+    filter->keyPrefix_ = keyPrefix.getString();
+  }
+  const auto& keyRegex = getField(parsed, "key_regex", folly::dynamic::STRING);
+  if (keyRegex.isString()) {
+    filter->keyRegex_ = boost::regex(keyRegex.getString());
+  }
+  const auto& typeIds = getField(parsed, "type_ids", folly::dynamic::ARRAY);
+  if (typeIds.isArray()) {
+    for (const auto& typeId : typeIds) {
+      filter->typeIds_.insert(typeId.asInt());
+    }
+  }
+  const auto& direction =
+      getField(parsed, "direction", folly::dynamic::STRING);
+  if (direction.isString()) {
+    if (direction.getString() == "sent") {
+      filter->direction_ = MessageDirection::Sent;
+    } else if (direction.getString() == "received") {
+      filter->direction_ = MessageDirection::Received;
+    } else {
+      throw std::runtime_error(folly::sformat(
+          "debug fifo filter: invalid direction '{}'", direction.getString()));
+    }
+  }
+  const auto& minMessageSize =
+      getField(parsed, "min_message_size", folly::dynamic::INT64);
+  if (minMessageSize.isInt()) {
+    filter->minMessageSize_ = std::max<int64_t>(0, minMessageSize.getInt());
+  }
+  const auto& sampleRate =
+      getField(parsed, "sample_rate", folly::dynamic::DOUBLE);
+  if (sampleRate.isNumber()) {
+    filter->sampleRate_ = sampleRate.asDouble();
+    if (filter->sampleRate_ < 0.0 || filter->sampleRate_ > 1.0) {
+      throw std::runtime_error(
+          "debug fifo filter: sample_rate must be in [0, 1]");
+    }
+  }
+  return filter;
+}
+
+bool FifoFilter::matchesConnection(uint64_t connectionId) const noexcept {
+  if (sampleRate_ >= 1.0) {
+    return true;
+  }
+  // Connection ids are addresses, mix them to get uniform samples.
+  auto hash = folly::hash::twang_mix64(connectionId);
+  return (hash >> 11) * (1.0 / (uint64_t(1) << 53)) < sampleRate_;
+}
+
+bool FifoFilter::matchesMessage(
+    MessageDirection direction,
+    uint32_t typeId,
+    folly::StringPiece key) const noexcept {
+  if (direction_.hasValue() && direction_.value() != direction) {
+    return false;
+  }
+  if (!typeIds_.empty() && !typeIds_.count(typeId)) {
+    return false;
+  }
+  // Replies don't have keys, let them through.
+  if (key.empty()) {
+    return true;
+  }
+  if (!key.startsWith(keyPrefix_)) {
+    return false;
+  }
+  if (keyRegex_.hasValue()) {
+    try {
+      return boost::regex_search(key.begin(), key.end(), keyRegex_.value());
+    } catch (const std::runtime_error&) {
+      // Matching gave up (e.g. too complex for this key): skip the message.
+      return false;
+    }
+  }
+  return true;
+}
+
+} // memcache
+} // facebook
@@ -0,0 +1,92 @@
+/*
+ *  Copyright (c) 2017-present, Facebook, Inc.
+ *
+ *  This source code is licensed under the MIT license found in the LICENSE
+ *  file in the root directory of this source tree.
+ *
+ */
+#pragma once
+
+#include <memory>
+#include <string>
+#include <unordered_set>
+
+#include <boost/regex.hpp>
+
+#include <folly/Optional.h>
+#include <folly/Range.h>
+
+#include "mcrouter/lib/debug/ConnectionFifoProtocol.h"
+
+namespace facebook {
+namespace memcache {
+
+/**
+ * Decides which messages ConnectionFifo writes to a debug fifo, so that
+ * traffic a reader is not interested in is dropped before it is copied.
+ *
+ * The filter is read from a JSON object, all fields optional:
+ *  {
+ *    "key_prefix": "foo:",        // keys starting with "foo:"
+ *    "key_regex": "foo:[0-9]+",   // keys (partially) matching the regex
+ *    "type_ids": [1, 2],          // messages of the given type ids
+ *    "direction": "received",     // "sent" or "received" messages
+ *    "min_message_size": 1024,    // messages of at least 1024 bytes
+ *    "sample_rate": 0.01          // 1% of the connections
+ *  }
+ *
+ * Notes:
+ *  - Only requests carry a key: replies always pass key_prefix and
+ *    key_regex, so a filter with only key filters still mirrors every
+ *    reply (of the accepted type_ids). Setting "direction" to the one of
+ *    the requests drops the replies as well.
+ *  - Keys for which key_regex matching fails (e.g. exceeds boost's
+ *    complexity limit) don't match.
+ *  - Sampling is per connection, so that sampled connections are mirrored
+ *    with all their requests and replies.
+ *  - min_message_size only applies to messages written in a single
+ *    writeData() call. ASCII replies received by a client are mirrored
+ *    chunk by chunk as they are read, so their size is not known upfront
+ *    and they are never dropped by size.
+ */
+class FifoFilter {
+ public:
+  /**
+   * Parses a filter.
+   *
+   * @throw std::runtime_error  If json is not a valid filter.
+   */
+  static std::shared_ptr<const FifoFilter> fromJson(folly::StringPiece json);
+
+  /**
+   * Tells whether messages of the given connection should be written.
+   */
+  bool matchesConnection(uint64_t connectionId) const noexcept;
+
+  /**
+   * Tells whether a message should be written, given its header fields and
+   * key (empty if the message has no key).
+   */
+  bool matchesMessage(
+      MessageDirection direction,
+      uint32_t typeId,
+      folly::StringPiece key) const noexcept;
+
+  /**
+   * Tells whether a message of the given size should be written.
+   */
+  bool matchesSize(size_t size) const noexcept {
+    return size >= minMessageSize_;
+  }
+
+ private:
+  std::string keyPrefix_;
+  folly::Optional<boost::regex> keyRegex_;
+  std::unordered_set<uint32_t> typeIds_;
+  folly::Optional<MessageDirection> direction_;
+  size_t minMessageSize_{0};
+  double sampleRate_{1.0};
+};
+
+} // memcache
+} // facebook
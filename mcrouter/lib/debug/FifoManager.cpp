@@ -38,6 +38,7 @@ FifoManager::FifoManager() {
       fifos_.withRLock([](const auto& fifos) {
         for (auto& kv : fifos) {
           kv.second->tryConnect();
+          kv.second->updateFilter();
         }
       });
 
@@ -62,7 +62,7 @@ class FifoManager {
       folly::SharedMutex>
       fifos_;
 
-  // Thread that connects to fifos
+  // Thread that connects to fifos and reloads their filters
   std::thread thread_;
   bool running_{true};
   std::mutex mutex_;
@@ -261,8 +261,12 @@ void AsyncMcClientImpl::pushMessages() {
     auto iov = req.reqContext.getIovs();
     auto iovcnt = req.reqContext.getIovsCount();
     if (debugFifo_.isConnected()) {
-      debugFifo_.startMessage(MessageDirection::Sent, req.reqContext.typeId());
-      debugFifo_.writeData(iov, iovcnt);
+      if (debugFifo_.startMessage(
+              MessageDirection::Sent,
+              req.reqContext.typeId(),
+              req.reqContext.key())) {
+        debugFifo_.writeData(iov, iovcnt);
+      }
     }
 
     if (iovsUsed + iovcnt > kStackIovecs && iovsUsed) {
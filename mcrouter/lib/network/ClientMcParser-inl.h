@@ -63,8 +63,12 @@ ClientMcParser<Callback>::expectNext() {
     asciiParser_.initializeReplyParser<Request>();
     replyForwarder_ = &ClientMcParser<Callback>::forwardAsciiReply<Request>;
     if (UNLIKELY(debugFifo_ && debugFifo_->isConnected())) {
+      // Replies are mirrored chunk by chunk as they are read
       debugFifo_->startMessage(
-          MessageDirection::Received, ReplyT<Request>::typeId);
+          MessageDirection::Received,
+          ReplyT<Request>::typeId,
+          folly::StringPiece(),
+          true /* streamed */);
     }
   } else if (parser_.protocol() == mc_umbrella_protocol_DONOTUSE) {
     umbrellaOrCaretForwarder_ =
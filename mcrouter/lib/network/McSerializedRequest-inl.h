@@ -22,6 +22,18 @@ typename std::enable_if<!Request::hasKey, uint64_t>::type getKeySize(
   return 0;
 }
 
+template <class Request>
+typename std::enable_if<Request::hasKey, folly::StringPiece>::type getKey(
+    const Request& req) {
+  return req.key().fullKey();
+}
+
+template <class Request>
+typename std::enable_if<!Request::hasKey, folly::StringPiece>::type getKey(
+    const Request&) {
+  return folly::StringPiece();
+}
+
 template <class Request>
 typename std::enable_if<
     ListContains<McRequestList, Request>::value,
@@ -59,7 +71,9 @@ McSerializedRequest::McSerializedRequest(
     size_t reqId,
     mc_protocol_t protocol,
     const CodecIdRange& compressionCodecs)
-    : protocol_(protocol), typeId_(Request::typeId) {
+    : protocol_(protocol),
+      typeId_(Request::typeId),
+      key_(detail::getKey(req)) {
   switch (protocol_) {
     case mc_ascii_protocol:
       new (&asciiRequest_) AsciiSerializedRequest;
@@ -9,6 +9,8 @@
 
 #include <memory>
 
+#include <folly/Range.h>
+
 #include "mcrouter/lib/mc/protocol.h"
 #include "mcrouter/lib/network/AsciiSerialized.h"
 #include "mcrouter/lib/network/CaretSerializedMessage.h"
@@ -62,6 +64,12 @@ class McSerializedRequest {
   uint32_t typeId() const {
     return typeId_;
   }
+  /**
+   * Key of the request (empty if the request has no key).
+   */
+  folly::StringPiece key() const {
+    return key_;
+  }
 
  private:
   static const size_t kMaxIovs = 20;
@@ -77,6 +85,7 @@ class McSerializedRequest {
   mc_protocol_t protocol_{mc_unknown_protocol};
   Result result_{Result::OK};
   uint32_t typeId_{0};
+  folly::StringPiece key_;
 };
 }
 } // facebook::memcache
@@ -8,6 +8,7 @@
 #include <folly/lang/Bits.h>
 
 #include "mcrouter/lib/debug/ConnectionFifo.h"
+#include "mcrouter/lib/network/McSerializedRequest.h"
 #include "mcrouter/lib/network/UmbrellaProtocol.h"
 
 namespace facebook {
@@ -167,11 +168,15 @@ template <class Callback>
 template <class Request>
 void ServerMcParser<Callback>::writeToPipe(const Request& req) {
   assert(debugFifo_);
+  // Check the fifo filter before paying for the serialization.
+  if (!debugFifo_->startMessage(
+          MessageDirection::Received, Request::typeId, detail::getKey(req))) {
+    return;
+  }
   AsciiSerializedRequest debugSerializedRequest;
   const struct iovec* iov;
   size_t iovLen;
   debugSerializedRequest.prepare(req, iov, iovLen);
-  debugFifo_->startMessage(MessageDirection::Received, Request::typeId);
   debugFifo_->writeData(iov, iovLen);
 }
 }
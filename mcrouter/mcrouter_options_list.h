@@ -76,6 +76,36 @@ MCROUTER_OPTION_TOGGLE(
     no_short,
     "Enable using the asynclog version 2.0")
 
+MCROUTER_OPTION_INTEGER(
+    uint32_t,
+    asynclog_batch_flush_interval_ms,
+    0,
+    "asynclog-batch-flush-interval-ms",
+    no_short,
+    "If non-zero, each proxy queues asynclog entries and writes them to the"
+    " spool file in batches, at most this many ms after the first queued"
+    " entry. Requests still wait until their entry is written."
+    " 0 writes every entry separately.")
+
+MCROUTER_OPTION_INTEGER(
+    size_t,
+    asynclog_batch_max_bytes,
+    64 * 1024,
+    "asynclog-batch-max-bytes",
+    no_short,
+    "In batched asynclog mode, write the batch as soon as its entries reach"
+    " this many bytes, without waiting for the flush interval.")
+
+MCROUTER_OPTION_INTEGER(
+    size_t,
+    asynclog_batch_max_queued_bytes,
+    16 * 1024 * 1024,
+    "asynclog-batch-max-queued-bytes",
+    no_short,
+    "In batched asynclog mode, maximum size of the entries a proxy has queued"
+    " or in flight to the writer. Entries over the limit are dropped and"
+    " counted in asynclog_dropped_requests.")
+
 MCROUTER_OPTION_INTEGER(
     size_t,
     num_proxies,
@@ -634,6 +664,33 @@ MCROUTER_OPTION_INTEGER(
     no_short,
     "Time in ms between stats reports, or 0 for no logging")
 
+MCROUTER_OPTION_INTEGER(
+    size_t,
+    hot_keys_capacity,
+    100,
+    "hot-keys-capacity",
+    no_short,
+    "Number of keys each proxy monitors to report the keys with the most"
+    " requests and reply bytes ('stats hotkeys'). Memory used is bounded by"
+    " this. 0 disables hot key tracking.")
+
+MCROUTER_OPTION_INTEGER(
+    uint32_t,
+    hot_keys_decay_interval_sec,
+    60,
+    "hot-keys-decay-interval-sec",
+    no_short,
+    "Hot key counts are halved every this many seconds so recent traffic"
+    " dominates. 0 never decays them.")
+
+MCROUTER_OPTION_TOGGLE(
+    enable_routing_prefix_stats,
+    false,
+    "enable-routing-prefix-stats",
+    no_short,
+    "If enabled, keep latency and value size histograms per routing prefix"
+    " (p50/p95/p99/p999 reported as routing_prefix.<prefix>.* stats).")
+
 MCROUTER_OPTION_INTEGER(
     unsigned int,
     logging_rtt_outlier_threshold_us,
@@ -0,0 +1,106 @@
+/*
+ *  Copyright (c) 2018-present, Facebook, Inc.
+ *
+ *  This source code is licensed under the MIT license found in the LICENSE
+ *  file in the root directory of this source tree.
+ *
+ */
+#include "CarbonLookasideL0Cache.h"
+
+#include <chrono>
+
+#include <folly/dynamic.h>
+
+#include "mcrouter/lib/fbi/cpp/util.h"
+
+namespace facebook {
+namespace memcache {
+namespace mcrouter {
+
+CarbonLookasideL0Cache::CarbonLookasideL0Cache(const folly::dynamic& json) {
+  checkLogic(
+      json.isObject(), "CarbonLookasideRoute: 'l0_cache' is not an object");
+
+  auto jMaxItems = json.get_ptr("max_items");
+  checkLogic(
+      jMaxItems && jMaxItems->isInt() && jMaxItems->getInt() > 0,
+      "CarbonLookasideRoute: 'l0_cache.max_items' must be a positive int");
+  maxItems_ = jMaxItems->getInt();
+
+  if (auto jMaxBytes = json.get_ptr("max_bytes")) {
+    checkLogic(
+        jMaxBytes->isInt() && jMaxBytes->getInt() >= 0,
+        "CarbonLookasideRoute: 'l0_cache.max_bytes' must be an int >= 0");
+    maxBytes_ = jMaxBytes->getInt();
+  }
+
+  if (auto jTtlMs = json.get_ptr("ttl_ms")) {
+    checkLogic(
+        jTtlMs->isInt() && jTtlMs->getInt() > 0,
+        "CarbonLookasideRoute: 'l0_cache.ttl_ms' must be a positive int");
+    ttlMs_ = jTtlMs->getInt();
+  }
+}
+
+CarbonLookasideL0Cache::LookupResult CarbonLookasideL0Cache::lookup(
+    folly::StringPiece key,
+    folly::IOBuf& value,
+    uint64_t nowMs) {
+  auto it = entries_.find(key.str());
+  if (it == entries_.end()) {
+    return LookupResult::Miss;
+  }
+  if (it->second.expiresAtMs <= nowMs) {
+    bytes_ -= it->second.bytes;
+    entries_.erase(it->first);
+    return LookupResult::Expired;
+  }
+  value = it->second.value.cloneAsValue();
+  return LookupResult::Hit;
+}
+
+size_t CarbonLookasideL0Cache::insert(
+    folly::StringPiece key,
+    const folly::IOBuf& value,
+    uint64_t nowMs) {
+  Entry entry;
+  entry.value = value.cloneAsValue();
+  entry.expiresAtMs = nowMs + ttlMs_;
+  entry.bytes = key.size() + value.computeChainDataLength();
+  if (maxBytes_ != 0 && entry.bytes > maxBytes_) {
+    // Would evict everything else and still not fit.
+    return 0;
+  }
+
+  auto keyStr = key.str();
+  auto it = entries_.findWithoutPromotion(keyStr);
+  if (it != entries_.end()) {
+    bytes_ -= it->second.bytes;
+    entries_.erase(keyStr);
+  }
+
+  size_t evicted = 0;
+  auto onPrune = [this](std::string, Entry&& pruned) {
+    bytes_ -= pruned.bytes;
+  };
+  while (!entries_.empty() &&
+         (entries_.size() >= maxItems_ ||
+          (maxBytes_ != 0 && bytes_ + entry.bytes > maxBytes_))) {
+    entries_.prune(1, onPrune);
+    ++evicted;
+  }
+
+  bytes_ += entry.bytes;
+  entries_.set(std::move(keyStr), std::move(entry));
+  return evicted;
+}
+
+/* static */ uint64_t CarbonLookasideL0Cache::nowMs() {
+  using namespace std::chrono;
+  return duration_cast<milliseconds>(steady_clock::now().time_since_epoch())
+      .count();
+}
+
+} // mcrouter
+} // memcache
+} // facebook
@@ -0,0 +1,103 @@
+/*
+ *  Copyright (c) 2018-present, Facebook, Inc.
+ *
+ *  This source code is licensed under the MIT license found in the LICENSE
+ *  file in the root directory of this source tree.
+ *
+ */
+#pragma once
+
+#include <cstdint>
+#include <string>
+
+#include <folly/Optional.h>
+#include <folly/Range.h>
+#include <folly/container/EvictingCacheMap.h>
+#include <folly/io/IOBuf.h>
+
+namespace folly {
+struct dynamic;
+} // folly
+
+namespace facebook {
+namespace memcache {
+namespace mcrouter {
+
+/**
+ * Bounded in-process LRU cache of serialized replies, consulted by
+ * CarbonLookasideRoute before going to memcache.
+ *
+ * Every proxy builds its own routing tree, so every proxy has its own
+ * instance: the cache is sharded per proxy and needs no locking.
+ */
+class CarbonLookasideL0Cache {
+ public:
+  enum class LookupResult { Hit, Miss, Expired };
+
+  /**
+   * @param json  L0 cache configuration; must be an object. Format:
+   *
+   *              { "max_items": N, "max_bytes": B, "ttl_ms": T }
+   *
+   *              max_items (required) bounds the number of entries and
+   *              max_bytes (optional) the total size of keys and values.
+   *              Entries expire T milliseconds (default: 1000) after they
+   *              are stored, independently of the memcache TTL.
+   */
+  explicit CarbonLookasideL0Cache(const folly::dynamic& json);
+
+  /**
+   * Looks up key. On a hit, value is set to (a shared copy of) the cached
+   * serialized reply. Expired entries are removed.
+   */
+  LookupResult
+  lookup(folly::StringPiece key, folly::IOBuf& value, uint64_t nowMs);
+
+  /**
+   * Stores the serialized reply for key, evicting least recently used
+   * entries to stay within the bounds.
+   *
+   * @return  Number of entries evicted.
+   */
+  size_t
+  insert(folly::StringPiece key, const folly::IOBuf& value, uint64_t nowMs);
+
+  size_t size() const {
+    return entries_.size();
+  }
+
+  size_t bytes() const {
+    return bytes_;
+  }
+
+  size_t maxItems() const {
+    return maxItems_;
+  }
+
+  uint32_t ttlMs() const {
+    return ttlMs_;
+  }
+
+  /**
+   * Current time in milliseconds of the clock used for expiration.
+   */
+  static uint64_t nowMs();
+
+ private:
+  struct Entry {
+    folly::IOBuf value;
+    uint64_t expiresAtMs{0};
+    size_t bytes{0};
+  };
+
+  size_t maxItems_{0};
+  size_t maxBytes_{0};
+  uint32_t ttlMs_{1000};
+  size_t bytes_{0};
+  // Unbounded map used for its LRU order, bounds are enforced by insert().
+  folly::EvictingCacheMap<std::string, Entry> entries_{0};
+};
+
+} // mcrouter
+} // memcache
+} // facebook
@@ -7,6 +7,7 @@
  */
 #pragma once
 
+#include <memory>
 #include <string>
 #include <utility>
 
@@ -17,10 +18,13 @@
 #include "mcrouter/CarbonRouterFactory.h"
 #include "mcrouter/CarbonRouterInstance.h"
 #include "mcrouter/McrouterFiberContext.h"
+#include "mcrouter/ProxyBase.h"
+#include "mcrouter/ProxyRequestContextTyped.h"
 #include "mcrouter/config.h"
 #include "mcrouter/lib/Operation.h"
 #include "mcrouter/lib/RouteHandleTraverser.h"
 #include "mcrouter/lib/routes/NullRoute.h"
+#include "mcrouter/routes/CarbonLookasideL0Cache.h"
 #include "mcrouter/routes/McRouteHandleBuilder.h"
 
 namespace facebook {
@@ -47,7 +51,9 @@ LeaseSettings parseLeaseSettings(const folly::dynamic& json);
  * CarbonLookasideRoute is a route handle that can store replies in memcache
  * with a user defined key. The user controls which replies should be cached.
  * Replies found in memcache will be returned directly without having to
- * traverse further into the routing tree.
+ * traverse further into the routing tree. Optionally, replies are also kept
+ * in a small in-process cache (see CarbonLookasideL0Cache), so that hot keys
+ * are answered without a round trip to memcache.
  *
  * This behavior is controlled through a user defined class with the following
  * prototype:
@@ -76,10 +82,15 @@ class CarbonLookasideRoute {
  public:
   std::string routeName() const {
     return folly::sformat(
-        "CarbonLookaside|name={}|ttl={}s|leases={}",
+        "CarbonLookaside|name={}|ttl={}s|leases={}{}",
         carbonLookasideHelper_.name(),
         ttl_,
-        leaseSettings_.enableLeases ? "true" : "false");
+        leaseSettings_.enableLeases ? "true" : "false",
+        l0Cache_ ? folly::sformat(
+                       "|l0_items={}|l0_ttl={}ms",
+                       l0Cache_->maxItems(),
+                       l0Cache_->ttlMs())
+                 : "");
   }
 
   /**
@@ -99,6 +110,8 @@ class CarbonLookasideRoute {
    *                      cache a given request. This helper is use-case
    *                      specific.
    * @param leaseSettings The lease settings for memcache leases.
+   * @param l0Cache       In-process cache checked before memcache, or
+   *                      nullptr.
    */
   CarbonLookasideRoute(
       RouteHandlePtr child,
@@ -107,14 +120,16 @@ class CarbonLookasideRoute {
       std::string prefix,
       int32_t ttl,
       CarbonLookasideHelper helper,
-      LeaseSettings leaseSettings)
+      LeaseSettings leaseSettings,
+      std::unique_ptr<CarbonLookasideL0Cache> l0Cache = nullptr)
       : child_(std::move(child)),
         router_(std::move(router)),
         client_(std::move(client)),
         prefix_(std::move(prefix)),
         ttl_(ttl),
         carbonLookasideHelper_(std::move(helper)),
-        leaseSettings_(std::move(leaseSettings)) {
+        leaseSettings_(std::move(leaseSettings)),
+        l0Cache_(std::move(l0Cache)) {
     assert(router_);
     assert(client_);
   }
@@ -134,15 +149,21 @@ class CarbonLookasideRoute {
     if (cacheCandidate) {
       key =
           folly::to<std::string>(prefix_, carbonLookasideHelper_.buildKey(req));
-      if (auto optReply = carbonLookasideGet<Request>(key, leaseToken)) {
-        return optReply.value();
+      if (auto cached = l0CacheGet(key)) {
+        return deserializeReply<ReplyT<Request>>(cached.value());
+      }
+      if (auto cached = carbonLookasideGet(key, leaseToken)) {
+        l0CacheSet(key, cached.value());
+        return deserializeReply<ReplyT<Request>>(cached.value());
       }
     }
 
     auto reply = child_->route(req);
 
     if (cacheCandidate) {
-      carbonLookasideSet(key, reply, leaseToken);
+      auto value = serializeOffFiber(reply);
+      l0CacheSet(key, value);
+      carbonLookasideSet(key, std::move(value), leaseToken);
     }
     return reply;
   }
@@ -155,34 +176,71 @@ class CarbonLookasideRoute {
   const int32_t ttl_;
   CarbonLookasideHelper carbonLookasideHelper_;
   const LeaseSettings leaseSettings_;
+  const std::unique_ptr<CarbonLookasideL0Cache> l0Cache_;
+
+  template <typename Reply>
+  static Reply deserializeReply(const folly::IOBuf& value) {
+    folly::io::Cursor cur(&value);
+    carbon::CarbonProtocolReader reader(cur);
+    Reply reply;
+    reply.deserialize(reader);
+    return reply;
+  }
+
+  // Look up key in the in-process cache. Returns the serialized reply on a
+  // hit.
+  folly::Optional<folly::IOBuf> l0CacheGet(folly::StringPiece key) {
+    if (!l0Cache_) {
+      return folly::none;
+    }
+    auto& stats = fiber_local<RouterInfo>::getSharedCtx()->proxy().stats();
+    folly::IOBuf value;
+    switch (l0Cache_->lookup(key, value, CarbonLookasideL0Cache::nowMs())) {
+      case CarbonLookasideL0Cache::LookupResult::Hit:
+        stats.increment(carbon_lookaside_l0_hit_count_stat);
+        return std::move(value);
+      case CarbonLookasideL0Cache::LookupResult::Expired:
+        stats.increment(carbon_lookaside_l0_expired_count_stat);
+        break;
+      case CarbonLookasideL0Cache::LookupResult::Miss:
+        break;
+    }
+    stats.increment(carbon_lookaside_l0_miss_count_stat);
+    return folly::none;
+  }
 
-  template <typename Request>
-  folly::Optional<ReplyT<Request>> carbonLookasideGet(
+  void l0CacheSet(folly::StringPiece key, const folly::IOBuf& value) {
+    if (!l0Cache_) {
+      return;
+    }
+    if (auto evicted =
+            l0Cache_->insert(key, value, CarbonLookasideL0Cache::nowMs())) {
+      fiber_local<RouterInfo>::getSharedCtx()->proxy().stats().increment(
+          carbon_lookaside_l0_eviction_count_stat, evicted);
+    }
+  }
+
+  folly::Optional<folly::IOBuf> carbonLookasideGet(
       folly::StringPiece key,
       int64_t& leaseToken) {
     if (leaseSettings_.enableLeases) {
-      return carbonLookasideLeaseGet<Request>(key, leaseToken);
+      return carbonLookasideLeaseGet(key, leaseToken);
     }
-    return carbonLookasideGet<Request>(key);
+    return carbonLookasideGet(key);
   }
 
-  // Build a request to CarbonLookaside to query for key. Successful replies
-  // are deserialized.
-  template <typename Request>
-  folly::Optional<ReplyT<Request>> carbonLookasideGet(folly::StringPiece key) {
+  // Build a request to CarbonLookaside to query for key. Returns the
+  // serialized reply on a hit.
+  folly::Optional<folly::IOBuf> carbonLookasideGet(folly::StringPiece key) {
     McGetRequest cacheRequest(key);
-    folly::Optional<ReplyT<Request>> ret;
+    folly::Optional<folly::IOBuf> ret;
     folly::fibers::Baton baton;
     client_->send(
         cacheRequest,
         [&baton, &ret](const McGetRequest&, McGetReply&& cacheReply) {
           if (isHitResult(cacheReply.result()) &&
               cacheReply.value().hasValue()) {
-            folly::io::Cursor cur(cacheReply.value().get_pointer());
-            carbon::CarbonProtocolReader reader(cur);
-            ReplyT<Request> reply;
-            reply.deserialize(reader);
-            ret.assign(std::move(reply));
+            ret.assign(std::move(cacheReply.value().value()));
           }
           baton.post();
         });
@@ -191,14 +249,13 @@ class CarbonLookasideRoute {
   }
 
   // Build a request using leases to CarbonLookaside to query for key.
-  // Successful replies are deserialized.
-  template <typename Request>
-  folly::Optional<ReplyT<Request>> carbonLookasideLeaseGet(
+  // Returns the serialized reply on a hit.
+  folly::Optional<folly::IOBuf> carbonLookasideLeaseGet(
       folly::StringPiece key,
       int64_t& leaseToken) {
     leaseToken = 0;
     McLeaseGetRequest cacheRequest(key);
-    folly::Optional<ReplyT<Request>> ret;
+    folly::Optional<folly::IOBuf> ret;
     auto nextInterval = leaseSettings_.initialWaitMs;
     for (int32_t attempt = 0; attempt <= leaseSettings_.numRetries; ++attempt) {
       folly::fibers::Baton sleepBaton;
@@ -215,11 +272,7 @@ class CarbonLookasideRoute {
             retry = false;
             if (isHitResult(cacheReply.result()) &&
                 cacheReply.value().hasValue()) {
-              folly::io::Cursor cur(cacheReply.value().get_pointer());
-              carbon::CarbonProtocolReader reader(cur);
-              ReplyT<Request> reply;
-              reply.deserialize(reader);
-              ret.assign(std::move(reply));
+              ret.assign(std::move(cacheReply.value().value()));
             } else if (isMissResult(cacheReply.result())) {
               // Hot miss will retry using an expoential backoff.
               // A miss will return with the lease token set.
@@ -257,24 +310,22 @@ class CarbonLookasideRoute {
     });
   }
 
-  template <typename Reply>
   void carbonLookasideSet(
       folly::StringPiece key,
-      const Reply& reply,
+      folly::IOBuf value,
       int64_t leaseToken) {
     if (leaseSettings_.enableLeases && leaseToken) {
-      return carbonLookasideLeaseSet(key, reply, leaseToken);
+      return carbonLookasideLeaseSet(key, std::move(value), leaseToken);
     }
-    return carbonLookasideSet(key, reply);
+    return carbonLookasideSet(key, std::move(value));
   }
 
   // Build a request to memcache to store the serialized reply with the
   // provided key.
-  template <typename Reply>
-  void carbonLookasideSet(folly::StringPiece key, const Reply& reply) {
+  void carbonLookasideSet(folly::StringPiece key, folly::IOBuf value) {
     McSetRequest req(key);
     req.exptime() = ttl_;
-    req.value() = serializeOffFiber(reply);
+    req.value() = std::move(value);
     folly::fibers::addTask([this, req = std::move(req)]() {
       folly::fibers::Baton baton;
       client_->send(
@@ -285,15 +336,14 @@ class CarbonLookasideRoute {
 
   // Build a request using leases to memcache to store the serialized reply
   // with the provided key.
-  template <typename Reply>
   void carbonLookasideLeaseSet(
       folly::StringPiece key,
-      const Reply& reply,
+      folly::IOBuf value,
       const int64_t leaseToken) {
     McLeaseSetRequest req(key);
     req.exptime() = ttl_;
     req.leaseToken() = leaseToken;
-    req.value() = serializeOffFiber(reply);
+    req.value() = std::move(value);
     folly::fibers::addTask([this, req = std::move(req)]() {
       folly::fibers::Baton baton;
       client_->send(req, [&baton](const McLeaseSetRequest&, McLeaseSetReply&&) {
@@ -315,6 +365,11 @@ class CarbonLookasideRoute {
  *   "flavor": "web",
  *   "helper_config": {
  *     // configs specific to the helper class.
+ *   },
+ *   "l0_cache": { // optional, see CarbonLookasideL0Cache
+ *     "max_items": 1000,
+ *     "max_bytes": 1048576,
+ *     "ttl_ms": 1000
  *   }
  * }
  */
@@ -354,6 +409,11 @@ typename RouterInfo::RouteHandlePtr createCarbonLookasideRoute(
   }
   LeaseSettings leaseSettings = parseLeaseSettings(json);
 
+  std::unique_ptr<CarbonLookasideL0Cache> l0Cache;
+  if (auto jL0Cache = json.get_ptr("l0_cache")) {
+    l0Cache = std::make_unique<CarbonLookasideL0Cache>(*jL0Cache);
+  }
+
   auto helperConfig = json.get_ptr("helper_config");
   if (helperConfig) {
     checkLogic(
@@ -395,7 +455,8 @@ typename RouterInfo::RouteHandlePtr createCarbonLookasideRoute(
       std::move(prefix),
       ttl,
       std::move(helper),
-      std::move(leaseSettings));
+      std::move(leaseSettings),
+      std::move(l0Cache));
 }
 
 } // namespace mcrouter
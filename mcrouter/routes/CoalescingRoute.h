@@ -0,0 +1,195 @@
+/*
+ *  Copyright (c) 2018-present, Facebook, Inc.
+ *
+ *  This source code is licensed under the MIT license found in the LICENSE
+ *  file in the root directory of this source tree.
+ *
+ */
+#pragma once
+
+#include <memory>
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+#include <folly/Format.h>
+#include <folly/Optional.h>
+#include <folly/ScopeGuard.h>
+#include <folly/fibers/Baton.h>
+
+#include "mcrouter/McrouterFiberContext.h"
+#include "mcrouter/ProxyBase.h"
+#include "mcrouter/ProxyRequestContextTyped.h"
+#include "mcrouter/lib/Reply.h"
+#include "mcrouter/lib/RouteHandleTraverser.h"
+#include "mcrouter/lib/config/RouteHandleFactory.h"
+#include "mcrouter/lib/network/gen/Memcache.h"
+#include "mcrouter/routes/McRouteHandleBuilder.h"
+
+namespace facebook {
+namespace memcache {
+namespace mcrouter {
+
+/**
+ * Merges identical in-flight get and lease-get requests: while a request for
+ * a key is being routed to the child, other requests for the same key wait
+ * for its reply instead of being sent too (a.k.a. singleflight).
+ *
+ * At most maxWaiters requests wait on a given in-flight request, the others
+ * are routed to the child as usual.
+ *
+ * For lease-get, only the request that went to the child may receive the
+ * lease token: on a miss with a lease token, waiters get a hot miss
+ * (token 1) and retry, as they would have if they had reached memcached.
+ *
+ * Every proxy has its own routing tree, so requests are only merged with
+ * those of the same proxy.
+ */
+template <class RouterInfo>
+class CoalescingRoute {
+ public:
+  using RouteHandleIf = typename RouterInfo::RouteHandleIf;
+  using RouteHandlePtr = typename RouterInfo::RouteHandlePtr;
+
+  /**
+   * @param rh          The child route handle
+   * @param maxWaiters  Maximum number of requests waiting on one in-flight
+   *                    request
+   */
+  CoalescingRoute(RouteHandlePtr rh, size_t maxWaiters)
+      : rh_(std::move(rh)), maxWaiters_(maxWaiters) {}
+
+  std::string routeName() const {
+    return folly::sformat("coalescing|max_waiters={}", maxWaiters_);
+  }
+
+  template <class Request>
+  void traverse(
+      const Request& req,
+      const RouteHandleTraverser<RouteHandleIf>& t) const {
+    t(*rh_, req);
+  }
+
+  template <class Request>
+  ReplyT<Request> route(const Request& req) {
+    return rh_->route(req);
+  }
+
+  McGetReply route(const McGetRequest& req) {
+    return coalesce(req, getFlights_);
+  }
+
+  McLeaseGetReply route(const McLeaseGetRequest& req) {
+    return coalesce(req, leaseGetFlights_);
+  }
+
+ private:
+  template <class Request>
+  struct Flight {
+    folly::Optional<ReplyT<Request>> reply;
+    std::vector<folly::fibers::Baton*> waiters;
+  };
+
+  template <class Request>
+  using FlightMap =
+      std::unordered_map<std::string, std::shared_ptr<Flight<Request>>>;
+
+  const RouteHandlePtr rh_;
+  const size_t maxWaiters_;
+  FlightMap<McGetRequest> getFlights_;
+  FlightMap<McLeaseGetRequest> leaseGetFlights_;
+
+  template <class Request>
+  ReplyT<Request> coalesce(const Request& req, FlightMap<Request>& flights) {
+    auto key = req.key().fullKey().str();
+    auto it = flights.find(key);
+    if (it != flights.end()) {
+      auto& stats = fiber_local<RouterInfo>::getSharedCtx()->proxy().stats();
+      auto flight = it->second;
+      if (flight->waiters.size() >= maxWaiters_) {
+        stats.increment(coalescing_route_waiters_limited_count_stat);
+        return rh_->route(req);
+      }
+      folly::fibers::Baton baton;
+      flight->waiters.push_back(&baton);
+      baton.wait();
+      stats.increment(coalescing_route_coalesced_count_stat);
+      if (!flight->reply.hasValue()) {
+        return createReply<Request>(
+            ErrorReply,
+            mc_res_local_error,
+            "CoalescingRoute: in-flight request failed");
+      }
+      return waiterReply(flight->reply.value());
+    }
+
+    auto flight = std::make_shared<Flight<Request>>();
+    flights.emplace(key, flight);
+    SCOPE_EXIT {
+      flights.erase(key);
+      for (auto* baton : flight->waiters) {
+        baton->post();
+      }
+    };
+    auto reply = rh_->route(req);
+    if (!flight->waiters.empty()) {
+      flight->reply.assign(reply);
+    }
+    return reply;
+  }
+
+  static McGetReply waiterReply(const McGetReply& reply) {
+    return reply;
+  }
+
+  static McLeaseGetReply waiterReply(const McLeaseGetReply& reply) {
+    constexpr int64_t kLeaseHotMissToken = 1;
+    auto copy = reply;
+    if (copy.leaseToken() > kLeaseHotMissToken) {
+      copy.leaseToken() = kLeaseHotMissToken;
+    }
+    return copy;
+  }
+};
+
+/**
+ * Creates a CoalescingRoute from a json config.
+ *
+ * Sample json:
+ * {
+ *   "type": "CoalescingRoute",
+ *   "child": "PoolRoute|pool_name",
+ *   "max_waiters": 1000 // optional, defaults to 1000
+ * }
+ */
+template <class RouterInfo>
+typename RouterInfo::RouteHandlePtr makeCoalescingRoute(
+    RouteHandleFactory<typename RouterInfo::RouteHandleIf>& factory,
+    const folly::dynamic& json) {
+  checkLogic(json.isObject(), "CoalescingRoute: config is not an object.");
+
+  auto jChild = json.get_ptr("child");
+  checkLogic(
+      jChild != nullptr, "CoalescingRoute: 'child' property is missing.");
+  auto child = factory.create(*jChild);
+
+  size_t maxWaiters = 1000;
+  if (auto jMaxWaiters = json.get_ptr("max_waiters")) {
+    checkLogic(
+        jMaxWaiters->isInt() && jMaxWaiters->getInt() >= 0,
+        "CoalescingRoute: 'max_waiters' must be a non-negative integer.");
+    maxWaiters = jMaxWaiters->getInt();
+  }
+
+  if (maxWaiters == 0) {
+    // Nothing would ever be merged, optimize this rh away.
+    return std::move(child);
+  }
+
+  return makeRouteHandleWithInfo<RouterInfo, CoalescingRoute>(
+      std::move(child), maxWaiters);
+}
+
+} // namespace mcrouter
+} // namespace memcache
+} // namespace facebook
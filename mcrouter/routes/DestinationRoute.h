@@ -237,6 +237,18 @@ class DestinationRoute {
     auto proxy = &fiber_local<RouterInfo>::getSharedCtx()->proxy();
     auto& ap = *destination_->accessPoint();
     folly::fibers::Baton b;
+    if (proxy->router().opts().asynclog_batch_flush_interval_ms > 0) {
+      bool written = false;
+      if (proxy->asyncLog().queueDelete(
+              *proxy, ap, key, asynclogName, b, written)) {
+        /* Wait for the whole batch to be written (or dropped) */
+        b.wait();
+        if (written) {
+          proxy->stats().increment(asynclog_requests_stat);
+        }
+      }
+      return true;
+    }
     auto res = false;
     if (auto asyncWriter = proxy->router().asyncWriter()) {
       res = asyncWriter->run([&b, &ap, proxy, key, asynclogName]() {
@@ -15,6 +15,7 @@
 #include "mcrouter/routes/AllMajorityRouteFactory.h"
 #include "mcrouter/routes/AllSyncRouteFactory.h"
 #include "mcrouter/routes/CarbonLookasideRoute.h"
+#include "mcrouter/routes/CoalescingRoute.h"
 #include "mcrouter/routes/DevNullRoute.h"
 #include "mcrouter/routes/ErrorRoute.h"
 #include "mcrouter/routes/FailoverRoute.h"
@@ -99,6 +100,7 @@ McRouteHandleProvider<MemcacheRouterInfo>::buildRouteMap() {
        &createCarbonLookasideRoute<
            MemcacheRouterInfo,
            MemcacheCarbonLookasideHelper>},
+      {"CoalescingRoute", &makeCoalescingRoute<MemcacheRouterInfo>},
       {"DevNullRoute", &makeDevNullRoute<MemcacheRouterInfo>},
       {"ErrorRoute", &makeErrorRoute<MemcacheRouterInfo>},
       {"FailoverWithExptimeRoute",
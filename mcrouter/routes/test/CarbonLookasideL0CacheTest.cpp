@@ -0,0 +1,105 @@
+/*
+ *  Copyright (c) 2018-present, Facebook, Inc.
+ *
+ *  This source code is licensed under the MIT license found in the LICENSE
+ *  file in the root directory of this source tree.
+ *
+ */
+#include <string>
+
+#include <gtest/gtest.h>
+
+#include <folly/io/IOBuf.h>
+#include <folly/json.h>
+
+#include "mcrouter/routes/CarbonLookasideL0Cache.h"
+
+using namespace facebook::memcache;
+using namespace facebook::memcache::mcrouter;
+
+using LookupResult = CarbonLookasideL0Cache::LookupResult;
+
+namespace {
+
+folly::IOBuf makeValue(folly::StringPiece str) {
+  return folly::IOBuf(folly::IOBuf::COPY_BUFFER, str);
+}
+
+std::string toString(const folly::IOBuf& buf) {
+  return buf.cloneAsValue().moveToFbString().toStdString();
+}
+
+} // anonymous namespace
+
+TEST(CarbonLookasideL0CacheTest, hitAndMiss) {
+  CarbonLookasideL0Cache cache(folly::parseJson(R"({"max_items": 10})"));
+  folly::IOBuf value;
+  EXPECT_EQ(LookupResult::Miss, cache.lookup("a", value, 0));
+
+  EXPECT_EQ(0, cache.insert("a", makeValue("value_a"), 0));
+  EXPECT_EQ(LookupResult::Hit, cache.lookup("a", value, 10));
+  EXPECT_EQ("value_a", toString(value));
+  EXPECT_EQ(1, cache.size());
+  EXPECT_EQ(8, cache.bytes());
+
+  // Replacing an entry updates its value and size.
+  EXPECT_EQ(0, cache.insert("a", makeValue("b"), 20));
+  EXPECT_EQ(LookupResult::Hit, cache.lookup("a", value, 30));
+  EXPECT_EQ("b", toString(value));
+  EXPECT_EQ(1, cache.size());
+  EXPECT_EQ(2, cache.bytes());
+}
+
+TEST(CarbonLookasideL0CacheTest, expiry) {
+  CarbonLookasideL0Cache cache(
+      folly::parseJson(R"({"max_items": 10, "ttl_ms": 100})"));
+  folly::IOBuf value;
+  cache.insert("a", makeValue("value_a"), 1000);
+  EXPECT_EQ(LookupResult::Hit, cache.lookup("a", value, 1099));
+  EXPECT_EQ(LookupResult::Expired, cache.lookup("a", value, 1100));
+  EXPECT_EQ(LookupResult::Miss, cache.lookup("a", value, 1100));
+  EXPECT_EQ(0, cache.size());
+  EXPECT_EQ(0, cache.bytes());
+}
+
+TEST(CarbonLookasideL0CacheTest, evictLeastRecentlyUsed) {
+  CarbonLookasideL0Cache cache(folly::parseJson(R"({"max_items": 2})"));
+  folly::IOBuf value;
+  cache.insert("a", makeValue("1"), 0);
+  cache.insert("b", makeValue("2"), 0);
+  // "a" becomes the most recently used.
+  EXPECT_EQ(LookupResult::Hit, cache.lookup("a", value, 0));
+  EXPECT_EQ(1, cache.insert("c", makeValue("3"), 0));
+  EXPECT_EQ(LookupResult::Miss, cache.lookup("b", value, 0));
+  EXPECT_EQ(LookupResult::Hit, cache.lookup("a", value, 0));
+  EXPECT_EQ(LookupResult::Hit, cache.lookup("c", value, 0));
+}
+
+TEST(CarbonLookasideL0CacheTest, maxBytes) {
+  CarbonLookasideL0Cache cache(
+      folly::parseJson(R"({"max_items": 10, "max_bytes": 10})"));
+  folly::IOBuf value;
+  cache.insert("a", makeValue("1234"), 0);
+  cache.insert("b", makeValue("1234"), 0);
+  EXPECT_EQ(10, cache.bytes());
+  EXPECT_EQ(1, cache.insert("c", makeValue("12"), 0));
+  EXPECT_EQ(LookupResult::Miss, cache.lookup("a", value, 0));
+  EXPECT_EQ(8, cache.bytes());
+
+  // Larger than the whole cache, not stored.
+  EXPECT_EQ(0, cache.insert("d", makeValue("12345678901"), 0));
+  EXPECT_EQ(LookupResult::Miss, cache.lookup("d", value, 0));
+  EXPECT_EQ(2, cache.size());
+}
+
+TEST(CarbonLookasideL0CacheTest, invalidConfig) {
+  EXPECT_THROW(
+      CarbonLookasideL0Cache(folly::parseJson(R"({})")), std::logic_error);
+  EXPECT_THROW(
+      CarbonLookasideL0Cache(folly::parseJson(R"({"max_items": 0})")),
+      std::logic_error);
+  EXPECT_THROW(
+      CarbonLookasideL0Cache(
+          folly::parseJson(R"({"max_items": 1, "ttl_ms": 0})")),
+      std::logic_error);
+}
@@ -92,6 +92,10 @@ STUI(destination_pending_reqs, 0, 1)
 STUI(destination_inflight_reqs, 0, 1)
 STAT(destination_batch_size, stat_double, 0, .dbl = 0.0)
 STUI(asynclog_requests, 0, 1)
+/* Batches written by the batched asynclog writer */
+STUI(asynclog_batches, 0, 1)
+/* Asynclog entries not written: queue over the limit or writer busy */
+STUI(asynclog_dropped_requests, 0, 1)
 /* Proxy requests we started routing */
 STUI(proxy_reqs_processing, 0, 1)
 /* Proxy requests queued up and not routed yet */
@@ -131,6 +135,20 @@ STUI(load_balancer_load_reset_count, 0, 1)
 STUI(redirected_lease_set_count, 0, 1)
 #undef GROUP
 
+// CoalescingRoute
+#define GROUP ods_stats | count_stats
+STUI(coalescing_route_coalesced_count, 0, 1)
+STUI(coalescing_route_waiters_limited_count, 0, 1)
+#undef GROUP
+
+// CarbonLookasideRoute in-process (L0) cache
+#define GROUP ods_stats | count_stats
+STUI(carbon_lookaside_l0_hit_count, 0, 1)
+STUI(carbon_lookaside_l0_miss_count, 0, 1)
+STUI(carbon_lookaside_l0_expired_count, 0, 1)
+STUI(carbon_lookaside_l0_eviction_count, 0, 1)
+#undef GROUP
+
 #define GROUP ods_stats | detailed_stats | rate_stats
   STUIR(replies_compressed, 0, 1)
   STUIR(replies_not_compressed, 0, 1)
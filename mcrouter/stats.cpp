@@ -16,11 +16,14 @@
 #include <limits>
 
 #include <folly/Conv.h>
+#include <folly/String.h>
 #include <folly/Range.h>
 #include <folly/experimental/StringKeyedUnorderedMap.h>
 #include <folly/json.h>
 
 #include "mcrouter/CarbonRouterInstanceBase.h"
+#include "mcrouter/Histogram.h"
+#include "mcrouter/HotKeys.h"
 #include "mcrouter/McrouterLogFailure.h"
 #include "mcrouter/ProxyBase.h"
 #include "mcrouter/ProxyDestination.h"
@@ -563,6 +566,58 @@ static stat_group_t stat_parse_group_str(folly::StringPiece str) {
   }
 }
 
+folly::dynamic hot_keys_stats(CarbonRouterInstanceBase& router) {
+  const auto capacity = router.opts().hot_keys_capacity;
+  SpaceSaving requests(capacity);
+  SpaceSaving bytes(capacity);
+  for (size_t i = 0; i < router.opts().num_proxies; ++i) {
+    router.getProxyBase(i)->hotKeys().mergeInto(requests, bytes);
+  }
+  return hotKeysToDynamic(requests, bytes, capacity);
+}
+
+folly::dynamic histogram_stats(CarbonRouterInstanceBase& router) {
+  folly::StringKeyedUnorderedMap<RequestHistograms> pools;
+  folly::StringKeyedUnorderedMap<RequestHistograms> routingPrefixes;
+  for (size_t i = 0; i < router.opts().num_proxies; ++i) {
+    router.getProxyBase(i)->stats().mergeHistograms(pools, routingPrefixes);
+  }
+
+  folly::dynamic stats = folly::dynamic::object;
+  for (const auto& it : pools) {
+    it.second.appendStats(it.first, stats);
+  }
+  for (const auto& it : routingPrefixes) {
+    it.second.appendStats(
+        folly::to<std::string>("routing_prefix.", it.first), stats);
+  }
+  return stats;
+}
+
+/**
+ * One "<sketch>.<rank> <count> <error> <key>" stat per key, heaviest first,
+ * with the (escaped) key last so that it may contain spaces.
+ */
+static void append_hot_keys(StatsReply& reply, ProxyBase* proxy) {
+  auto hotKeys = hot_keys_stats(proxy->router());
+  reply.addStat("capacity", hotKeys["capacity"].asInt());
+  for (const char* sketch : {"requests", "bytes"}) {
+    const auto& jSketch = hotKeys[sketch];
+    reply.addStat(
+        folly::to<std::string>(sketch, ".total"), jSketch["total"].asInt());
+    const auto& top = jSketch["top"];
+    for (size_t i = 0; i < top.size(); ++i) {
+      reply.addStat(
+          folly::to<std::string>(sketch, ".", i),
+          folly::sformat(
+              "{} {} {}",
+              top[i]["count"].asInt(),
+              top[i]["error"].asInt(),
+              folly::cEscape<std::string>(top[i]["key"].asString())));
+    }
+  }
+}
+
 /**
  * @param Proxy proxy
  */
@@ -576,6 +631,11 @@ McStatsReply stats_reply(ProxyBase* proxy, folly::StringPiece group_str) {
     return reply.getReply();
   }
 
+  if (group_str == "hotkeys") {
+    append_hot_keys(reply, proxy);
+    return reply.getReply();
+  }
+
   auto groups = stat_parse_group_str(group_str);
   if (groups == unknown_stats) {
     McStatsReply errorReply(mc_res_client_error);
@@ -630,6 +690,13 @@ McStatsReply stats_reply(ProxyBase* proxy, folly::StringPiece group_str) {
     }
   }
 
+  if (groups & (mcproxy_stats | all_stats | detailed_stats | ods_stats)) {
+    auto histogramStats = histogram_stats(proxy->router());
+    for (const auto& it : histogramStats.items()) {
+      reply.addStat(it.first.asString(), it.second.asInt());
+    }
+  }
+
   if (groups & server_stats) {
     folly::StringKeyedUnorderedMap<ServerStat> serverStats;
     auto& router = proxy->router();
@@ -11,6 +11,7 @@
 #include <unordered_map>
 
 #include <folly/Range.h>
+#include <folly/dynamic.h>
 
 #include "mcrouter/lib/network/gen/Memcache.h"
 
@@ -135,6 +136,19 @@ void append_pool_stats(
     CarbonRouterInstanceBase& router,
     std::vector<stat_t>& stats);
 
+/**
+ * Percentiles of the latency and value size histograms of all proxies,
+ * as flat {name: value} pairs: "<pool>.duration_us.p99",
+ * "routing_prefix.<prefix>.value_bytes.p50", ...
+ * See RequestHistograms::appendStats().
+ */
+folly::dynamic histogram_stats(CarbonRouterInstanceBase& router);
+
+/**
+ * Hot keys of all proxies of the router, see hotKeysToDynamic().
+ */
+folly::dynamic hot_keys_stats(CarbonRouterInstanceBase& router);
+
 void set_standalone_args(folly::StringPiece args);
 
 } // mcrouter
@@ -8,7 +8,11 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
+import collections
+import contextlib
 import errno
+import functools
+import itertools
 import os
 import re
 import select
@@ -18,9 +22,16 @@ import socket
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 
+from mcrouter.test import debug_fifo_filter
 from mcrouter.test.config import McrouterGlobals
+from mcrouter.test.hot_keys import parse_hot_keys
+from mcrouter.test.latency import LatencyRecorder, now
+from mcrouter.test.mcpiper_records import McpiperRecords
+from mcrouter.test.ports import bind_port
+from mcrouter.test.stats_snapshot import StatsSnapshot
 
 class BaseDirectory(object):
     def __init__(self, prefix="mctest"):
@@ -120,8 +131,193 @@ class ProcessBase(object):
         if stderr:
             print("{} ({}) stdout:\n{}".format(self, self.cmd_line, stderr))
 
+class ErrorReply(Exception):
+    """Raised by reply readers when the server answers with an *ERROR line"""
+    pass
+
+def _noreply(noreply):
+    return ' noreply' if noreply else ''
+
+def format_get(cmd, keys):
+    return "{} {}\r\n".format(cmd, " ".join(keys))
+
+def format_store(command, key, value, replicate=False, noreply=False,
+                 exptime=0, flags=0):
+    value = str(value)
+    flags = flags | (1024 if replicate else 0)
+    return "%s %s %d %d %d%s\r\n%s\r\n" % (command, key, flags, exptime,
+                                           len(value), _noreply(noreply),
+                                           value)
+
+def format_lease_set(key, value_token, exptime=0):
+    value = str(value_token["value"])
+    token = int(value_token["token"])
+    flags = 0
+    return "lease-set %s %d %d %d %d\r\n%s\r\n" % \
+        (key, token, flags, exptime, len(value), value)
+
+def format_cas(key, value, cas_token):
+    value = str(value)
+    return "cas %s 0 0 %d %d\r\n%s\r\n" % (key, len(value), cas_token, value)
+
+def format_delete(key, exptime=None, noreply=False):
+    exptime_str = ''
+    if exptime is not None:
+        exptime_str = " {}".format(exptime)
+    return "delete {}{}{}\r\n".format(key, exptime_str, _noreply(noreply))
+
+def format_touch(key, exptime, noreply=False):
+    return "touch {} {}{}\r\n".format(key, exptime, _noreply(noreply))
+
+def format_arith(cmd, key, value, noreply=False):
+    return "%s %s %d%s\r\n" % (cmd, key, value, _noreply(noreply))
+
+class ReplyReader(object):
+    """
+    Binary reply reader for big values.
+
+    Reply lines are parsed out of a reusable bytearray filled with
+    recv_into().  VALUE payloads are received directly into a buffer of
+    their exact size and handed back as memoryview objects, so they are
+    neither copied through Python strings nor decoded.
+    """
+
+    def __init__(self, sock, bufsize=64 * 1024):
+        self.socket = sock
+        self.buf = bytearray(bufsize)
+        self.start = 0
+        self.end = 0
+
+    def _fill(self):
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif self.end == len(self.buf):
+            pending = self.buf[self.start:self.end]
+            if len(pending) * 2 > len(self.buf):
+                self.buf = bytearray(len(self.buf) * 2)
+            self.buf[:len(pending)] = pending
+            self.start, self.end = 0, len(pending)
+        n = self.socket.recv_into(memoryview(self.buf)[self.end:])
+        if n == 0:
+            raise IOError('Connection closed while reading reply')
+        self.end += n
+
+    def readline(self):
+        """Returns the next line, including its terminator, as bytes"""
+        scanned = 0
+        while True:
+            i = self.buf.find(b'\n', self.start + scanned, self.end)
+            if i >= 0:
+                line = bytes(self.buf[self.start:i + 1])
+                self.start = i + 1
+                return line
+            scanned = self.end - self.start
+            self._fill()
+
+    def read(self, n):
+        """Returns a memoryview over the next n bytes"""
+        value = bytearray(n)
+        view = memoryview(value)
+        got = min(n, self.end - self.start)
+        view[:got] = memoryview(self.buf)[self.start:self.start + got]
+        self.start += got
+        while got < n:
+            r = self.socket.recv_into(view[got:])
+            if r == 0:
+                raise IOError('Connection closed while reading value')
+            got += r
+        return view
+
+    def skip(self, n):
+        while self.end - self.start < n:
+            self._fill()
+        self.start += n
+
+    def buffered(self):
+        """Number of received bytes not read yet"""
+        return self.end - self.start
+
+
+class _TextReader(object):
+    """
+    File-like text view of a connection's ReplyReader, for the reply
+    parsers that work on strings.  Both share the ReplyReader's buffer, so
+    the two can be used in turn on the same connection.
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+
+    def readline(self):
+        return _text(self.reader.readline())
+
+    def read(self, n):
+        return _text(self.reader.read(n).tobytes())
+
+    def skip(self, n):
+        self.reader.skip(n)
+
+    def buffered(self):
+        return self.reader.buffered()
+
+    def close(self):
+        pass
+
+
+def _text(data):
+    return data if isinstance(data, str) else data.decode('utf-8')
+
+class _FirstLineTimer(object):
+    """
+    Wraps a connection's reply reader (file object or ReplyReader) to note
+    when the first reply line of a timed request has been read.
+    """
+
+    def __init__(self, f, mc):
+        self.f = f
+        self.mc = mc
+
+    def readline(self, *args):
+        line = self.f.readline(*args)
+        timing = self.mc._timing
+        if timing is not None and timing[1] is None:
+            timing[1] = now()
+        return line
+
+    def __getattr__(self, name):
+        return getattr(self.f, name)
+
+
+def _timed(op):
+    """
+    Records the latency of an MCProcess request method under 'op' when
+    latency recording is enabled (see MCProcess.record_latency()).
+    Requests that got no reply, e.g. noreply ones, are not recorded.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.latency is None or self._timing is not None:
+                return method(self, *args, **kwargs)
+            self._timing = timing = [now(), None]
+            try:
+                result = method(self, *args, **kwargs)
+            finally:
+                self._timing = None
+            if timing[1] is not None:
+                self.latency.record(op, timing[1] - timing[0],
+                                    now() - timing[0])
+            return result
+        return wrapper
+    return decorator
+
+
 class MCProcess(ProcessBase):
     proc = None
+    latency = None
+    _timing = None
+    # Seconds ensure_connected() waits for a starting process
+    startup_timeout = 30
 
     def __init__(self, cmd, addr, base_dir=None, junk_fill=False):
         if cmd is not None and '-s' in cmd:
@@ -142,25 +338,113 @@ class MCProcess(ProcessBase):
         ProcessBase.__init__(self, cmd, base_dir, junk_fill)
         self.deletes = 0
         self.others = 0
+        self.reconnects = 0
 
     def getport(self):
         return self.port
 
     def connect(self):
-        self.socket = socket.socket(self.addr_family, socket.SOCK_STREAM)
-        self.socket.connect(self.addr)
-        self.fd = self.socket.makefile()
-
-    def ensure_connected(self):
+        if getattr(self, 'socket', None) is not None:
+            self.disconnect()
+        sock = socket.socket(self.addr_family, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.addr)
+        except socket.error:
+            sock.close()
+            raise
+        self.socket = sock
+        # one buffer per connection: replies may be read as text or raw
+        self.reader = ReplyReader(self.socket)
+        self.fd = _TextReader(self.reader)
+        if self.latency is not None:
+            self._wrap_readers()
+
+    def _wrap_readers(self):
+        if self.fd is not None and not isinstance(self.fd, _FirstLineTimer):
+            self.fd = _FirstLineTimer(self.fd, self)
+            self.reader = _FirstLineTimer(self.reader, self)
+
+    def record_latency(self, recorder=None):
+        """
+        Starts recording per operation latencies of the requests sent
+        through this client into recorder (a new LatencyRecorder if None),
+        and returns the recorder.  Several clients may share a recorder.
+        """
+        if recorder is None:
+            recorder = LatencyRecorder()
+        self.latency = recorder
+        if getattr(self, 'fd', None) is not None:
+            self._wrap_readers()
+        return recorder
+
+    def ensure_connected(self, timeout=None):
+        """
+        Connects, retrying with exponential backoff while the process is
+        still starting up and refuses connections.  Raises an Exception if
+        the process exits, or doesn't accept the connection within timeout
+        (default: startup_timeout) seconds.
+        """
+        if timeout is None:
+            timeout = self.startup_timeout
+        deadline = time.time() + timeout
+        delay = 0.001
         while True:
             try:
                 self.connect()
                 return
-            except Exception as e:
-                if e.errno == errno.ECONNREFUSED:
-                    pass
-                else:
+            except socket.error as e:
+                if e.errno not in (errno.ECONNREFUSED, errno.ENOENT):
                     raise
+                error = e
+            self._check_startup(deadline, timeout, error)
+            time.sleep(min(delay, max(0, deadline - time.time())))
+            delay = min(delay * 2, 0.1)
+
+    def ensure_ready(self, check=None, timeout=None):
+        """
+        ensure_connected(), then waits until check() (by default, a version
+        request) returns a true value, reconnecting between attempts with
+        exponential backoff.  Needed when the listen socket is passed to the
+        process: connecting succeeds as soon as the socket is listening,
+        before the process serves requests.
+        """
+        if timeout is None:
+            timeout = self.startup_timeout
+        if check is None:
+            check = self.version
+        deadline = time.time() + timeout
+        self.ensure_connected(timeout)
+        delay = 0.01
+        while True:
+            try:
+                if check():
+                    return
+                error = 'no reply'
+            except (socket.error, ValueError) as e:
+                error = e
+            self._check_startup(deadline, timeout, error)
+            time.sleep(min(delay, max(0, deadline - time.time())))
+            delay = min(delay * 2, 0.5)
+            # The process may still have to handle the previous request
+            self.ensure_connected(max(0, deadline - time.time()))
+
+    def _check_startup(self, deadline, timeout, error):
+        if self.proc is not None and self.proc.poll() is not None:
+            self.dump()
+            raise Exception('{} exited with status {} before accepting '
+                            'connections on {}'.format(
+                                self.cmd_line, self.proc.returncode,
+                                self.addr))
+        if time.time() >= deadline:
+            raise Exception('Timed out after {}s waiting for {} to accept '
+                            'connections on {}: {}'.format(
+                                timeout, self.cmd_line, self.addr, error))
+
+    def reconnect(self):
+        """Drops the current connection (after a protocol error) and opens
+        a fresh one"""
+        self.reconnects += 1
+        self.connect()
 
     def disconnect(self):
         try:
@@ -173,7 +457,7 @@ class MCProcess(ProcessBase):
                 self.fd.close()
         except IOError:
             pass
-        self.fd = self.socket = None
+        self.fd = self.socket = self.reader = None
 
     def terminate(self):
         if not self.proc:
@@ -195,21 +479,30 @@ class MCProcess(ProcessBase):
 
     def _get(self, cmd, keys, expect_cas, return_all_info):
         multi = True
-        hadValue = False
         if not isinstance(keys, list):
             multi = False
             keys = [keys]
-        self.socket.sendall("{} {}\r\n".format(cmd, " ".join(keys)))
+        self.socket.sendall(format_get(cmd, keys))
+        return self._read_get_reply(keys, multi, expect_cas, return_all_info)
+
+    def _read_get_reply(self, keys, multi, expect_cas, return_all_info,
+                        raw=False):
+        """
+        Parses a get/gets reply.  With raw, values are read with the binary
+        ReplyReader and returned as memoryview objects instead of strings.
+        """
+        reader = self.reader if raw else self.fd
+        hadValue = False
         res = dict([(key, None) for key in keys])
 
         while True:
-            l = self.fd.readline().strip()
+            l = _text(reader.readline().strip())
             if l == 'END':
                 if multi:
                     return res
                 else:
                     assert len(res) == 1
-                    return res.values()[0]
+                    return list(res.values())[0]
             elif l.startswith("VALUE"):
                 hadValue = True
                 parts = l.split()
@@ -217,8 +510,8 @@ class MCProcess(ProcessBase):
                 f = int(parts[2])
                 n = int(parts[3])
                 assert k in keys
-                payload = self.fd.read(n)
-                self.fd.read(2)
+                payload = reader.read(n)
+                reader.skip(2)
                 if return_all_info:
                     res[k] = dict({"key": k,
                                   "flags": f,
@@ -234,25 +527,105 @@ class MCProcess(ProcessBase):
                                     'multiget request')
                 return l
             else:
-                self.connect()
+                self.reconnect()
                 raise Exception('Unexpected response "%s" (%s)' % (l, keys))
 
+    @_timed('get')
     def get(self, keys, return_all_info=False):
         return self._get('get', keys, expect_cas=False,
                          return_all_info=return_all_info)
 
+    @_timed('gets')
     def gets(self, keys):
         return self._get('gets', keys, expect_cas=True, return_all_info=True)
 
+    def get_multi(self, keys, batch_size=100, depth=4, return_all_info=False):
+        """
+        Generator over (key, value) pairs for an arbitrarily long iterable of
+        keys.  Keys are split into multigets of at most batch_size keys and
+        up to 'depth' of them are kept in flight on the connection, so
+        results are streamed back while the next batches are on the wire.
+
+        Misses yield None; if a batch fails with SERVER_ERROR, every key
+        of that batch yields the error line, as get() would.
+
+        Replies of the batches still in flight are read and dropped when
+        the generator is closed early (break, exception or close()), so
+        the connection stays usable.  A generator that is only partially
+        consumed must be closed before the next command is sent.
+        """
+        keys = iter(keys)
+        in_flight = collections.deque()
+        in_sync = True
+
+        def send_batch():
+            batch = list(itertools.islice(keys, batch_size))
+            if batch:
+                self.socket.sendall(format_get('get', batch))
+                in_flight.append(batch)
+
+        try:
+            for _ in range(depth):
+                send_batch()
+
+            while in_flight:
+                batch = in_flight.popleft()
+                in_sync = False
+                res = self._read_get_reply(batch, True, False,
+                                           return_all_info)
+                in_sync = True
+                send_batch()
+                if isinstance(res, dict):
+                    for key in batch:
+                        yield key, res[key]
+                else:
+                    for key in batch:
+                        yield key, res
+        finally:
+            if in_flight:
+                if in_sync:
+                    while in_flight:
+                        self._read_get_reply(in_flight.popleft(), True,
+                                             False, False)
+                else:
+                    # a reply was cut short, the stream can't be resynced
+                    self.reconnect()
+
+    def _get_raw(self, cmd, keys, expect_cas, return_all_info):
+        multi = True
+        if not isinstance(keys, list):
+            multi = False
+            keys = [keys]
+        self.socket.sendall(format_get(cmd, keys))
+        return self._read_get_reply(keys, multi, expect_cas, return_all_info,
+                                    raw=True)
+
+    @_timed('get')
+    def get_raw(self, keys, return_all_info=False):
+        """
+        Same as get(), but reads the reply with the binary ReplyReader:
+        values are returned as memoryview objects instead of strings.
+        """
+        return self._get_raw('get', keys, expect_cas=False,
+                             return_all_info=return_all_info)
+
+    @_timed('gets')
+    def gets_raw(self, keys):
+        return self._get_raw('gets', keys, expect_cas=True,
+                             return_all_info=True)
+
+    @_timed('metaget')
     def metaget(self, keys):
         ## FIXME: Not supporting multi-metaget yet
         #multi = True
         #if not instance(keys, list):
         #    multi = False
         #    keys = [keys]
-        res = {}
         self.socket.sendall("metaget %s\r\n" % keys)
+        return self._read_metaget_reply()
 
+    def _read_metaget_reply(self):
+        res = {}
         while True:
             l = self.fd.readline().strip()
             if l.startswith("END"):
@@ -263,12 +636,16 @@ class MCProcess(ProcessBase):
                     res[meta_list[2 * i].strip(':')] = \
                         meta_list[2 * i + 1].strip(';')
 
+    @_timed('lease-get')
     def leaseGet(self, keys):
         multi = True
         if not isinstance(keys, list):
             multi = False
             keys = [keys]
-        self.socket.sendall("lease-get %s\r\n" % " ".join(keys))
+        self.socket.sendall(format_get('lease-get', keys))
+        return self._read_lease_get_reply(keys, multi)
+
+    def _read_lease_get_reply(self, keys, multi):
         res = dict([(key, None) for key in keys])
 
         while True:
@@ -292,82 +669,112 @@ class MCProcess(ProcessBase):
                 res[k] = {"value": self.fd.read(int(n)),
                           "token": int(t)}
 
+    def _wait_for_reply(self, timeout):
+        """Whether reply data is available within timeout seconds"""
+        return self.reader.buffered() > 0 or \
+            len(select.select([self.socket], [], [], timeout)[0]) > 0
+
     def expectNoReply(self):
         self.socket.settimeout(0.5)
         try:
+            if self.reader.buffered():
+                return False
             self.socket.recv(1)
             return False
         except socket.timeout:
             pass
         return True
 
+    def _read_store_reply(self, expected="STORED"):
+        answer = self.fd.readline().strip()
+        if re.search('ERROR', answer):
+            print(answer)
+            raise ErrorReply(answer)
+        return re.match(expected, answer)
+
     def _set(self, command, key, value, replicate=False, noreply=False,
              exptime=0, flags=0):
-        value = str(value)
-        flags = flags | (1024 if replicate else 0)
-        self.socket.sendall("%s %s %d %d %d%s\r\n%s\r\n" %
-                            (command, key, flags, exptime, len(value),
-                            (' noreply' if noreply else ''), value))
+        self.socket.sendall(format_store(command, key, value, replicate,
+                                         noreply, exptime, flags))
         if noreply:
             return self.expectNoReply()
 
-        answer = self.fd.readline().strip()
-        if re.search('ERROR', answer):
-            print(answer)
-            self.connect()
+        try:
+            return self._read_store_reply()
+        except ErrorReply:
+            self.reconnect()
             return None
-        return re.match("STORED", answer)
 
+    @_timed('lease-set')
     def leaseSet(self, key, value_token, exptime=0, is_stalestored=False):
-        value = str(value_token["value"])
-        token = int(value_token["token"])
-        flags = 0
-        cmd = "lease-set %s %d %d %d %d\r\n%s\r\n" % \
-                (key, token, flags, exptime, len(value), value)
-        self.socket.sendall(cmd)
+        self.socket.sendall(format_lease_set(key, value_token, exptime))
 
-        answer = self.fd.readline().strip()
-        if re.search('ERROR', answer):
-            print(answer)
-            self.connect()
+        try:
+            return self._read_store_reply(
+                "STALE_STORED" if is_stalestored else "STORED")
+        except ErrorReply:
+            self.reconnect()
             return None
-        if is_stalestored:
-            return re.match("STALE_STORED", answer)
-        return re.match("STORED", answer)
 
+    @_timed('set')
     def set(self, key, value, replicate=False, noreply=False, exptime=0,
             flags=0):
         return self._set("set", key, value, replicate, noreply, exptime, flags)
 
+    @_timed('add')
     def add(self, key, value, replicate=False, noreply=False):
         return self._set("add", key, value, replicate, noreply)
 
+    @_timed('replace')
     def replace(self, key, value, replicate=False, noreply=False):
         return self._set("replace", key, value, replicate, noreply)
 
+    @_timed('set')
+    def set_raw(self, key, value, noreply=False, exptime=0, flags=0):
+        """
+        Same as set(), but value (bytes, bytearray or memoryview) is written
+        to the socket as is instead of being formatted into the request.
+        """
+        self.socket.sendall("set %s %d %d %d%s\r\n" %
+                            (key, flags, exptime, len(value),
+                             _noreply(noreply)))
+        self.socket.sendall(value)
+        self.socket.sendall(b'\r\n')
+        if noreply:
+            return self.expectNoReply()
+
+        try:
+            return self._read_store_reply()
+        except ErrorReply:
+            self.reconnect()
+            return None
+
+    @_timed('delete')
     def delete(self, key, exptime=None, noreply=False):
-        exptime_str = ''
-        if exptime is not None:
-            exptime_str = " {}".format(exptime)
-        self.socket.sendall("delete {}{}{}\r\n".format(
-                            key, exptime_str, (' noreply' if noreply else '')))
+        self.socket.sendall(format_delete(key, exptime, noreply))
         self.deletes += 1
 
         if noreply:
             return self.expectNoReply()
 
+        return self._read_delete_reply()
+
+    def _read_delete_reply(self):
         answer = self.fd.readline()
 
         assert re.match("DELETED|NOT_FOUND|SERVER_ERROR", answer), answer
         return re.match("DELETED", answer)
 
+    @_timed('touch')
     def touch(self, key, exptime, noreply=False):
-        self.socket.sendall("touch {} {}{}\r\n".format(
-                            key, exptime, (' noreply' if noreply else '')))
+        self.socket.sendall(format_touch(key, exptime, noreply))
 
         if noreply:
             return self.expectNoReply()
 
+        return self._read_touch_reply()
+
+    def _read_touch_reply(self):
         answer = self.fd.readline()
 
         if answer == "TOUCHED\r\n":
@@ -381,31 +788,37 @@ class MCProcess(ProcessBase):
         return None
 
     def _arith(self, cmd, key, value, noreply):
-        self.socket.sendall("%s %s %d%s\r\n" %
-                            (cmd, key, value, (' noreply' if noreply else '')))
+        self.socket.sendall(format_arith(cmd, key, value, noreply))
         if noreply:
             return self.expectNoReply()
 
+        return self._read_arith_reply()
+
+    def _read_arith_reply(self):
         answer = self.fd.readline()
         if re.match("NOT_FOUND", answer):
             return None
         else:
             return int(answer)
 
+    @_timed('incr')
     def incr(self, key, value=1, noreply=False):
         return self._arith('incr', key, value, noreply)
 
+    @_timed('decr')
     def decr(self, key, value=1, noreply=False):
         return self._arith('decr', key, value, noreply)
 
     def _affix(self, cmd, key, value, noreply=False, flags=0, exptime=0):
-        self.socket.sendall("%s %s %d %d %d%s\r\n%s\r\n" %
-                            (cmd, key, flags, exptime, len(value),
-                            (' noreply' if noreply else ''), value))
+        self.socket.sendall(format_store(cmd, key, value, noreply=noreply,
+                                         exptime=exptime, flags=flags))
 
         if noreply:
             return self.expectNoReply()
 
+        return self._read_affix_reply()
+
+    def _read_affix_reply(self):
         answer = self.fd.readline()
         if answer == "STORED\r\n":
             return "STORED"
@@ -417,24 +830,25 @@ class MCProcess(ProcessBase):
             return "CLIENT_ERROR"
         return None
 
+    @_timed('append')
     def append(self, key, value, noreply=False, flags=0, exptime=0):
         return self._affix('append', key, value, noreply, flags, exptime)
 
+    @_timed('prepend')
     def prepend(self, key, value, noreply=False, flags=0, exptime=0):
         return self._affix('prepend', key, value, noreply, flags, exptime)
 
+    @_timed('cas')
     def cas(self, key, value, cas_token):
-        value = str(value)
-        self.socket.sendall("cas %s 0 0 %d %d\r\n%s\r\n" %
-                            (key, len(value), cas_token, value))
+        self.socket.sendall(format_cas(key, value, cas_token))
 
-        answer = self.fd.readline().strip()
-        if re.search('ERROR', answer):
-            print(answer)
-            self.connect()
+        try:
+            return self._read_store_reply()
+        except ErrorReply:
+            self.reconnect()
             return None
-        return re.match("STORED", answer)
 
+    @_timed('stats')
     def stats(self, spec=None):
         q = 'stats\r\n'
         if spec:
@@ -443,8 +857,7 @@ class MCProcess(ProcessBase):
 
         s = {}
         l = None
-        fds = select.select([self.fd], [], [], 5.0)
-        if len(fds[0]) == 0:
+        if not self._wait_for_reply(5.0):
             return None
         while l != 'END':
             l = self.fd.readline().strip()
@@ -456,6 +869,14 @@ class MCProcess(ProcessBase):
 
         return s
 
+    def stats_snapshot(self, spec=None):
+        """stats(spec) as a StatsSnapshot, see stats_snapshot.py"""
+        return StatsSnapshot.from_process(self, spec)
+
+    def hot_keys(self):
+        """stats('hotkeys') parsed, see hot_keys.parse_hot_keys()"""
+        return parse_hot_keys(self.stats('hotkeys'))
+
     def raw_stats(self, spec=None):
         q = 'stats\r\n'
         if spec:
@@ -464,8 +885,7 @@ class MCProcess(ProcessBase):
 
         s = []
         l = None
-        fds = select.select([self.fd], [], [], 2.0)
-        if len(fds[0]) == 0:
+        if not self._wait_for_reply(2.0):
             return None
         while l != 'END':
             l = self.fd.readline().strip()
@@ -480,8 +900,7 @@ class MCProcess(ProcessBase):
         self.socket.sendall(command)
 
         # Handle no response
-        fds = select.select([self.fd], [], [], 2.0)
-        if len(fds[0]) == 0:
+        if not self._wait_for_reply(2.0):
             return None
 
         answer = ""
@@ -490,7 +909,7 @@ class MCProcess(ProcessBase):
             l = self.fd.readline().strip()
             # Handle error
             if not answer and 'ERROR' in l:
-                self.connect()
+                self.reconnect()
                 return l
             answer += l + "\r\n"
         return answer
@@ -501,6 +920,7 @@ class MCProcess(ProcessBase):
         answer = self.fd.readline()
         return answer
 
+    @_timed('version')
     def version(self):
         self.socket.sendall("version\r\n")
         return self.fd.readline()
@@ -509,6 +929,7 @@ class MCProcess(ProcessBase):
         self.socket.sendall("shutdown\r\n")
         return self.fd.readline()
 
+    @_timed('flush_all')
     def flush_all(self, delay=None):
         if delay is None:
             self.socket.sendall("flush_all\r\n")
@@ -516,6 +937,163 @@ class MCProcess(ProcessBase):
             self.socket.sendall("flush_all {}\r\n".format(delay))
         return self.fd.readline().rstrip()
 
+    def pipeline(self):
+        return MCPipeline(self)
+
+
+class MCPipeline(object):
+    """
+    Pipelined request batch on top of an MCProcess connection.
+
+    Requests are queued with the same methods as MCProcess, written to the
+    socket with a single sendall() by execute(), and the replies are then
+    parsed in order using the MCProcess reply readers.  execute() returns
+    one result per queued request, in the order the requests were queued;
+    noreply requests yield None.
+
+    Can be used as a context manager, executing on a clean exit:
+
+        with mc.pipeline() as p:
+            p.set('a', '1')
+            p.get('a')
+        stored, value = p.results
+    """
+
+    def __init__(self, mc):
+        self.mc = mc
+        self.requests = []
+        self.readers = []
+        self.results = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+        return False
+
+    def __len__(self):
+        return len(self.requests)
+
+    def _queue(self, request, reader):
+        self.requests.append(request)
+        self.readers.append(reader)
+        return self
+
+    def _queue_get(self, cmd, keys, expect_cas, return_all_info):
+        multi = isinstance(keys, list)
+        if not multi:
+            keys = [keys]
+        return self._queue(
+            format_get(cmd, keys),
+            lambda: self.mc._read_get_reply(keys, multi, expect_cas,
+                                            return_all_info))
+
+    def get(self, keys, return_all_info=False):
+        return self._queue_get('get', keys, expect_cas=False,
+                               return_all_info=return_all_info)
+
+    def gets(self, keys):
+        return self._queue_get('gets', keys, expect_cas=True,
+                               return_all_info=True)
+
+    def metaget(self, keys):
+        return self._queue("metaget %s\r\n" % keys,
+                           self.mc._read_metaget_reply)
+
+    def leaseGet(self, keys):
+        multi = isinstance(keys, list)
+        if not multi:
+            keys = [keys]
+        return self._queue(format_get('lease-get', keys),
+                           lambda: self.mc._read_lease_get_reply(keys, multi))
+
+    def _set(self, command, key, value, replicate=False, noreply=False,
+             exptime=0, flags=0):
+        return self._queue(
+            format_store(command, key, value, replicate, noreply, exptime,
+                         flags),
+            None if noreply else self.mc._read_store_reply)
+
+    def set(self, key, value, replicate=False, noreply=False, exptime=0,
+            flags=0):
+        return self._set("set", key, value, replicate, noreply, exptime, flags)
+
+    def add(self, key, value, replicate=False, noreply=False):
+        return self._set("add", key, value, replicate, noreply)
+
+    def replace(self, key, value, replicate=False, noreply=False):
+        return self._set("replace", key, value, replicate, noreply)
+
+    def leaseSet(self, key, value_token, exptime=0, is_stalestored=False):
+        expected = "STALE_STORED" if is_stalestored else "STORED"
+        return self._queue(format_lease_set(key, value_token, exptime),
+                           lambda: self.mc._read_store_reply(expected))
+
+    def cas(self, key, value, cas_token):
+        return self._queue(format_cas(key, value, cas_token),
+                           self.mc._read_store_reply)
+
+    def delete(self, key, exptime=None, noreply=False):
+        self.mc.deletes += 1
+        return self._queue(format_delete(key, exptime, noreply),
+                           None if noreply else self.mc._read_delete_reply)
+
+    def touch(self, key, exptime, noreply=False):
+        return self._queue(format_touch(key, exptime, noreply),
+                           None if noreply else self.mc._read_touch_reply)
+
+    def incr(self, key, value=1, noreply=False):
+        return self._queue(format_arith('incr', key, value, noreply),
+                           None if noreply else self.mc._read_arith_reply)
+
+    def decr(self, key, value=1, noreply=False):
+        return self._queue(format_arith('decr', key, value, noreply),
+                           None if noreply else self.mc._read_arith_reply)
+
+    def append(self, key, value, noreply=False, flags=0, exptime=0):
+        return self._queue(
+            format_store('append', key, value, noreply=noreply,
+                         exptime=exptime, flags=flags),
+            None if noreply else self.mc._read_affix_reply)
+
+    def prepend(self, key, value, noreply=False, flags=0, exptime=0):
+        return self._queue(
+            format_store('prepend', key, value, noreply=noreply,
+                         exptime=exptime, flags=flags),
+            None if noreply else self.mc._read_affix_reply)
+
+    def execute(self):
+        """Sends all queued requests at once and reads back their replies.
+
+        *ERROR replies to storage commands yield None, as in MCProcess; the
+        connection is then re-established once all replies have been read.
+        """
+        requests, readers = self.requests, self.readers
+        self.requests = []
+        self.readers = []
+
+        if requests:
+            self.mc.socket.sendall("".join(requests))
+
+        results = []
+        reconnect = False
+        for reader in readers:
+            if reader is None:
+                results.append(None)
+                continue
+            try:
+                results.append(reader())
+            except ErrorReply:
+                reconnect = True
+                results.append(None)
+        if reconnect:
+            self.mc.reconnect()
+
+        self.results = results
+        return results
+
 def sub_port(s, substitute_ports, port_map):
     parts = s.split(':')
     if len(parts) < 2:
@@ -597,6 +1175,7 @@ def create_listen_socket():
         listen_sock = socket.socket(socket.AF_INET6)
     else:
         listen_sock = socket.socket(socket.AF_INET)
+    bind_port(listen_sock)
     listen_sock.listen(100)
     return listen_sock
 
@@ -640,6 +1219,18 @@ class McrouterBase(MCProcess):
     def check_in_log(self, needle):
         return needle in open(self.log).read()
 
+    def set_debug_fifo_filter(self, **kwargs):
+        """
+        Restricts the traffic mirrored to the debug fifos, see
+        debug_fifo_filter.make_filter() for the arguments.  Applied by
+        mcrouter within about a second.
+        """
+        return debug_fifo_filter.write_filter(
+            self.debug_fifo_root, debug_fifo_filter.make_filter(**kwargs))
+
+    def clear_debug_fifo_filter(self):
+        debug_fifo_filter.clear_filter(self.debug_fifo_root)
+
 
 class Mcrouter(McrouterBase):
     def __init__(self, config, port=None, default_route=None, extra_args=None,
@@ -715,6 +1306,159 @@ class McrouterClients:
     def __getitem__(self, idx):
         return self.clients[idx]
 
+    def close(self):
+        for client in self.clients:
+            client.disconnect()
+
+class McrouterClientPool(object):
+    """
+    Pool of McrouterClient connections to one mcrouter port.
+
+    checkout() hands out an idle connection, opening a new one while fewer
+    than max_size exist and blocking otherwise; checkin() returns it.
+    Connections idle for longer than max_idle_time seconds are closed, and
+    an idle connection that became readable (server closed it, or stray
+    reply bytes) is reopened before being handed out.  A connection checked
+    in with error=True is closed and replaced lazily.
+
+        with pool.connection() as mc:
+            mc.set('key', 'value')
+    """
+
+    def __init__(self, port, max_size=8, max_idle_time=60.0):
+        self.port = port
+        self.max_size = max_size
+        self.max_idle_time = max_idle_time
+        self.lock = threading.Condition()
+        # (client, last checkin time), most recently used last
+        self.idle = collections.deque()
+        # connections handed out and not checked in yet
+        self.busy = set()
+        self.size = 0
+        self.created = 0
+        self.evicted = 0
+        self.errors = 0
+
+    def _open(self):
+        client = McrouterClient(self.port)
+        client.connect()
+        client.checkouts = 0
+        client.errors = 0
+        client.last_used = time.time()
+        self.created += 1
+        return client
+
+    def _close(self, client):
+        client.disconnect()
+        self.size -= 1
+        self.lock.notify()
+
+    def evict_idle(self):
+        with self.lock:
+            deadline = time.time() - self.max_idle_time
+            while self.idle and self.idle[0][1] < deadline:
+                client, _ = self.idle.popleft()
+                self._close(client)
+                self.evicted += 1
+
+    def checkout(self, timeout=None):
+        self.evict_idle()
+        with self.lock:
+            end = None if timeout is None else time.time() + timeout
+            while not self.idle and self.size >= self.max_size:
+                remaining = None if end is None else end - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise Exception('No connection available in pool to '
+                                    'port {} after {}s'.format(self.port,
+                                                               timeout))
+                self.lock.wait(remaining)
+            if self.idle:
+                client, _ = self.idle.pop()
+            else:
+                self.size += 1
+                client = None
+
+        if client is None:
+            try:
+                client = self._open()
+            except Exception:
+                with self.lock:
+                    self.size -= 1
+                    self.lock.notify()
+                raise
+        elif client.reader.buffered() or \
+                select.select([client.socket], [], [], 0)[0]:
+            try:
+                client.reconnect()
+            except Exception:
+                with self.lock:
+                    self._close(client)
+                raise
+        client.checkouts += 1
+        with self.lock:
+            self.busy.add(client)
+        return client
+
+    def checkin(self, client, error=False):
+        with self.lock:
+            self.busy.discard(client)
+            client.last_used = time.time()
+            if error:
+                client.errors += 1
+                self.errors += 1
+                self._close(client)
+            else:
+                self.idle.append((client, client.last_used))
+                self.lock.notify()
+
+    @contextlib.contextmanager
+    def connection(self, timeout=None):
+        client = self.checkout(timeout)
+        try:
+            yield client
+        except Exception:
+            # the reply stream may be out of sync after any failure
+            self.checkin(client, error=True)
+            raise
+        else:
+            self.checkin(client)
+
+    def close(self):
+        with self.lock:
+            while self.idle:
+                client, _ = self.idle.popleft()
+                self._close(client)
+
+    def stats(self):
+        """
+        Pool counters plus one entry per open connection, idle or checked
+        out; idle_time is None for checked out ones
+        """
+        def connection_stats(client, last_used):
+            return {
+                'checked_out': last_used is None,
+                'checkouts': client.checkouts,
+                'errors': client.errors,
+                'reconnects': client.reconnects,
+                'deletes': client.deletes,
+                'others': client.others,
+                'idle_time': None if last_used is None
+                else time.time() - last_used,
+            }
+
+        with self.lock:
+            return {
+                'size': self.size,
+                'idle': len(self.idle),
+                'created': self.created,
+                'evicted': self.evicted,
+                'errors': self.errors,
+                'connections':
+                    [connection_stats(client, last_used)
+                     for client, last_used in self.idle] +
+                    [connection_stats(client, None) for client in self.busy],
+            }
+
 class MockMemcached(MCProcess):
     def __init__(self, port=None):
         args = [McrouterGlobals.binPath('mockmc')]
@@ -771,16 +1515,7 @@ class Memcached(MCProcess):
                 listen_sock.close()
 
             # delay here until the server goes up
-            self.ensure_connected()
-            l = 10
-            s = self.stats()
-            while ((not s or len(s) == 0) and l > 0):
-                # Note, we need to reconnect, because it's possible the
-                # server is still going to process previous requests.
-                self.ensure_connected()
-                s = self.stats()
-                time.sleep(0.5)
-                l = l - 1
+            self.ensure_ready(check=self.stats)
             self.disconnect()
 
 class Mcpiper(ProcessBase):
@@ -799,3 +1534,13 @@ class Mcpiper(ProcessBase):
 
     def contains(self, needle):
         return needle in self.output()
+
+    def records(self):
+        """
+        McpiperRecords of the output so far, for mcpiper run with --ndjson.
+        Each call only parses what was written since the previous one.
+        """
+        if not hasattr(self, '_records'):
+            self._records = McpiperRecords(self.stdout)
+        self._records.update()
+        return self._records
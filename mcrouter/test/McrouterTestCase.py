@@ -7,13 +7,21 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
-import unittest
+import os
+import stat
 import time
+import unittest
 
 from mcrouter.test.MCProcess import Mcrouter, Memcached, MockMemcached
+from mcrouter.test import warm_mcrouters
 
 
 class McrouterTestCase(unittest.TestCase):
+    # Take mcrouters from the pool of warm processes (see warm_mcrouters.py)
+    # instead of starting new ones.  Only for tests that don't depend on
+    # mcrouter's stats, logs or other state left over from earlier tests.
+    warm_mcrouters = False
+
     def __init__(self, *args, **kwargs):
         super(McrouterTestCase, self).__init__(*args, **kwargs)
         self.use_mock_mc = False
@@ -47,12 +55,17 @@ class McrouterTestCase(unittest.TestCase):
                             if 'port_map' not in self.__dict__
                             else self.port_map)
 
-        mcrouter = Mcrouter(config,
-                            substitute_config_ports=substitute_ports,
-                            default_route=route,
-                            extra_args=extra_args,
-                            replace_map=replace_map)
-        mcrouter.ensure_connected()
+        if self.warm_mcrouters and '-b' not in extra_args:
+            mcrouter = warm_mcrouters.pool.checkout(
+                config, substitute_ports, route=route, extra_args=extra_args,
+                replace_map=replace_map)
+        else:
+            mcrouter = Mcrouter(config,
+                                substitute_config_ports=substitute_ports,
+                                default_route=route,
+                                extra_args=extra_args,
+                                replace_map=replace_map)
+            mcrouter.ensure_connected()
 
         if bg_mcrouter:
             self.open_ports.append(mcrouter.getport())
@@ -74,7 +87,10 @@ class McrouterTestCase(unittest.TestCase):
         # (some mock severs might be blocked on recv() calls)
         if 'open_mcrouters' in self.__dict__:
             for mcr in self.open_mcrouters:
-                mcr.terminate()
+                if hasattr(mcr, 'warm_key'):
+                    warm_mcrouters.pool.checkin(mcr)
+                else:
+                    mcr.terminate()
 
         if 'open_servers' in self.__dict__:
             for server in self.open_servers:
@@ -90,3 +106,120 @@ class McrouterTestCase(unittest.TestCase):
             now = time.time()
             if (now - start_time > timeout):
                 return False
+
+    def wait_for(self, condition, timeout=10, message=None, interval=0.01,
+                 max_interval=0.5):
+        """
+        Calls condition() with exponential backoff, starting at interval
+        seconds, until it returns a true value and returns that value.
+        Fails the test if that doesn't happen within timeout seconds.
+        """
+        deadline = time.time() + timeout
+        while True:
+            result = condition()
+            if result:
+                return result
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                if callable(message):
+                    message = message()
+                self.fail('Timed out after {}s waiting for {}'.format(
+                    timeout, message or getattr(condition, '__name__',
+                                                'condition')))
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, max_interval)
+
+    def wait_for_stat(self, process, name, value, timeout=10, spec=None):
+        """
+        Waits until stat name of process (as returned by stats(spec)) is at
+        least value, or satisfies value if it is a callable.
+        """
+        check = value if callable(value) else lambda v: v >= value
+        last = [None]
+
+        def reached():
+            stats = process.stats(spec)
+            if not stats or name not in stats:
+                return False
+            last[0] = stats[name]
+            return check(float(last[0]))
+        self.wait_for(reached, timeout, lambda: 'stat {} to reach {}, '
+                      'last value: {}'.format(name, value, last[0]))
+
+    def wait_for_file(self, path, newer_than=None, timeout=10):
+        """
+        Waits until path exists and, if newer_than (a time.time()
+        timestamp) is given, was modified after it.
+        """
+        def updated():
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                return False
+            return newer_than is None or mtime > newer_than
+        self.wait_for(updated, timeout, lambda: '{} to be {}'.format(
+            path, 'created' if newer_than is None else 'updated'))
+        return path
+
+    def wait_for_fifo(self, process, fifo_root, count=1, timeout=10):
+        """
+        Waits until process (e.g. an Mcrouter or Mcpiper) has at least count
+        fifos from fifo_root open, and returns their paths.  For mcrouter
+        this means a reader connected and it started writing to the fifo.
+        """
+        fifo_root = os.path.realpath(fifo_root)
+        fd_dir = '/proc/{}/fd'.format(process.proc.pid)
+
+        def open_fifos():
+            fifos = set()
+            try:
+                fds = os.listdir(fd_dir)
+            except OSError:
+                return None
+            for fd in fds:
+                try:
+                    path = os.readlink(os.path.join(fd_dir, fd))
+                    if (os.path.dirname(path) == fifo_root and
+                            stat.S_ISFIFO(os.stat(path).st_mode)):
+                        fifos.add(path)
+                except OSError:
+                    continue
+            return sorted(fifos) if len(fifos) >= count else None
+        return self.wait_for(open_fifos, timeout, lambda: '{} fifo(s) of {} '
+                             'to be opened'.format(count, fifo_root))
+
+    def wait_for_log_line(self, path, *needles, **kwargs):
+        """
+        Waits until every needle (a string or compiled regex) appears in the
+        file at path, e.g. a log or the output of Mcpiper, and returns the
+        file contents.  Takes a timeout keyword argument.
+        """
+        missing = list(needles)
+
+        def found():
+            try:
+                with open(path, 'rb') as f:
+                    content = f.read().decode('ascii', 'ignore')
+            except IOError:
+                return None
+            missing[:] = [n for n in needles
+                          if not (n.search(content) if hasattr(n, 'search')
+                                  else n in content)]
+            return content if not missing else None
+        return self.wait_for(found, kwargs.get('timeout', 10),
+                             lambda: '{} in {}'.format(
+                                 ', '.join(getattr(n, 'pattern', n)
+                                           for n in missing), path))
+
+    def wait_for_requests(self, server, count, command=None, timeout=10):
+        """
+        Waits until a Python mock server has seen count requests in total,
+        or count requests of the given command (MemcachedServer only).
+        """
+        def seen():
+            if command is None:
+                return server.requests
+            return server.get_counters().get(command, 0)
+        self.wait_for(lambda: seen() >= count, timeout,
+                      lambda: '{} {} request(s), seen {}'.format(
+                          count, command or 'total', seen()))
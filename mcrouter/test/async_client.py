@@ -0,0 +1,345 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+"""
+asyncio based ASCII client with the same method surface as MCProcess.
+
+Each AsyncMcrouterClient owns one connection; many of them can be driven
+from a single event loop, which lets a test or load generator open thousands
+of concurrent connections to mcrouter without one thread per client.
+
+Requires Python 3.5+.
+"""
+
+import asyncio
+import re
+import socket
+
+from mcrouter.test.MCProcess import (
+    format_arith,
+    format_cas,
+    format_delete,
+    format_get,
+    format_lease_set,
+    format_store,
+    format_touch,
+)
+
+ENCODING = 'utf-8'
+
+
+def _encode(request):
+    return request.encode(ENCODING, 'surrogateescape')
+
+
+def _decode(data):
+    return data.decode(ENCODING, 'surrogateescape')
+
+
+class AsyncMcrouterClient(object):
+    # seconds to wait for a stats reply before reconnecting
+    stats_timeout = 5.0
+
+    def __init__(self, port, host='localhost'):
+        self.addr = (host, int(port))
+        self.port = int(port)
+        self.reader = None
+        self.writer = None
+        # created lazily so that it binds to the loop running connect()
+        self.lock = None
+        self.deletes = 0
+        self.others = 0
+
+    def getport(self):
+        return self.port
+
+    async def connect(self):
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        if self.writer is not None:
+            self.disconnect()
+        self.reader, self.writer = await asyncio.open_connection(
+            *self.addr)
+        sock = self.writer.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def disconnect(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def _readline(self):
+        return _decode(await self.reader.readline())
+
+    async def _read_value(self, n):
+        payload = await self.reader.readexactly(n + 2)
+        return _decode(payload[:-2])
+
+    async def _request(self, request, read_reply):
+        async with self.lock:
+            self.writer.write(_encode(request))
+            await self.writer.drain()
+            if read_reply is None:
+                return await self._expect_no_reply()
+            return await read_reply()
+
+    async def _expect_no_reply(self):
+        try:
+            await asyncio.wait_for(self.reader.read(1), 0.5)
+            return False
+        except asyncio.TimeoutError:
+            pass
+        return True
+
+    async def _get(self, cmd, keys, expect_cas, return_all_info):
+        multi = True
+        if not isinstance(keys, list):
+            multi = False
+            keys = [keys]
+
+        async def read_reply():
+            hadValue = False
+            res = dict([(key, None) for key in keys])
+            while True:
+                l = (await self._readline()).strip()
+                if l == 'END':
+                    if multi:
+                        return res
+                    assert len(res) == 1
+                    return list(res.values())[0]
+                elif l.startswith("VALUE"):
+                    hadValue = True
+                    parts = l.split()
+                    k = parts[1]
+                    f = int(parts[2])
+                    n = int(parts[3])
+                    assert k in keys
+                    payload = await self._read_value(n)
+                    if return_all_info:
+                        res[k] = {"key": k,
+                                  "flags": f,
+                                  "size": n,
+                                  "value": payload}
+                        if expect_cas:
+                            res[k]["cas"] = int(parts[4])
+                    else:
+                        res[k] = payload
+                elif l.startswith("SERVER_ERROR"):
+                    if hadValue:
+                        raise Exception('Received hit reply + SERVER_ERROR '
+                                        'for multiget request')
+                    return l
+                else:
+                    await self.connect()
+                    raise Exception('Unexpected response "%s" (%s)' %
+                                    (l, keys))
+
+        return await self._request(format_get(cmd, keys), read_reply)
+
+    async def get(self, keys, return_all_info=False):
+        return await self._get('get', keys, expect_cas=False,
+                               return_all_info=return_all_info)
+
+    async def gets(self, keys):
+        return await self._get('gets', keys, expect_cas=True,
+                               return_all_info=True)
+
+    async def metaget(self, keys):
+        async def read_reply():
+            res = {}
+            while True:
+                l = (await self._readline()).strip()
+                if l.startswith("END"):
+                    return res
+                elif l.startswith("META"):
+                    meta_list = l.split()
+                    for i in range(1, len(meta_list) // 2):
+                        res[meta_list[2 * i].strip(':')] = \
+                            meta_list[2 * i + 1].strip(';')
+
+        return await self._request("metaget %s\r\n" % keys, read_reply)
+
+    async def leaseGet(self, keys):
+        multi = True
+        if not isinstance(keys, list):
+            multi = False
+            keys = [keys]
+
+        async def read_reply():
+            res = dict([(key, None) for key in keys])
+            while True:
+                l = (await self._readline()).strip()
+                if l == 'END':
+                    if multi:
+                        return res
+                    assert len(res) == 1
+                    return list(res.values())[0]
+                elif l.startswith("VALUE"):
+                    v, k, f, n = l.split()
+                    assert k in keys
+                    res[k] = {"value": await self._read_value(int(n)),
+                              "token": None}
+                elif l.startswith("LVALUE"):
+                    v, k, t, f, n = l.split()
+                    assert k in keys
+                    res[k] = {"value": await self._read_value(int(n)),
+                              "token": int(t)}
+
+        return await self._request(format_get('lease-get', keys), read_reply)
+
+    async def _store(self, request, expected="STORED"):
+        async def read_reply():
+            answer = (await self._readline()).strip()
+            if re.search('ERROR', answer):
+                print(answer)
+                await self.connect()
+                return None
+            return re.match(expected, answer)
+
+        return await self._request(request, read_reply)
+
+    async def _set(self, command, key, value, replicate=False, noreply=False,
+                   exptime=0, flags=0):
+        request = format_store(command, key, value, replicate, noreply,
+                               exptime, flags)
+        if noreply:
+            return await self._request(request, None)
+        return await self._store(request)
+
+    async def set(self, key, value, replicate=False, noreply=False,
+                  exptime=0, flags=0):
+        return await self._set("set", key, value, replicate, noreply,
+                               exptime, flags)
+
+    async def add(self, key, value, replicate=False, noreply=False):
+        return await self._set("add", key, value, replicate, noreply)
+
+    async def replace(self, key, value, replicate=False, noreply=False):
+        return await self._set("replace", key, value, replicate, noreply)
+
+    async def leaseSet(self, key, value_token, exptime=0,
+                       is_stalestored=False):
+        return await self._store(
+            format_lease_set(key, value_token, exptime),
+            "STALE_STORED" if is_stalestored else "STORED")
+
+    async def cas(self, key, value, cas_token):
+        return await self._store(format_cas(key, value, cas_token))
+
+    async def delete(self, key, exptime=None, noreply=False):
+        self.deletes += 1
+
+        async def read_reply():
+            answer = await self._readline()
+            assert re.match("DELETED|NOT_FOUND|SERVER_ERROR", answer), answer
+            return re.match("DELETED", answer)
+
+        return await self._request(format_delete(key, exptime, noreply),
+                                   None if noreply else read_reply)
+
+    async def touch(self, key, exptime, noreply=False):
+        async def read_reply():
+            answer = await self._readline()
+            if answer == "TOUCHED\r\n":
+                return "TOUCHED"
+            if answer == "NOT_FOUND\r\n":
+                return "NOT_FOUND"
+            if re.match("^SERVER_ERROR", answer):
+                return "SERVER_ERROR"
+            if re.match("^CLIENT_ERROR", answer):
+                return "CLIENT_ERROR"
+            return None
+
+        return await self._request(format_touch(key, exptime, noreply),
+                                   None if noreply else read_reply)
+
+    async def _arith(self, cmd, key, value, noreply):
+        async def read_reply():
+            answer = await self._readline()
+            if re.match("NOT_FOUND", answer):
+                return None
+            return int(answer)
+
+        return await self._request(format_arith(cmd, key, value, noreply),
+                                   None if noreply else read_reply)
+
+    async def incr(self, key, value=1, noreply=False):
+        return await self._arith('incr', key, value, noreply)
+
+    async def decr(self, key, value=1, noreply=False):
+        return await self._arith('decr', key, value, noreply)
+
+    async def _affix(self, cmd, key, value, noreply=False, flags=0,
+                     exptime=0):
+        async def read_reply():
+            answer = await self._readline()
+            if answer == "STORED\r\n":
+                return "STORED"
+            if answer == "NOT_STORED\r\n":
+                return "NOT_STORED"
+            if re.match("^SERVER_ERROR", answer):
+                return "SERVER_ERROR"
+            if re.match("^CLIENT_ERROR", answer):
+                return "CLIENT_ERROR"
+            return None
+
+        request = format_store(cmd, key, value, noreply=noreply,
+                               exptime=exptime, flags=flags)
+        return await self._request(request, None if noreply else read_reply)
+
+    async def append(self, key, value, noreply=False, flags=0, exptime=0):
+        return await self._affix('append', key, value, noreply, flags,
+                                 exptime)
+
+    async def prepend(self, key, value, noreply=False, flags=0, exptime=0):
+        return await self._affix('prepend', key, value, noreply, flags,
+                                 exptime)
+
+    async def stats(self, spec=None):
+        q = 'stats\r\n'
+        if spec:
+            q = 'stats {0}\r\n'.format(spec)
+
+        async def read_reply():
+            s = {}
+            l = None
+            while l != 'END':
+                l = (await self._readline()).strip()
+                if len(l) == 0:
+                    return None
+                a = l.split(None, 2)
+                if len(a) == 3:
+                    s[a[1]] = a[2]
+            return s
+
+        try:
+            return await asyncio.wait_for(self._request(q, read_reply),
+                                          self.stats_timeout)
+        except asyncio.TimeoutError:
+            # the rest of the reply would be read by the next request
+            await self.connect()
+            return None
+
+    async def issue_command(self, command):
+        self.others += 1
+        return await self._request(command, self._readline)
+
+    async def version(self):
+        return await self._request("version\r\n", self._readline)
+
+    async def flush_all(self, delay=None):
+        if delay is None:
+            command = "flush_all\r\n"
+        else:
+            command = "flush_all {}\r\n".format(delay)
+        return (await self._request(command, self._readline)).rstrip()
+
+
+async def connect_clients(port, count, host='localhost'):
+    """Opens 'count' connections to host:port concurrently"""
+    clients = [AsyncMcrouterClient(port, host) for i in range(count)]
+    await asyncio.gather(*[client.connect() for client in clients])
+    return clients
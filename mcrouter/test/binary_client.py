@@ -0,0 +1,694 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+"""
+Caret and Umbrella protocol clients.
+
+MCProcess only speaks the ASCII protocol, so every request it sends goes
+through McAsciiParser.  The clients here encode requests the way
+CaretSerializedMessage and UmbrellaSerializedMessage do, which lets tests
+and benchmarks exercise the binary parsers our services actually use.
+
+Both clients expose the MCProcess method surface (get, set, delete, ...)
+with the same return conventions, plus send_batch() which pipelines a list
+of requests on one write and matches the replies back by request id.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import socket
+import struct
+import sys
+
+from mcrouter.test.MCProcess import ReplyReader
+
+PY3 = sys.version_info[0] >= 3
+
+# mc_res_t, in enum order (see lib/mc/msg.h)
+RESULTS = [
+    'unknown', 'deleted', 'touched', 'found', 'foundstale', 'notfound',
+    'notfoundhot', 'notstored', 'stalestored', 'ok', 'stored', 'exists',
+    'ooo', 'timeout', 'connect_timeout', 'connect_error', 'busy',
+    'try_again', 'shutdown', 'tko', 'bad_command', 'bad_key', 'bad_flags',
+    'bad_exptime', 'bad_lease_id', 'bad_cas_id', 'bad_value', 'aborted',
+    'client_error', 'local_error', 'remote_error', 'waiting',
+]
+
+CLIENT_ERRORS = frozenset([
+    'bad_command', 'bad_key', 'bad_flags', 'bad_exptime', 'bad_lease_id',
+    'bad_cas_id', 'bad_value', 'client_error',
+])
+
+SERVER_ERRORS = frozenset([
+    'ooo', 'timeout', 'connect_timeout', 'connect_error', 'busy',
+    'try_again', 'shutdown', 'tko', 'aborted', 'local_error', 'remote_error',
+])
+
+# Fields carried as uint64_t in the Carbon structures
+UNSIGNED_FIELDS = frozenset(['flags', 'cas', 'delta'])
+
+
+def _to_bytes(s):
+    if isinstance(s, (bytes, bytearray)):
+        return bytes(s)
+    if PY3:
+        return s.encode('utf-8', 'surrogateescape')
+    return s.encode('utf-8')
+
+
+def _to_str(b):
+    if PY3:
+        return bytes(b).decode('utf-8', 'surrogateescape')
+    return bytes(b)
+
+
+def _encode_varint(n):
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+    return out
+
+
+def _read_varint(read_byte):
+    shift = 0
+    n = 0
+    while True:
+        byte = read_byte()
+        n |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return n
+        shift += 7
+
+
+def _zigzag(n):
+    if n >= 1 << 63:
+        n -= 1 << 64
+    return (n << 1) ^ (n >> 63)
+
+
+def _unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def _encode_group_varint32(a, b, c, d):
+    selector = 0
+    out = bytearray()
+    for i, n in enumerate((a, b, c, d)):
+        size = 1
+        while size < 4 and n >> (8 * size):
+            size += 1
+        selector |= (size - 1) << (2 * i)
+        out += struct.pack('<I', n)[:size]
+    return bytearray([selector]) + out
+
+
+def _group_varint32_sizes(selector):
+    return [((selector >> (2 * i)) & 0x3) + 1 for i in range(4)]
+
+
+def _decode_group_varint32(selector, data):
+    values = []
+    pos = 0
+    for size in _group_varint32_sizes(selector):
+        chunk = data[pos:pos + size] + b'\0' * (4 - size)
+        values.append(struct.unpack('<I', chunk)[0])
+        pos += size
+    return values
+
+
+class Carbon(object):
+    """Field types of the Carbon compact protocol (carbon/Fields.h)"""
+    STOP = 0x0
+    TRUE = 0x1
+    FALSE = 0x2
+    INT8 = 0x3
+    INT16 = 0x4
+    INT32 = 0x5
+    INT64 = 0x6
+    DOUBLE = 0x7
+    BINARY = 0x8
+    LIST = 0x9
+    SET = 0xa
+    MAP = 0xb
+    STRUCT = 0xc
+    FLOAT = 0xd
+
+
+class CarbonWriter(object):
+    """Mirrors CarbonProtocolWriter for the scalar fields requests use"""
+
+    def __init__(self):
+        self.out = bytearray()
+        self.last_field_id = 0
+
+    def write_field_header(self, field_type, field_id):
+        delta = field_id - self.last_field_id
+        if 0 < delta <= 0xf:
+            self.out.append((delta << 4) | field_type)
+        else:
+            self.out.append(field_type)
+            self.out += struct.pack('<h', field_id)
+        self.last_field_id = field_id
+
+    def write_field(self, field_id, field_type, value):
+        """Writes a field, skipping it if it's zero or empty"""
+        if not value:
+            return
+        self.write_field_header(field_type, field_id)
+        if field_type == Carbon.BINARY:
+            value = _to_bytes(value)
+            self.out += _encode_varint(len(value))
+            self.out += value
+        elif field_type == Carbon.INT8:
+            self.out += struct.pack('<b', value)
+        else:
+            self.out += _encode_varint(_zigzag(value))
+
+    def finish(self):
+        self.out.append(Carbon.STOP)
+        return bytes(self.out)
+
+
+class CarbonReader(object):
+    """Decodes a compact struct into a {field id: value} dict"""
+
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def read_byte(self):
+        byte = self.data[self.pos]
+        self.pos += 1
+        return byte if isinstance(byte, int) else ord(byte)
+
+    def read_bytes(self, n):
+        value = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return value.tobytes()
+
+    def read_struct(self):
+        fields = {}
+        last_field_id = 0
+        while True:
+            byte = self.read_byte()
+            if byte & 0xf0:
+                field_type = byte & 0x0f
+                field_id = last_field_id + (byte >> 4)
+            else:
+                field_type = byte
+                if field_type == Carbon.STOP:
+                    return fields
+                field_id = struct.unpack('<h', self.read_bytes(2))[0]
+            fields[field_id] = self.read_value(field_type)
+            last_field_id = field_id
+
+    def read_value(self, field_type):
+        if field_type == Carbon.TRUE:
+            return True
+        if field_type == Carbon.FALSE:
+            return False
+        if field_type == Carbon.INT8:
+            return struct.unpack('<b', self.read_bytes(1))[0]
+        if field_type in (Carbon.INT16, Carbon.INT32, Carbon.INT64):
+            return _unzigzag(_read_varint(self.read_byte))
+        if field_type == Carbon.DOUBLE:
+            return struct.unpack('>d', self.read_bytes(8))[0]
+        if field_type == Carbon.FLOAT:
+            return struct.unpack('>f', self.read_bytes(4))[0]
+        if field_type == Carbon.BINARY:
+            return self.read_bytes(_read_varint(self.read_byte))
+        if field_type == Carbon.STRUCT:
+            return self.read_struct()
+        if field_type in (Carbon.LIST, Carbon.SET):
+            byte = self.read_byte()
+            size = byte >> 4
+            if size == 0xf:
+                size = _read_varint(self.read_byte)
+            return [self.read_item(byte & 0x0f) for i in range(size)]
+        if field_type == Carbon.MAP:
+            size = _read_varint(self.read_byte)
+            if size == 0:
+                return {}
+            byte = self.read_byte()
+            return dict((self.read_item(byte >> 4),
+                         self.read_item(byte & 0x0f)) for i in range(size))
+        raise Exception('Unknown Carbon field type {}'.format(field_type))
+
+    def read_item(self, field_type):
+        # Container elements write bools as a single byte
+        if field_type in (Carbon.TRUE, Carbon.FALSE):
+            return self.read_byte() == Carbon.TRUE
+        return self.read_value(field_type)
+
+
+class CaretProtocol(object):
+    """
+    '^', GroupVarint32(body size, type id, request id, number of additional
+    fields), varint (key, value) pairs, then the Carbon serialized body.
+    """
+    MAGIC = b'^'
+
+    # op: (request type id, request fields, reply field names by id)
+    OPS = {
+        'get': (1, [(1, 'key', Carbon.BINARY)],
+                {1: 'result', 2: 'value', 3: 'flags', 4: 'message',
+                 5: 'app_error'}),
+        'set': (3, [(1, 'key', Carbon.BINARY),
+                    (2, 'exptime', Carbon.INT32),
+                    (3, 'flags', Carbon.INT64),
+                    (4, 'value', Carbon.BINARY)],
+                {1: 'result', 2: 'flags', 3: 'value', 4: 'message',
+                 5: 'app_error'}),
+        'delete': (5, [(1, 'key', Carbon.BINARY),
+                       (2, 'flags', Carbon.INT64),
+                       (3, 'exptime', Carbon.INT32)],
+                   {1: 'result', 2: 'flags', 3: 'value', 4: 'message',
+                    5: 'app_error'}),
+        'lease-get': (7, [(1, 'key', Carbon.BINARY)],
+                      {1: 'result', 2: 'lease_token', 3: 'value',
+                       4: 'flags', 5: 'message', 6: 'app_error'}),
+        'lease-set': (9, [(1, 'key', Carbon.BINARY),
+                          (2, 'exptime', Carbon.INT32),
+                          (3, 'flags', Carbon.INT64),
+                          (4, 'value', Carbon.BINARY),
+                          (5, 'lease_token', Carbon.INT64)],
+                      {1: 'result', 2: 'message', 3: 'app_error'}),
+        'add': (11, [(1, 'key', Carbon.BINARY),
+                     (2, 'exptime', Carbon.INT32),
+                     (3, 'flags', Carbon.INT64),
+                     (4, 'value', Carbon.BINARY)],
+                {1: 'result', 2: 'message', 3: 'app_error'}),
+        'replace': (13, [(1, 'key', Carbon.BINARY),
+                         (2, 'exptime', Carbon.INT32),
+                         (3, 'flags', Carbon.INT64),
+                         (4, 'value', Carbon.BINARY)],
+                    {1: 'result', 2: 'message', 3: 'app_error'}),
+        'gets': (15, [(1, 'key', Carbon.BINARY)],
+                 {1: 'result', 2: 'cas', 3: 'value', 4: 'flags',
+                  5: 'message', 6: 'app_error'}),
+        'cas': (17, [(1, 'key', Carbon.BINARY),
+                     (2, 'exptime', Carbon.INT32),
+                     (3, 'flags', Carbon.INT64),
+                     (4, 'value', Carbon.BINARY),
+                     (5, 'cas', Carbon.INT64)],
+                {1: 'result', 2: 'message', 3: 'app_error'}),
+        'incr': (19, [(1, 'key', Carbon.BINARY),
+                      (2, 'delta', Carbon.INT64)],
+                 {1: 'result', 2: 'delta', 3: 'message', 4: 'app_error'}),
+        'decr': (21, [(1, 'key', Carbon.BINARY),
+                      (2, 'delta', Carbon.INT64)],
+                 {1: 'result', 2: 'delta', 3: 'message', 4: 'app_error'}),
+        'metaget': (23, [(1, 'key', Carbon.BINARY)],
+                    {1: 'result', 2: 'age', 3: 'exptime', 4: 'ipv',
+                     5: 'ip_address', 6: 'message', 7: 'app_error'}),
+        'append': (27, [(1, 'key', Carbon.BINARY),
+                        (2, 'exptime', Carbon.INT32),
+                        (3, 'flags', Carbon.INT64),
+                        (4, 'value', Carbon.BINARY)],
+                   {1: 'result', 2: 'message', 3: 'app_error'}),
+        'prepend': (29, [(1, 'key', Carbon.BINARY),
+                         (2, 'exptime', Carbon.INT32),
+                         (3, 'flags', Carbon.INT64),
+                         (4, 'value', Carbon.BINARY)],
+                    {1: 'result', 2: 'message', 3: 'app_error'}),
+        'touch': (31, [(1, 'key', Carbon.BINARY),
+                       (2, 'exptime', Carbon.INT32)],
+                  {1: 'result', 2: 'message', 3: 'app_error'}),
+    }
+
+    def encode_request(self, op, reqid, fields):
+        type_id, request_fields, _ = self.OPS[op]
+        writer = CarbonWriter()
+        for field_id, name, field_type in request_fields:
+            writer.write_field(field_id, field_type, fields.get(name))
+        body = writer.finish()
+        return (self.MAGIC +
+                bytes(_encode_group_varint32(len(body), type_id, reqid, 0)) +
+                body)
+
+    def read_reply(self, reader, ops):
+        """Reads one reply; ops maps request id to the op it answers"""
+        magic, selector = bytearray(reader.read(2).tobytes())
+        if magic != ord(self.MAGIC):
+            raise Exception('Bad Caret magic byte {}'.format(magic))
+        header = reader.read(
+            sum(_group_varint32_sizes(selector))).tobytes()
+        body_size, type_id, reqid, nfields = _decode_group_varint32(
+            selector, header)
+        read_byte = lambda: bytearray(reader.read(1).tobytes())[0]
+        for i in range(2 * nfields):
+            _read_varint(read_byte)
+
+        reply = {}
+        names = self.OPS[ops[reqid]][2]
+        for field_id, value in CarbonReader(reader.read(body_size).tobytes()) \
+                .read_struct().items():
+            name = names.get(field_id)
+            if name == 'result':
+                value = RESULTS[value]
+            elif name in UNSIGNED_FIELDS and value < 0:
+                value += 1 << 64
+            if name is not None:
+                reply[name] = value
+        return reqid, reply
+
+
+class UmbrellaProtocol(object):
+    """
+    '}', version, big endian nentries (u16) and total size (u32), nentries
+    16 byte entries, then NUL terminated strings referenced by the entries.
+    """
+    MAGIC = b'}'
+    HEADER = struct.Struct('>ccHI')
+    ENTRY = struct.Struct('>HHQ')
+    STRING_ENTRY = struct.Struct('>HHII')
+
+    # entry_type_t (lib/mc/umbrella.h)
+    I32, U32, I64, U64, CSTRING, BSTRING = range(1, 7)
+
+    # msg_field_t tags
+    TAGS = {
+        0x1: 'op',
+        0x2: 'result',
+        0x4: 'reqid',
+        0x8: 'app_error',
+        0x10: 'flags',
+        0x20: 'exptime',
+        0x40: 'age',
+        0x100: 'delta',
+        0x200: 'lease_token',
+        0x400: 'cas',
+        0x2000: 'key',
+        0x4000: 'value',
+    }
+    TAG_IDS = dict((name, tag) for tag, name in TAGS.items())
+    STRING_TAGS = frozenset([0x800, 0x1000, 0x2000, 0x4000])
+
+    # lib/mc/umbrella_conv.h
+    OPS = {
+        'get': 5, 'set': 6, 'add': 7, 'replace': 8, 'append': 9,
+        'prepend': 10, 'cas': 11, 'delete': 12, 'incr': 14, 'decr': 15,
+        'lease-get': 20, 'lease-set': 21, 'metaget': 24, 'gets': 26,
+        'touch': 28,
+    }
+    RESULTS = [
+        'unknown', 'deleted', 'found', 'notfound', 'notstored',
+        'stalestored', 'ok', 'stored', 'exists', 'ooo', 'timeout',
+        'connect_timeout', 'connect_error', 'busy', 'tko', 'bad_command',
+        'bad_key', 'bad_flags', 'bad_exptime', 'bad_lease_id', 'bad_value',
+        'aborted', 'client_error', 'local_error', 'remote_error', 'waiting',
+        'bad_cas_id', 'try_again', 'foundstale', 'notfoundhot', 'shutdown',
+        'touched',
+    ]
+
+    def encode_request(self, op, reqid, fields):
+        entries = [(self.I32, 0x1, self.OPS[op]), (self.U64, 0x4, reqid)]
+        for name in ('flags', 'exptime', 'cas', 'lease_token', 'delta'):
+            if fields.get(name):
+                entries.append((self.U64, self.TAG_IDS[name],
+                                fields[name] & ((1 << 64) - 1)))
+        strings = [(self.TAG_IDS[name], _to_bytes(fields[name]))
+                   for name in ('key', 'value') if name in fields]
+
+        body = bytearray()
+        packed = [self.ENTRY.pack(*entry) for entry in entries]
+        for tag, data in strings:
+            packed.append(self.STRING_ENTRY.pack(
+                self.BSTRING, tag, len(body), len(data) + 1))
+            body += data
+            body.append(0)
+        nentries = len(packed)
+        total = self.HEADER.size + self.ENTRY.size * nentries + len(body)
+        return (self.HEADER.pack(self.MAGIC, b'\0', nentries, total) +
+                b''.join(packed) + bytes(body))
+
+    def read_reply(self, reader, ops):
+        magic, version, nentries, total = self.HEADER.unpack(
+            reader.read(self.HEADER.size).tobytes())
+        if magic != self.MAGIC:
+            raise Exception('Bad Umbrella magic byte {!r}'.format(magic))
+        entries = reader.read(self.ENTRY.size * nentries).tobytes()
+        body = reader.read(
+            total - self.HEADER.size - len(entries)).tobytes()
+
+        reply = {}
+        reqid = None
+        for i in range(nentries):
+            chunk = entries[i * self.ENTRY.size:(i + 1) * self.ENTRY.size]
+            entry_type, tag = struct.unpack('>HH', chunk[:4])
+            if entry_type in (self.CSTRING, self.BSTRING):
+                _, _, offset, length = self.STRING_ENTRY.unpack(chunk)
+                value = body[offset:offset + max(length - 1, 0)]
+            else:
+                value = self.ENTRY.unpack(chunk)[2]
+                if entry_type in (self.I32, self.I64) and value >= 1 << 63:
+                    value -= 1 << 64
+            if tag == 0x4:
+                reqid = value
+            elif tag == 0x2:
+                reply['result'] = self.RESULTS[value]
+            elif tag in self.TAGS:
+                reply[self.TAGS[tag]] = value
+
+        # Umbrella carries error messages in the value field
+        if reply.get('result') in CLIENT_ERRORS | SERVER_ERRORS and \
+                'value' in reply:
+            reply['message'] = reply.pop('value')
+        if ops.get(reqid) == 'metaget' and 'value' in reply:
+            reply['ip_address'] = reply.pop('value')
+        return reqid, reply
+
+
+def _error_line(reply):
+    result = reply.get('result')
+    message = _to_str(reply.get('message', b''))
+    if result in CLIENT_ERRORS:
+        return ('CLIENT_ERROR ' + message).rstrip()
+    if result in SERVER_ERRORS:
+        return ('SERVER_ERROR ' + message).rstrip()
+    return None
+
+
+class BinaryClient(object):
+    """
+    Client for one of the binary protocols.  Requests get increasing
+    nonzero request ids and replies, which may come back out of order,
+    are matched up by them.
+    """
+
+    def __init__(self, port, protocol, host='localhost'):
+        self.addr = (host, int(port))
+        self.port = int(port)
+        self.protocol = protocol
+        self.socket = None
+        self.reader = None
+        self.reqid = 0
+        self.deletes = 0
+        self.others = 0
+
+    def getport(self):
+        return self.port
+
+    def connect(self):
+        self.disconnect()
+        self.socket = socket.create_connection(self.addr)
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = ReplyReader(self.socket)
+
+    def ensure_connected(self):
+        if self.socket is None:
+            self.connect()
+
+    def disconnect(self):
+        if self.socket is not None:
+            self.socket.close()
+        self.socket = None
+        self.reader = None
+
+    def _next_reqid(self):
+        # 0 is reserved for Caret connection control messages
+        self.reqid = self.reqid % 0xffffffff + 1
+        return self.reqid
+
+    def send_batch(self, requests):
+        """
+        Sends (op, fields) requests with a single write and returns the
+        reply dicts in request order.  Reply dicts have a 'result' name
+        plus whichever of value, flags, cas, lease_token, delta, message
+        the server sent.
+        """
+        self.ensure_connected()
+        ops = {}
+        reqids = []
+        data = []
+        for op, fields in requests:
+            reqid = self._next_reqid()
+            ops[reqid] = op
+            reqids.append(reqid)
+            data.append(self.protocol.encode_request(op, reqid, fields))
+        self.socket.sendall(b''.join(data))
+
+        replies = {}
+        try:
+            while len(replies) < len(reqids):
+                reqid, reply = self.protocol.read_reply(self.reader, ops)
+                if reqid not in ops:
+                    raise Exception('Reply for unknown request id {}'
+                                    .format(reqid))
+                replies[reqid] = reply
+        except Exception:
+            self.disconnect()
+            raise
+        return [replies[reqid] for reqid in reqids]
+
+    def request(self, op, **fields):
+        return self.send_batch([(op, fields)])[0]
+
+    def _get(self, op, keys):
+        multi = isinstance(keys, list)
+        if not multi:
+            keys = [keys]
+        replies = self.send_batch([(op, {'key': key}) for key in keys])
+        res = dict(zip(keys, replies))
+        return res if multi else replies[0]
+
+    def get(self, keys, return_all_info=False):
+        def convert(key, reply):
+            if reply['result'] != 'found':
+                return _error_line(reply)
+            value = _to_str(reply.get('value', b''))
+            if return_all_info:
+                return {"key": key,
+                        "flags": reply.get('flags', 0),
+                        "size": len(value),
+                        "value": value}
+            return value
+
+        res = self._get('get', keys)
+        if isinstance(keys, list):
+            return dict((k, convert(k, r)) for k, r in res.items())
+        return convert(keys, res)
+
+    def gets(self, keys):
+        def convert(key, reply):
+            if reply['result'] != 'found':
+                return _error_line(reply)
+            value = _to_str(reply.get('value', b''))
+            return {"key": key,
+                    "flags": reply.get('flags', 0),
+                    "size": len(value),
+                    "value": value,
+                    "cas": reply.get('cas', 0)}
+
+        res = self._get('gets', keys)
+        if isinstance(keys, list):
+            return dict((k, convert(k, r)) for k, r in res.items())
+        return convert(keys, res)
+
+    def metaget(self, keys):
+        reply = self.request('metaget', key=keys)
+        if reply['result'] != 'found':
+            return {}
+        return {"age": str(reply.get('age', 0)),
+                "exptime": str(reply.get('exptime', 0)),
+                "from": _to_str(reply.get('ip_address', b''))}
+
+    def leaseGet(self, keys):
+        def convert(reply):
+            if reply['result'] == 'found':
+                return {"value": _to_str(reply.get('value', b'')),
+                        "token": None}
+            if reply['result'] in ('notfound', 'notfoundhot'):
+                return {"value": _to_str(reply.get('value', b'')),
+                        "token": reply.get('lease_token', 0)}
+            return None
+
+        res = self._get('lease-get', keys)
+        if isinstance(keys, list):
+            return dict((k, convert(r)) for k, r in res.items())
+        return convert(res)
+
+    def _set(self, op, key, value, exptime=0, flags=0):
+        reply = self.request(op, key=key, value=value, exptime=exptime,
+                             flags=flags)
+        return reply['result'] == 'stored'
+
+    def set(self, key, value, exptime=0, flags=0):
+        return self._set('set', key, value, exptime, flags)
+
+    def add(self, key, value):
+        return self._set('add', key, value)
+
+    def replace(self, key, value):
+        return self._set('replace', key, value)
+
+    def leaseSet(self, key, value_token, exptime=0, is_stalestored=False):
+        reply = self.request('lease-set', key=key,
+                             value=value_token["value"],
+                             lease_token=value_token["token"],
+                             exptime=exptime)
+        expected = 'stalestored' if is_stalestored else 'stored'
+        return reply['result'] == expected
+
+    def cas(self, key, value, cas_token):
+        reply = self.request('cas', key=key, value=value, cas=cas_token)
+        return reply['result'] == 'stored'
+
+    def delete(self, key, exptime=None):
+        self.deletes += 1
+        reply = self.request('delete', key=key, exptime=exptime or 0)
+        return reply['result'] == 'deleted'
+
+    def touch(self, key, exptime):
+        reply = self.request('touch', key=key, exptime=exptime)
+        if reply['result'] == 'touched':
+            return "TOUCHED"
+        if reply['result'] == 'notfound':
+            return "NOT_FOUND"
+        line = _error_line(reply)
+        return line.split()[0] if line else None
+
+    def _arith(self, op, key, value):
+        reply = self.request(op, key=key, delta=value)
+        if reply['result'] != 'stored':
+            return None
+        return reply.get('delta', 0)
+
+    def incr(self, key, value=1):
+        return self._arith('incr', key, value)
+
+    def decr(self, key, value=1):
+        return self._arith('decr', key, value)
+
+    def _affix(self, op, key, value, flags=0, exptime=0):
+        reply = self.request(op, key=key, value=value, flags=flags,
+                             exptime=exptime)
+        if reply['result'] == 'stored':
+            return "STORED"
+        if reply['result'] == 'notstored':
+            return "NOT_STORED"
+        line = _error_line(reply)
+        return line.split()[0] if line else None
+
+    def append(self, key, value, flags=0, exptime=0):
+        return self._affix('append', key, value, flags, exptime)
+
+    def prepend(self, key, value, flags=0, exptime=0):
+        return self._affix('prepend', key, value, flags, exptime)
+
+
+class CaretClient(BinaryClient):
+    def __init__(self, port, host='localhost'):
+        super(CaretClient, self).__init__(port, CaretProtocol(), host)
+
+
+class UmbrellaClient(BinaryClient):
+    def __init__(self, port, host='localhost'):
+        super(UmbrellaClient, self).__init__(port, UmbrellaProtocol(), host)
@@ -0,0 +1,163 @@
+/*
+ *  Copyright (c) 2018-present, Facebook, Inc.
+ *
+ *  This source code is licensed under the MIT license found in the LICENSE
+ *  file in the root directory of this source tree.
+ *
+ */
+#include <atomic>
+#include <limits>
+#include <string>
+#include <thread>
+#include <vector>
+
+#include <gtest/gtest.h>
+
+#include <folly/Conv.h>
+#include <folly/dynamic.h>
+#include <folly/experimental/StringKeyedUnorderedMap.h>
+
+#include "mcrouter/Histogram.h"
+#include "mcrouter/ProxyStats.h"
+
+using facebook::memcache::mcrouter::Histogram;
+using facebook::memcache::mcrouter::ProxyStats;
+using facebook::memcache::mcrouter::RequestHistograms;
+
+TEST(Histogram, buckets) {
+  for (uint64_t value = 0; value < 100000; ++value) {
+    auto idx = Histogram::bucketIndex(value);
+    ASSERT_LE(value, Histogram::bucketUpperBound(idx));
+    if (idx > 0) {
+      ASSERT_GT(value, Histogram::bucketUpperBound(idx - 1));
+    }
+    // at most 1/kSubBuckets above the value
+    ASSERT_LE(
+        Histogram::bucketUpperBound(idx),
+        value + value / Histogram::kSubBuckets);
+  }
+  EXPECT_EQ(
+      Histogram::kNumBuckets - 1,
+      Histogram::bucketIndex(uint64_t(1) << Histogram::kMaxValueBits));
+  EXPECT_EQ(
+      Histogram::kNumBuckets - 1,
+      Histogram::bucketIndex(std::numeric_limits<uint64_t>::max()));
+}
+
+TEST(Histogram, percentiles) {
+  Histogram h;
+  EXPECT_EQ(0, h.percentile(99));
+
+  for (uint64_t value = 1; value <= 1000; ++value) {
+    h.addValue(value);
+  }
+  EXPECT_EQ(1000, h.count());
+  EXPECT_EQ(1000, h.max());
+  EXPECT_GE(h.percentile(50), 500);
+  EXPECT_LE(h.percentile(50), 500 + 500 / Histogram::kSubBuckets);
+  EXPECT_GE(h.percentile(99), 990);
+  EXPECT_LE(h.percentile(99), 1000);
+  EXPECT_EQ(1000, h.percentile(99.9));
+  EXPECT_EQ(1000, h.percentile(100));
+  EXPECT_EQ(1, h.percentile(0));
+}
+
+TEST(Histogram, tail) {
+  Histogram h;
+  for (int i = 0; i < 990; ++i) {
+    h.addValue(100);
+  }
+  for (int i = 0; i < 10; ++i) {
+    h.addValue(50000);
+  }
+  auto bucket100 = Histogram::bucketUpperBound(Histogram::bucketIndex(100));
+  EXPECT_EQ(bucket100, h.percentile(50));
+  EXPECT_EQ(bucket100, h.percentile(99));
+  EXPECT_EQ(50000, h.percentile(99.9));
+}
+
+TEST(Histogram, mergeAndDecay) {
+  Histogram a;
+  Histogram b;
+  for (int i = 0; i < 10; ++i) {
+    a.addValue(10);
+    b.addValue(1000);
+  }
+  a.merge(b);
+  EXPECT_EQ(20, a.count());
+  EXPECT_EQ(1000, a.max());
+  EXPECT_EQ(10, a.percentile(50));
+  EXPECT_EQ(1000, a.percentile(95));
+
+  a.decay();
+  EXPECT_EQ(10, a.count());
+  EXPECT_EQ(1000, a.percentile(95));
+
+  for (int i = 0; i < 4; ++i) {
+    a.decay();
+  }
+  EXPECT_EQ(0, a.count());
+  EXPECT_EQ(0, a.max());
+}
+
+TEST(RequestHistograms, appendStats) {
+  RequestHistograms h;
+  h.durationUs.addValue(7);
+  h.valueBytes.addValue(3);
+
+  folly::dynamic stats = folly::dynamic::object;
+  h.appendStats("pool", stats);
+  EXPECT_EQ(12, stats.size());
+  EXPECT_EQ(1, stats["pool.duration_us.count"].asInt());
+  EXPECT_EQ(7, stats["pool.duration_us.p99"].asInt());
+  EXPECT_EQ(7, stats["pool.duration_us.max"].asInt());
+  EXPECT_EQ(3, stats["pool.value_bytes.p50"].asInt());
+  EXPECT_EQ(3, stats["pool.value_bytes.p999"].asInt());
+}
+
+TEST(ProxyStats, histogramsRecordAndDecayConcurrently) {
+  ProxyStats stats(std::vector<std::string>{"pool"});
+  stats.addPoolHistogramSamples(0, 1000000, 0);
+  stats.addRoutingPrefixHistogramSamples("/a/a/", 1000000, 0);
+
+  std::atomic<bool> done{false};
+  std::thread decayer([&stats, &done]() {
+    while (!done) {
+      stats.decayHistograms();
+    }
+  });
+  for (int i = 0; i < 100000; ++i) {
+    stats.addPoolHistogramSamples(0, 1, 1);
+    stats.addRoutingPrefixHistogramSamples("/a/a/", 1, 1);
+  }
+  done = true;
+  decayer.join();
+  for (int i = 0; i < 10; ++i) {
+    stats.addPoolHistogramSamples(0, 1, 1);
+    stats.addRoutingPrefixHistogramSamples("/a/a/", 1, 1);
+  }
+
+  // A lost update would leave count() above the sum of the buckets, and
+  // the percentiles would then report the max instead
+  folly::StringKeyedUnorderedMap<RequestHistograms> pools;
+  folly::StringKeyedUnorderedMap<RequestHistograms> routingPrefixes;
+  stats.mergeHistograms(pools, routingPrefixes);
+  for (const auto* h : {&pools["pool"], &routingPrefixes["/a/a/"]}) {
+    EXPECT_LE(10, h->durationUs.count());
+    EXPECT_EQ(1, h->durationUs.percentile(50));
+    EXPECT_EQ(1, h->valueBytes.percentile(99));
+  }
+}
+
+TEST(ProxyStats, routingPrefixHistogramsLimit) {
+  ProxyStats stats(std::vector<std::string>());
+  for (size_t i = 0; i <= ProxyStats::kMaxRoutingPrefixes; ++i) {
+    stats.addRoutingPrefixHistogramSamples(
+        folly::to<std::string>("/r", i, "/c/"), 1, 0);
+  }
+  folly::StringKeyedUnorderedMap<RequestHistograms> pools;
+  folly::StringKeyedUnorderedMap<RequestHistograms> routingPrefixes;
+  stats.mergeHistograms(pools, routingPrefixes);
+  EXPECT_TRUE(pools.empty());
+  EXPECT_EQ(ProxyStats::kMaxRoutingPrefixes, routingPrefixes.size());
+}
@@ -0,0 +1,138 @@
+/*
+ *  Copyright (c) 2018-present, Facebook, Inc.
+ *
+ *  This source code is licensed under the MIT license found in the LICENSE
+ *  file in the root directory of this source tree.
+ *
+ */
+#include <string>
+
+#include <gtest/gtest.h>
+
+#include <folly/Conv.h>
+
+#include "mcrouter/HotKeys.h"
+
+using facebook::memcache::mcrouter::HotKeys;
+using facebook::memcache::mcrouter::SpaceSaving;
+
+TEST(SpaceSaving, exactUnderCapacity) {
+  SpaceSaving sketch(4);
+  sketch.add("a", 3);
+  sketch.add("b");
+  sketch.add("c", 2);
+  sketch.add("a");
+
+  auto top = sketch.top(10);
+  ASSERT_EQ(3, top.size());
+  EXPECT_EQ("a", top[0].key);
+  EXPECT_EQ(4, top[0].count);
+  EXPECT_EQ(0, top[0].error);
+  EXPECT_EQ("c", top[1].key);
+  EXPECT_EQ("b", top[2].key);
+  EXPECT_EQ(7, sketch.total());
+
+  ASSERT_EQ(1, sketch.top(1).size());
+}
+
+TEST(SpaceSaving, heavyHittersSurviveEviction) {
+  SpaceSaving sketch(8);
+  for (int i = 0; i < 10000; ++i) {
+    sketch.add(folly::to<std::string>("cold", i));
+    if (i % 4 == 0) {
+      sketch.add("hot1");
+    }
+    if (i % 5 == 0) {
+      sketch.add("hot2", 2);
+    }
+  }
+
+  EXPECT_EQ(8, sketch.size());
+  auto top = sketch.top(2);
+  ASSERT_EQ(2, top.size());
+  EXPECT_EQ("hot2", top[0].key);
+  EXPECT_EQ("hot1", top[1].key);
+  // true count is within [count - error, count]
+  EXPECT_LE(top[0].count - top[0].error, 4000);
+  EXPECT_GE(top[0].count, 4000);
+  EXPECT_LE(top[1].count - top[1].error, 2500);
+  EXPECT_GE(top[1].count, 2500);
+}
+
+TEST(SpaceSaving, evictedKeyInheritsMinCount) {
+  SpaceSaving sketch(2);
+  sketch.add("a", 5);
+  sketch.add("b", 2);
+  sketch.add("c");
+
+  auto top = sketch.top(2);
+  ASSERT_EQ(2, top.size());
+  EXPECT_EQ("a", top[0].key);
+  EXPECT_EQ("c", top[1].key);
+  EXPECT_EQ(3, top[1].count);
+  EXPECT_EQ(2, top[1].error);
+}
+
+TEST(SpaceSaving, mergeAndDecay) {
+  SpaceSaving a(4);
+  SpaceSaving b(4);
+  a.add("x", 10);
+  a.add("y", 2);
+  b.add("x", 6);
+  b.add("z", 8);
+
+  a.merge(b);
+  auto top = a.top(3);
+  ASSERT_EQ(3, top.size());
+  EXPECT_EQ("x", top[0].key);
+  EXPECT_EQ(16, top[0].count);
+  EXPECT_EQ("z", top[1].key);
+  EXPECT_EQ(26, a.total());
+
+  a.decay();
+  top = a.top(1);
+  EXPECT_EQ(8, top[0].count);
+  EXPECT_EQ(13, a.total());
+}
+
+TEST(SpaceSaving, zeroCapacity) {
+  SpaceSaving sketch(0);
+  sketch.add("a");
+  EXPECT_EQ(0, sketch.size());
+  EXPECT_TRUE(sketch.top(10).empty());
+}
+
+TEST(HotKeys, recordAndTick) {
+  HotKeys hotKeys(4, 10);
+  hotKeys.record("a", 100);
+  hotKeys.record("a", 100);
+  hotKeys.record("b", 0);
+
+  SpaceSaving requests(4);
+  SpaceSaving bytes(4);
+  hotKeys.mergeInto(requests, bytes);
+  EXPECT_EQ(3, requests.total());
+  EXPECT_EQ(2, requests.size());
+  EXPECT_EQ(200, bytes.total());
+  EXPECT_EQ(1, bytes.size());
+
+  // Not due yet
+  hotKeys.tick(time(nullptr));
+  hotKeys.tick(time(nullptr) + 20);
+  SpaceSaving decayedRequests(4);
+  SpaceSaving decayedBytes(4);
+  hotKeys.mergeInto(decayedRequests, decayedBytes);
+  EXPECT_EQ(1, decayedRequests.total());
+  EXPECT_EQ(100, decayedBytes.total());
+}
+
+TEST(HotKeys, disabled) {
+  HotKeys hotKeys(0, 10);
+  EXPECT_FALSE(hotKeys.enabled());
+  hotKeys.record("a", 100);
+
+  SpaceSaving requests(4);
+  SpaceSaving bytes(4);
+  hotKeys.mergeInto(requests, bytes);
+  EXPECT_EQ(0, requests.total());
+}
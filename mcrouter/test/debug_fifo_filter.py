@@ -0,0 +1,104 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+"""
+Filters for the debug fifos mcrouter writes to --debug-fifo-root.
+
+mcrouter reloads <debug fifo root>/debug_fifo_filter.json about once a
+second and only mirrors the messages the filter accepts, so readers don't
+pay for traffic they would discard anyway:
+
+    mcrouter.set_debug_fifo_filter(key_prefix='foo:', ops=['get'],
+                                   sample_rate=0.1)
+    ...
+    mcrouter.clear_debug_fifo_filter()
+
+Key filters only apply to requests: replies carry no key and always pass
+them, so a key_prefix/key_regex filter still mirrors every reply of the
+accepted ops.  Set direction to the one of the requests to drop the replies
+too.  Sampling picks whole connections.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import json
+import os
+
+FILTER_FILE = 'debug_fifo_filter.json'
+
+# Type ids of the memcache requests, the reply of each is the id + 1.
+REQUEST_TYPE_IDS = {
+    'get': 1,
+    'set': 3,
+    'delete': 5,
+    'lease-get': 7,
+    'lease-set': 9,
+    'add': 11,
+    'replace': 13,
+    'gets': 15,
+    'cas': 17,
+    'incr': 19,
+    'decr': 21,
+    'metaget': 23,
+    'append': 27,
+    'prepend': 29,
+    'touch': 31,
+    'flushre': 41,
+    'flushall': 43,
+}
+
+
+def make_filter(key_prefix=None, key_regex=None, ops=None, direction=None,
+                min_message_size=None, sample_rate=None):
+    """
+    The filter as mcrouter reads it.  ops are operation names (or request
+    type ids); their requests and replies are mirrored.  direction is
+    'sent' or 'received'.  min_message_size does not apply to ascii
+    replies received by mcrouter, which are mirrored as they are read.
+    """
+    res = {}
+    if key_prefix is not None:
+        res['key_prefix'] = key_prefix
+    if key_regex is not None:
+        res['key_regex'] = key_regex
+    if ops is not None:
+        type_ids = set()
+        for op in ops:
+            type_id = REQUEST_TYPE_IDS[op] if op in REQUEST_TYPE_IDS \
+                else int(op)
+            type_ids.update((type_id, type_id + 1))
+        res['type_ids'] = sorted(type_ids)
+    if direction is not None:
+        if direction not in ('sent', 'received'):
+            raise ValueError('Invalid direction: {}'.format(direction))
+        res['direction'] = direction
+    if min_message_size is not None:
+        res['min_message_size'] = int(min_message_size)
+    if sample_rate is not None:
+        if not 0 <= sample_rate <= 1:
+            raise ValueError('sample_rate must be in [0, 1]')
+        res['sample_rate'] = sample_rate
+    return res
+
+
+def write_filter(fifo_root, fifo_filter):
+    """Atomically replaces the filter of the fifos in fifo_root"""
+    path = os.path.join(fifo_root, FILTER_FILE)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(fifo_filter, f)
+    os.rename(tmp, path)
+    return path
+
+
+def clear_filter(fifo_root):
+    """Removes the filter, mcrouter mirrors everything again"""
+    try:
+        os.remove(os.path.join(fifo_root, FILTER_FILE))
+    except OSError:
+        pass
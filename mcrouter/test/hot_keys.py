@@ -0,0 +1,64 @@
+# Copyright (c) 2018-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+"""
+Parser for the reply of 'stats hotkeys'.
+
+Every proxy keeps two Space-Saving sketches (--hot-keys-capacity keys
+each): one counting requests per key, one counting reply value bytes per
+key.  'stats hotkeys' merges those of all proxies and replies
+
+    STAT capacity 100
+    STAT requests.total 1234
+    STAT requests.0 120 3 some:key
+    ...
+    STAT bytes.total 56789
+    STAT bytes.0 40960 0 other:key
+
+i.e. "<sketch>.<rank> <count> <error> <key>", heaviest first, where the
+key's true weight is in [count - error, count] and the key (C-escaped by
+mcrouter) comes last since it may contain spaces.  Counts are halved every
+--hot-keys-decay-interval-sec.  The same data is written as JSON to
+<stats-root>/<prefix>.hotkeys, see StatsRootReader.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+SKETCHES = ('requests', 'bytes')
+
+
+def parse_hot_keys(stats):
+    """
+    {'capacity': n, 'requests': {'total': n, 'top': [{'key': key,
+    'count': n, 'error': n}]}, 'bytes': {...}} from stats('hotkeys'),
+    the layout of the .hotkeys file.  None if stats is None.
+    """
+    if stats is None:
+        return None
+    hot_keys = {'capacity': int(stats.get('capacity', 0))}
+    for sketch in SKETCHES:
+        ranked = []
+        for name, value in stats.items():
+            prefix, _, rank = name.partition('.')
+            if prefix != sketch or not rank.isdigit():
+                continue
+            count, error, key = value.split(' ', 2)
+            ranked.append((int(rank), {'key': key, 'count': int(count),
+                                       'error': int(error)}))
+        hot_keys[sketch] = {
+            'total': int(stats.get(sketch + '.total', 0)),
+            'top': [entry for _, entry in sorted(ranked,
+                                                 key=lambda r: r[0])],
+        }
+    return hot_keys
+
+
+def top_keys(hot_keys, sketch='requests', n=None):
+    """[(key, count)] of the n heaviest keys of a parsed sketch"""
+    return [(entry['key'], entry['count'])
+            for entry in hot_keys[sketch]['top'][:n]]
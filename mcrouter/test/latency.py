@@ -0,0 +1,221 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+"""
+Latency histograms for the test clients.
+
+LatencyHistogram keeps counts in log-linear buckets, the same layout
+HdrHistogram uses: values are split into power of two ranges and each range
+into a fixed number of linear sub-buckets, so every recorded value is kept
+within a bounded relative error no matter how large it is.  Buckets are
+stored sparsely, which makes merging two histograms a matter of adding
+counts, e.g. to combine the histograms of clients running on several
+threads.
+
+LatencyRecorder keeps one pair of histograms per operation: time from
+sending a request to reading the first reply line, and to having the whole
+reply.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import math
+import threading
+import time
+
+if hasattr(time, 'perf_counter'):
+    now = time.perf_counter
+else:
+    now = time.time
+
+DEFAULT_PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram(object):
+    """
+    Histogram of latencies in seconds, recorded with microsecond
+    resolution.  significant_figures (1 to 5) bounds the relative error of
+    every bucket to less than 10^-significant_figures.
+    """
+
+    def __init__(self, significant_figures=2):
+        if not 1 <= significant_figures <= 5:
+            raise ValueError('significant_figures must be in [1, 5]')
+        self.significant_figures = significant_figures
+        self.sub_bucket_bits = int(math.ceil(
+            math.log(2 * 10 ** significant_figures, 2)))
+        self.sub_bucket_count = 1 << self.sub_bucket_bits
+        self.sub_bucket_half = self.sub_bucket_count >> 1
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return (self.sub_bucket_count + (shift - 1) * self.sub_bucket_half +
+                (value >> shift) - self.sub_bucket_half)
+
+    def _bucket_range(self, index):
+        """[lowest, highest] values, in microseconds, of a bucket"""
+        if index < self.sub_bucket_count:
+            return index, index
+        shift, sub = divmod(index - self.sub_bucket_count,
+                            self.sub_bucket_half)
+        shift += 1
+        low = (sub + self.sub_bucket_half) << shift
+        return low, low + (1 << shift) - 1
+
+    def record(self, seconds, count=1):
+        value = max(0, int(round(seconds * 1e6)))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Adds the counts of other (with the same precision) to self"""
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError('Cannot merge histograms of different precision')
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or
+                                      other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or
+                                      other.max > self.max):
+            self.max = other.max
+        return self
+
+    def __add__(self, other):
+        return LatencyHistogram(self.significant_figures).merge(self) \
+            .merge(other)
+
+    def __len__(self):
+        return self.count
+
+    def percentile(self, p):
+        """Latency in seconds below which p percent of the values fall"""
+        if not self.count:
+            return None
+        rank = max(1, int(math.ceil(p / 100.0 * self.count)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                highest = self._bucket_range(index)[1]
+                return min(max(highest, self.min), self.max) / 1e6
+        return self.max / 1e6
+
+    def mean(self):
+        if not self.count:
+            return None
+        return self.total / self.count / 1e6
+
+    def to_dict(self, percentiles=DEFAULT_PERCENTILES):
+        """
+        Summary in microseconds, plus the non-empty buckets as
+        [lowest value, count] pairs so that it can be merged again with
+        from_dict().
+        """
+        res = {
+            'count': self.count,
+            'min_us': self.min,
+            'max_us': self.max,
+            'mean_us': None if not self.count else self.total / self.count,
+            'significant_figures': self.significant_figures,
+            'buckets': [[self._bucket_range(index)[0], self.counts[index]]
+                        for index in sorted(self.counts)],
+        }
+        for p in percentiles:
+            value = self.percentile(p)
+            res['p{}_us'.format(p)] = None if value is None else value * 1e6
+        return res
+
+    @classmethod
+    def from_dict(cls, d):
+        hist = cls(d['significant_figures'])
+        for low, count in d['buckets']:
+            index = hist._index(low)
+            hist.counts[index] = hist.counts.get(index, 0) + count
+        hist.count = d['count']
+        hist.min = d['min_us']
+        hist.max = d['max_us']
+        if d['mean_us'] is not None:
+            hist.total = int(round(d['mean_us'] * d['count']))
+        return hist
+
+
+class LatencyRecorder(object):
+    """
+    Per operation LatencyHistograms for 'first_byte' (send to first reply
+    line) and 'complete' (send to whole reply) latencies.  One recorder can
+    be shared by clients on several threads, or each client can have its
+    own and they can be merged afterwards.
+    """
+
+    PHASES = ('first_byte', 'complete')
+
+    def __init__(self, significant_figures=2):
+        self.significant_figures = significant_figures
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def _histogram(self, op, phase):
+        key = (op, phase)
+        if key not in self.histograms:
+            self.histograms[key] = LatencyHistogram(self.significant_figures)
+        return self.histograms[key]
+
+    def record(self, op, first_byte, complete):
+        """Records one request; first_byte may be None (e.g. noreply)"""
+        with self.lock:
+            if first_byte is not None:
+                self._histogram(op, 'first_byte').record(first_byte)
+            self._histogram(op, 'complete').record(complete)
+
+    def histogram(self, op, phase='complete'):
+        with self.lock:
+            hist = LatencyHistogram(self.significant_figures)
+            if (op, phase) in self.histograms:
+                hist.merge(self.histograms[(op, phase)])
+            return hist
+
+    def ops(self):
+        with self.lock:
+            return sorted(set(op for op, phase in self.histograms))
+
+    def merge(self, other):
+        with other.lock:
+            items = [(key, LatencyHistogram(other.significant_figures)
+                      .merge(hist)) for key, hist in other.histograms.items()]
+        with self.lock:
+            for (op, phase), hist in items:
+                self._histogram(op, phase).merge(hist)
+        return self
+
+    def reset(self):
+        with self.lock:
+            self.histograms = {}
+
+    def to_dict(self, percentiles=DEFAULT_PERCENTILES):
+        """{op: {phase: LatencyHistogram.to_dict()}}"""
+        with self.lock:
+            res = {}
+            for (op, phase), hist in self.histograms.items():
+                res.setdefault(op, {})[phase] = hist.to_dict(percentiles)
+            return res
@@ -0,0 +1,498 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+"""
+Open-loop load generator for mcrouter.
+
+Starts mock_mc_server backends and an mcrouter in front of them using the
+test harness process classes, then sends requests on a fixed schedule at
+the target rate, independently of how fast replies come back.  Latency is
+measured from the time a request was scheduled to be sent, so a stalled
+router shows up in the percentiles instead of silently lowering the rate.
+
+Run from the top of the build tree:
+
+    python -m mcrouter.test.loadtest --qps 20000 --method get --duration 30
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import bisect
+import collections
+import json
+import math
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+from mcrouter.test.MCProcess import (
+    BaseDirectory,
+    Mcrouter,
+    MockMemcached,
+    ReplyReader,
+    format_get,
+    format_store,
+)
+
+if hasattr(time, 'perf_counter'):
+    now = time.perf_counter
+else:
+    now = time.time
+
+
+class SizeDistribution(object):
+    """
+    Integer sizes described by a spec string:
+
+      fixed:N                  always N
+      uniform:MIN:MAX          uniform in [MIN, MAX]
+      exponential:MEAN[:MAX]   exponential with the given mean
+      pareto:MIN:ALPHA[:MAX]   heavy tailed, starting at MIN
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        parts = spec.split(':')
+        self.kind = parts[0]
+        try:
+            args = [float(a) for a in parts[1:]]
+        except ValueError:
+            raise ValueError('Bad size distribution "{}"'.format(spec))
+        if self.kind == 'fixed' and len(args) == 1:
+            self.args = args
+        elif self.kind == 'uniform' and len(args) == 2:
+            self.args = args
+        elif self.kind == 'exponential' and len(args) in (1, 2):
+            self.args = args
+        elif self.kind == 'pareto' and len(args) in (2, 3):
+            self.args = args
+        else:
+            raise ValueError('Bad size distribution "{}"'.format(spec))
+
+    def sample(self, rng):
+        a = self.args
+        if self.kind == 'fixed':
+            size = a[0]
+        elif self.kind == 'uniform':
+            size = rng.uniform(a[0], a[1])
+        elif self.kind == 'exponential':
+            size = rng.expovariate(1.0 / a[0])
+            if len(a) > 1:
+                size = min(size, a[1])
+        else:
+            size = a[0] * rng.paretovariate(a[1])
+            if len(a) > 2:
+                size = min(size, a[2])
+        return max(1, int(size))
+
+    def __str__(self):
+        return self.spec
+
+
+class KeyDistribution(object):
+    """
+    Picks key indices in [0, key_space):
+
+      uniform      every key equally likely
+      zipf:S       key i chosen with probability proportional to 1/(i+1)^S
+    """
+
+    def __init__(self, spec, key_space):
+        self.spec = spec
+        self.key_space = key_space
+        parts = spec.split(':')
+        if parts[0] == 'uniform' and len(parts) == 1:
+            self.cdf = None
+        elif parts[0] == 'zipf' and len(parts) == 2:
+            s = float(parts[1])
+            self.cdf = []
+            total = 0.0
+            for i in range(key_space):
+                total += 1.0 / (i + 1) ** s
+                self.cdf.append(total)
+            self.cdf = [c / total for c in self.cdf]
+        else:
+            raise ValueError('Bad key distribution "{}"'.format(spec))
+
+    def sample(self, rng):
+        if self.cdf is None:
+            return rng.randrange(self.key_space)
+        return min(bisect.bisect_left(self.cdf, rng.random()),
+                   self.key_space - 1)
+
+    def __str__(self):
+        return self.spec
+
+
+class Workload(object):
+    """What requests to send: op mix, keys and value sizes"""
+
+    def __init__(self, get_ratio=0.9, key_space=10000, key_dist='uniform',
+                 key_size='fixed:16', value_size='fixed:100',
+                 key_prefix='loadtest:', seed=0):
+        self.get_ratio = get_ratio
+        self.key_dist = KeyDistribution(key_dist, key_space)
+        self.key_size = SizeDistribution(key_size)
+        self.value_size = SizeDistribution(value_size)
+        rng = random.Random(seed)
+        self.keys = []
+        for i in range(key_space):
+            key = '{}{}'.format(key_prefix, i)
+            padding = self.key_size.sample(rng) - len(key)
+            self.keys.append(key + 'x' * padding)
+        self.seed = seed
+
+    def requests(self, rng):
+        """Yields (op, request) forever"""
+        values = {}
+        while True:
+            key = self.keys[self.key_dist.sample(rng)]
+            if rng.random() < self.get_ratio:
+                yield 'get', format_get('get', key)
+            else:
+                size = self.value_size.sample(rng)
+                if size not in values:
+                    values[size] = 'v' * size
+                yield 'set', format_store('set', key, values[size])
+
+    def describe(self):
+        return {'get_ratio': self.get_ratio,
+                'key_space': self.key_dist.key_space,
+                'key_dist': str(self.key_dist),
+                'key_size': str(self.key_size),
+                'value_size': str(self.value_size),
+                'seed': self.seed}
+
+
+class LoadConnection(object):
+    """
+    One connection driven open-loop: a sender thread writes requests at
+    their scheduled times and a receiver thread matches replies to them in
+    order (ASCII replies are never reordered on a connection).
+    """
+
+    def __init__(self, port, host, workload, rng):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = ReplyReader(self.sock)
+        self.requests = workload.requests(rng)
+        self.pending = collections.deque()
+        self.cv = threading.Condition()
+        self.sending = True
+        # (scheduled time, latency) of every reply
+        self.latencies = []
+        self.errors = 0
+        self.hits = 0
+        self.misses = 0
+
+    def send(self, schedule):
+        """Sends one request per scheduled time in the iterable"""
+        try:
+            for scheduled in schedule:
+                delay = scheduled - now()
+                if delay > 0:
+                    time.sleep(delay)
+                op, request = next(self.requests)
+                with self.cv:
+                    self.pending.append((scheduled, op))
+                    self.cv.notify()
+                self.sock.sendall(request.encode('utf-8')
+                                  if not isinstance(request, bytes)
+                                  else request)
+        except socket.error:
+            self.errors += 1
+        finally:
+            with self.cv:
+                self.sending = False
+                self.cv.notify()
+
+    def _read_reply(self, op):
+        line = self.reader.readline()
+        if op == 'get':
+            if line.startswith(b'VALUE'):
+                self.reader.skip(int(line.split()[3]) + 2)
+                line = self.reader.readline()
+                if line == b'END\r\n':
+                    self.hits += 1
+                    return True
+            elif line == b'END\r\n':
+                self.misses += 1
+                return True
+            return False
+        return line == b'STORED\r\n'
+
+    def receive(self):
+        while True:
+            with self.cv:
+                while not self.pending and self.sending:
+                    self.cv.wait()
+                if not self.pending:
+                    return
+                scheduled, op = self.pending.popleft()
+            try:
+                ok = self._read_reply(op)
+            except (IOError, socket.error):
+                # whatever is still pending is counted as lost by run_load()
+                self.errors += 1
+                return
+            self.latencies.append((scheduled, now() - scheduled))
+            if not ok:
+                self.errors += 1
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+        self.sock.close()
+
+
+def process_cpu_time(pid):
+    """User + system CPU seconds used so far by pid, None if unavailable"""
+    try:
+        with open('/proc/{}/stat'.format(pid)) as f:
+            stat = f.read()
+    except IOError:
+        return None
+    # The command name may contain spaces, fields resume after its ')'
+    fields = stat[stat.rindex(')') + 2:].split()
+    ticks = int(fields[11]) + int(fields[12])
+    return ticks / os.sysconf(str('SC_CLK_TCK'))
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = int(math.ceil(p * len(sorted_values) / 100.0)) - 1
+    return sorted_values[max(0, min(rank, len(sorted_values) - 1))]
+
+
+def run_load(port, qps, duration, workload, connections=10, warmup=1.0,
+             host='localhost', arrival='uniform', pid=None, drain_timeout=5.0,
+             seed=0):
+    """
+    Drives host:port at qps requests per second for warmup + duration
+    seconds and returns a dict describing what was measured.  Only
+    requests scheduled after the warmup count towards the results.  If pid
+    is given, that process' CPU usage over the measured period is reported.
+    """
+    rng = random.Random(seed)
+    conns = [LoadConnection(port, host, workload,
+                            random.Random(rng.random()))
+             for i in range(connections)]
+
+    start = now() + 0.1
+    measure_start = start + warmup
+    end = measure_start + duration
+    per_conn_qps = qps / connections
+
+    def schedule(i, conn_rng):
+        if arrival == 'poisson':
+            t = start + conn_rng.expovariate(per_conn_qps)
+            while t < end:
+                yield t
+                t += conn_rng.expovariate(per_conn_qps)
+        else:
+            # Stagger connections so their sends interleave evenly
+            n = 0
+            t = start + i / qps
+            while t < end:
+                yield t
+                n += 1
+                t = start + i / qps + n / per_conn_qps
+
+    threads = []
+    for i, conn in enumerate(conns):
+        conn_schedule = schedule(i, random.Random(rng.random()))
+        threads.append(threading.Thread(target=conn.send,
+                                        args=(conn_schedule,)))
+        threads.append(threading.Thread(target=conn.receive))
+    for t in threads:
+        t.daemon = True
+        t.start()
+
+    time.sleep(max(0, measure_start - now()))
+    cpu_start = process_cpu_time(pid) if pid else None
+    time.sleep(max(0, end - now()))
+    cpu_end = process_cpu_time(pid) if pid else None
+
+    deadline = now() + drain_timeout
+    for t in threads:
+        t.join(max(0, deadline - now()))
+    for conn in conns:
+        conn.close()
+
+    latencies = sorted(lat for conn in conns
+                       for scheduled, lat in conn.latencies
+                       if scheduled >= measure_start)
+    # Requests still outstanding after the drain timeout never completed
+    lost = sum(len(conn.pending) for conn in conns)
+    to_us = lambda v: None if v is None else round(v * 1e6, 1)
+
+    result = {
+        'target_qps': qps,
+        'achieved_qps': round(len(latencies) / duration, 1),
+        'duration': duration,
+        'connections': connections,
+        'arrival': arrival,
+        'requests': len(latencies),
+        'errors': sum(conn.errors for conn in conns) + lost,
+        'hits': sum(conn.hits for conn in conns),
+        'misses': sum(conn.misses for conn in conns),
+        'workload': workload.describe(),
+        'latency_us': {
+            'mean': to_us(sum(latencies) / len(latencies)
+                          if latencies else None),
+            'p50': to_us(percentile(latencies, 50)),
+            'p90': to_us(percentile(latencies, 90)),
+            'p99': to_us(percentile(latencies, 99)),
+            'p999': to_us(percentile(latencies, 99.9)),
+            'max': to_us(latencies[-1] if latencies else None),
+        },
+        'router_cpu': None,
+    }
+    if cpu_start is not None and cpu_end is not None:
+        result['router_cpu'] = round(100.0 * (cpu_end - cpu_start) / duration,
+                                     1)
+    return result
+
+
+def start_mcrouter(servers=1, extra_args=None, base_dir=None):
+    """
+    Starts the given number of mock_mc_server processes and an mcrouter
+    hashing over them.  Returns (mcrouter, [mock servers]).
+    """
+    if base_dir is None:
+        base_dir = BaseDirectory('loadtest')
+    mocks = [MockMemcached() for i in range(servers)]
+    for mock in mocks:
+        mock.ensure_connected()
+        mock.disconnect()
+    config = os.path.join(base_dir.path, 'loadtest.json')
+    with open(config, 'w') as f:
+        json.dump({
+            'pools': {
+                'A': {
+                    'servers': ['localhost:{}'.format(mock.getport())
+                                for mock in mocks],
+                    'server_timeout': 1000,
+                },
+            },
+            'route': 'PoolRoute|A',
+        }, f)
+    mcrouter = Mcrouter(config, extra_args=extra_args, base_dir=base_dir)
+    mcrouter.ensure_connected()
+    mcrouter.disconnect()
+    return mcrouter, mocks
+
+
+def stop(processes):
+    for process in processes:
+        if process.proc is not None:
+            process.proc.terminate()
+            process.proc.wait()
+
+
+def format_result(result):
+    lat = result['latency_us']
+    cpu = result['router_cpu']
+    return ('qps {achieved_qps}/{target_qps}  '
+            'p50 {p50}us  p99 {p99}us  p999 {p999}us  max {max}us  '
+            'errors {errors}  router cpu {cpu}').format(
+                p50=lat['p50'], p99=lat['p99'], p999=lat['p999'],
+                max=lat['max'], cpu='n/a' if cpu is None else '%s%%' % cpu,
+                **result)
+
+
+def add_workload_arguments(parser):
+    parser.add_argument('--get-ratio', type=float, default=0.9,
+                        help='fraction of requests that are gets, the rest '
+                        'are sets (default: %(default)s)')
+    parser.add_argument('--method', choices=['get', 'set'],
+                        help='send only this method; overrides --get-ratio')
+    parser.add_argument('--key-space', type=int, default=10000,
+                        help='number of distinct keys (default: %(default)s)')
+    parser.add_argument('--key-dist', default='uniform',
+                        help='uniform or zipf:S (default: %(default)s)')
+    parser.add_argument('--key-size', default='fixed:16',
+                        help='key length distribution (default: %(default)s)')
+    parser.add_argument('--value-size', default='fixed:100',
+                        help='set value size distribution: fixed:N, '
+                        'uniform:MIN:MAX, exponential:MEAN[:MAX] or '
+                        'pareto:MIN:ALPHA[:MAX] (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def workload_from_args(args):
+    get_ratio = args.get_ratio
+    if args.method is not None:
+        get_ratio = 1.0 if args.method == 'get' else 0.0
+    return Workload(get_ratio=get_ratio, key_space=args.key_space,
+                    key_dist=args.key_dist, key_size=args.key_size,
+                    value_size=args.value_size, seed=args.seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--qps', type=float, action='append',
+                        help='target rate; repeat to run several loads in '
+                        'turn (default: 20000)')
+    parser.add_argument('--duration', type=float, default=30,
+                        help='measured seconds per run (default: %(default)s)')
+    parser.add_argument('--warmup', type=float, default=3,
+                        help='unmeasured seconds before each run '
+                        '(default: %(default)s)')
+    parser.add_argument('--connections', type=int, default=100)
+    parser.add_argument('--arrival', choices=['uniform', 'poisson'],
+                        default='uniform')
+    parser.add_argument('--servers', type=int, default=1,
+                        help='number of mock_mc_server backends')
+    parser.add_argument('--port', type=int,
+                        help='load an already running mcrouter on this port '
+                        'instead of starting one')
+    parser.add_argument('--pid', type=int,
+                        help='with --port, pid to report CPU usage for')
+    parser.add_argument('--mcrouter-arg', action='append', default=[],
+                        help='extra mcrouter command line argument')
+    parser.add_argument('--json', action='store_true',
+                        help='print one JSON result per line')
+    add_workload_arguments(parser)
+    args = parser.parse_args(argv)
+
+    workload = workload_from_args(args)
+    processes = []
+    if args.port is not None:
+        port, pid = args.port, args.pid
+    else:
+        mcrouter, mocks = start_mcrouter(args.servers, args.mcrouter_arg)
+        processes = [mcrouter] + mocks
+        port, pid = mcrouter.getport(), mcrouter.proc.pid
+
+    try:
+        for qps in args.qps or [20000]:
+            result = run_load(port, qps, args.duration, workload,
+                              connections=args.connections,
+                              warmup=args.warmup, arrival=args.arrival,
+                              pid=pid, seed=args.seed)
+            if args.json:
+                print(json.dumps(result, sort_keys=True))
+            else:
+                print(format_result(result))
+            sys.stdout.flush()
+    finally:
+        stop(processes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+"""
+Reader for the output of 'mcpiper --ndjson'.
+
+Every message mcpiper sees is written as one JSON object per line, e.g.
+
+    {"ts_us": 1500000000000000, "conn_id": 3, "reqid": 7, "dir": "reply",
+     "op": "get", "result": "mc_res_found", "key": "foo", "value_bytes": 3,
+     "flags": 0, "rtt_us": 120, "from": "...", "to": "...",
+     "protocol": "caret"}
+
+McpiperRecords reads such a file incrementally (update() only parses the
+lines appended since the last call) and indexes the records by key and by
+operation, so queries over long captures don't rescan everything.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import collections
+import json
+
+
+class McpiperRecords(object):
+    def __init__(self, path=None):
+        self.path = path
+        self.offset = 0
+        self.partial = b''
+        self.records = []
+        self.by_key = collections.defaultdict(list)
+        self.by_op = collections.defaultdict(list)
+        self.errors = 0
+
+    def update(self):
+        """Parses the complete lines appended to path, returns their count"""
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+        except IOError:
+            return 0
+        self.offset += len(data)
+        lines = (self.partial + data).split(b'\n')
+        self.partial = lines.pop()
+        added = 0
+        for line in lines:
+            if self.add_line(line):
+                added += 1
+        return added
+
+    def add_line(self, line):
+        line = line.strip()
+        if not line.startswith(b'{'):
+            return False
+        try:
+            record = json.loads(line.decode('utf-8'))
+        except ValueError:
+            self.errors += 1
+            return False
+        self.add(record)
+        return True
+
+    def add(self, record):
+        index = len(self.records)
+        self.records.append(record)
+        self.by_key[record.get('key', '')].append(index)
+        self.by_op[record.get('op')].append(index)
+
+    def __len__(self):
+        return len(self.records)
+
+    def find(self, key=None, op=None, **fields):
+        """
+        Records with the given key and/or op whose other fields equal
+        fields, e.g. find(key='foo', dir='reply', result='mc_res_found').
+        """
+        if key is not None and op is not None:
+            ops = set(self.by_op.get(op, ()))
+            indexes = [i for i in self.by_key.get(key, ()) if i in ops]
+        elif key is not None:
+            indexes = self.by_key.get(key, ())
+        elif op is not None:
+            indexes = self.by_op.get(op, ())
+        else:
+            indexes = range(len(self.records))
+        records = (self.records[i] for i in indexes)
+        return [r for r in records
+                if all(r.get(name) == value for name, value in fields.items())]
+
+    def count(self, key=None, op=None, **fields):
+        return len(self.find(key, op, **fields))
+
+    def keys(self):
+        return [key for key, indexes in self.by_key.items() if indexes]
+
+    def ops(self):
+        return [op for op, indexes in self.by_op.items() if indexes]
+
+    def top_keys(self, n=10, op=None, dir='request'):
+        """[(key, count)] of the n keys with the most messages"""
+        counts = collections.Counter(
+            r.get('key', '') for r in self.find(op=op, dir=dir))
+        return counts.most_common(n)
+
+    def pairs(self, key=None, op=None):
+        """
+        [(request, reply)] matched by connection and request id; reply is
+        None while it hasn't been seen.
+        """
+        replies = dict(((r['conn_id'], r['reqid']), r)
+                       for r in self.find(key, op, dir='reply'))
+        return [(r, replies.get((r['conn_id'], r['reqid'])))
+                for r in self.find(key, op, dir='request')]
+
+    @staticmethod
+    def key_bytes(record):
+        """The key as the bytes mcrouter saw (escaped one byte per char)"""
+        return record.get('key', '').encode('latin-1')
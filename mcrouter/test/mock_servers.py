@@ -7,12 +7,210 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
+import collections
 import errno
+import heapq
+import math
+import random
+import re
+import select
 import socket
+import struct
 import threading
 import time
 
+from mcrouter.test.ports import bind_port
+
+# Commands followed by a data block, and the index of the <bytes> argument
+STORAGE_COMMANDS = {
+    'set': 3,
+    'add': 3,
+    'replace': 3,
+    'append': 3,
+    'prepend': 3,
+    'cas': 3,
+    'lease-set': 4,
+}
+
+
+def _to_bytes(data):
+    if isinstance(data, bytes):
+        return data
+    return data.encode('utf-8')
+
+
+class MockRequest(object):
+    """A parsed ASCII request: the command line split into command and
+    args, plus the data block of storage commands"""
+    def __init__(self, line, data=None):
+        self.line = line
+        tokens = line.split()
+        self.command = tokens[0] if tokens else ''
+        self.args = tokens[1:]
+        self.key = self.args[0] if self.args else None
+        self.data = data
+        self.noreply = bool(self.args) and self.args[-1] == 'noreply'
+
+
+class LatencyDistribution(object):
+    """
+    Delays in seconds described by a spec string:
+
+      fixed:S                        always S
+      uniform:MIN:MAX                uniform in [MIN, MAX]
+      exponential:MEAN[:MAX]         exponential with the given mean
+      lognormal:MEDIAN:SIGMA[:MAX]   long tailed around MEDIAN
+      bimodal:FAST:SLOW:P            SLOW with probability P, else FAST
+    """
+
+    ARGS = {
+        'fixed': (1,),
+        'uniform': (2,),
+        'exponential': (1, 2),
+        'lognormal': (2, 3),
+        'bimodal': (3,),
+    }
+
+    def __init__(self, spec):
+        self.spec = spec
+        parts = spec.split(':')
+        self.kind = parts[0]
+        try:
+            self.args = [float(a) for a in parts[1:]]
+        except ValueError:
+            raise ValueError('Bad latency distribution "{}"'.format(spec))
+        if len(self.args) not in self.ARGS.get(self.kind, ()):
+            raise ValueError('Bad latency distribution "{}"'.format(spec))
+
+    def sample(self, rng):
+        a = self.args
+        if self.kind == 'fixed':
+            return a[0]
+        if self.kind == 'uniform':
+            return rng.uniform(a[0], a[1])
+        if self.kind == 'bimodal':
+            return a[1] if rng.random() < a[2] else a[0]
+        if self.kind == 'exponential':
+            delay = rng.expovariate(1.0 / a[0]) if a[0] > 0 else 0
+        else:
+            delay = rng.lognormvariate(math.log(a[0]), a[1])
+        if len(a) > self.ARGS[self.kind][0]:
+            delay = min(delay, a[-1])
+        return delay
+
+    def __str__(self):
+        return self.spec
+
+
+class FaultProfile(object):
+    """Latency and faults a MockServer adds to its replies.
+
+    latency is a LatencyDistribution (or its spec) for every reply, and
+    command_latency maps commands to distributions used instead of it.
+    Each request then independently gets, with the given probabilities:
+      reset_rate    the connection closed with a TCP reset, no reply
+      error_rate    error (e.g. SERVER_ERROR) instead of being handled
+      partial_rate  the first half of its reply, then the connection closed
+      drip_rate     its reply drip_bytes at a time every drip_interval
+    Commands in exempt (by default 'version', so that probes keep working)
+    only get command_latency.  self.injected counts the faults.
+    """
+
+    def __init__(self, latency=None, command_latency=None, error_rate=0,
+                 error='SERVER_ERROR injected error', reset_rate=0,
+                 partial_rate=0, drip_rate=0, drip_bytes=1,
+                 drip_interval=0.01, exempt=('version',), seed=None):
+        self.latency = self._distribution(latency)
+        self.command_latency = dict(
+            (command, self._distribution(spec))
+            for command, spec in (command_latency or {}).items())
+        self.faults = [('reset', reset_rate), ('error', error_rate),
+                       ('partial', partial_rate), ('drip', drip_rate)]
+        self.error = error
+        self.drip_bytes = drip_bytes
+        self.drip_interval = drip_interval
+        self.exempt = exempt
+        self.rng = random.Random(seed)
+        self.injected = collections.Counter()
+
+    @staticmethod
+    def _distribution(spec):
+        if spec is None or isinstance(spec, LatencyDistribution):
+            return spec
+        return LatencyDistribution(spec)
+
+    def delay(self, command):
+        latency = self.command_latency.get(command)
+        if latency is None and command not in self.exempt:
+            latency = self.latency
+        if latency is None:
+            return 0
+        return max(0, latency.sample(self.rng))
+
+    def fault(self, command):
+        """The fault to inject for a request, or None"""
+        if command in self.exempt:
+            return None
+        for fault, rate in self.faults:
+            if rate and self.rng.random() < rate:
+                self.injected[fault] += 1
+                return fault
+        return None
+
+
+class MockConnection(object):
+    """A client connection of an event driven MockServer.
+
+    Only touched from the server thread: handlers queue output with send()
+    and it is written as the socket becomes writable."""
+    def __init__(self, server, sock, address):
+        self.server = server
+        self.socket = sock
+        self.address = address
+        self.inbuf = b''
+        self.outbuf = b''
+        # Set while a delayed reply is pending, replies must stay in order
+        self.paused = False
+        # Close once outbuf is flushed
+        self.closing = False
+        self.closed = False
+        self.requests = 0
+
+    def send(self, data):
+        if not self.closed:
+            self.outbuf += _to_bytes(data)
+
+    def close(self, reset=False):
+        """Closes the connection after pending output is written, or right
+        away with a TCP reset if reset is True"""
+        if reset:
+            self.outbuf = b''
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER,
+                                   struct.pack(b'ii', 1, 0))
+        self.closing = True
+        if not self.outbuf:
+            self.server._drop(self)
+
+
 class MockServer(threading.Thread):
+    """Base class of the Python mock servers.
+
+    A single thread accepts connections and multiplexes all of them with
+    select(), so any number of clients (e.g. one per mcrouter proxy) are
+    served concurrently.  Subclasses define per command behavior with
+    handle_<command>(conn, request) methods ('-' in the command becomes
+    '_', e.g. handle_lease_get) that return the reply, or None for no reply.
+    request_delay() may hold a reply back; later requests on the same
+    connection wait for it, as they would on a real server.  A FaultProfile
+    set with set_fault_profile(), at any time, adds latency and faults to
+    the replies.
+
+    Subclasses that define runServer(client_socket, client_address) instead
+    get a blocking socket and a thread for each connection.
+    """
+
+    runServer = None
+
     def __init__(self, port=0):
         """If no port provided, automatically chooses one.
         Chosen port will be set at self.port,
@@ -23,6 +221,16 @@ class MockServer(threading.Thread):
         self.port = port
         self.port_event = threading.Event()
         self.stopped_event = threading.Event()
+        self.connections = {}
+        self.requests = 0
+        self.fault_profile = None
+        self.client_threads = []
+        self.timers = []
+        self.timers_lock = threading.Lock()
+        self.timer_seq = 0
+        self.wakeup_r, self.wakeup_w = socket.socketpair()
+        self.wakeup_r.setblocking(0)
+        self.wakeup_w.setblocking(0)
 
     def getport(self):
         return self.port
@@ -33,6 +241,7 @@ class MockServer(threading.Thread):
 
     def terminate(self):
         self.stopped_event.set()
+        self._wakeup()
         self.join()
 
     def run(self):
@@ -44,24 +253,29 @@ class MockServer(threading.Thread):
                                                socket.SOCK_STREAM)
         self.listen_socket.setblocking(0)
         self.listen_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.listen_socket.bind(('', self.port))
-        self.listen_socket.listen(5)
+        if self.port:
+            self.listen_socket.bind(('', self.port))
+        else:
+            bind_port(self.listen_socket)
+        self.listen_socket.listen(128)
         self.port = self.listen_socket.getsockname()[1]
         self.port_event.set()
 
-        while not self.is_stopped():
-            try:
-                client, address = self.listen_socket.accept()
-                client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-                self.runServer(client, address)
-                client.close()
-            except IOError as e:
-                if e.errno == errno.EWOULDBLOCK:
-                    time.sleep(0.1)
-                else:
-                    raise
-
-        self.listen_socket.close()
+        try:
+            while not self.is_stopped():
+                self._run_once()
+        finally:
+            for conn in list(self.connections.values()):
+                self._drop(conn)
+            self.listen_socket.close()
+            self.wakeup_r.close()
+            self.wakeup_w.close()
+            for client, thread in self.client_threads:
+                try:
+                    client.shutdown(socket.SHUT_RDWR)
+                except socket.error:
+                    pass
+                thread.join()
 
     def is_stopped(self):
         return self.stopped_event.isSet()
@@ -69,11 +283,266 @@ class MockServer(threading.Thread):
     def wait_until_stopped(self):
         self.stopped_event.wait()
 
+    def call_later(self, delay, callback):
+        """Runs callback() on the server thread after delay seconds.
+        Safe to call from any thread."""
+        with self.timers_lock:
+            self.timer_seq += 1
+            heapq.heappush(self.timers,
+                           (time.time() + delay, self.timer_seq, callback))
+        if threading.current_thread() is not self:
+            self._wakeup()
+
+    def handle_connect(self, conn):
+        """Called when a client connects"""
+        pass
+
+    def handle_disconnect(self, conn):
+        """Called when a client connection is closed"""
+        pass
+
+    def parse_request(self, buf):
+        """Returns (MockRequest, bytes consumed) for the first complete
+        request in buf, or None if more data is needed"""
+        end = buf.find(b'\r\n')
+        if end < 0:
+            return None
+        line = buf[:end].decode('utf-8', 'replace')
+        tokens = line.split()
+        size_index = STORAGE_COMMANDS.get(tokens[0]) if tokens else None
+        if size_index is None or len(tokens) <= size_index + 1:
+            return MockRequest(line), end + 2
+        try:
+            size = int(tokens[size_index + 1])
+        except ValueError:
+            return MockRequest(line), end + 2
+        total = end + 2 + size + 2
+        if len(buf) < total:
+            return None
+        return MockRequest(line, buf[end + 2:end + 2 + size]), total
+
+    def handle_request(self, conn, request):
+        """Dispatches request to handle_<command>()"""
+        handler = None
+        if re.match(r'^[a-z][a-z_-]*$', request.command):
+            handler = getattr(
+                self, 'handle_' + request.command.replace('-', '_'), None)
+        if handler is None:
+            return self.handle_unknown(conn, request)
+        return handler(conn, request)
+
+    def handle_unknown(self, conn, request):
+        return 'ERROR\r\n'
+
+    def handle_version(self, conn, request):
+        return 'VERSION {}\r\n'.format(type(self).__name__)
+
+    def request_delay(self, conn, request):
+        """Seconds to wait before sending the reply to request"""
+        return 0
+
+    def set_fault_profile(self, profile=None, **kwargs):
+        """Sets the FaultProfile used from the next request on, given either
+        as profile or as FaultProfile arguments.  None removes it."""
+        if kwargs:
+            profile = FaultProfile(**kwargs)
+        self.fault_profile = profile
+        return profile
+
+    def respond(self, conn, reply, delay=0, fault=None):
+        """Sends reply (may be None) on conn after delay seconds, with the
+        given FaultProfile fault"""
+        if not delay and fault is None:
+            if reply is not None:
+                conn.send(reply)
+            return
+
+        conn.paused = True
+        if delay:
+            self.call_later(delay,
+                            lambda: self._deliver(conn, reply, fault))
+        else:
+            self._deliver(conn, reply, fault)
+
+    def _deliver(self, conn, reply, fault):
+        conn.paused = False
+        if conn.closed:
+            return
+        if fault == 'reset':
+            conn.close(reset=True)
+            return
+        if reply is not None:
+            data = _to_bytes(reply)
+            if fault == 'partial':
+                conn.send(data[:len(data) // 2])
+                conn.close()
+                return
+            if fault == 'drip':
+                profile = self.fault_profile or FaultProfile()
+                self._drip(conn, data, profile.drip_bytes,
+                           profile.drip_interval)
+                return
+            conn.send(data)
+        self._process(conn)
+
+    def _drip(self, conn, data, size, interval):
+        if conn.closed:
+            return
+        conn.send(data[:size])
+        if len(data) <= size:
+            conn.paused = False
+            self._process(conn)
+            return
+        conn.paused = True
+        self._write(conn)
+        self.call_later(interval, lambda: self._drip(conn, data[size:],
+                                                     size, interval))
+
+    def _wakeup(self):
+        try:
+            self.wakeup_w.send(b'x')
+        except socket.error:
+            pass
+
+    def _run_timers(self):
+        """Runs due timers, returns seconds until the next one or None"""
+        while True:
+            with self.timers_lock:
+                if not self.timers:
+                    return None
+                when, seq, callback = self.timers[0]
+                wait = when - time.time()
+                if wait > 0:
+                    return wait
+                heapq.heappop(self.timers)
+            callback()
+
+    def _run_once(self):
+        timeout = self._run_timers()
+        readers = [self.listen_socket, self.wakeup_r]
+        readers.extend(self.connections)
+        writers = [sock for sock, conn in self.connections.items()
+                   if conn.outbuf]
+        try:
+            readable, writable, _ = select.select(readers, writers, [],
+                                                  timeout)
+        except select.error as e:
+            if e.args[0] == errno.EINTR:
+                return
+            raise
+
+        for sock in readable:
+            if sock is self.listen_socket:
+                self._accept()
+            elif sock is self.wakeup_r:
+                try:
+                    self.wakeup_r.recv(4096)
+                except socket.error:
+                    pass
+            elif sock in self.connections:
+                self._read(self.connections[sock])
+        for sock in writable:
+            if sock in self.connections:
+                self._write(self.connections[sock])
+
+    def _accept(self):
+        while True:
+            try:
+                client, address = self.listen_socket.accept()
+            except socket.error as e:
+                if e.errno in (errno.EWOULDBLOCK, errno.EAGAIN):
+                    return
+                if e.errno in (errno.ECONNABORTED, errno.EINTR):
+                    continue
+                raise
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.runServer is not None:
+                client.setblocking(1)
+                thread = threading.Thread(target=self._serve_client,
+                                          args=(client, address))
+                thread.daemon = True
+                self.client_threads.append((client, thread))
+                thread.start()
+                continue
+            client.setblocking(0)
+            conn = MockConnection(self, client, address)
+            self.connections[client] = conn
+            self.handle_connect(conn)
+
+    def _serve_client(self, client, address):
+        try:
+            self.runServer(client, address)
+        finally:
+            client.close()
+
+    def _read(self, conn):
+        try:
+            data = conn.socket.recv(65536)
+        except socket.error as e:
+            if e.errno in (errno.EWOULDBLOCK, errno.EAGAIN, errno.EINTR):
+                return
+            data = b''
+        if not data:
+            self._drop(conn)
+            return
+        conn.inbuf += data
+        self._process(conn)
+
+    def _process(self, conn):
+        while not conn.paused and not conn.closing:
+            parsed = self.parse_request(conn.inbuf)
+            if parsed is None:
+                break
+            request, size = parsed
+            conn.inbuf = conn.inbuf[size:]
+            conn.requests += 1
+            self.requests += 1
+            profile = self.fault_profile
+            fault = None
+            reply = None
+            if profile is not None:
+                fault = profile.fault(request.command)
+            if fault == 'error':
+                reply = None if request.noreply else profile.error + '\r\n'
+            elif fault != 'reset':
+                reply = self.handle_request(conn, request)
+            if conn.closing:
+                break
+            delay = self.request_delay(conn, request)
+            if profile is not None:
+                delay += profile.delay(request.command)
+            self.respond(conn, reply, delay,
+                         None if fault == 'error' else fault)
+        if conn.outbuf:
+            self._write(conn)
+
+    def _write(self, conn):
+        try:
+            sent = conn.socket.send(conn.outbuf)
+        except socket.error as e:
+            if e.errno in (errno.EWOULDBLOCK, errno.EAGAIN, errno.EINTR):
+                return
+            self._drop(conn)
+            return
+        conn.outbuf = conn.outbuf[sent:]
+        if conn.closing and not conn.outbuf:
+            self._drop(conn)
+
+    def _drop(self, conn):
+        if conn.closed:
+            return
+        conn.closed = True
+        conn.closing = True
+        conn.outbuf = b''
+        self.connections.pop(conn.socket, None)
+        conn.socket.close()
+        self.handle_disconnect(conn)
+
 
 class SleepServer(MockServer):
     """A mock server that listens on a port, but always times out"""
-    def runServer(self, client_socket, client_address):
-        self.wait_until_stopped()
+    def handle_request(self, conn, request):
+        return None
 
 class ConnectionErrorServer(MockServer):
     """A mock server that returns error on connections"""
@@ -129,8 +598,8 @@ class StoreServer(MockServer):
 
 class DeadServer(MockServer):
     """ Simple server that hard fails all the time """
-    def runServer(self, client_socket, client_address):
-        client_socket.close()
+    def handle_connect(self, conn):
+        conn.close()
 
 class TkoServer(MockServer):
     def __init__(self, period, phase=0, tmo=0.5, hitcmd='hit'):
@@ -147,23 +616,310 @@ class TkoServer(MockServer):
         self.tmo = tmo
         self.hitcmd = hitcmd
 
-    def runServer(self, client_socket, client_address):
-        while not self.is_stopped():
-            f = client_socket.makefile()
-            cmd = f.readline()
-            f.close()
-            if not cmd:
-                continue
-            if cmd == 'version\r\n':
-                client_socket.send('VERSION TKO_SERVER\r\n')
-                continue
-            # fast 'period' times in a row, then slow 'period' times in a row
-            if self.step % (2 * self.period) >= self.period:
-                time.sleep(self.tmo)
-            self.step += 1
-            if cmd.startswith('get {}\r\n'.format(self.hitcmd)):
-                client_socket.send(
-                    'VALUE hit 0 %d\r\n%s\r\nEND\r\n' % (
-                        len(str(self.port)), str(self.port)))
-            elif cmd.startswith('get'):
-                client_socket.send('END\r\n')
+    def handle_version(self, conn, request):
+        return 'VERSION TKO_SERVER\r\n'
+
+    def handle_get(self, conn, request):
+        if request.args == [self.hitcmd]:
+            return 'VALUE hit 0 %d\r\n%s\r\nEND\r\n' % (
+                len(str(self.port)), str(self.port))
+        return 'END\r\n'
+
+    def handle_unknown(self, conn, request):
+        return None
+
+    def request_delay(self, conn, request):
+        if request.command == 'version':
+            return 0
+        # fast 'period' times in a row, then slow 'period' times in a row
+        slow = self.step % (2 * self.period) >= self.period
+        self.step += 1
+        return self.tmo if slow else 0
+
+class MemcachedServer(MockServer):
+    """An in-memory memcached with the semantics of mock_mc_server:
+    storage, arithmetic, cas, touch, exptime, leases and metaget, with LRU
+    eviction once the items take more than max_bytes.
+
+    Every request is counted by command in self.counters, along with hits,
+    misses, evictions and expirations, so that tests can check exactly what
+    reached the server.  clock may be replaced to control time.
+    """
+
+    # Bytes counted for an item in addition to its key and value
+    ITEM_OVERHEAD = 48
+
+    # Like memcached, larger exptimes are absolute unix timestamps
+    MAX_RELATIVE_EXPTIME = 60 * 60 * 24 * 30
+
+    class Item(object):
+        def __init__(self, value, flags, exptime, now, origin):
+            self.value = value
+            self.flags = flags
+            self.exptime = exptime
+            self.set_time = now
+            self.origin = origin
+            self.cas = 0
+            # 'cache' for regular items, 'tlru' and 'tlru_hot' for deleted
+            # or lease-get missed items that only serve leases
+            self.state = 'cache'
+            self.lease_token = 0
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, port=0):
+        super(MemcachedServer, self).__init__(port)
+        self.max_bytes = max_bytes
+        self.clock = time.time
+        self.lock = threading.RLock()
+        self.items = collections.OrderedDict()
+        self.bytes = 0
+        self.counters = collections.Counter()
+        self.next_cas = 1
+        self.next_lease_token = 100
+
+    def get_counters(self):
+        """Copy of the counters, plus current item count and size"""
+        with self.lock:
+            counters = dict(self.counters)
+            counters['curr_items'] = len(self.items)
+            counters['bytes'] = self.bytes
+            return counters
+
+    def reset_counters(self):
+        with self.lock:
+            self.counters.clear()
+
+    def flush(self):
+        with self.lock:
+            self.items.clear()
+            self.bytes = 0
+
+    def handle_request(self, conn, request):
+        with self.lock:
+            self.counters[request.command] += 1
+            if request.command in STORAGE_COMMANDS and request.data is None:
+                return 'CLIENT_ERROR bad data chunk\r\n'
+            try:
+                reply = super(MemcachedServer, self).handle_request(
+                    conn, request)
+            except (IndexError, ValueError):
+                return 'CLIENT_ERROR bad command line format\r\n'
+            if request.noreply:
+                return None
+            return reply
+
+    def _size(self, key, item):
+        return len(key) + len(item.value) + self.ITEM_OVERHEAD
+
+    def _exptime(self, exptime):
+        exptime = int(exptime)
+        if exptime < 0:
+            return -1
+        if 0 < exptime <= self.MAX_RELATIVE_EXPTIME:
+            return int(self.clock()) + exptime
+        return exptime
+
+    def _find(self, key, state='cache'):
+        """The unexpired item for key, marked as most recently used.
+        With state=None items that only serve leases are returned too."""
+        item = self.items.get(key)
+        if item is None:
+            return None
+        if item.exptime and item.exptime <= self.clock():
+            self._remove(key)
+            self.counters['expired'] += 1
+            return None
+        self.items[key] = self.items.pop(key)
+        if state is not None and item.state != state:
+            return None
+        return item
+
+    def _remove(self, key):
+        item = self.items.pop(key)
+        self.bytes -= self._size(key, item)
+
+    def _store(self, key, item):
+        if key in self.items:
+            self._remove(key)
+        self.next_cas += 1
+        item.cas = self.next_cas
+        self.items[key] = item
+        self.bytes += self._size(key, item)
+        while self.bytes > self.max_bytes and len(self.items) > 1:
+            self._remove(next(iter(self.items)))
+            self.counters['evictions'] += 1
+
+    def _new_item(self, conn, request, flags, exptime):
+        return self.Item(request.data, int(flags), self._exptime(exptime),
+                         self.clock(), conn.address[0])
+
+    def _value(self, key, item, cas=False):
+        line = 'VALUE {} {} {}'.format(key, item.flags, len(item.value))
+        if cas:
+            line += ' {}'.format(item.cas)
+        return _to_bytes(line + '\r\n') + item.value + b'\r\n'
+
+    def _get(self, request, cas):
+        reply = []
+        for key in request.args:
+            item = self._find(key)
+            if item is None:
+                self.counters['get_misses'] += 1
+            else:
+                self.counters['get_hits'] += 1
+                reply.append(self._value(key, item, cas))
+        reply.append(b'END\r\n')
+        return b''.join(reply)
+
+    def handle_get(self, conn, request):
+        return self._get(request, cas=False)
+
+    def handle_gets(self, conn, request):
+        return self._get(request, cas=True)
+
+    def handle_set(self, conn, request):
+        key, flags, exptime = request.args[:3]
+        self._store(key, self._new_item(conn, request, flags, exptime))
+        return 'STORED\r\n'
+
+    def handle_add(self, conn, request):
+        if self._find(request.key) is not None:
+            return 'NOT_STORED\r\n'
+        return self.handle_set(conn, request)
+
+    def handle_replace(self, conn, request):
+        if self._find(request.key) is None:
+            return 'NOT_STORED\r\n'
+        return self.handle_set(conn, request)
+
+    def _affix(self, request, append):
+        item = self._find(request.key)
+        if item is None:
+            return 'NOT_STORED\r\n'
+        self._remove(request.key)
+        if append:
+            item.value = item.value + request.data
+        else:
+            item.value = request.data + item.value
+        self._store(request.key, item)
+        return 'STORED\r\n'
+
+    def handle_append(self, conn, request):
+        return self._affix(request, append=True)
+
+    def handle_prepend(self, conn, request):
+        return self._affix(request, append=False)
+
+    def handle_cas(self, conn, request):
+        key, flags, exptime, size, cas = request.args[:5]
+        item = self._find(key)
+        if item is None:
+            return 'NOT_FOUND\r\n'
+        if item.cas != int(cas):
+            return 'EXISTS\r\n'
+        self._store(key, self._new_item(conn, request, flags, exptime))
+        return 'STORED\r\n'
+
+    def _arith(self, request, delta):
+        item = self._find(request.key)
+        if item is None:
+            return 'NOT_FOUND\r\n'
+        try:
+            value = int(item.value)
+        except ValueError:
+            return ('CLIENT_ERROR cannot increment or decrement non-numeric '
+                    'value\r\n')
+        value = max(0, value + delta) % 2 ** 64
+        self._remove(request.key)
+        item.value = _to_bytes(str(value))
+        self._store(request.key, item)
+        return '{}\r\n'.format(value)
+
+    def handle_incr(self, conn, request):
+        return self._arith(request, int(request.args[1]))
+
+    def handle_decr(self, conn, request):
+        return self._arith(request, -int(request.args[1]))
+
+    def handle_touch(self, conn, request):
+        item = self._find(request.key)
+        if item is None:
+            return 'NOT_FOUND\r\n'
+        item.exptime = self._exptime(request.args[1])
+        return 'TOUCHED\r\n'
+
+    def handle_delete(self, conn, request):
+        item = self._find(request.key, state=None)
+        if item is None:
+            return 'NOT_FOUND\r\n'
+        # Deleted items stay around to serve leases, with a new token
+        deleted = item.state == 'cache'
+        item.state = 'tlru'
+        self.next_lease_token += 1
+        item.lease_token = self.next_lease_token
+        self.next_cas += 1
+        item.cas = self.next_cas
+        return 'DELETED\r\n' if deleted else 'NOT_FOUND\r\n'
+
+    def handle_lease_get(self, conn, request):
+        key = request.key
+        item = self._find(key, state=None)
+        if item is None:
+            item = self.Item(b'', 0, 0, self.clock(), conn.address[0])
+            self._store(key, item)
+            item.state = 'tlru'
+            self.next_lease_token += 1
+            item.lease_token = self.next_lease_token
+        if item.state == 'cache':
+            self.counters['get_hits'] += 1
+            return self._value(key, item) + b'END\r\n'
+        self.counters['get_misses'] += 1
+        if item.state == 'tlru':
+            item.state = 'tlru_hot'
+            token = item.lease_token
+        else:
+            # Another lease is outstanding: hot miss
+            token = 1
+        return (_to_bytes('LVALUE {} {} {} {}\r\n'.format(
+            key, token, item.flags, len(item.value))) +
+            item.value + b'\r\nEND\r\n')
+
+    def handle_lease_set(self, conn, request):
+        key, token, flags, exptime = request.args[:4]
+        item = self._find(key, state=None)
+        if item is None:
+            return 'NOT_STORED\r\n'
+        new_item = self._new_item(conn, request, flags, exptime)
+        if item.state == 'cache' or item.lease_token == int(token):
+            self._store(key, new_item)
+            return 'STORED\r\n'
+        # Stale token: keep the value for leases but don't make it a hit
+        new_item.state = item.state
+        new_item.lease_token = item.lease_token
+        self._store(key, new_item)
+        return 'STALE_STORED\r\n'
+
+    def handle_metaget(self, conn, request):
+        item = self._find(request.key)
+        if item is None:
+            return 'END\r\n'
+        origin = item.origin
+        if origin.startswith('::ffff:'):
+            origin = origin[len('::ffff:'):]
+        return ('META {} age: {}; exptime: {}; from: {}; is_transient: 0\r\n'
+                'END\r\n'.format(request.key,
+                                 int(self.clock() - item.set_time),
+                                 item.exptime, origin or 'unknown'))
+
+    def handle_flush_all(self, conn, request):
+        args = [arg for arg in request.args if arg != 'noreply']
+        delay = int(args[0]) if args else 0
+        if delay > 0:
+            self.call_later(delay, self.flush)
+        else:
+            self.flush()
+        return 'OK\r\n'
+
+    def handle_stats(self, conn, request):
+        counters = self.get_counters()
+        return ''.join('STAT {} {}\r\n'.format(name, counters[name])
+                       for name in sorted(counters)) + 'END\r\n'
@@ -0,0 +1,287 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+"""
+Runs the Python integration tests in parallel.
+
+Test modules are sharded across worker slots, longest first when the
+timings of a previous run are available.  Each module runs in its own
+Python process with a private TMPDIR (so every BaseDirectory lands in the
+worker's tree) and a private range of ports that create_listen_socket() and
+the mock servers bind to (see ports.py), so that concurrent tests never race
+for a port.
+Per-test wall times are collected and written to a JSON timings file:
+
+    python -m mcrouter.test.parallel_tests -j 32 --timings timings.json
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+from mcrouter.test.ports import PORTS_ENV
+
+if hasattr(time, 'perf_counter'):
+    now = time.perf_counter
+else:
+    now = time.time
+
+# Worker port ranges are carved out of this range, below the Linux
+# ephemeral ports
+FIRST_PORT = 20000
+LAST_PORT = 32000
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(os.path.dirname(TEST_DIR))
+
+
+def python_tests(makefile=os.path.join(TEST_DIR, 'Makefile.am')):
+    """The Python test modules run by 'make check'"""
+    tests = []
+    with open(makefile) as f:
+        for line in f:
+            if line.lstrip().startswith('#'):
+                continue
+            tests.extend(re.findall(r'\b(test_\w+)\.py\b', line))
+    return tests
+
+
+def schedule(modules, timings):
+    """modules ordered longest first by their previous wall time; modules
+    never timed go first since they may be the longest"""
+    return sorted(modules, key=lambda m: -timings.get(m, float('inf')))
+
+
+class TimingResult(unittest.TextTestResult):
+    """Records wall time and outcome of every test"""
+
+    def __init__(self, *args, **kwargs):
+        super(TimingResult, self).__init__(*args, **kwargs)
+        self.timings = []
+        self._started = None
+        self._outcome_name = None
+
+    def startTest(self, test):
+        self._started = now()
+        self._outcome_name = 'pass'
+        super(TimingResult, self).startTest(test)
+
+    def stopTest(self, test):
+        super(TimingResult, self).stopTest(test)
+        self.timings.append({
+            'test': test.id(),
+            'seconds': round(now() - self._started, 3),
+            'outcome': self._outcome_name,
+        })
+        self._started = None
+
+    def _set_outcome(self, test, outcome):
+        if self._started is None:
+            # setUpClass/setUpModule failures are reported outside of tests
+            self.timings.append({'test': str(test), 'seconds': 0,
+                                 'outcome': outcome})
+        else:
+            self._outcome_name = outcome
+
+    def addError(self, test, err):
+        self._set_outcome(test, 'error')
+        super(TimingResult, self).addError(test, err)
+
+    def addFailure(self, test, err):
+        self._set_outcome(test, 'fail')
+        super(TimingResult, self).addFailure(test, err)
+
+    def addSkip(self, test, reason):
+        self._set_outcome(test, 'skip')
+        super(TimingResult, self).addSkip(test, reason)
+
+    def addUnexpectedSuccess(self, test):
+        self._set_outcome(test, 'fail')
+        super(TimingResult, self).addUnexpectedSuccess(test)
+
+
+def run_worker(module, report):
+    """Runs one test module in this process, writes its timings to report"""
+    suite = unittest.defaultTestLoader.loadTestsFromName(
+        'mcrouter.test.' + module)
+    runner = unittest.TextTestRunner(verbosity=2, resultclass=TimingResult)
+    start = now()
+    result = runner.run(suite)
+    with open(report, 'w') as f:
+        json.dump({'module': module,
+                   'seconds': round(now() - start, 3),
+                   'success': result.wasSuccessful(),
+                   'tests': result.timings}, f)
+    return 0 if result.wasSuccessful() else 1
+
+
+class Runner(object):
+    def __init__(self, modules, jobs, python, timeout, keep_tmp=False):
+        self.queue = list(modules)
+        self.jobs = jobs
+        self.python = python
+        self.timeout = timeout
+        self.keep_tmp = keep_tmp
+        self.lock = threading.Lock()
+        self.results = []
+        self.total = len(modules)
+
+    def worker_ports(self, slot):
+        size = min(2000, (LAST_PORT - FIRST_PORT + 1) // self.jobs)
+        first = FIRST_PORT + slot * size
+        return first, first + size - 1
+
+    def run(self):
+        threads = [threading.Thread(target=self.run_slot, args=(slot,))
+                   for slot in range(self.jobs)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.results
+
+    def run_slot(self, slot):
+        env = dict(os.environ)
+        env[PORTS_ENV] = '{}-{}'.format(*self.worker_ports(slot))
+        while True:
+            with self.lock:
+                if not self.queue:
+                    return
+                module = self.queue.pop(0)
+            tmp = tempfile.mkdtemp(prefix='mctest-{}.'.format(slot))
+            try:
+                env['TMPDIR'] = tmp
+                result = self.run_module(module, tmp, env)
+            finally:
+                if not self.keep_tmp:
+                    shutil.rmtree(tmp, ignore_errors=True)
+            with self.lock:
+                self.results.append(result)
+                print('[{:>3}/{}] {:<5} {:<40} {:>8.1f}s'.format(
+                    len(self.results), self.total,
+                    'PASS' if result['success'] else 'FAIL', module,
+                    result['seconds']))
+                sys.stdout.flush()
+
+    def run_module(self, module, tmp, env):
+        report = os.path.join(tmp, 'report.json')
+        output = os.path.join(tmp, 'output')
+        start = now()
+        with open(output, 'w') as out:
+            proc = subprocess.Popen(
+                [self.python, '-B', '-m', 'mcrouter.test.parallel_tests',
+                 '--worker', module, '--report', report],
+                cwd=ROOT_DIR, env=env, stdout=out, stderr=subprocess.STDOUT)
+            timer = threading.Timer(self.timeout, proc.kill)
+            timer.start()
+            try:
+                returncode = proc.wait()
+            finally:
+                timed_out = not timer.is_alive()
+                timer.cancel()
+        result = {'module': module, 'tests': [], 'success': False}
+        if os.path.exists(report):
+            with open(report) as f:
+                result = json.load(f)
+        result['seconds'] = round(now() - start, 3)
+        result['success'] = result['success'] and returncode == 0
+        if timed_out:
+            result['timed_out'] = True
+        if not result['success']:
+            with open(output) as f:
+                result['output'] = f.read()
+        return result
+
+
+def load_timings(path):
+    """{module: seconds} from a previous timings file"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        data = json.load(f)
+    return dict((r['module'], r['seconds']) for r in data['modules'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n')[0])
+    parser.add_argument('modules', nargs='*',
+                        help='test modules to run (default: the Python '
+                        'tests in Makefile.am)')
+    parser.add_argument('-j', '--jobs', type=int,
+                        default=multiprocessing.cpu_count())
+    parser.add_argument('--timings',
+                        help='JSON file with per-test wall times; the '
+                        'timings of the previous run are used to schedule '
+                        'the longest modules first')
+    parser.add_argument('--timeout', type=float, default=1800,
+                        help='seconds after which a module is killed')
+    parser.add_argument('--slowest', type=int, default=20,
+                        help='print the N slowest tests')
+    parser.add_argument('--keep-tmp', action='store_true',
+                        help='keep the worker directories')
+    parser.add_argument('--python', default=sys.executable)
+    parser.add_argument('--worker', help=argparse.SUPPRESS)
+    parser.add_argument('--report', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        return run_worker(args.worker, args.report)
+
+    modules = [re.sub(r'\.py$', '', os.path.basename(m))
+               for m in args.modules] or python_tests()
+    modules = schedule(modules, load_timings(args.timings))
+    jobs = max(1, min(args.jobs, len(modules)))
+
+    start = now()
+    runner = Runner(modules, jobs, args.python, args.timeout, args.keep_tmp)
+    results = runner.run()
+    wall = now() - start
+
+    failed = [r for r in results if not r['success']]
+    for result in failed:
+        print('\n===== {}{} =====\n{}'.format(
+            result['module'], ' (timed out)' if result.get('timed_out')
+            else '', result.get('output', '')))
+
+    tests = sorted((t for r in results for t in r['tests']),
+                   key=lambda t: -t['seconds'])
+    if args.slowest and tests:
+        print('\nSlowest tests:')
+        for test in tests[:args.slowest]:
+            print('{:>8.1f}s  {}'.format(test['seconds'], test['test']))
+
+    serial = sum(r['seconds'] for r in results)
+    print('\n{} modules, {} tests, {} failed in {:.1f}s '
+          '({:.1f}s of test time, {} jobs)'.format(
+              len(results), len(tests), len(failed), wall, serial, jobs))
+
+    if args.timings:
+        with open(args.timings, 'w') as f:
+            json.dump({'wall_seconds': round(wall, 3), 'jobs': jobs,
+                       'modules': [dict((k, v) for k, v in r.items()
+                                        if k != 'output')
+                                   for r in results]},
+                      f, indent=2, sort_keys=True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
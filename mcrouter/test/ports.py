@@ -0,0 +1,64 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+"""
+Port allocation for the test harness.
+
+A test runner (see parallel_tests.py) may restrict the ports a test process
+binds to by setting PORTS_ENV to "FIRST-LAST"; otherwise any free port is
+used.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import errno
+import os
+import socket
+import threading
+
+# Environment variable with the "FIRST-LAST" ports of a test process
+PORTS_ENV = 'MCROUTER_TEST_PORTS'
+
+_next_port = {}
+_next_port_lock = threading.Lock()
+
+
+def port_range():
+    """(first, last) ports this process may bind to, or None"""
+    spec = os.environ.get(PORTS_ENV)
+    if not spec:
+        return None
+    first, last = spec.split('-')
+    return int(first), int(last)
+
+
+def bind_port(sock, host=''):
+    """
+    Binds sock to the next free port of this process' port range, or to any
+    port when no range is set.  Ports are handed out round robin so that a
+    port is not reused while the previous test may still have connections
+    to it.
+    """
+    ports = port_range()
+    if ports is None:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+    first, last = ports
+    count = last - first + 1
+    for i in range(count):
+        with _next_port_lock:
+            port = _next_port.get(ports, first)
+            _next_port[ports] = first + (port - first + 1) % count
+        try:
+            sock.bind((host, port))
+            return port
+        except socket.error as e:
+            if e.errno not in (errno.EADDRINUSE, errno.EACCES):
+                raise
+    raise Exception('No free port in range {}-{}'.format(first, last))
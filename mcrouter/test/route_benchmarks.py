@@ -0,0 +1,241 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+"""
+Benchmarks for route handles.
+
+Each benchmark runs mcrouter with one of the JSON configs used by the
+integration tests, backed by one mock_mc_server per distinct port in the
+config, and drives it with a fixed, seeded workload from loadtest.py.
+Results are written as JSON so that runs from two builds can be diffed:
+
+    python -m mcrouter.test.route_benchmarks --output new.json
+    python -m mcrouter.test.route_benchmarks --compare old.json new.json
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import argparse
+import json
+import re
+import socket
+import sys
+import time
+
+from mcrouter.test.MCProcess import BaseDirectory, Mcrouter, MockMemcached
+from mcrouter.test.loadtest import Workload, run_load, stop
+
+
+class Benchmark(object):
+    def __init__(self, name, config, extra_args=None, **workload):
+        self.name = name
+        self.config = config
+        self.extra_args = extra_args or []
+        self.workload = workload
+
+
+BENCHMARKS = [
+    Benchmark('PoolRoute', './mcrouter/test/mcrouter_test_basic_1_1_1.json'),
+    Benchmark('PoolRoute-caret', './mcrouter/test/test_basic_caret.json'),
+    Benchmark('FailoverWithExptimeRoute',
+              './mcrouter/test/test_basic_failover.json'),
+    Benchmark('AllSyncRoute', './mcrouter/test/test_basic_all_sync.json',
+              get_ratio=0.5),
+    Benchmark('L1L2CacheRoute', './mcrouter/test/test_basic_l1_l2.json'),
+    Benchmark('L1L2SizeSplitRoute',
+              './mcrouter/test/test_basic_l1_l2_sizesplit.json',
+              get_ratio=0.5, value_size='uniform:1:16'),
+    Benchmark('BigValueRoute', './mcrouter/test/test_bigvalue.json',
+              extra_args=['--big-value-split-threshold', '5000',
+                          '--big-value-batch-size', '2'],
+              get_ratio=0.5, key_space=1000, value_size='uniform:1000:20000'),
+    Benchmark('ShardSplitRoute', './mcrouter/test/test_shard_splits.json',
+              key_prefix='a:1:'),
+    Benchmark('ShadowRoute', './mcrouter/test/test_shadow.json',
+              key_prefix='f'),
+    # the "foo" policy has completed its migration to a WarmUpRoute
+    Benchmark('WarmUpRoute', './mcrouter/test/test_warmup.json',
+              key_prefix='foo'),
+    Benchmark('OperationSelectorRoute',
+              './mcrouter/test/test_operation_selector_route.json'),
+]
+
+# Metrics compared by --compare, and whether bigger is better
+METRICS = [
+    ('achieved_qps', True),
+    ('latency_us.p50', False),
+    ('latency_us.p99', False),
+    ('latency_us.p999', False),
+    ('cpu_us_per_request', False),
+]
+
+
+def config_ports(config_json):
+    """
+    Distinct ports of the "host:port[:protocol]" strings in a config, in
+    order of first appearance (the order replace_ports() substitutes them).
+    """
+    ports = []
+    for s in re.findall(r'"((?:[^"\\]|\\.)*)"', config_json):
+        parts = s.split(':')
+        if len(parts) < 2:
+            continue
+        for i in (-1, -2):
+            try:
+                port = int(parts[i])
+            except ValueError:
+                continue
+            if port not in ports:
+                ports.append(port)
+    return ports
+
+
+def run_benchmark(benchmark, qps, duration, warmup, connections, seed=0):
+    base_dir = BaseDirectory('route_benchmarks')
+    with open(benchmark.config) as f:
+        nports = len(config_ports(f.read()))
+    mocks = [MockMemcached() for i in range(nports)]
+    mcrouter = None
+    try:
+        for mock in mocks:
+            mock.ensure_connected()
+            mock.disconnect()
+        mcrouter = Mcrouter(benchmark.config,
+                            extra_args=list(benchmark.extra_args),
+                            base_dir=base_dir,
+                            substitute_config_ports=[mock.getport()
+                                                     for mock in mocks])
+        mcrouter.ensure_connected()
+        mcrouter.disconnect()
+
+        workload = Workload(seed=seed, **benchmark.workload)
+        result = run_load(mcrouter.getport(), qps, duration, workload,
+                          connections=connections, warmup=warmup,
+                          pid=mcrouter.proc.pid, seed=seed)
+    finally:
+        stop(([mcrouter] if mcrouter is not None else []) + mocks)
+
+    result['config'] = benchmark.config
+    result['extra_args'] = benchmark.extra_args
+    result['cpu_us_per_request'] = None
+    if result['router_cpu'] is not None and result['achieved_qps']:
+        result['cpu_us_per_request'] = round(
+            result['router_cpu'] * 1e4 / result['achieved_qps'], 2)
+    return result
+
+
+def get_metric(result, name):
+    for part in name.split('.'):
+        if result is None:
+            return None
+        result = result.get(part)
+    return result
+
+
+def compare(old, new, threshold):
+    """
+    Prints old vs new for every benchmark present in both result files and
+    returns the list of (benchmark, metric, change %) that got worse by more
+    than threshold percent.
+    """
+    regressions = []
+    names = [name for name in new['results'] if name in old['results']]
+    print('{:<28} {:<20} {:>12} {:>12} {:>9}'.format(
+        'benchmark', 'metric', 'old', 'new', 'change'))
+    for name in sorted(names):
+        for metric, bigger_is_better in METRICS:
+            a = get_metric(old['results'][name], metric)
+            b = get_metric(new['results'][name], metric)
+            if a is None or b is None:
+                continue
+            change = 100.0 * (b - a) / a if a else 0.0
+            worse = -change if bigger_is_better else change
+            mark = ''
+            if worse > threshold:
+                regressions.append((name, metric, round(change, 1)))
+                mark = ' <--'
+            print('{:<28} {:<20} {:>12} {:>12} {:>+8.1f}%{}'.format(
+                name, metric, a, b, change, mark))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--output', help='write JSON results to this file')
+    parser.add_argument('--benchmark', action='append',
+                        help='run only this benchmark (repeatable)')
+    parser.add_argument('--list', action='store_true',
+                        help='list benchmarks and exit')
+    parser.add_argument('--qps', type=float, default=5000)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--warmup', type=float, default=2)
+    parser.add_argument('--connections', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='diff two result files instead of running')
+    parser.add_argument('--threshold', type=float, default=10,
+                        help='with --compare, percent change that counts as '
+                        'a regression (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for benchmark in BENCHMARKS:
+            print('{:<28} {}'.format(benchmark.name, benchmark.config))
+        return 0
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        regressions = compare(old, new, args.threshold)
+        if regressions:
+            print('{} regression(s) over {}%'.format(len(regressions),
+                                                    args.threshold))
+            return 1
+        return 0
+
+    benchmarks = BENCHMARKS
+    if args.benchmark:
+        unknown = set(args.benchmark) - set(b.name for b in BENCHMARKS)
+        if unknown:
+            parser.error('unknown benchmark(s): ' + ', '.join(sorted(unknown)))
+        benchmarks = [b for b in BENCHMARKS if b.name in args.benchmark]
+
+    output = {
+        'timestamp': int(time.time()),
+        'host': socket.gethostname(),
+        'settings': {
+            'qps': args.qps,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'connections': args.connections,
+            'seed': args.seed,
+        },
+        'results': {},
+    }
+    for benchmark in benchmarks:
+        result = run_benchmark(benchmark, args.qps, args.duration,
+                               args.warmup, args.connections, args.seed)
+        output['results'][benchmark.name] = result
+        lat = result['latency_us']
+        print('{:<28} qps {:>9}  p50 {:>8}us  p99 {:>8}us  errors {:>5}  '
+              'cpu/req {}us'.format(benchmark.name, result['achieved_qps'],
+                                    lat['p50'], lat['p99'], result['errors'],
+                                    result['cpu_us_per_request']))
+        sys.stdout.flush()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(output, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
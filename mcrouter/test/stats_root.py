@@ -0,0 +1,269 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+"""
+Reader for the files mcrouter writes to --stats-root.
+
+Every --stats-logging-interval mcrouter atomically replaces
+<prefix>.stats (e.g. libmcrouter.mcrouter.0.stats), a flat JSON object
+with one "<prefix>.<name>": value pair per line, next to
+<prefix>.startup_options, <prefix>.config_sources_info and
+<prefix>.hotkeys (see hot_keys.py).  Pool stats
+(--pool-stats-config-file) are named "<prefix>.<pool>.<stat>.<aggregation>",
+where the pool name itself may contain dots and aggregation is sum or avg,
+or count, max, p50, p95, p99 or p999 for the duration_us and value_bytes
+histograms.  With --enable-routing-prefix-stats the same histograms are
+reported per routing prefix as "<prefix>.routing_prefix.<rp>.<stat>...".
+
+StatsRootReader follows a stats root over time: poll() only reads the
+files that were replaced since the last poll, parses just the stats that
+match the reader's filter, and appends every value to a per counter time
+series stamped with the file's modification time.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import collections
+import json
+import os
+
+STATS_SUFFIX = '.stats'
+POOL_STAT_AGGREGATIONS = ('sum', 'avg', 'count', 'max', 'p50', 'p95', 'p99',
+                          'p999')
+POOL_STATS = ('requests', 'final_result_error', 'duration_us',
+              'total_duration_us', 'value_bytes')
+ROUTING_PREFIX_STAT_PREFIX = 'routing_prefix.'
+
+
+def parse_stats_lines(lines, prefix, names=None):
+    """
+    {name: value} from the lines of a stats file, with prefix + '.'
+    stripped from the names.  Only names starting with one of names (any
+    iterable of strings) are parsed.  Relies on the one pair per line
+    layout mcrouter writes; returns None if the lines don't follow it.
+    """
+    strip = len(prefix) + 1
+    names = tuple(prefix + '.' + name for name in names) if names else None
+    stats = {}
+    for line in lines:
+        line = line.strip()
+        if line in ('{', '}', ''):
+            continue
+        if not line.startswith('"'):
+            return None
+        end = line.find('": ', 1)
+        if end < 0:
+            return None
+        name = line[1:end]
+        if names is not None and not name.startswith(names):
+            continue
+        value = line[end + 3:].rstrip(',')
+        try:
+            stats[name[strip:]] = int(value)
+        except ValueError:
+            try:
+                stats[name[strip:]] = float(value)
+            except ValueError:
+                try:
+                    stats[name[strip:]] = json.loads(value)
+                except ValueError:
+                    # e.g. a nested object spanning several lines
+                    return None
+    return stats
+
+
+def split_pool_stat(name):
+    """(pool, stat, aggregation) for a pool stat name, else None"""
+    parts = name.rsplit('.', 2)
+    if (len(parts) != 3 or parts[2] not in POOL_STAT_AGGREGATIONS or
+            parts[1] not in POOL_STATS):
+        return None
+    return tuple(parts)
+
+
+class StatsFile(object):
+    """A file of the stats root, read again only after it was replaced"""
+
+    def __init__(self, path):
+        self.path = path
+        self.signature = None
+        self.mtime = None
+
+    def changed(self):
+        """Contents if the file was replaced since the last call, or None"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        signature = (st.st_ino, st.st_mtime, st.st_size)
+        if signature == self.signature:
+            return None
+        try:
+            with open(self.path) as f:
+                lines = f.readlines()
+        except IOError:
+            return None
+        self.signature = signature
+        self.mtime = st.st_mtime
+        return lines
+
+
+class RouterStats(object):
+    """Time series of the stats of one router (one file prefix)"""
+
+    def __init__(self, stats_root, prefix, names=None, max_samples=None):
+        self.prefix = prefix
+        self.names = names
+        self.max_samples = max_samples
+        self.file = StatsFile(os.path.join(stats_root, prefix + STATS_SUFFIX))
+        self.startup_options_file = os.path.join(
+            stats_root, prefix + '.startup_options')
+        self.config_sources_info_file = os.path.join(
+            stats_root, prefix + '.config_sources_info')
+        self.hot_keys_file = os.path.join(stats_root, prefix + '.hotkeys')
+        self.latest = {}
+        self.timestamp = None
+        self.samples = 0
+        self.series = {}
+
+    def poll(self):
+        """Reads the stats file if it was replaced; True if it was"""
+        lines = self.file.changed()
+        if lines is None:
+            return False
+        stats = parse_stats_lines(lines, self.prefix, self.names)
+        if stats is None:
+            stats = self._parse_json(''.join(lines))
+        if stats is None:
+            # caught mid-write by a non-atomic writer, try again next time
+            self.file.signature = None
+            return False
+        self.latest = stats
+        self.timestamp = self.file.mtime
+        self.samples += 1
+        for name, value in stats.items():
+            if name not in self.series:
+                self.series[name] = collections.deque(
+                    maxlen=self.max_samples)
+            self.series[name].append((self.timestamp, value))
+        return True
+
+    def _parse_json(self, content):
+        try:
+            data = json.loads(content)
+        except ValueError:
+            return None
+        start = self.prefix + '.'
+        names = tuple(start + name for name in self.names) \
+            if self.names else start
+        return dict((name[len(start):], value)
+                    for name, value in data.items()
+                    if name.startswith(names))
+
+    def _grouped(self, routing_prefixes):
+        groups = {}
+        for name, value in self.latest.items():
+            parts = split_pool_stat(name)
+            if parts is None:
+                continue
+            group, stat, aggregation = parts
+            if group.startswith(ROUTING_PREFIX_STAT_PREFIX) != \
+                    routing_prefixes:
+                continue
+            if routing_prefixes:
+                group = group[len(ROUTING_PREFIX_STAT_PREFIX):]
+            groups.setdefault(group, {})[stat + '.' + aggregation] = value
+        return groups
+
+    def pools(self):
+        """{pool: {'requests.sum': value, ...}} from the latest stats"""
+        return self._grouped(routing_prefixes=False)
+
+    def routing_prefixes(self):
+        """{routing prefix: {'duration_us.p99': value, ...}}"""
+        return self._grouped(routing_prefixes=True)
+
+    def rate(self, name):
+        """Per second change of name between the last two samples"""
+        series = self.series.get(name)
+        if not series or len(series) < 2:
+            return None
+        (t0, v0), (t1, v1) = series[-2], series[-1]
+        if t1 <= t0:
+            return None
+        return (v1 - v0) / (t1 - t0)
+
+    def _load(self, path):
+        with open(path) as f:
+            return json.load(f)
+
+    def startup_options(self):
+        return self._load(self.startup_options_file)
+
+    def config_sources_info(self):
+        return self._load(self.config_sources_info_file)
+
+    def hot_keys(self):
+        """Hot keys last written, in the layout of parse_hot_keys()"""
+        return self._load(self.hot_keys_file)
+
+
+class StatsRootReader(object):
+    """
+    Follows every router writing to stats_root.  names restricts the stats
+    kept to those starting with one of its strings (without the router
+    prefix), e.g. ['cmd_', 'twmemcache.'].  max_samples bounds the length
+    of every time series.
+    """
+
+    def __init__(self, stats_root, names=None, max_samples=None):
+        self.stats_root = stats_root
+        self.names = tuple(names) if names else None
+        self.max_samples = max_samples
+        self.routers = {}
+
+    def discover(self):
+        """Starts following routers whose stats file appeared"""
+        try:
+            files = os.listdir(self.stats_root)
+        except OSError:
+            return
+        for name in files:
+            if name.endswith(STATS_SUFFIX):
+                prefix = name[:-len(STATS_SUFFIX)]
+                if prefix not in self.routers:
+                    self.routers[prefix] = RouterStats(
+                        self.stats_root, prefix, self.names, self.max_samples)
+
+    def poll(self):
+        """Reads the replaced stats files, returns their router prefixes"""
+        self.discover()
+        return sorted(prefix for prefix, router in self.routers.items()
+                      if router.poll())
+
+    def router(self, prefix=None):
+        """RouterStats of prefix, or of the only router if not given"""
+        if prefix is None:
+            if len(self.routers) != 1:
+                raise KeyError('{} routers in {}, pass a prefix'.format(
+                    len(self.routers), self.stats_root))
+            return next(iter(self.routers.values()))
+        return self.routers[prefix]
+
+    def latest(self, prefix=None):
+        return self.router(prefix).latest
+
+    def series(self, name, prefix=None):
+        """[(timestamp, value)] of a stat, oldest first"""
+        return list(self.router(prefix).series.get(name, ()))
+
+    def pools(self, prefix=None):
+        return self.router(prefix).pools()
+
+    def routing_prefixes(self, prefix=None):
+        return self.router(prefix).routing_prefixes()
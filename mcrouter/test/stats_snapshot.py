@@ -0,0 +1,267 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+"""
+Typed snapshots of 'stats' output.
+
+A StatsSnapshot parses the strings returned by MCProcess.stats() once, into
+numbers where possible, so that snapshots can be subtracted and turned into
+rates without int() calls scattered through the tests:
+
+    before = mcrouter.stats_snapshot()
+    ...
+    delta = mcrouter.stats_snapshot().diff(before)
+    self.assertEqual(delta['cmd_get_count'], 10)
+
+poll() takes snapshots of many processes at once, StatsCollector does so
+periodically in the background, and to_columns() turns a list of
+snapshots into one array per stat (NumPy arrays when NumPy is installed),
+which is what load test collectors want to aggregate over.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import array
+import threading
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def parse_value(value):
+    """value as an int or a float, or None if it is not a number"""
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def make_column(values):
+    """float64 column of values (None is NaN)"""
+    values = [float('nan') if v is None else v for v in values]
+    if numpy is not None:
+        return numpy.array(values, dtype=numpy.float64)
+    return array.array(b'd' if str is bytes else 'd', values)
+
+
+class StatsSnapshot(object):
+    """
+    One 'stats' reply.  Numeric stats are in values, the others (version,
+    hostnames, ...) in text; both are reachable with snapshot[name].
+    """
+
+    def __init__(self, stats, timestamp=None, source=None):
+        self.timestamp = time.time() if timestamp is None else timestamp
+        self.source = source
+        self.values = {}
+        self.text = {}
+        for name, value in (stats or {}).items():
+            number = parse_value(value)
+            if number is None:
+                self.text[name] = value
+            else:
+                self.values[name] = number
+
+    @classmethod
+    def from_process(cls, process, spec=None):
+        """Snapshot of process.stats(spec), or None if it didn't reply"""
+        stats = process.stats(spec)
+        if stats is None:
+            return None
+        return cls(stats, source=process)
+
+    def __getitem__(self, name):
+        if name in self.values:
+            return self.values[name]
+        return self.text[name]
+
+    def __contains__(self, name):
+        return name in self.values or name in self.text
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def names(self):
+        """Sorted names of the numeric stats"""
+        return sorted(self.values)
+
+    def diff(self, earlier):
+        """StatsDelta from earlier to this snapshot"""
+        return StatsDelta(earlier, self)
+
+    def rates(self, earlier):
+        """Per second rates of change since earlier"""
+        return self.diff(earlier).rates()
+
+
+class StatsDelta(object):
+    """Difference of the numeric stats present in both snapshots"""
+
+    def __init__(self, earlier, later):
+        self.interval = later.timestamp - earlier.timestamp
+        self.values = dict(
+            (name, value - earlier.values[name])
+            for name, value in later.values.items()
+            if name in earlier.values)
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+    def __contains__(self, name):
+        return name in self.values
+
+    def get(self, name, default=None):
+        return self.values.get(name, default)
+
+    def changed(self):
+        """{name: delta} of the stats that changed"""
+        return dict((name, value) for name, value in self.values.items()
+                    if value)
+
+    def rates(self):
+        """{name: delta per second}"""
+        if self.interval <= 0:
+            raise ValueError('Snapshots must be taken at different times')
+        return dict((name, value / self.interval)
+                    for name, value in self.values.items())
+
+
+def poll(processes, spec=None):
+    """
+    Snapshots of all processes, taken concurrently; None for a process that
+    didn't reply.  Each process must only be used by one thread at a time.
+    """
+    snapshots = [None] * len(processes)
+
+    def take(i):
+        try:
+            snapshots[i] = StatsSnapshot.from_process(processes[i], spec)
+        except Exception:
+            snapshots[i] = None
+
+    threads = [threading.Thread(target=take, args=(i,))
+               for i in range(len(processes))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return snapshots
+
+
+def to_columns(snapshots, names=None):
+    """
+    {'timestamp': column, name: column, ...} for a list of snapshots, with
+    one row per snapshot.  names defaults to every numeric stat that appears
+    in any snapshot; stats missing from a snapshot are NaN.
+    """
+    snapshots = [s for s in snapshots if s is not None]
+    if names is None:
+        names = sorted(set(name for s in snapshots for name in s.values))
+    columns = {'timestamp': make_column([s.timestamp for s in snapshots])}
+    for name in names:
+        columns[name] = make_column([s.values.get(name) for s in snapshots])
+    return columns
+
+
+def column_rates(columns, names=None):
+    """
+    Per second rates between consecutive rows of to_columns() output, one
+    row shorter than the input.
+    """
+    timestamps = columns['timestamp']
+    names = names or [name for name in columns if name != 'timestamp']
+    if numpy is not None:
+        intervals = numpy.diff(timestamps)
+        return dict((name, numpy.diff(columns[name]) / intervals)
+                    for name in names)
+    intervals = [b - a for a, b in zip(timestamps, timestamps[1:])]
+    res = {}
+    for name in names:
+        column = columns[name]
+        res[name] = make_column([(b - a) / t for a, b, t in
+                                 zip(column, column[1:], intervals)])
+    return res
+
+
+class StatsCollector(object):
+    """
+    Polls processes every interval seconds on a background thread.
+    snapshots[i] is the list of snapshots taken of processes[i].
+    """
+
+    def __init__(self, processes, interval=1.0, spec=None):
+        self.processes = list(processes)
+        self.interval = interval
+        self.spec = spec
+        self.snapshots = [[] for p in self.processes]
+        self.lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def collect(self):
+        """Takes one snapshot of every process"""
+        snapshots = poll(self.processes, self.spec)
+        with self.lock:
+            for i, snapshot in enumerate(snapshots):
+                if snapshot is not None:
+                    self.snapshots[i].append(snapshot)
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = time.time()
+            self.collect()
+            self._stop.wait(max(0, self.interval - (time.time() - start)))
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def columns(self, i, names=None):
+        """to_columns() of the snapshots of processes[i]"""
+        with self.lock:
+            snapshots = list(self.snapshots[i])
+        return to_columns(snapshots, names)
+
+    def totals(self, names=None):
+        """
+        to_columns() of the sum over all processes, row by row, for the
+        rows every process has.
+        """
+        with self.lock:
+            rows = min(len(s) for s in self.snapshots) if self.snapshots \
+                else 0
+            per_process = [list(s[:rows]) for s in self.snapshots]
+        merged = []
+        for row in range(rows):
+            snapshots = [s[row] for s in per_process]
+            total = StatsSnapshot({}, timestamp=max(
+                s.timestamp for s in snapshots))
+            for snapshot in snapshots:
+                for name, value in snapshot.values.items():
+                    total.values[name] = total.values.get(name, 0) + value
+            merged.append(total)
+        return to_columns(merged, names)
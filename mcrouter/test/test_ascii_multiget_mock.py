@@ -30,3 +30,40 @@ class TestMcrouterAsciiMultigetSanityMock(McrouterTestCase):
         # Test multiget with one timeout.
         self.assertEquals(m.get(['test:multiget:1', '__mockmc__.want_timeout']),
                           'SERVER_ERROR timeout')
+
+    def test_get_multi_batches(self):
+        m = self.mcrouter
+        n = 1050
+
+        with m.pipeline() as p:
+            for i in range(0, n, 2):
+                p.set('test:get_multi:{}'.format(i), str(i))
+        self.assertTrue(all(p.results))
+
+        keys = ['test:get_multi:{}'.format(i) for i in range(n)]
+        results = list(m.get_multi(keys, batch_size=100))
+        self.assertEqual([k for k, _ in results], keys)
+        for i, (_, value) in enumerate(results):
+            self.assertEqual(value, str(i) if i % 2 == 0 else None)
+
+        # the connection is left in a usable state
+        self.assertEqual(m.get('test:get_multi:0'), '0')
+
+    def test_get_multi_stop_early(self):
+        m = self.mcrouter
+        self.assertTrue(m.set('test:get_multi:0', 'A'))
+        self.assertTrue(m.set('test:get_multi:stop', 'B'))
+
+        keys = ['test:get_multi:{}'.format(i) for i in range(1000)]
+        for key, value in m.get_multi(keys, batch_size=10):
+            self.assertEqual((key, value), ('test:get_multi:0', 'A'))
+            break
+
+        # the unread batches don't leak into the next replies
+        self.assertEqual(m.get('test:get_multi:stop'), 'B')
+
+        results = m.get_multi(keys, batch_size=10)
+        self.assertEqual(next(results), ('test:get_multi:0', 'A'))
+        results.close()
+        self.assertEqual(m.get(['test:get_multi:stop']),
+                         {'test:get_multi:stop': 'B'})
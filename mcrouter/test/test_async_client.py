@@ -0,0 +1,101 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import sys
+import unittest
+
+from mcrouter.test.mock_servers import MemcachedServer
+
+
+@unittest.skipIf(sys.version_info < (3, 5), 'asyncio client needs Python 3.5')
+class TestAsyncClient(unittest.TestCase):
+    """Runs the client against a MemcachedServer, without mcrouter"""
+
+    def setUp(self):
+        import asyncio
+
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.server = MemcachedServer()
+        self.server.ensure_connected()
+        self.clients = []
+
+    def tearDown(self):
+        for c in self.clients:
+            c.disconnect()
+        self.server.terminate()
+        self.loop.close()
+
+    def run_async(self, coro):
+        return self.loop.run_until_complete(coro)
+
+    def connect(self):
+        from mcrouter.test.async_client import AsyncMcrouterClient
+
+        mc = AsyncMcrouterClient(self.server.getport())
+        self.run_async(mc.connect())
+        self.clients.append(mc)
+        return mc
+
+    def test_basic_ops(self):
+        run = self.run_async
+        mc = self.connect()
+        self.assertTrue(run(mc.set('async:key', 'value')))
+        self.assertEqual(run(mc.get('async:key')), 'value')
+        self.assertEqual(run(mc.get(['async:key', 'async:miss'])),
+                         {'async:key': 'value', 'async:miss': None})
+        self.assertEqual(run(mc.gets('async:key'))['value'], 'value')
+        self.assertTrue(run(mc.delete('async:key')))
+        self.assertIsNone(run(mc.get('async:key')))
+        self.assertTrue(run(mc.set('async:counter', '1')))
+        self.assertEqual(run(mc.incr('async:counter', 2)), 3)
+        self.assertEqual(run(mc.decr('async:counter')), 2)
+        self.assertEqual(run(mc.stats())['set'], '2')
+        self.assertEqual(run(mc.version()), 'VERSION MemcachedServer\r\n')
+
+    def test_noreply(self):
+        run = self.run_async
+        mc = self.connect()
+        self.assertTrue(run(mc.set('async:key', 'value', noreply=True)))
+        self.assertEqual(run(mc.get('async:key')), 'value')
+
+    def test_many_connections(self):
+        import asyncio
+        from mcrouter.test.async_client import connect_clients
+
+        n = 200
+        clients = self.run_async(connect_clients(self.server.getport(), n))
+        self.clients.extend(clients)
+        stored = self.run_async(asyncio.gather(
+            *[c.set('async:{}'.format(i), str(i))
+              for i, c in enumerate(clients)]))
+        self.assertTrue(all(stored))
+        # read every key back through a different connection
+        values = self.run_async(asyncio.gather(
+            *[c.get('async:{}'.format(i))
+              for i, c in enumerate(reversed(clients))]))
+        self.assertEqual(values, [str(i) for i in range(n)])
+        self.assertEqual(len(self.server.connections), n)
+
+    def test_stats_timeout_reconnects(self):
+        run = self.run_async
+        mc = self.connect()
+        mc.stats_timeout = 0.2
+        self.assertTrue(run(mc.set('async:key', 'value')))
+        # stats replies come a byte every 50ms, so the client times out
+        # in the middle of one
+        self.server.set_fault_profile(drip_rate=1, drip_interval=0.05,
+                                      exempt=('version', 'get', 'set'))
+        self.assertIsNone(run(mc.stats()))
+        self.server.set_fault_profile(None)
+        # the rest of that reply doesn't leak into the next requests
+        self.assertEqual(run(mc.get('async:key')), 'value')
+        self.assertEqual(run(mc.stats())['curr_items'], '1')
+        self.assertEqual(self.server.counters['stats'], 2)
@@ -10,15 +10,25 @@ from __future__ import unicode_literals
 
 import json
 import os
+import shutil
+import threading
 import time
 
+from mcrouter.test.MCProcess import McrouterClients
 from mcrouter.test.McrouterTestCase import McrouterTestCase
+from mcrouter.test.stats_root import StatsRootReader
 
 class TestAsyncFiles(McrouterTestCase):
     stat_prefix = 'libmcrouter.mcrouter.0.'
     config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
     extra_args = ['--stats-logging-interval', '100', '--use-asynclog-version2']
 
+    def wait_for_stats(self, stats_dir, newer_than=None):
+        for name in ('stats', 'startup_options', 'config_sources_info'):
+            self.wait_for_file(
+                os.path.join(stats_dir, self.stat_prefix + name),
+                newer_than)
+
     def check_stats(self, stats_dir):
         file_stat = os.path.join(stats_dir, self.stat_prefix + 'stats')
         file_startup_options = os.path.join(
@@ -38,21 +48,25 @@ class TestAsyncFiles(McrouterTestCase):
     def test_stats_no_requests(self):
         mcrouter = self.add_mcrouter(self.config, extra_args=self.extra_args)
         # wait for files
-        time.sleep(2)
+        self.wait_for_stats(mcrouter.stats_dir)
         self.check_stats(mcrouter.stats_dir)
 
     def test_async_files(self):
         mcrouter = self.add_mcrouter(self.config, extra_args=self.extra_args)
         self.assertIsNone(mcrouter.delete('key'))
 
-        # wait for files
-        time.sleep(2)
-
         # check async spool for failed delete
-        asynclog_files = []
-        for root, dirs, files in os.walk(mcrouter.get_async_spool_dir()):
-            for f in files:
-                asynclog_files.append(os.path.join(root, f))
+        def get_asynclog_files():
+            asynclog_files = []
+            for root, dirs, files in os.walk(mcrouter.get_async_spool_dir()):
+                for f in files:
+                    asynclog_files.append(os.path.join(root, f))
+            return asynclog_files
+
+        # wait for files
+        asynclog_files = self.wait_for(get_asynclog_files)
+        self.wait_for_log_line(asynclog_files[0], 'foo')
+        self.wait_for_stats(mcrouter.stats_dir)
 
         self.assertEqual(len(asynclog_files), 1)
         foundPool = False
@@ -70,9 +84,10 @@ class TestAsyncFiles(McrouterTestCase):
         (file_stat, file_startup_options, file_config_sources) = \
             self.check_stats(mcrouter.stats_dir)
 
-        with open(file_stat) as f:
-            stat_json = json.load(f)
-            self.assertGreaterEqual(stat_json[self.stat_prefix + 'uptime'], 0)
+        reader = StatsRootReader(mcrouter.stats_dir, names=['uptime'])
+        reader.poll()
+        self.assertGreaterEqual(
+            reader.latest(self.stat_prefix.rstrip('.'))['uptime'], 0)
 
         with open(file_startup_options) as f:
             startup_json = json.load(f)
@@ -85,8 +100,87 @@ class TestAsyncFiles(McrouterTestCase):
 
         # check stats are up-to-date
         now = time.time()
-        time.sleep(2)
+        self.wait_for_stats(mcrouter.stats_dir, newer_than=now)
+
+
+class TestAsyncFilesBatched(McrouterTestCase):
+    config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
+    # entries are batched per proxy
+    extra_args = ['--num-proxies', '1', '--use-asynclog-version2',
+                  '--asynclog-batch-flush-interval-ms', '1000']
+    num_clients = 5
+
+    def get_asynclog_lines(self, mcrouter):
+        lines = []
+        for root, dirs, files in os.walk(mcrouter.get_async_spool_dir()):
+            for f in files:
+                with open(os.path.join(root, f), 'r') as fd:
+                    lines.extend(fd.readlines())
+        return lines
+
+    def concurrent_deletes(self, mcrouter):
+        clients = McrouterClients(mcrouter.getport(), self.num_clients)
+        threads = [threading.Thread(target=clients[i].delete,
+                                    args=('key{}'.format(i),))
+                   for i in range(self.num_clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        clients.close()
+
+    def test_batched_writes(self):
+        mcrouter = self.add_mcrouter(self.config, extra_args=self.extra_args)
+        self.concurrent_deletes(mcrouter)
+
+        # deletes only reply once their batch is written
+        lines = self.get_asynclog_lines(mcrouter)
+        self.assertEqual(len(lines), self.num_clients)
+        keys = sorted(json.loads(line)[3]['k'] for line in lines)
+        self.assertEqual(
+            keys, ['key{}'.format(i) for i in range(self.num_clients)])
+        for line in lines:
+            self.assertEqual(json.loads(line)[3]['p'], 'foo')
+
+        # clients slower than the flush interval end up in a later batch
+        stats = mcrouter.stats()
+        self.assertEqual(int(stats['asynclog_requests']), self.num_clients)
+        self.assertGreaterEqual(int(stats['asynclog_batches']), 1)
+        self.assertLessEqual(int(stats['asynclog_batches']), self.num_clients)
+        self.assertEqual(int(stats['asynclog_dropped_requests']), 0)
+
+    def test_size_threshold(self):
+        extra_args = self.extra_args + ['--asynclog-batch-max-bytes', '1']
+        mcrouter = self.add_mcrouter(self.config, extra_args=extra_args)
+        # every entry is over the threshold, so nothing waits for the timer
+        start = time.time()
+        self.assertIsNone(mcrouter.delete('key'))
+        self.assertLess(time.time() - start, 1)
+
+        self.assertEqual(len(self.get_asynclog_lines(mcrouter)), 1)
+        self.assertEqual(int(mcrouter.stats()['asynclog_batches']), 1)
+
+    def test_queue_limit(self):
+        extra_args = self.extra_args + \
+            ['--asynclog-batch-max-queued-bytes', '1']
+        mcrouter = self.add_mcrouter(self.config, extra_args=extra_args)
+        self.assertIsNone(mcrouter.delete('key'))
+
+        self.assertEqual(self.get_asynclog_lines(mcrouter), [])
+        stats = mcrouter.stats()
+        self.assertEqual(int(stats['asynclog_requests']), 0)
+        self.assertEqual(int(stats['asynclog_dropped_requests']), 1)
+
+    def test_failed_write(self):
+        mcrouter = self.add_mcrouter(self.config, extra_args=self.extra_args)
+        # a file in place of the spool dir fails openFile() even for root
+        spool_dir = mcrouter.get_async_spool_dir()
+        shutil.rmtree(spool_dir)
+        open(spool_dir, 'w').close()
+
+        self.assertIsNone(mcrouter.delete('key'))
 
-        self.assertGreater(os.path.getmtime(file_stat), now)
-        self.assertGreater(os.path.getmtime(file_startup_options), now)
-        self.assertGreater(os.path.getmtime(file_config_sources), now)
+        stats = mcrouter.stats()
+        self.assertEqual(int(stats['asynclog_requests']), 0)
+        self.assertEqual(int(stats['asynclog_batches']), 0)
+        self.assertEqual(int(stats['asynclog_dropped_requests']), 1)
@@ -40,6 +40,15 @@ class TestBigvalue(McrouterTestCase):
         # if the test fails
         self.assertTrue(mcrouter.get('key') == value)
 
+    def test_bigvalue_raw(self):
+        mcrouter = self.get_mcrouter()
+        value = b'abc' * (7 * 1000 * 1000 + 5)
+        self.assertTrue(mcrouter.set_raw('key', memoryview(value)))
+        reply = mcrouter.get_raw('key')
+        self.assertTrue(isinstance(reply, memoryview))
+        self.assertEqual(len(reply), len(value))
+        self.assertTrue(reply == value)
+
     def test_bigvalue_leases(self):
         mcrouter = self.get_mcrouter()
         value = 'abc' * (7 * 1000 * 1000 + 5)
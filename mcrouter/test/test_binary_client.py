@@ -0,0 +1,111 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from mcrouter.test.MCProcess import MockMemcached
+from mcrouter.test.McrouterTestCase import McrouterTestCase
+from mcrouter.test.binary_client import CaretClient
+from mcrouter.test.binary_client import UmbrellaClient
+
+
+class TestCaretClient(McrouterTestCase):
+    config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
+    extra_args = []
+    client_class = CaretClient
+
+    def setUp(self):
+        self.mc = self.add_server(MockMemcached(), logical_port=12345)
+        self.mcrouter = self.add_mcrouter(self.config, None, self.extra_args)
+        self.client = self.client_class(self.mcrouter.port)
+
+    def tearDown(self):
+        self.client.disconnect()
+        super(TestCaretClient, self).tearDown()
+
+    def test_get_set_delete(self):
+        self.assertIsNone(self.client.get('binary:key'))
+        self.assertTrue(self.client.set('binary:key', 'value'))
+        self.assertEqual(self.client.get('binary:key'), 'value')
+        self.assertEqual(self.mcrouter.get('binary:key'), 'value')
+        self.assertEqual(self.mc.get('binary:key'), 'value')
+        self.assertTrue(self.client.delete('binary:key'))
+        self.assertFalse(self.client.delete('binary:key'))
+        self.assertIsNone(self.client.get('binary:key'))
+
+    def test_multiget(self):
+        self.mcrouter.set('binary:a', 'A')
+        self.mcrouter.set('binary:b', 'B')
+        self.assertEqual(
+            self.client.get(['binary:a', 'binary:b', 'binary:c']),
+            {'binary:a': 'A', 'binary:b': 'B', 'binary:c': None})
+
+    def test_flags(self):
+        self.assertTrue(self.client.set('binary:key', 'value', flags=42))
+        res = self.client.get('binary:key', return_all_info=True)
+        self.assertEqual(res['flags'], 42)
+        self.assertEqual(res['value'], 'value')
+
+    def test_add_replace(self):
+        self.assertFalse(self.client.replace('binary:key', 'value'))
+        self.assertTrue(self.client.add('binary:key', 'value'))
+        self.assertFalse(self.client.add('binary:key', 'value2'))
+        self.assertTrue(self.client.replace('binary:key', 'value2'))
+        self.assertEqual(self.client.get('binary:key'), 'value2')
+
+    def test_arith(self):
+        self.assertIsNone(self.client.incr('binary:counter'))
+        self.client.set('binary:counter', '10')
+        self.assertEqual(self.client.incr('binary:counter', 5), 15)
+        self.assertEqual(self.client.decr('binary:counter'), 14)
+        self.assertEqual(self.mcrouter.get('binary:counter'), '14')
+
+    def test_touch_append_prepend(self):
+        self.assertEqual(self.client.touch('binary:key', 100), 'NOT_FOUND')
+        self.assertEqual(self.client.append('binary:key', 'x'), 'NOT_STORED')
+        self.client.set('binary:key', 'value')
+        self.assertEqual(self.client.touch('binary:key', 100), 'TOUCHED')
+        self.assertEqual(self.client.append('binary:key', 'abc'), 'STORED')
+        self.assertEqual(self.client.prepend('binary:key', 'xyz'), 'STORED')
+        self.assertEqual(self.client.get('binary:key'), 'xyzvalueabc')
+
+    def test_gets_cas(self):
+        self.client.set('binary:key', 'value')
+        res = self.client.gets('binary:key')
+        self.assertEqual(res['value'], 'value')
+        self.assertTrue(self.client.cas('binary:key', 'value2', res['cas']))
+        self.assertFalse(self.client.cas('binary:key', 'value3', res['cas']))
+        self.assertEqual(self.client.get('binary:key'), 'value2')
+
+    def test_lease_get_set(self):
+        res = self.client.leaseGet('binary:key')
+        self.assertIsNotNone(res['token'])
+        res['value'] = 'value'
+        self.assertTrue(self.client.leaseSet('binary:key', res))
+        res = self.client.leaseGet('binary:key')
+        self.assertEqual(res, {'value': 'value', 'token': None})
+
+    def test_big_value(self):
+        value = 'x' * (512 * 1024)
+        self.assertTrue(self.client.set('binary:big', value))
+        self.assertEqual(self.client.get('binary:big'), value)
+
+    def test_send_batch(self):
+        requests = [('set', {'key': 'binary:%d' % i, 'value': str(i)})
+                    for i in range(50)]
+        requests += [('get', {'key': 'binary:%d' % i}) for i in range(50)]
+        replies = self.client.send_batch(requests)
+        self.assertEqual(len(replies), 100)
+        for i in range(50):
+            self.assertEqual(replies[i]['result'], 'stored')
+            self.assertEqual(replies[50 + i]['result'], 'found')
+            self.assertEqual(replies[50 + i]['value'], str(i).encode())
+
+
+class TestUmbrellaClient(TestCaretClient):
+    client_class = UmbrellaClient
@@ -15,6 +15,7 @@ import time
 from string import Template
 import threading
 import Queue
+import json
 
 class CarbonLookasideTmpConfig():
     routeConfigFile = """
@@ -34,6 +35,7 @@ class CarbonLookasideTmpConfig():
       "initial_wait_interval_ms": $TEMPLATE_LEASE_WAIT_INTERVAL,
       "num_retries": $TEMPLATE_LEASE_NUM_RETRIES,
     },
+    $TEMPLATE_L0_CACHE
     "child": [
       "PoolRoute|A"
     ]
@@ -99,7 +101,8 @@ class CarbonLookasideTmpConfig():
             os.remove(self.tmpFlavorFile)
 
     def __init__(self, prefix, ttl, port, lease_enable='false', lease_interval=0,
-            lease_num_retries=0, latency_before=0, latency_after=0):
+            lease_num_retries=0, latency_before=0, latency_after=0,
+            l0_cache=None):
         # Client file configuration
         with tempfile.NamedTemporaryFile(mode='w', delete=False) as self.tmpClientFile:
             clientDict = {'TEMPLATE_PORT': port}
@@ -121,7 +124,11 @@ class CarbonLookasideTmpConfig():
                          'TEMPLATE_LEASE_WAIT_INTERVAL': lease_interval,
                          'TEMPLATE_LEASE_NUM_RETRIES': lease_num_retries,
                          'TEMPLATE_BEFORE_LATENCY': latency_before,
-                         'TEMPLATE_AFTER_LATENCY': latency_after}
+                         'TEMPLATE_AFTER_LATENCY': latency_after,
+                         'TEMPLATE_L0_CACHE': ''}
+            if l0_cache:
+                routeDict['TEMPLATE_L0_CACHE'] = \
+                    '"l0_cache": {},'.format(json.dumps(l0_cache))
             if latency_before or latency_after:
                 src = Template(self.routeLatencyConfigFile)
             else:
@@ -391,3 +398,81 @@ class TestCarbonLookasideRouteLeasesHotMiss(McrouterTestCase):
         stats = self.mc.stats()
         self.assertTrue(stats["cmd_lease_set"] == '1')
         self.assertTrue(stats["lease_tokens_in_use"] == '0')
+
+
+class CarbonLookasideL0CacheTestBase(McrouterTestCase):
+    prefix = "CarbonLookaside"
+    ttl = 120
+    l0_cache = None
+    extra_args = []
+
+    def setUp(self):
+        # Pool A and the memcache lookaside are both self.mc
+        self.mc = self.add_server(self.make_memcached())
+        self.tmpConfig = CarbonLookasideTmpConfig(self.prefix, self.ttl,
+                                                  self.mc.getport(),
+                                                  l0_cache=self.l0_cache)
+        self.config = self.tmpConfig.getFileName()
+        self.mcrouter = self.add_mcrouter(
+            self.config,
+            extra_args=self.extra_args)
+
+    def tearDown(self):
+        self.tmpConfig.cleanup()
+
+    def mc_gets(self):
+        return int(self.mc.stats()['cmd_get'])
+
+    def l0_stats(self):
+        stats = self.mcrouter.stats('ods')
+        return dict((name, int(stats['carbon_lookaside_l0_{}_count'.format(
+            name)])) for name in ('hit', 'miss', 'expired', 'eviction'))
+
+
+class TestCarbonLookasideRouteL0Cache(CarbonLookasideL0CacheTestBase):
+    l0_cache = {'max_items': 3, 'ttl_ms': 60000}
+
+    def test_carbonlookaside_l0_hot_keys(self):
+        key = 'someprefix:hot:|#|id=123'
+        self.assertTrue(self.mc.set(key, 'value'))
+        # L0 miss, memcache lookaside miss, then pool A
+        self.assertEqual(self.mcrouter.get(key), 'value')
+        self.assertEqual(self.mc_gets(), 2)
+        # The hot key is answered in process, memcache is not touched
+        for _ in range(10):
+            self.assertEqual(self.mcrouter.get(key), 'value')
+        self.assertEqual(self.mc_gets(), 2)
+        self.assertEqual(self.l0_stats(), {'hit': 10, 'miss': 1,
+                                           'expired': 0, 'eviction': 0})
+
+    def test_carbonlookaside_l0_eviction(self):
+        keys = ['someprefix:{}:|#|id=123'.format(i) for i in range(4)]
+        for key in keys:
+            self.assertTrue(self.mc.set(key, 'value'))
+            self.assertEqual(self.mcrouter.get(key), 'value')
+        self.assertEqual(self.l0_stats()['eviction'], 1)
+        gets = self.mc_gets()
+        # The three most recently used keys are still in process
+        for key in keys[1:]:
+            self.assertEqual(self.mcrouter.get(key), 'value')
+        self.assertEqual(self.mc_gets(), gets)
+        # The evicted one comes from the memcache lookaside, not pool A
+        self.assertEqual(self.mcrouter.get(keys[0]), 'value')
+        self.assertEqual(self.mc_gets(), gets + 1)
+
+
+class TestCarbonLookasideRouteL0CacheExpiry(CarbonLookasideL0CacheTestBase):
+    l0_cache = {'max_items': 100, 'ttl_ms': 200}
+
+    def test_carbonlookaside_l0_expiry(self):
+        key = 'someprefix:expiring:|#|id=123'
+        self.assertTrue(self.mc.set(key, 'value'))
+        self.assertEqual(self.mcrouter.get(key), 'value')
+        self.assertEqual(self.mcrouter.get(key), 'value')
+        self.assertEqual(self.mc_gets(), 2)
+        time.sleep(0.3)
+        # Expired in process, still in the memcache lookaside
+        self.assertEqual(self.mcrouter.get(key), 'value')
+        self.assertEqual(self.mc_gets(), 3)
+        self.assertEqual(self.l0_stats(), {'hit': 1, 'miss': 2,
+                                           'expired': 1, 'eviction': 0})
@@ -0,0 +1,126 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from threading import Thread
+import time
+
+from mcrouter.test.MCProcess import McrouterClientPool, MockMemcached
+from mcrouter.test.McrouterTestCase import McrouterTestCase
+
+
+class TestClientPool(McrouterTestCase):
+    config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
+    extra_args = []
+
+    def setUp(self):
+        self.add_server(MockMemcached(), logical_port=12345)
+        self.mcrouter = self.add_mcrouter(self.config, None, self.extra_args)
+
+    def test_pool_reuses_connections(self):
+        pool = McrouterClientPool(self.mcrouter.port, max_size=4)
+        # asserting in a worker would only end that thread, so the workers
+        # record what they saw and the test checks it once they are done
+        results = []
+        errors = []
+
+        def worker(i):
+            try:
+                for j in range(20):
+                    with pool.connection() as mc:
+                        key = 'pool:{}:{}'.format(i, j)
+                        stored = bool(mc.set(key, str(j)))
+                        results.append((key, stored, mc.get(key), str(j)))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [Thread(target=worker, args=(i,)) for i in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), 16 * 20)
+        for key, stored, value, expected in results:
+            self.assertTrue(stored, key)
+            self.assertEqual(value, expected, key)
+
+        stats = pool.stats()
+        self.assertLessEqual(stats['created'], 4)
+        self.assertEqual(stats['size'], stats['idle'])
+        self.assertEqual(
+            sum(c['checkouts'] for c in stats['connections']), 16 * 20)
+        pool.close()
+        self.assertEqual(pool.stats()['size'], 0)
+
+    def test_pool_replaces_broken_connections(self):
+        pool = McrouterClientPool(self.mcrouter.port, max_size=1)
+        with self.assertRaises(ValueError):
+            with pool.connection() as mc:
+                raise ValueError('broken')
+        self.assertEqual(pool.stats()['errors'], 1)
+        self.assertEqual(pool.stats()['size'], 0)
+
+        with pool.connection() as mc:
+            self.assertTrue(mc.set('pool:key', 'value'))
+        self.assertEqual(pool.stats()['created'], 2)
+        pool.close()
+
+    def test_pool_evicts_idle_connections(self):
+        pool = McrouterClientPool(self.mcrouter.port, max_size=2,
+                                  max_idle_time=0.1)
+        a = pool.checkout()
+        b = pool.checkout()
+        with self.assertRaises(Exception):
+            pool.checkout(timeout=0.1)
+        pool.checkin(a)
+        pool.checkin(b)
+        time.sleep(0.2)
+        pool.evict_idle()
+        stats = pool.stats()
+        self.assertEqual(stats['evicted'], 2)
+        self.assertEqual(stats['size'], 0)
+
+    def test_pool_failed_reconnect_frees_slot(self):
+        pool = McrouterClientPool(self.mcrouter.port, max_size=1)
+        client = pool.checkout()
+        pool.checkin(client)
+
+        # the idle connection looks readable and can't be reopened
+        def reconnect():
+            raise IOError('reconnect failed')
+        client.reconnect = reconnect
+        client.reader.buffered = lambda: 1
+        with self.assertRaises(IOError):
+            pool.checkout()
+        self.assertEqual(pool.stats()['size'], 0)
+
+        # the slot is available again
+        with pool.connection(timeout=1) as mc:
+            self.assertTrue(mc.set('pool:key', 'value'))
+        pool.close()
+
+    def test_pool_stats_cover_checked_out_connections(self):
+        pool = McrouterClientPool(self.mcrouter.port, max_size=2)
+        a = pool.checkout()
+        b = pool.checkout()
+        pool.checkin(b)
+        stats = pool.stats()
+        self.assertEqual(stats['size'], 2)
+        self.assertEqual(stats['idle'], 1)
+        self.assertEqual(
+            sorted(c['checked_out'] for c in stats['connections']),
+            [False, True])
+        busy = [c for c in stats['connections'] if c['checked_out']][0]
+        self.assertIsNone(busy['idle_time'])
+        pool.checkin(a)
+        self.assertFalse(
+            any(c['checked_out'] for c in pool.stats()['connections']))
+        pool.close()
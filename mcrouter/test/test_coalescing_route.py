@@ -0,0 +1,109 @@
+# Copyright (c) 2018-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import threading
+
+from mcrouter.test.MCProcess import McrouterClients
+from mcrouter.test.McrouterTestCase import McrouterTestCase
+from mcrouter.test.mock_servers import MemcachedServer
+
+
+class CoalescingRouteTestBase(McrouterTestCase):
+    config = './mcrouter/test/test_coalescing.json'
+    # requests are only merged within a proxy
+    extra_args = ['--num-proxies', '1']
+    max_waiters = 1000
+    num_clients = 8
+
+    def setUp(self):
+        self.server = self.add_server(MemcachedServer(), logical_port=12345)
+        self.mcrouter = self.add_mcrouter(
+            self.config, extra_args=self.extra_args,
+            replace_map={'MAX_WAITERS': self.max_waiters})
+        self.clients = McrouterClients(self.mcrouter.getport(),
+                                       self.num_clients)
+
+    def slow_server(self):
+        """Keeps gets in flight long enough for all clients to send theirs"""
+        self.server.reset_counters()
+        self.server.set_fault_profile(
+            command_latency={'get': 'fixed:0.5', 'lease-get': 'fixed:0.5'})
+
+    def concurrent(self, method, key):
+        """Replies to the same request sent at once by every client"""
+        replies = [None] * self.num_clients
+
+        def send(i):
+            replies[i] = getattr(self.clients[i], method)(key)
+
+        threads = [threading.Thread(target=send, args=(i,))
+                   for i in range(self.num_clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return replies
+
+    def ods_stat(self, name):
+        return int(self.mcrouter.stats('ods')[name])
+
+    def tearDown(self):
+        self.clients.close()
+        super(CoalescingRouteTestBase, self).tearDown()
+
+
+class TestCoalescingRoute(CoalescingRouteTestBase):
+    def test_coalesced_get(self):
+        self.assertTrue(self.mcrouter.set('hot', 'value'))
+        self.slow_server()
+        replies = self.concurrent('get', 'hot')
+        self.assertEqual(replies, ['value'] * self.num_clients)
+        self.assertEqual(self.server.get_counters()['get'], 1)
+        self.assertEqual(self.ods_stat('coalescing_route_coalesced_count'),
+                         self.num_clients - 1)
+
+    def test_coalesced_miss(self):
+        self.slow_server()
+        replies = self.concurrent('get', 'missing')
+        self.assertEqual(replies, [None] * self.num_clients)
+        self.assertEqual(self.server.get_counters()['get'], 1)
+
+    def test_coalesced_lease_get(self):
+        self.slow_server()
+        replies = self.concurrent('leaseGet', 'missing')
+        self.assertEqual(self.server.get_counters()['lease-get'], 1)
+        # Only one client gets the lease, the others a hot miss
+        tokens = sorted(reply['token'] for reply in replies)
+        self.assertEqual(tokens[:-1], [1] * (self.num_clients - 1))
+        self.assertGreater(tokens[-1], 1)
+
+    def test_sequential_gets_not_merged(self):
+        self.assertTrue(self.mcrouter.set('key', 'value'))
+        self.server.reset_counters()
+        for i in range(3):
+            self.assertEqual(self.clients[0].get('key'), 'value')
+        self.assertEqual(self.server.get_counters()['get'], 3)
+
+
+class TestCoalescingRouteMaxWaiters(CoalescingRouteTestBase):
+    max_waiters = 2
+    num_clients = 5
+
+    def test_coalesced_get(self):
+        self.assertTrue(self.mcrouter.set('hot', 'value'))
+        self.slow_server()
+        replies = self.concurrent('get', 'hot')
+        self.assertEqual(replies, ['value'] * self.num_clients)
+        # One request in flight with two waiters, the other two sent as is
+        self.assertEqual(self.server.get_counters()['get'], 3)
+        self.assertEqual(
+            self.ods_stat('coalescing_route_coalesced_count'), 2)
+        self.assertEqual(
+            self.ods_stat('coalescing_route_waiters_limited_count'), 2)
@@ -8,11 +8,15 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
-from mcrouter.test.MCProcess import Memcached
+from mcrouter.test.MCProcess import BaseDirectory, Memcached
 from mcrouter.test.McrouterTestCase import McrouterTestCase
+from mcrouter.test.debug_fifo_filter import (FILTER_FILE, clear_filter,
+                                             make_filter, write_filter)
 
+import errno
+import json
 import os
-import time
+import stat
 
 class TestDebugFifos(McrouterTestCase):
     config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
@@ -23,8 +27,13 @@ class TestDebugFifos(McrouterTestCase):
         self.mcrouter = self.add_mcrouter(self.config,
                                           extra_args=self.extra_args)
 
+    def list_fifos(self):
+        root = self.mcrouter.debug_fifo_root
+        return [f for f in os.listdir(root)
+                if stat.S_ISFIFO(os.stat(os.path.join(root, f)).st_mode)]
+
     def get_fifo(self, substr):
-        fifos = os.listdir(self.mcrouter.debug_fifo_root)
+        fifos = self.list_fifos()
         self.assertEqual(2, len(fifos))
 
         fifos = [f for f in fifos if substr in f]
@@ -38,14 +47,15 @@ class TestDebugFifos(McrouterTestCase):
         self.assertEqual('abc123', self.mcrouter.get(key))
 
         # Wait mcrouter create the fifos.
-        time.sleep(2)
+        self.wait_for(lambda: len(self.list_fifos()) == 2)
 
         # Connects to the client and server fifos
         cfd = os.open(self.get_fifo('client'), os.O_RDONLY | os.O_NONBLOCK)
         sfd = os.open(self.get_fifo('server'), os.O_RDONLY | os.O_NONBLOCK)
 
         # Wait mcrouter detects new fifo connection
-        time.sleep(2)
+        self.wait_for_fifo(self.mcrouter, self.mcrouter.debug_fifo_root,
+                           count=2)
 
         # Send requests
         self.mcrouter.get(key)
@@ -62,3 +72,98 @@ class TestDebugFifos(McrouterTestCase):
 
         os.close(cfd)
         os.close(sfd)
+
+    def read_fifo(self, fd):
+        data = b''
+        while True:
+            try:
+                buf = os.read(fd, 65536)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    return data
+                raise
+            if not buf:
+                return data
+            data += buf
+
+    def test_fifo_filter(self):
+        self.mcrouter.set_debug_fifo_filter(key_prefix='keep.', ops=['get'])
+        self.assertTrue(self.mcrouter.set('keep.0', 'abc'))
+        self.wait_for(lambda: len(self.list_fifos()) == 2)
+        cfd = os.open(self.get_fifo('client'), os.O_RDONLY | os.O_NONBLOCK)
+        self.wait_for_fifo(self.mcrouter, self.mcrouter.debug_fifo_root)
+
+        # mcrouter reloads the filter about once a second
+        attempt = [0]
+
+        def mirrored(keys):
+            attempt[0] += 1
+            for key in ('keep', 'skip'):
+                self.mcrouter.get('{}.{}'.format(key, attempt[0]))
+            data = self.read_fifo(cfd)
+            return [key for key in ('keep', 'skip')
+                    if '{}.{}'.format(key, attempt[0]).encode() in data] \
+                == keys
+        self.wait_for(lambda: mirrored(['keep']))
+
+        self.assertTrue(self.mcrouter.set('keep.x', 'abc'))
+        self.mcrouter.get('keep.x')
+        self.mcrouter.get('skip.x')
+        data = self.read_fifo(cfd)
+        self.assertIn(b'get keep.x', data)
+        self.assertNotIn(b'set keep.x', data)
+        self.assertNotIn(b'skip.x', data)
+
+        self.mcrouter.clear_debug_fifo_filter()
+        self.wait_for(lambda: mirrored(['keep', 'skip']))
+        os.close(cfd)
+
+    def test_fifo_filter_size_ascii_replies(self):
+        # a reply the server may send in several chunks, but that fits in
+        # the fifo's pipe buffer
+        value = 'v' * 20000
+        self.assertTrue(self.mcrouter.set('big', value))
+        self.mcrouter.set_debug_fifo_filter(direction='received',
+                                            min_message_size=10000)
+        self.wait_for(lambda: len(self.list_fifos()) == 2)
+        cfd = os.open(self.get_fifo('client'), os.O_RDONLY | os.O_NONBLOCK)
+        self.wait_for_fifo(self.mcrouter, self.mcrouter.debug_fifo_root)
+
+        # ascii replies are mirrored as they are read, whatever their
+        # size, rather than judged by their first chunk
+        def mirrored():
+            self.assertEqual(self.mcrouter.get('big'), value)
+            data = self.read_fifo(cfd)
+            return b'VALUE big' in data and b'get big' not in data and \
+                data.count(b'v') >= len(value)
+        self.wait_for(mirrored)
+        os.close(cfd)
+
+
+class TestDebugFifoFilter(McrouterTestCase):
+    def test_make_filter(self):
+        self.assertEqual(make_filter(), {})
+        self.assertEqual(
+            make_filter(key_prefix='a:', key_regex='a:[0-9]+',
+                        ops=['get', 'lease-get'], direction='received',
+                        min_message_size=100, sample_rate=0.5),
+            {'key_prefix': 'a:', 'key_regex': 'a:[0-9]+',
+             'type_ids': [1, 2, 7, 8], 'direction': 'received',
+             'min_message_size': 100, 'sample_rate': 0.5})
+        self.assertEqual(make_filter(ops=[41])['type_ids'], [41, 42])
+        with self.assertRaises(ValueError):
+            make_filter(direction='both')
+        with self.assertRaises(ValueError):
+            make_filter(sample_rate=2)
+
+    def test_write_and_clear(self):
+        base_dir = BaseDirectory('fifos')
+        root = base_dir.path
+        path = write_filter(root, make_filter(ops=['set']))
+        self.assertEqual(path, os.path.join(root, FILTER_FILE))
+        with open(path) as f:
+            self.assertEqual(json.load(f), {'type_ids': [3, 4]})
+        self.assertEqual(os.listdir(root), [FILTER_FILE])
+        clear_filter(root)
+        clear_filter(root)
+        self.assertEqual(os.listdir(root), [])
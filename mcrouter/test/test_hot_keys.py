@@ -0,0 +1,93 @@
+# Copyright (c) 2018-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from mcrouter.test.McrouterTestCase import McrouterTestCase
+from mcrouter.test.hot_keys import parse_hot_keys, top_keys
+from mcrouter.test.mock_servers import MemcachedServer
+from mcrouter.test.stats_root import StatsRootReader
+
+
+class TestHotKeys(McrouterTestCase):
+    config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
+    extra_args = ['--hot-keys-capacity', '4',
+                  '--stats-logging-interval', '100']
+    stat_prefix = 'libmcrouter.mcrouter.0'
+
+    def setUp(self):
+        self.add_server(MemcachedServer(), logical_port=12345)
+        self.mcrouter = self.add_mcrouter(self.config,
+                                          extra_args=self.extra_args)
+
+    def send_traffic(self):
+        self.assertTrue(self.mcrouter.set('hot', 'v' * 1000))
+        self.assertTrue(self.mcrouter.set('big', 'v' * 10000))
+        for i in range(20):
+            self.assertEqual(self.mcrouter.get('hot'), 'v' * 1000)
+        for i in range(3):
+            self.assertEqual(len(self.mcrouter.get('big')), 10000)
+        # more distinct keys than the sketch can monitor
+        for i in range(6):
+            self.assertIsNone(self.mcrouter.get('cold:{}'.format(i)))
+
+    def check_hot_keys(self, hot_keys):
+        self.assertEqual(hot_keys['capacity'], 4)
+        self.assertEqual(hot_keys['requests']['total'], 31)
+        requests = hot_keys['requests']['top']
+        self.assertEqual(len(requests), 4)
+        self.assertEqual(requests[0], {'key': 'hot', 'count': 21,
+                                       'error': 0})
+        self.assertEqual(requests[1], {'key': 'big', 'count': 4,
+                                       'error': 0})
+
+        self.assertEqual(hot_keys['bytes']['total'], 50000)
+        self.assertEqual(top_keys(hot_keys, 'bytes'),
+                         [('big', 30000), ('hot', 20000)])
+
+    def test_stats_hotkeys(self):
+        self.send_traffic()
+        self.check_hot_keys(self.mcrouter.hot_keys())
+
+        stats = self.mcrouter.stats('hotkeys')
+        self.assertEqual(stats['requests.0'], '21 0 hot')
+        self.assertEqual(parse_hot_keys(stats),
+                         self.mcrouter.hot_keys())
+
+    def test_stats_root(self):
+        self.send_traffic()
+        reader = StatsRootReader(self.mcrouter.stats_dir)
+
+        def logged():
+            reader.poll()
+            router = reader.routers.get(self.stat_prefix)
+            try:
+                hot_keys = router.hot_keys()
+            except (AttributeError, IOError, ValueError):
+                return False
+            return hot_keys['requests']['total'] == 31
+        self.wait_for(logged)
+        self.check_hot_keys(reader.router(self.stat_prefix).hot_keys())
+
+
+class TestHotKeysDisabled(McrouterTestCase):
+    config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
+    extra_args = ['--hot-keys-capacity', '0']
+
+    def setUp(self):
+        self.add_server(MemcachedServer(), logical_port=12345)
+        self.mcrouter = self.add_mcrouter(self.config,
+                                          extra_args=self.extra_args)
+
+    def test_disabled(self):
+        self.assertIsNone(self.mcrouter.get('key'))
+        self.assertEqual(self.mcrouter.hot_keys(), {
+            'capacity': 0,
+            'requests': {'total': 0, 'top': []},
+            'bytes': {'total': 0, 'top': []},
+        })
@@ -0,0 +1,101 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import json
+import threading
+import unittest
+
+from mcrouter.test.MCProcess import McrouterClient, MockMemcached
+from mcrouter.test.McrouterTestCase import McrouterTestCase
+from mcrouter.test.latency import LatencyHistogram, LatencyRecorder
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    def test_histogram_precision(self):
+        hist = LatencyHistogram(significant_figures=3)
+        for us in range(1, 100001):
+            hist.record(us / 1e6)
+        self.assertEqual(hist.count, 100000)
+        self.assertEqual(hist.min, 1)
+        self.assertEqual(hist.max, 100000)
+        for p in (50, 99, 99.9):
+            expected = p / 100.0 * 0.1
+            self.assertAlmostEqual(hist.percentile(p), expected,
+                                   delta=expected * 1e-3)
+        self.assertEqual(hist.percentile(100), 0.1)
+        self.assertIsNone(LatencyHistogram().percentile(50))
+
+    def test_histogram_merge(self):
+        a = LatencyHistogram()
+        b = LatencyHistogram()
+        for i in range(100):
+            a.record(0.001)
+            b.record(0.010)
+        merged = a + b
+        self.assertEqual(merged.count, 200)
+        self.assertAlmostEqual(merged.percentile(50), 0.001, delta=1e-5)
+        self.assertAlmostEqual(merged.percentile(99), 0.010, delta=1e-4)
+        self.assertEqual(a.count, 100)
+
+        restored = LatencyHistogram.from_dict(
+            json.loads(json.dumps(merged.to_dict())))
+        self.assertEqual(restored.count, merged.count)
+        self.assertEqual(restored.percentile(99), merged.percentile(99))
+        self.assertRaises(ValueError, a.merge, LatencyHistogram(3))
+
+
+class TestRecordLatency(McrouterTestCase):
+    config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
+    extra_args = []
+
+    def setUp(self):
+        self.add_server(MockMemcached(), logical_port=12345)
+        self.mcrouter = self.add_mcrouter(self.config, None, self.extra_args)
+
+    def test_record_latency(self):
+        latency = self.mcrouter.record_latency()
+        self.assertTrue(self.mcrouter.set('key', 'value'))
+        self.assertEqual(self.mcrouter.get('key'), 'value')
+        self.assertEqual(self.mcrouter.get(['key', 'key2']),
+                         {'key': 'value', 'key2': None})
+        self.mcrouter.set('key', 'value', noreply=True)
+        self.assertIsNone(self.mcrouter.incr('counter'))
+
+        self.assertEqual(latency.ops(), ['get', 'incr', 'set'])
+        self.assertEqual(latency.histogram('get').count, 2)
+        # noreply requests have no reply to time
+        self.assertEqual(latency.histogram('set').count, 1)
+        first_byte = latency.histogram('get', 'first_byte')
+        complete = latency.histogram('get', 'complete')
+        self.assertEqual(first_byte.count, 2)
+        self.assertLessEqual(first_byte.min, complete.max)
+
+        report = latency.to_dict()
+        self.assertEqual(report['get']['complete']['count'], 2)
+        self.assertIn('p99_us', report['get']['complete'])
+
+    def test_record_latency_threads(self):
+        recorder = LatencyRecorder()
+
+        def run(n):
+            client = McrouterClient(self.mcrouter.port)
+            client.connect()
+            client.record_latency(recorder)
+            for i in range(n):
+                client.get('key{}'.format(i))
+            client.disconnect()
+
+        threads = [threading.Thread(target=run, args=(50,))
+                   for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(recorder.histogram('get').count, 200)
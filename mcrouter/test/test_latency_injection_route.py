@@ -45,3 +45,16 @@ class TestLatencyInjectionRoute(McrouterTestCase):
 
         duration = t_end - t_start
         self.assertGreaterEqual(duration.total_seconds(), 1)
+
+    def test_latency_before_recorded(self):
+        self.mc.set("key3", "value3")
+
+        latency = self.mcrouter_latency_before.record_latency()
+        self.assertEqual("value3", self.mcrouter_latency_before.get("key3"))
+        self.assertIsNone(self.mcrouter_latency_before.get("key4"))
+
+        hist = latency.histogram('get', 'first_byte')
+        self.assertEqual(hist.count, 2)
+        self.assertGreaterEqual(hist.percentile(50), 2)
+        self.assertGreaterEqual(latency.histogram('get').percentile(100),
+                                hist.percentile(100))
@@ -0,0 +1,60 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import random
+import unittest
+
+from mcrouter.test.MCProcess import MockMemcached
+from mcrouter.test.McrouterTestCase import McrouterTestCase
+from mcrouter.test.loadtest import (
+    KeyDistribution,
+    SizeDistribution,
+    Workload,
+    percentile,
+    run_load,
+)
+
+
+class TestDistributions(unittest.TestCase):
+    def test_distributions(self):
+        rng = random.Random(0)
+        self.assertEqual(SizeDistribution('fixed:10').sample(rng), 10)
+        for i in range(100):
+            self.assertTrue(
+                10 <= SizeDistribution('uniform:10:20').sample(rng) <= 20)
+            self.assertTrue(
+                50 <= SizeDistribution('pareto:50:1.5:100').sample(rng) <= 100)
+            self.assertIn(KeyDistribution('zipf:1', 10).sample(rng), range(10))
+        self.assertRaises(ValueError, SizeDistribution, 'normal:10')
+        self.assertRaises(ValueError, KeyDistribution, 'zipf', 10)
+        self.assertEqual(percentile([1, 2, 3, 4], 50), 2)
+        self.assertEqual(percentile([1, 2, 3, 4], 99.9), 4)
+
+
+class TestLoadtest(McrouterTestCase):
+    config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
+    extra_args = []
+
+    def setUp(self):
+        self.mc = self.add_server(MockMemcached(), logical_port=12345)
+        self.mcrouter = self.add_mcrouter(self.config, None, self.extra_args)
+
+    def test_run_load(self):
+        workload = Workload(get_ratio=0.5, key_space=100,
+                            value_size='uniform:10:1000')
+        result = run_load(self.mcrouter.getport(), qps=500, duration=1,
+                          workload=workload, connections=4, warmup=0.2,
+                          pid=self.mcrouter.proc.pid)
+        self.assertEqual(result['errors'], 0)
+        self.assertGreater(result['requests'], 400)
+        self.assertGreater(result['hits'] + result['misses'], 0)
+        latency = result['latency_us']
+        self.assertTrue(latency['p50'] <= latency['p99'] <= latency['p999'])
+        self.assertIsNotNone(result['router_cpu'])
@@ -8,10 +8,12 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
-import time
+import json
+import os
 
 from mcrouter.test.MCProcess import BaseDirectory, Memcached, Mcpiper
 from mcrouter.test.McrouterTestCase import McrouterTestCase
+from mcrouter.test.mcpiper_records import McpiperRecords
 
 class TestMcpiper(McrouterTestCase):
     mcrouter_ascii_config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
@@ -39,8 +41,8 @@ class TestMcpiper(McrouterTestCase):
             self.mcrouter_caret_config,
             extra_args=self.mcrouter_caret_extra_args)
 
-    def get_mcpiper(self, mcrouter, raw):
-        args = []
+    def get_mcpiper(self, mcrouter, raw, extra_args=None):
+        args = list(extra_args or [])
         if raw:
             args.append('--raw')
         mcpiper = Mcpiper(mcrouter.debug_fifo_root, args)
@@ -48,7 +50,7 @@ class TestMcpiper(McrouterTestCase):
         # Make sure mcrouter creates fifos and start replicating data to them.
         mcrouter.set('abc', '123')
         mcrouter.delete('abc')
-        time.sleep(3)
+        self.wait_for_fifo(mcrouter, mcrouter.debug_fifo_root, count=2)
 
         return mcpiper
 
@@ -62,18 +64,13 @@ class TestMcpiper(McrouterTestCase):
         self.assertFalse(mcrouter.get('key_miss'))
 
         # wait for data to arrive in mcpiper
-        time.sleep(2)
-
-        self.assertTrue(mcpiper.contains('value_hit'))
         if raw:
-            self.assertTrue(mcpiper.contains(special_symbol))
-            self.assertTrue(mcpiper.contains('key_miss'))
-            self.assertTrue(mcpiper.contains('key_hit'))
+            self.wait_for_log_line(mcpiper.stdout, 'value_hit',
+                                   special_symbol, 'key_miss', 'key_hit')
         else:
-            self.assertTrue(mcpiper.contains('mc_res_found'))
-            self.assertTrue(mcpiper.contains('mc_res_notfound'))
-            self.assertTrue(mcpiper.contains('get key_miss'))
-            self.assertTrue(mcpiper.contains('get key_hit'))
+            self.wait_for_log_line(mcpiper.stdout, 'value_hit',
+                                   'mc_res_found', 'mc_res_notfound',
+                                   'get key_miss', 'get key_hit')
 
     def do_set_test(self, mcrouter, raw, special_symbol):
 
@@ -82,13 +79,11 @@ class TestMcpiper(McrouterTestCase):
         self.assertTrue(mcrouter.set('key', 'value2'))
 
         # wait for data to arrive in mcpiper
-        time.sleep(2)
-        self.assertTrue(mcpiper.contains('value2'))
         if raw:
-            self.assertTrue(mcpiper.contains(special_symbol))
-            self.assertTrue(mcpiper.contains('key'))
+            self.wait_for_log_line(mcpiper.stdout, 'value2', special_symbol,
+                                   'key')
         else:
-            self.assertTrue(mcpiper.contains('set key'))
+            self.wait_for_log_line(mcpiper.stdout, 'value2', 'set key')
 
     def do_delete_test(self, mcrouter, raw, special_symbol):
         # Prepare data
@@ -100,17 +95,48 @@ class TestMcpiper(McrouterTestCase):
         self.assertFalse(mcrouter.delete('key_not_found'))
 
         # wait for data to arrive in mcpiper
-        time.sleep(2)
-
         if raw:
-            self.assertTrue(mcpiper.contains(special_symbol))
-            self.assertTrue(mcpiper.contains('key_del'))
-            self.assertTrue(mcpiper.contains('key_not_found'))
+            self.wait_for_log_line(mcpiper.stdout, special_symbol, 'key_del',
+                                   'key_not_found')
         else:
-            self.assertTrue(mcpiper.contains('mc_res_notfound'))
-            self.assertTrue(mcpiper.contains('deleted'))
-            self.assertTrue(mcpiper.contains('delete key_del'))
-            self.assertTrue(mcpiper.contains('delete key_not_found'))
+            self.wait_for_log_line(mcpiper.stdout, 'mc_res_notfound',
+                                   'deleted', 'delete key_del',
+                                   'delete key_not_found')
+
+    def do_ndjson_test(self, mcrouter):
+        self.assertTrue(self.memcached.set('key_hit', 'value_hit'))
+
+        mcpiper = self.get_mcpiper(mcrouter, False, ['--ndjson'])
+
+        self.assertEquals('value_hit', mcrouter.get('key_hit'))
+        self.assertFalse(mcrouter.get('key_miss'))
+        self.assertTrue(mcrouter.set('key_set', 'value'))
+
+        def replied():
+            records = mcpiper.records()
+            return all(records.count(key, dir='reply')
+                       for key in ('key_hit', 'key_miss', 'key_set'))
+        self.wait_for(replied)
+
+        records = mcpiper.records()
+        self.assertEqual(records.errors, 0)
+        hit = records.find('key_hit', 'get', dir='reply')[0]
+        self.assertEqual(hit['result'], 'mc_res_found')
+        self.assertEqual(hit['value_bytes'], len('value_hit'))
+        miss = records.find('key_miss', 'get', dir='reply')[0]
+        self.assertEqual(miss['result'], 'mc_res_notfound')
+        self.assertEqual(miss['value_bytes'], 0)
+        request = records.find('key_set', 'set', dir='request')[0]
+        self.assertEqual(request['value_bytes'], len('value'))
+        for request, reply in records.pairs('key_hit'):
+            self.assertEqual(request['conn_id'], reply['conn_id'])
+            self.assertLessEqual(request['ts_us'], reply['ts_us'])
+
+    def test_ndjson_umbrella(self):
+        self.do_ndjson_test(self.mcrouter_umbrella)
+
+    def test_ndjson_caret(self):
+        self.do_ndjson_test(self.mcrouter_caret)
 
     def test_get_ascii(self):
         self.do_get_test(self.mcrouter_ascii, False, '')
@@ -156,3 +182,52 @@ class TestMcpiper(McrouterTestCase):
 
     def test_delete_caret_raw(self):
         self.do_delete_test(self.mcrouter_caret, True, '^')
+
+
+class TestMcpiperRecords(McrouterTestCase):
+    records = [
+        {'conn_id': 1, 'reqid': 1, 'dir': 'request', 'op': 'get',
+         'key': 'a', 'value_bytes': 0},
+        {'conn_id': 1, 'reqid': 1, 'dir': 'reply', 'op': 'get', 'key': 'a',
+         'result': 'mc_res_found', 'value_bytes': 5},
+        {'conn_id': 2, 'reqid': 1, 'dir': 'request', 'op': 'set',
+         'key': 'a', 'value_bytes': 3},
+        {'conn_id': 2, 'reqid': 2, 'dir': 'request', 'op': 'get',
+         'key': 'b\u00ff', 'value_bytes': 0},
+    ]
+
+    def setUp(self):
+        self.base_dir = BaseDirectory('mcpiper_records')
+        self.path = os.path.join(self.base_dir.path, 'stdout')
+
+    def append(self, data):
+        with open(self.path, 'ab') as f:
+            f.write(data)
+
+    def test_incremental(self):
+        lines = [json.dumps(r).encode('ascii') + b'\n' for r in self.records]
+        records = McpiperRecords(self.path)
+        self.assertEqual(records.update(), 0)
+
+        # a record is only parsed once its line is complete
+        self.append(lines[0] + lines[1][:10])
+        self.assertEqual(records.update(), 1)
+        self.append(lines[1][10:] + b'not json\n' + b''.join(lines[2:]))
+        self.assertEqual(records.update(), 3)
+        self.assertEqual(records.update(), 0)
+        self.assertEqual(len(records), 4)
+
+        self.assertEqual(records.count('a'), 3)
+        self.assertEqual(records.count(op='get'), 3)
+        self.assertEqual(records.count('a', 'get'), 2)
+        self.assertEqual(records.count('a', dir='reply',
+                                       result='mc_res_found'), 1)
+        self.assertEqual(sorted(records.ops()), ['get', 'set'])
+        self.assertEqual(records.top_keys(1), [('a', 2)])
+        self.assertEqual(McpiperRecords.key_bytes(records.find(op='get')[2]),
+                         b'b\xff')
+
+        pairs = records.pairs()
+        self.assertEqual(len(pairs), 3)
+        self.assertEqual(pairs[0][1]['value_bytes'], 5)
+        self.assertIsNone(pairs[1][1])
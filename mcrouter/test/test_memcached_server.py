@@ -0,0 +1,148 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from mcrouter.test.MCProcess import McrouterClient
+from mcrouter.test.McrouterTestCase import McrouterTestCase
+from mcrouter.test.mock_servers import MemcachedServer
+
+
+class TestMemcachedServer(McrouterTestCase):
+    def setUp(self):
+        self.server = self.add_server(MemcachedServer(max_bytes=4096))
+        self.now = 1000000
+        self.server.clock = lambda: self.now
+        self.mc = McrouterClient(self.server.getport())
+        self.mc.connect()
+
+    def tearDown(self):
+        self.mc.disconnect()
+        super(TestMemcachedServer, self).tearDown()
+
+    def test_storage(self):
+        mc = self.mc
+        self.assertIsNone(mc.get('key'))
+        self.assertTrue(mc.set('key', 'value', flags=7))
+        self.assertEqual(mc.get('key', return_all_info=True)['flags'], 7)
+        self.assertFalse(mc.add('key', 'other'))
+        self.assertTrue(mc.add('key2', 'other'))
+        self.assertTrue(mc.replace('key2', 'replaced'))
+        self.assertFalse(mc.replace('key3', 'value'))
+        self.assertEqual(mc.append('key', '-end'), 'STORED')
+        self.assertEqual(mc.prepend('key', 'start-'), 'STORED')
+        self.assertEqual(mc.append('key3', 'x'), 'NOT_STORED')
+        self.assertEqual(mc.get(['key', 'key2', 'key3']),
+                         {'key': 'start-value-end', 'key2': 'replaced',
+                          'key3': None})
+        self.assertTrue(mc.delete('key2'))
+        self.assertFalse(mc.delete('key2'))
+        self.assertIsNone(mc.get('key2'))
+
+        cas = mc.gets('key')['cas']
+        self.assertTrue(mc.cas('key', 'new', cas))
+        self.assertFalse(mc.cas('key', 'newer', cas))
+        self.assertEqual(mc.get('key'), 'new')
+
+    def test_arith(self):
+        mc = self.mc
+        self.assertIsNone(mc.incr('counter'))
+        mc.set('counter', '41')
+        self.assertEqual(mc.incr('counter'), 42)
+        self.assertEqual(mc.decr('counter', 50), 0)
+        self.assertEqual(mc.incr('counter', 2 ** 64 - 1), 2 ** 64 - 1)
+        self.assertEqual(mc.incr('counter'), 0)
+
+    def test_exptime(self):
+        mc = self.mc
+        mc.set('short', 'value', exptime=10)
+        mc.set('absolute', 'value', exptime=self.now + 100)
+        mc.set('forever', 'value')
+        self.assertEqual(mc.metaget('short')['exptime'], str(self.now + 10))
+        self.now += 10
+        self.assertIsNone(mc.get('short'))
+        self.assertEqual(mc.touch('absolute', 1000), 'TOUCHED')
+        self.assertEqual(mc.touch('short', 1000), 'NOT_FOUND')
+        self.now += 500
+        self.assertEqual(mc.get('absolute'), 'value')
+        self.assertEqual(mc.get('forever'), 'value')
+        self.assertTrue(mc.set('gone', 'value', exptime=-1))
+        self.assertIsNone(mc.get('gone'))
+        self.assertEqual(self.server.get_counters()['expired'], 2)
+
+    def test_leases(self):
+        mc = self.mc
+        miss = mc.leaseGet('key')
+        self.assertGreater(miss['token'], 1)
+        # Another lease is outstanding: hot miss
+        self.assertEqual(mc.leaseGet('key')['token'], 1)
+        stale = {'value': 'stale', 'token': miss['token'] + 1}
+        self.assertTrue(mc.leaseSet('key', stale, is_stalestored=True))
+        self.assertIsNone(mc.get('key'))
+        self.assertTrue(mc.leaseSet('key', {'value': 'value',
+                                            'token': miss['token']}))
+        self.assertEqual(mc.leaseGet('key'), {'value': 'value',
+                                              'token': None})
+        mc.delete('key')
+        self.assertGreater(mc.leaseGet('key')['token'], miss['token'])
+
+    def test_lru(self):
+        mc = self.mc
+        value = 'x' * 900
+        for i in range(4):
+            mc.set('key{}'.format(i), value)
+        # Make key0 the most recently used, key1 gets evicted
+        self.assertEqual(mc.get('key0'), value)
+        mc.set('key4', value)
+        self.assertIsNone(mc.get('key1'))
+        for i in (0, 2, 3, 4):
+            self.assertEqual(mc.get('key{}'.format(i)), value)
+        counters = self.server.get_counters()
+        self.assertEqual(counters['evictions'], 1)
+        self.assertEqual(counters['curr_items'], 4)
+        self.assertLessEqual(counters['bytes'], 4096)
+
+    def test_counters(self):
+        mc = self.mc
+        mc.set('key', 'value')
+        mc.set('key', 'value', noreply=True)
+        mc.get('key')
+        mc.get('missing')
+        self.assertTrue(mc.version())
+        counters = self.server.get_counters()
+        self.assertEqual(counters['set'], 2)
+        self.assertEqual(counters['get'], 2)
+        self.assertEqual(counters['get_hits'], 1)
+        self.assertEqual(counters['get_misses'], 1)
+        self.assertEqual(counters['version'], 1)
+        self.assertEqual(int(mc.stats()['curr_items']), 1)
+        self.server.reset_counters()
+        self.assertNotIn('get', self.server.get_counters())
+        mc.flush_all()
+        self.assertIsNone(mc.get('key'))
+
+
+class TestMemcachedServerRouting(McrouterTestCase):
+    config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
+    extra_args = ['--num-proxies', '4']
+
+    def setUp(self):
+        self.server = self.add_server(MemcachedServer(), logical_port=12345)
+        self.mcrouter = self.add_mcrouter(self.config, None, self.extra_args)
+
+    def test_forwarded(self):
+        for i in range(200):
+            self.assertTrue(self.mcrouter.set('key{}'.format(i), str(i)))
+        for i in range(200):
+            self.assertEqual(self.mcrouter.get('key{}'.format(i)), str(i))
+        self.assertEqual(self.mcrouter.get('missing'), None)
+        counters = self.server.get_counters()
+        self.assertEqual(counters['set'], 200)
+        self.assertEqual(counters['get'], 201)
+        self.assertEqual(counters['get_hits'], 200)
+        self.assertEqual(counters['curr_items'], 200)
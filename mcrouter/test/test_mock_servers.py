@@ -0,0 +1,246 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import random
+import socket
+import time
+
+from mcrouter.test.MCProcess import McrouterClients
+from mcrouter.test.McrouterTestCase import McrouterTestCase
+from mcrouter.test.mock_servers import (
+    DeadServer, FaultProfile, LatencyDistribution, MemcachedServer,
+    MockServer, TkoServer)
+
+
+class KeyServer(MockServer):
+    """Replies to get with the key as the value, and to 'slow' gets after
+    a delay"""
+    def __init__(self, delay=0.5):
+        super(KeyServer, self).__init__()
+        self.delay = delay
+        self.connected = 0
+        self.sets = []
+
+    def handle_connect(self, conn):
+        self.connected += 1
+
+    def handle_get(self, conn, request):
+        return 'VALUE {0} 0 {1}\r\n{0}\r\nEND\r\n'.format(
+            request.key, len(request.key))
+
+    def handle_set(self, conn, request):
+        self.sets.append((request.key, request.data))
+        if request.noreply:
+            return None
+        return 'STORED\r\n'
+
+    def request_delay(self, conn, request):
+        if request.key == 'slow':
+            return self.delay
+        return 0
+
+
+def connect(port):
+    sock = socket.create_connection(('localhost', port))
+    sock.settimeout(5)
+    return sock
+
+
+def read_until(sock, suffix):
+    data = b''
+    while not data.endswith(suffix):
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+class TestMockServer(McrouterTestCase):
+    config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
+    extra_args = ['--num-proxies', '4']
+
+    def setUp(self):
+        self.server = self.add_server(KeyServer(), logical_port=12345)
+
+    def test_handlers(self):
+        sock = connect(self.server.getport())
+        # Pipelined requests, split across writes
+        sock.sendall(b'set a 0 0 3\r\nx\r\n\r\nget b\r\nver')
+        time.sleep(0.1)
+        sock.sendall(b'sion\r\nset c 0 0 1 noreply\r\nz\r\nfoo\r\nget ')
+        sock.sendall(b'd\r\n')
+        self.assertEqual(
+            read_until(sock, b'VALUE d 0 1\r\nd\r\nEND\r\n'),
+            b'STORED\r\nVALUE b 0 1\r\nb\r\nEND\r\n'
+            b'VERSION KeyServer\r\nERROR\r\nVALUE d 0 1\r\nd\r\nEND\r\n')
+        self.assertEqual(self.server.sets, [('a', b'x\r\n'), ('c', b'z')])
+        sock.close()
+
+    def test_concurrent_connections(self):
+        slow = connect(self.server.getport())
+        slow.sendall(b'get slow\r\nget after\r\n')
+        # A delayed reply holds back the connection it is on, but no other
+        start = time.time()
+        socks = [connect(self.server.getport()) for i in range(20)]
+        for i, sock in enumerate(socks):
+            sock.sendall('get key{}\r\n'.format(i).encode('ascii'))
+        for i, sock in enumerate(socks):
+            self.assertEqual(read_until(sock, b'END\r\n'),
+                             'VALUE key{0} 0 {1}\r\nkey{0}\r\nEND\r\n'
+                             .format(i, len(str(i)) + 3).encode('ascii'))
+            sock.close()
+        self.assertLess(time.time() - start, self.server.delay)
+        self.assertEqual(
+            read_until(slow, b'after\r\nEND\r\n'),
+            b'VALUE slow 0 4\r\nslow\r\nEND\r\n'
+            b'VALUE after 0 5\r\nafter\r\nEND\r\n')
+        self.assertGreaterEqual(time.time() - start, self.server.delay)
+        slow.close()
+
+    def test_mcrouter_proxies(self):
+        mcrouter = self.add_mcrouter(self.config, None, self.extra_args)
+        clients = McrouterClients(mcrouter.port, 8)
+        for i in range(100):
+            key = 'key{}'.format(i)
+            self.assertEqual(clients[i % 8].get(key), key)
+        self.assertTrue(mcrouter.set('key', 'value'))
+        self.assertIn(('key', b'value'), self.server.sets)
+        self.assertGreater(self.server.connected, 1)
+        clients.close()
+
+
+class TestDeadServer(McrouterTestCase):
+    def test_dead_server(self):
+        server = self.add_server(DeadServer())
+        sock = connect(server.getport())
+        self.assertEqual(sock.recv(4096), b'')
+        sock.close()
+
+
+class TestTkoServer(McrouterTestCase):
+    def test_tko_server(self):
+        server = self.add_server(TkoServer(period=2, tmo=0.3))
+        sock = connect(server.getport())
+        timings = []
+        for i in range(4):
+            start = time.time()
+            sock.sendall(b'get hit\r\nversion\r\n')
+            self.assertEqual(
+                read_until(sock, b'TKO_SERVER\r\n'),
+                'VALUE hit 0 {0}\r\n{1}\r\nEND\r\nVERSION TKO_SERVER\r\n'
+                .format(len(str(server.port)), server.port).encode('ascii'))
+            timings.append(time.time() - start >= 0.3)
+        self.assertEqual(timings, [False, False, True, True])
+        sock.close()
+
+
+def read_all(sock):
+    data = b''
+    try:
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                return data, 'closed'
+            data += chunk
+    except socket.error:
+        return data, 'reset'
+
+
+class TestFaultProfile(McrouterTestCase):
+    config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
+    extra_args = []
+
+    def setUp(self):
+        self.server = self.add_server(MemcachedServer(), logical_port=12345)
+
+    def request(self, data, timeout=5):
+        sock = connect(self.server.getport())
+        sock.settimeout(timeout)
+        sock.sendall(data)
+        return sock
+
+    def test_distributions(self):
+        rng = random.Random(0)
+        lognormal = LatencyDistribution('lognormal:0.01:1')
+        samples = sorted(lognormal.sample(rng) for i in range(10000))
+        self.assertAlmostEqual(samples[5000], 0.01, delta=0.001)
+        self.assertGreater(samples[9900], 0.05)
+        capped = LatencyDistribution('lognormal:0.01:1:0.02')
+        self.assertEqual(max(capped.sample(rng) for i in range(1000)), 0.02)
+        bimodal = LatencyDistribution('bimodal:0.001:0.5:0.1')
+        slow = sum(bimodal.sample(rng) == 0.5 for i in range(10000))
+        self.assertAlmostEqual(slow, 1000, delta=150)
+        for spec in ('fixed', 'bimodal:1:2', 'normal:1:2', 'fixed:x'):
+            self.assertRaises(ValueError, LatencyDistribution, spec)
+
+    def test_latency(self):
+        self.server.set_fault_profile(latency='fixed:0.3',
+                                      command_latency={'set': 'fixed:0'})
+        start = time.time()
+        sock = self.request(b'set key 0 0 1\r\nv\r\nversion\r\n')
+        read_until(sock, b'MemcachedServer\r\n')
+        self.assertLess(time.time() - start, 0.3)
+        sock.sendall(b'get key\r\n')
+        self.assertEqual(read_until(sock, b'END\r\n'),
+                         b'VALUE key 0 1\r\nv\r\nEND\r\n')
+        self.assertGreaterEqual(time.time() - start, 0.3)
+
+        # Profiles can be changed at runtime
+        self.server.set_fault_profile(None)
+        start = time.time()
+        sock.sendall(b'get key\r\n')
+        read_until(sock, b'END\r\n')
+        self.assertLess(time.time() - start, 0.3)
+        sock.close()
+
+    def test_error(self):
+        profile = self.server.set_fault_profile(error_rate=1)
+        sock = self.request(b'set key 0 0 1\r\nv\r\nversion\r\n')
+        self.assertEqual(read_until(sock, b'MemcachedServer\r\n'),
+                         b'SERVER_ERROR injected error\r\n'
+                         b'VERSION MemcachedServer\r\n')
+        self.assertEqual(profile.injected['error'], 1)
+        self.assertNotIn('set', self.server.get_counters())
+        sock.close()
+
+    def test_reset(self):
+        self.server.set_fault_profile(reset_rate=1)
+        sock = self.request(b'get key\r\n')
+        self.assertEqual(read_all(sock), (b'', 'reset'))
+        sock.close()
+
+    def test_partial(self):
+        self.server.set_fault_profile(partial_rate=1)
+        sock = self.request(b'get key\r\n')
+        self.assertEqual(read_all(sock), (b'EN', 'closed'))
+        sock.close()
+
+    def test_drip(self):
+        self.server.set_fault_profile(
+            FaultProfile(drip_rate=1, drip_bytes=2, drip_interval=0.05))
+        start = time.time()
+        sock = self.request(b'get key\r\nget key\r\n')
+        self.assertEqual(read_until(sock, b'END\r\nEND\r\n'),
+                         b'END\r\nEND\r\n')
+        # 3 chunks per reply
+        self.assertGreaterEqual(time.time() - start, 0.2)
+        sock.close()
+
+    def test_mcrouter_latency(self):
+        mcrouter = self.add_mcrouter(self.config, None, self.extra_args)
+        self.server.set_fault_profile(
+            command_latency={'get': 'bimodal:0:0.2:0.5'}, seed=1)
+        latency = mcrouter.record_latency()
+        for i in range(20):
+            mcrouter.get('key')
+        hist = latency.histogram('get')
+        self.assertGreaterEqual(hist.percentile(99), 0.2)
+        self.assertLess(hist.percentile(10), 0.2)
@@ -0,0 +1,69 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import socket
+import unittest
+
+from mcrouter.test import parallel_tests
+from mcrouter.test.parallel_tests import Runner, python_tests, schedule
+from mcrouter.test.ports import PORTS_ENV, bind_port
+
+
+class TestParallelTests(unittest.TestCase):
+    def setUp(self):
+        self.env = os.environ.get(PORTS_ENV)
+        self.sockets = []
+
+    def tearDown(self):
+        if self.env is None:
+            os.environ.pop(PORTS_ENV, None)
+        else:
+            os.environ[PORTS_ENV] = self.env
+        for sock in self.sockets:
+            sock.close()
+
+    def socket(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sockets.append(sock)
+        return sock
+
+    def test_bind_port(self):
+        os.environ.pop(PORTS_ENV, None)
+        self.assertGreater(bind_port(self.socket()), 0)
+
+        # A range of a single port known to be free, the next port may not
+        probe = self.socket()
+        probe.bind(('', 0))
+        port = probe.getsockname()[1]
+        probe.close()
+        os.environ[PORTS_ENV] = '{}-{}'.format(port, port)
+        self.assertEqual(bind_port(self.socket()), port)
+        self.assertRaises(Exception, bind_port, self.socket())
+
+    def test_worker_ports(self):
+        runner = Runner([], 32, 'python', 1)
+        ranges = [runner.worker_ports(slot) for slot in range(32)]
+        self.assertEqual(ranges[0][0], parallel_tests.FIRST_PORT)
+        self.assertLessEqual(ranges[-1][1], parallel_tests.LAST_PORT)
+        for (a_first, a_last), (b_first, b_last) in zip(ranges, ranges[1:]):
+            self.assertLess(a_last, b_first)
+
+    def test_python_tests(self):
+        tests = python_tests()
+        self.assertIn('test_parallel_tests', tests)
+        self.assertIn('test_mcrouter_basic', tests)
+        # Disabled tests are commented out
+        self.assertNotIn('test_warmup2', tests)
+
+    def test_schedule(self):
+        self.assertEqual(schedule(['a', 'b', 'c', 'd'],
+                                  {'a': 1, 'b': 10, 'c': 5}),
+                         ['d', 'b', 'c', 'a'])
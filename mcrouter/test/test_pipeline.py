@@ -0,0 +1,79 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import time
+
+from mcrouter.test.MCProcess import MockMemcached, format_get
+from mcrouter.test.McrouterTestCase import McrouterTestCase
+
+
+class TestPipeline(McrouterTestCase):
+    config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
+    extra_args = []
+
+    def setUp(self):
+        self.add_server(MockMemcached(), logical_port=12345)
+        self.mcrouter = self.add_mcrouter(self.config, None, self.extra_args)
+
+    def test_pipeline_replies_in_order(self):
+        with self.mcrouter.pipeline() as p:
+            p.set('pipeline:1', 'A')
+            p.set('pipeline:2', 'B', noreply=True)
+            p.get('pipeline:1')
+            p.get(['pipeline:1', 'pipeline:2', 'pipeline:3'])
+            p.delete('pipeline:1')
+            p.get('pipeline:1')
+            p.set('pipeline:counter', '10')
+            p.incr('pipeline:counter', 5)
+            p.decr('pipeline:counter')
+
+        self.assertEqual(len(p.results), 9)
+        self.assertTrue(p.results[0])
+        self.assertIsNone(p.results[1])
+        self.assertEqual(p.results[2], 'A')
+        self.assertEqual(p.results[3], {'pipeline:1': 'A',
+                                        'pipeline:2': 'B',
+                                        'pipeline:3': None})
+        self.assertTrue(p.results[4])
+        self.assertIsNone(p.results[5])
+        self.assertTrue(p.results[6])
+        self.assertEqual(p.results[7], 15)
+        self.assertEqual(p.results[8], 14)
+
+    def test_pipeline_many_requests(self):
+        n = 1000
+        p = self.mcrouter.pipeline()
+        for i in range(n):
+            p.set('pipeline:many:{}'.format(i), str(i))
+        self.assertTrue(all(p.execute()))
+        self.assertEqual(len(p), 0)
+
+        for i in range(n):
+            p.get('pipeline:many:{}'.format(i))
+        self.assertEqual(p.execute(), [str(i) for i in range(n)])
+
+        # connection is still usable for plain requests afterwards
+        self.assertEqual(self.mcrouter.get('pipeline:many:0'), '0')
+
+    def test_text_and_raw_readers_share_buffer(self):
+        m = self.mcrouter
+        self.assertTrue(m.set('pipeline:1', 'A'))
+        self.assertTrue(m.set('pipeline:2', 'B'))
+
+        m.socket.sendall(format_get('get', ['pipeline:1']) +
+                         format_get('get', ['pipeline:2']))
+        # let both replies arrive, so that the first read buffers both
+        time.sleep(0.1)
+        self.assertEqual(
+            m._read_get_reply(['pipeline:1'], False, False, False), 'A')
+        value = m._read_get_reply(['pipeline:2'], False, False, False,
+                                  raw=True)
+        self.assertEqual(value.tobytes(), b'B')
+        self.assertEqual(m.get('pipeline:1'), 'A')
@@ -11,9 +11,7 @@ from __future__ import unicode_literals
 from mcrouter.test.MCProcess import Mcrouter
 from mcrouter.test.McrouterTestCase import McrouterTestCase
 from mcrouter.test.mock_servers import SleepServer
-
-import time
-import os
+from mcrouter.test.stats_root import StatsRootReader
 
 
 class TestPoolStats(McrouterTestCase):
@@ -25,10 +23,9 @@ class TestPoolStats(McrouterTestCase):
         '--timeouts-until-tko=50',
         '--disable-miss-on-get-errors',
         '--num-proxies=4']
-    stat_prefix = 'libmcrouter.mcrouter.0.'
-    pool_prefix = stat_prefix + 'twmemcache.CI.'
+    stat_prefix = 'libmcrouter.mcrouter.0'
+    pool_prefix = 'twmemcache.CI.'
     count = 20
-    durationMap = {}
 
     def setUp(self):
         self.mc = []
@@ -46,75 +43,53 @@ class TestPoolStats(McrouterTestCase):
             self.config,
             extra_args=self.extra_args)
 
-    def verify_stat(self, line, statname, expected, op):
-        if self.pool_prefix + statname in line:
-            s = line.split(':')[1].split(',')[0]
-            if 'GR' in op:
-                self.assertGreater(int(s), expected)
-                self.durationMap[statname] = int(s)
-            elif 'EQ' in op:
-                self.assertEqual(int(s), expected)
-            else:
-                self.assertTrue(False)
-
-    def check_pool_stats(self, stats_dir):
-        file_stat = os.path.join(stats_dir, self.stat_prefix + 'stats')
-        verifiedStats = 0
-        with open(file_stat, 'r') as f:
-            for line in f.readlines():
-                # Expect all east requests to fail because it
-                # is running SleepServer
-
-                if self.pool_prefix + 'east' in line:
-                    self.verify_stat(line,
-                            'east.requests.sum', self.count, 'EQ')
-                    self.verify_stat(line,
-                            'east.final_result_error.sum', self.count, 'EQ')
-                    self.verify_stat(line, 'east.duration_us.avg', 0, 'GR')
-                    self.verify_stat(line,
-                            'east.total_duration_us.avg', 0, 'GR')
-                    verifiedStats += 1
-
-                if self.pool_prefix + 'west' in line:
-                    self.verify_stat(line,
-                            'west.requests.sum', 2 * self.count, 'EQ')
-                    self.verify_stat(line,
-                            'west.final_result_error.sum', 0, 'EQ')
-                    self.verify_stat(line, 'west.duration_us.avg', 0, 'GR')
-                    self.verify_stat(line,
-                            'west.total_duration_us.avg', 0, 'GR')
-                    verifiedStats += 1
-
-                if self.pool_prefix + 'north' in line:
-                    self.verify_stat(line,
-                            'north.requests.sum', self.count, 'EQ')
-                    self.verify_stat(line,
-                            'north.final_result_error.sum', 0, 'EQ')
-                    self.verify_stat(line, 'north.duration_us.avg', 0, 'GR')
-                    self.verify_stat(line,
-                            'north.total_duration_us.avg', 0, 'EQ')
-                    verifiedStats += 1
-
-                if self.pool_prefix + 'south' in line:
-                    self.verify_stat(line,
-                            'south.requests.sum', self.count, 'EQ')
-                    self.verify_stat(line,
-                            'south.final_result_error.sum', 0, 'EQ')
-                    self.verify_stat(line, 'south.duration_us.avg', 0, 'GR')
-                    self.verify_stat(line,
-                            'south.total_duration_us.avg', 0, 'GR')
-                    verifiedStats += 1
-
-        # These checks must be done outside the for loop
-        self.assertTrue(self.durationMap['east.total_duration_us.avg']
-                >= self.durationMap['east.duration_us.avg'])
-        self.assertTrue(self.durationMap['west.total_duration_us.avg']
-                >= self.durationMap['west.duration_us.avg'])
-        self.assertTrue(self.durationMap['south.total_duration_us.avg']
-                >= self.durationMap['south.duration_us.avg'])
-        # for 'north' pool total_duration would be 0 and duration
-        # would be greater than 0. so, the check is already done.
-        self.assertTrue(verifiedStats == 16)
+    def check_duration_histogram(self, pool, count):
+        self.assertEqual(pool['duration_us.count'], count)
+        self.assertGreater(pool['duration_us.p50'], 0)
+        self.assertLessEqual(pool['duration_us.p50'],
+                             pool['duration_us.p95'])
+        self.assertLessEqual(pool['duration_us.p95'],
+                             pool['duration_us.p99'])
+        self.assertLessEqual(pool['duration_us.p99'],
+                             pool['duration_us.p999'])
+        self.assertLessEqual(pool['duration_us.p999'],
+                             pool['duration_us.max'])
+        # gets of missing keys, no values
+        self.assertEqual(pool['value_bytes.count'], 0)
+
+    def check_pool_stats(self, pools):
+        # Expect all east requests to fail because it is running SleepServer
+        east = pools[self.pool_prefix + 'east']
+        self.check_duration_histogram(east, self.count)
+        self.assertEqual(east['requests.sum'], self.count)
+        self.assertEqual(east['final_result_error.sum'], self.count)
+        self.assertGreater(east['duration_us.avg'], 0)
+        self.assertGreaterEqual(east['total_duration_us.avg'],
+                                east['duration_us.avg'])
+
+        west = pools[self.pool_prefix + 'west']
+        self.check_duration_histogram(west, 2 * self.count)
+        self.assertEqual(west['requests.sum'], 2 * self.count)
+        self.assertEqual(west['final_result_error.sum'], 0)
+        self.assertGreater(west['duration_us.avg'], 0)
+        self.assertGreaterEqual(west['total_duration_us.avg'],
+                                west['duration_us.avg'])
+
+        north = pools[self.pool_prefix + 'north']
+        self.check_duration_histogram(north, self.count)
+        self.assertEqual(north['requests.sum'], self.count)
+        self.assertEqual(north['final_result_error.sum'], 0)
+        self.assertGreater(north['duration_us.avg'], 0)
+        # total_duration is 0 for the north pool
+        self.assertEqual(north['total_duration_us.avg'], 0)
+
+        south = pools[self.pool_prefix + 'south']
+        self.check_duration_histogram(south, self.count)
+        self.assertEqual(south['requests.sum'], self.count)
+        self.assertEqual(south['final_result_error.sum'], 0)
+        self.assertGreater(south['duration_us.avg'], 0)
+        self.assertGreaterEqual(south['total_duration_us.avg'],
+                                south['duration_us.avg'])
 
     def test_poolstats(self):
         n = 4 * self.count
@@ -129,6 +104,20 @@ class TestPoolStats(McrouterTestCase):
             else:
                 key = 'twmemcache.CI.east:{}:|#|id=123'.format(i)
             self.mcrouter.get(key)
-        self.assertTrue(self.mcrouter.stats()['cmd_get_count'] > 0)
-        time.sleep(11)
-        self.check_pool_stats(self.mcrouter.stats_dir)
+        stats = self.mcrouter.stats()
+        self.assertTrue(stats['cmd_get_count'] > 0)
+        self.assertEqual(
+            int(stats[self.pool_prefix + 'north.duration_us.count']),
+            self.count)
+        reader = StatsRootReader(self.mcrouter.stats_dir,
+                                 names=[self.pool_prefix])
+
+        def stats_logged():
+            reader.poll()
+            router = reader.routers.get(self.stat_prefix)
+            east = router.pools().get(self.pool_prefix + 'east', {}) \
+                if router else {}
+            return east.get('requests.sum') == self.count
+        # stats files are written every 10 seconds
+        self.wait_for(stats_logged, timeout=30)
+        self.check_pool_stats(reader.pools(self.stat_prefix))
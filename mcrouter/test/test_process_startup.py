@@ -0,0 +1,64 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import socket
+import sys
+import threading
+import time
+import unittest
+
+from mcrouter.test.MCProcess import MCProcess
+from mcrouter.test.mock_servers import MemcachedServer
+
+
+def free_port():
+    sock = socket.socket()
+    sock.bind(('localhost', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class TestProcessStartup(unittest.TestCase):
+    def test_exited(self):
+        process = MCProcess([sys.executable, '-c', 'import sys; sys.exit(3)'],
+                            free_port())
+        with self.assertRaises(Exception) as cm:
+            process.ensure_connected()
+        self.assertIn('exited with status 3', str(cm.exception))
+        process.proc = None
+
+    def test_timeout(self):
+        process = MCProcess(['sleep', '10'], free_port())
+        start = time.time()
+        with self.assertRaises(Exception) as cm:
+            process.ensure_connected(timeout=0.5)
+        self.assertIn('Timed out after 0.5s', str(cm.exception))
+        self.assertLess(time.time() - start, 2)
+        process.proc.terminate()
+        process.proc.wait()
+        process.proc = None
+
+    def test_ready(self):
+        port = free_port()
+        server = MemcachedServer(port=port)
+        timer = threading.Timer(0.3, server.ensure_connected)
+        timer.start()
+        process = MCProcess(None, port)
+        start = time.time()
+        try:
+            process.ensure_ready()
+            self.assertGreaterEqual(time.time() - start, 0.25)
+            self.assertTrue(process.set('key', 'value'))
+            self.assertEqual(server.get_counters()['version'], 1)
+        finally:
+            timer.join()
+            process.disconnect()
+            server.terminate()
@@ -0,0 +1,48 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import unittest
+
+from mcrouter.test.route_benchmarks import (
+    BENCHMARKS,
+    compare,
+    config_ports,
+    run_benchmark,
+)
+
+
+class TestRouteBenchmarks(unittest.TestCase):
+    def test_config_ports(self):
+        config = """{"pools": {"A": {"servers": ["localhost:12345",
+                                                 "[::1]:12346:caret",
+                                                 "localhost:12345"]}},
+                     "route": {"type": "PrefixSelectorRoute",
+                               "policies": {"a:": "PoolRoute|A"}}}"""
+        self.assertEqual(config_ports(config), [12345, 12346])
+
+    def test_compare(self):
+        old = {'results': {'A': {'achieved_qps': 1000,
+                                 'latency_us': {'p50': 100, 'p99': 200},
+                                 'cpu_us_per_request': 10}}}
+        new = {'results': {'A': {'achieved_qps': 990,
+                                 'latency_us': {'p50': 105, 'p99': 300},
+                                 'cpu_us_per_request': None},
+                           'B': {'achieved_qps': 10}}}
+        self.assertEqual(compare(old, new, 10),
+                         [('A', 'latency_us.p99', 50.0)])
+        self.assertEqual(compare(old, new, 60), [])
+
+    def test_run_benchmark(self):
+        benchmark = [b for b in BENCHMARKS if b.name == 'L1L2CacheRoute'][0]
+        result = run_benchmark(benchmark, qps=200, duration=1, warmup=0.2,
+                               connections=2)
+        self.assertEqual(result['errors'], 0)
+        self.assertGreater(result['requests'], 150)
+        self.assertEqual(result['config'], benchmark.config)
@@ -0,0 +1,90 @@
+# Copyright (c) 2018-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from mcrouter.test.McrouterTestCase import McrouterTestCase
+from mcrouter.test.mock_servers import MemcachedServer
+from mcrouter.test.stats_root import StatsRootReader
+
+
+class TestRoutingPrefixStats(McrouterTestCase):
+    config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
+    extra_args = ['--enable-routing-prefix-stats',
+                  '--stats-logging-interval', '100']
+    stat_prefix = 'libmcrouter.mcrouter.0'
+    # no routing prefix in the keys, requests use the default route
+    routing_prefix = 'routing_prefix./././.'
+
+    def setUp(self):
+        self.server = self.add_server(MemcachedServer(), logical_port=12345)
+        self.mcrouter = self.add_mcrouter(self.config,
+                                          extra_args=self.extra_args)
+
+    def stat(self, stats, name):
+        return int(stats[self.routing_prefix + name])
+
+    def test_value_bytes(self):
+        for i in range(10):
+            self.assertTrue(self.mcrouter.set('key:{}'.format(i), 'v' * 1000))
+        for i in range(10):
+            self.assertEqual(self.mcrouter.get('key:{}'.format(i)),
+                             'v' * 1000)
+        self.assertIsNone(self.mcrouter.get('missing'))
+
+        stats = self.mcrouter.stats()
+        self.assertEqual(self.stat(stats, 'duration_us.count'), 21)
+        # sets and hits carry a value, the miss doesn't
+        self.assertEqual(self.stat(stats, 'value_bytes.count'), 20)
+        for p in ('p50', 'p95', 'p99', 'p999', 'max'):
+            self.assertEqual(self.stat(stats, 'value_bytes.' + p), 1000)
+
+    def test_tail_latency(self):
+        self.assertTrue(self.mcrouter.set('fast', 'v'))
+        self.assertTrue(self.mcrouter.set('slow', 'v'))
+        for i in range(198):
+            self.assertEqual(self.mcrouter.get('fast'), 'v')
+        self.server.set_fault_profile(command_latency={'get': 'fixed:0.2'})
+        self.assertEqual(self.mcrouter.get('slow'), 'v')
+
+        stats = self.mcrouter.stats()
+        self.assertEqual(self.stat(stats, 'duration_us.count'), 201)
+        # the average would hide the one slow get, p999 doesn't
+        self.assertLess(self.stat(stats, 'duration_us.p99'), 200000)
+        self.assertGreaterEqual(self.stat(stats, 'duration_us.p999'),
+                                200000)
+        self.assertEqual(self.stat(stats, 'duration_us.p999'),
+                         self.stat(stats, 'duration_us.max'))
+
+    def test_stats_root(self):
+        self.assertTrue(self.mcrouter.set('key', 'value'))
+        reader = StatsRootReader(self.mcrouter.stats_dir,
+                                 names=['routing_prefix.'])
+
+        def logged():
+            reader.poll()
+            router = reader.routers.get(self.stat_prefix)
+            histograms = router.routing_prefixes().get('/././') \
+                if router else None
+            return histograms and histograms['duration_us.count'] == 1
+        self.wait_for(logged)
+        histograms = reader.routing_prefixes(self.stat_prefix)['/././']
+        self.assertEqual(histograms['value_bytes.p50'], 5)
+
+
+class TestRoutingPrefixStatsDisabled(McrouterTestCase):
+    config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
+
+    def setUp(self):
+        self.add_server(MemcachedServer(), logical_port=12345)
+        self.mcrouter = self.add_mcrouter(self.config)
+
+    def test_disabled(self):
+        self.assertIsNone(self.mcrouter.get('key'))
+        self.assertFalse([name for name in self.mcrouter.stats()
+                          if name.startswith('routing_prefix.')])
@@ -8,8 +8,6 @@ from __future__ import division
 from __future__ import print_function
 from __future__ import unicode_literals
 
-import time
-
 from mcrouter.test.MCProcess import Memcached
 from mcrouter.test.McrouterTestCase import McrouterTestCase
 
@@ -32,6 +30,13 @@ class TestShadow(McrouterTestCase):
             self.config,
             extra_args=self.extra_args + more_extra_args)
 
+    def wait_for_shadow(self, shadows, kv, shadow_keys):
+        values = dict(kv)
+        self.wait_for(lambda: all(shadow.get(key) == values[key]
+                                  for shadow in shadows
+                                  for key in shadow_keys),
+                      message='shadow sets')
+
     def test_normal_shadow(self):
         mcrouter = self.get_mcrouter()
         # SpookyHashV2 will choose these values for 0.0 .. 0.1:
@@ -43,7 +48,8 @@ class TestShadow(McrouterTestCase):
             mcrouter.set(key, value)
 
         # shadow is async, so wait until all sets complete
-        time.sleep(1)
+        self.wait_for_shadow([self.mc_foo_shadow, self.mc_bar_shadow],
+                             kv, shadow_keys)
 
         for key, value in kv:
             self.assertTrue(self.mc_foo_0.get(key) == value or
@@ -67,7 +73,8 @@ class TestShadow(McrouterTestCase):
             mcrouter.set(key, value)
 
         # shadow is async, so wait until all sets complete
-        time.sleep(1)
+        self.wait_for_shadow([self.mc_foo_shadow_specific_keys],
+                             kv, shadow_keys)
 
         for key, value in kv:
             self.assertTrue(self.mc_foo_0.get(key) == value or
@@ -89,7 +96,7 @@ class TestShadow(McrouterTestCase):
             mcrouter.set(key, value)
 
         # shadow is async, so wait until all sets complete
-        time.sleep(1)
+        self.wait_for_shadow([self.mc_foo_shadow], kv, shadow_keys)
 
         for key, value in kv:
             self.assertTrue(self.mc_foo_0.get(key) == value or
@@ -110,7 +117,7 @@ class TestShadow(McrouterTestCase):
             mcrouter.set(key, value)
 
         # shadow is async, so wait until all sets complete
-        time.sleep(1)
+        self.wait_for_shadow([self.mc_bar_shadow], kv, shadow_keys)
 
         for key, value in kv:
             self.assertIsNone(self.mc_bar_0.get(key))
@@ -131,7 +138,7 @@ class TestShadow(McrouterTestCase):
             mcrouter.set(key, value)
 
         # shadow is async, so wait until all sets complete
-        time.sleep(1)
+        self.wait_for_shadow([self.mc_bar_shadow], kv, shadow_keys)
 
         for key, value in kv:
             self.assertEqual(self.mc_bar_0.get(key), value)
@@ -152,7 +159,7 @@ class TestShadow(McrouterTestCase):
             mcrouter.set(key, value)
 
         # shadow is async, so wait until all sets complete
-        time.sleep(1)
+        self.wait_for_shadow([self.mc_bar_shadow], kv, shadow_keys)
 
         for key, value in kv:
             self.assertIsNone(self.mc_bar_0.get(key))
@@ -175,7 +182,8 @@ class TestShadow(McrouterTestCase):
             mcrouter.set(key, value)
 
         # shadow is async, so wait until all sets complete
-        time.sleep(1)
+        self.wait_for_shadow([self.mc_foo_shadow, self.mc_bar_shadow],
+                             kv, shadow_keys)
 
         for key, value in kv:
             self.assertTrue(self.mc_foo_0.get(key) == value or
@@ -200,7 +208,7 @@ class TestShadow(McrouterTestCase):
             mcrouter.set(key, value)
 
         # shadow is async, so wait until all sets complete
-        time.sleep(1)
+        self.wait_for_shadow([self.mc_bar_shadow], kv, shadow_keys)
 
         for key, value in kv:
             self.assertIsNone(self.mc_bar_0.get(key))
@@ -0,0 +1,120 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import json
+import os
+
+from mcrouter.test.MCProcess import BaseDirectory
+from mcrouter.test.McrouterTestCase import McrouterTestCase
+from mcrouter.test.stats_root import (StatsRootReader, parse_stats_lines,
+                                      split_pool_stat)
+
+
+class TestStatsRootReader(McrouterTestCase):
+    prefix = 'libmcrouter.mcrouter.0'
+
+    def setUp(self):
+        self.base_dir = BaseDirectory('stats_root')
+        self.root = self.base_dir.path
+
+    def write_stats(self, stats, mtime, prefix=None, suffix='stats'):
+        """Replaces a stats file like mcrouter does, pretty sorted JSON"""
+        prefix = prefix or self.prefix
+        path = os.path.join(self.root, '{}.{}'.format(prefix, suffix))
+        content = json.dumps(dict((prefix + '.' + name, value)
+                                  for name, value in stats.items()),
+                             indent=2, sort_keys=True,
+                             separators=(',', ': '))
+        with open(path + '.tmp', 'w') as f:
+            f.write(content + '\n')
+        os.utime(path + '.tmp', (mtime, mtime))
+        os.rename(path + '.tmp', path)
+
+    def test_parse_lines(self):
+        lines = ['{\n',
+                 '  "p.twmemcache.CI.west.requests.sum": 40,\n',
+                 '  "p.duration_us": 12.5,\n',
+                 '  "p.version": "37.0.0"\n',
+                 '}\n']
+        self.assertEqual(parse_stats_lines(lines, 'p'), {
+            'twmemcache.CI.west.requests.sum': 40,
+            'duration_us': 12.5,
+            'version': '37.0.0',
+        })
+        self.assertEqual(parse_stats_lines(lines, 'p', ['twmemcache.']),
+                         {'twmemcache.CI.west.requests.sum': 40})
+        self.assertIsNone(parse_stats_lines(['{"p.a": 1, "p.b": 2}'], 'p'))
+
+    def test_split_pool_stat(self):
+        self.assertEqual(split_pool_stat('twmemcache.CI.west.requests.sum'),
+                         ('twmemcache.CI.west', 'requests', 'sum'))
+        self.assertEqual(split_pool_stat('a.b.total_duration_us.avg'),
+                         ('a.b', 'total_duration_us', 'avg'))
+        self.assertEqual(split_pool_stat('a.b.value_bytes.p999'),
+                         ('a.b', 'value_bytes', 'p999'))
+        self.assertIsNone(split_pool_stat('cmd_get_count'))
+        self.assertIsNone(split_pool_stat('a.uptime.sum'))
+
+    def test_series(self):
+        reader = StatsRootReader(self.root, max_samples=3)
+        self.assertEqual(reader.poll(), [])
+
+        for i in range(5):
+            self.write_stats({'cmd_get_count': 10 * i, 'uptime': i,
+                              'a.b.requests.sum': i,
+                              'a.b.duration_us.avg': 1.5}, mtime=1000 + i)
+            self.assertEqual(reader.poll(), [self.prefix])
+            # not replaced since, nothing to read
+            self.assertEqual(reader.poll(), [])
+
+        self.assertEqual(reader.series('cmd_get_count'),
+                         [(1002, 20), (1003, 30), (1004, 40)])
+        self.assertEqual(reader.latest()['uptime'], 4)
+        self.assertEqual(reader.router().rate('cmd_get_count'), 10)
+        self.assertEqual(reader.pools(), {
+            'a.b': {'requests.sum': 4, 'duration_us.avg': 1.5}})
+        self.assertEqual(reader.router().samples, 5)
+
+    def test_histograms(self):
+        reader = StatsRootReader(self.root)
+        self.write_stats({'a.b.duration_us.p99': 900,
+                          'a.b.requests.sum': 4,
+                          'routing_prefix./x/y/.duration_us.p50': 120,
+                          'routing_prefix./x/y/.value_bytes.max': 4096},
+                         mtime=1000)
+        reader.poll()
+        self.assertEqual(reader.pools(), {
+            'a.b': {'duration_us.p99': 900, 'requests.sum': 4}})
+        self.assertEqual(reader.routing_prefixes(), {
+            '/x/y/': {'duration_us.p50': 120, 'value_bytes.max': 4096}})
+
+    def test_filter_and_routers(self):
+        other = 'libmcrouter.other.0'
+        reader = StatsRootReader(self.root, names=['cmd_'])
+        self.write_stats({'cmd_get_count': 1, 'uptime': 1}, mtime=1000)
+        self.write_stats({'cmd_get_count': 2, 'uptime': 2}, mtime=1000,
+                         prefix=other)
+        self.write_stats({'default_route': '/a/b/'}, mtime=1000,
+                         suffix='startup_options')
+        self.assertEqual(reader.poll(), sorted([self.prefix, other]))
+        self.assertEqual(reader.latest(self.prefix), {'cmd_get_count': 1})
+        self.assertEqual(reader.latest(other), {'cmd_get_count': 2})
+        with self.assertRaises(KeyError):
+            reader.latest()
+        self.assertEqual(reader.router(self.prefix).startup_options(),
+                         {self.prefix + '.default_route': '/a/b/'})
+
+    def test_compact_json(self):
+        path = os.path.join(self.root, self.prefix + '.stats')
+        with open(path, 'w') as f:
+            json.dump({self.prefix + '.uptime': 3}, f)
+        reader = StatsRootReader(self.root)
+        reader.poll()
+        self.assertEqual(reader.latest(), {'uptime': 3})
@@ -0,0 +1,100 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import math
+
+from mcrouter.test.MCProcess import McrouterClient
+from mcrouter.test.McrouterTestCase import McrouterTestCase
+from mcrouter.test.mock_servers import MemcachedServer
+from mcrouter.test.stats_snapshot import (StatsCollector, StatsSnapshot,
+                                          column_rates, poll, to_columns)
+
+
+class TestStatsSnapshot(McrouterTestCase):
+    def test_parse(self):
+        snapshot = StatsSnapshot({'pid': '123', 'rusage_user': '0.25',
+                                  'version': 'mcrouter 37.0.0',
+                                  'empty': ''})
+        self.assertEqual(snapshot['pid'], 123)
+        self.assertEqual(snapshot['rusage_user'], 0.25)
+        self.assertEqual(snapshot['version'], 'mcrouter 37.0.0')
+        self.assertEqual(snapshot.names(), ['pid', 'rusage_user'])
+        self.assertIn('empty', snapshot)
+        self.assertIsNone(snapshot.get('missing'))
+        with self.assertRaises(KeyError):
+            snapshot['missing']
+
+    def test_diff_and_rates(self):
+        a = StatsSnapshot({'gets': '10', 'sets': '4', 'old': '1',
+                           'version': 'a'}, timestamp=100)
+        b = StatsSnapshot({'gets': '30', 'sets': '4', 'new': '1',
+                           'version': 'b'}, timestamp=102)
+        delta = b.diff(a)
+        self.assertEqual(delta.interval, 2)
+        self.assertEqual(delta.values, {'gets': 20, 'sets': 0})
+        self.assertEqual(delta.changed(), {'gets': 20})
+        self.assertEqual(b.rates(a), {'gets': 10, 'sets': 0})
+        with self.assertRaises(ValueError):
+            a.rates(a)
+
+    def test_columns(self):
+        snapshots = [StatsSnapshot({'gets': str(10 * i), 'sets': '1'},
+                                   timestamp=i) for i in range(4)]
+        snapshots.append(None)
+        snapshots.append(StatsSnapshot({'gets': '100'}, timestamp=5))
+        columns = to_columns(snapshots)
+        self.assertEqual(sorted(columns), ['gets', 'sets', 'timestamp'])
+        self.assertEqual(list(columns['gets']), [0, 10, 20, 30, 100])
+        self.assertTrue(math.isnan(columns['sets'][4]))
+
+        rates = column_rates(columns, ['gets'])
+        self.assertEqual(list(rates['gets']), [10, 10, 10, 35])
+
+
+class TestStatsPolling(McrouterTestCase):
+    def setUp(self):
+        self.servers = [self.add_server(MemcachedServer()) for i in range(4)]
+        self.clients = [McrouterClient(server.getport())
+                        for server in self.servers]
+        for client in self.clients:
+            client.connect()
+
+    def tearDown(self):
+        for client in self.clients:
+            client.disconnect()
+        super(TestStatsPolling, self).tearDown()
+
+    def test_poll(self):
+        for client in self.clients:
+            client.get('key')
+        before = poll(self.clients)
+        for i, client in enumerate(self.clients):
+            for j in range(i + 1):
+                client.get('key')
+        after = poll(self.clients)
+        self.assertEqual([s.diff(b)['get'] for s, b in zip(after, before)],
+                         [1, 2, 3, 4])
+        self.assertIs(after[2].source, self.clients[2])
+
+        snapshot = self.clients[0].stats_snapshot()
+        self.assertEqual(snapshot['get_misses'], 2)
+
+    def test_collector(self):
+        collector = StatsCollector(self.clients, interval=0.01)
+        for i in range(3):
+            for client in self.clients:
+                client.get('key')
+            collector.collect()
+        self.assertEqual(list(collector.columns(1)['get']), [1, 2, 3])
+        self.assertEqual(list(collector.totals(['get'])['get']), [4, 8, 12])
+
+        collector.start()
+        self.wait_for(lambda: len(collector.snapshots[0]) > 5)
+        collector.stop()
@@ -0,0 +1,121 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import os
+import re
+import socket
+import subprocess
+import threading
+import time
+
+from mcrouter.test.MCProcess import BaseDirectory, McrouterClient
+from mcrouter.test.McrouterTestCase import McrouterTestCase
+from mcrouter.test.mock_servers import MemcachedServer
+
+
+class Process(object):
+    def __init__(self, proc):
+        self.proc = proc
+
+
+class TestWaitHelpers(McrouterTestCase):
+    def setUp(self):
+        self.base_dir = BaseDirectory('wait_helpers')
+
+    def later(self, delay, f):
+        timer = threading.Timer(delay, f)
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+    def test_wait_for(self):
+        calls = []
+
+        def condition():
+            calls.append(time.time())
+            return len(calls) == 5 and 'done'
+        self.assertEqual(self.wait_for(condition), 'done')
+        # exponential backoff
+        gaps = [b - a for a, b in zip(calls, calls[1:])]
+        self.assertGreater(gaps[-1], gaps[0] * 4)
+
+        start = time.time()
+        with self.assertRaises(AssertionError) as cm:
+            self.wait_for(lambda: False, timeout=0.2, message='nothing')
+        self.assertLess(time.time() - start, 0.5)
+        self.assertIn('nothing', str(cm.exception))
+
+    def test_wait_for_file(self):
+        path = os.path.join(self.base_dir.path, 'file')
+
+        def write():
+            with open(path, 'w') as f:
+                f.write('first line\n')
+        self.later(0.1, write)
+        self.assertEqual(self.wait_for_file(path), path)
+        self.assertRaises(AssertionError, self.wait_for_file, path,
+                          newer_than=time.time(), timeout=0.1)
+
+        now = time.time()
+        self.later(0.1, write)
+        self.wait_for_file(path, newer_than=now)
+
+    def test_wait_for_log_line(self):
+        path = os.path.join(self.base_dir.path, 'log')
+
+        def log(line):
+            with open(path, 'a') as f:
+                f.write(line + '\n')
+        self.later(0.05, lambda: log('starting'))
+        self.later(0.2, lambda: log('listening on port 1234'))
+        content = self.wait_for_log_line(path, 'starting',
+                                         re.compile(r'port \d+'))
+        self.assertIn('1234', content)
+        with self.assertRaises(AssertionError) as cm:
+            self.wait_for_log_line(path, 'starting', 'stopped', timeout=0.1)
+        self.assertIn('stopped', str(cm.exception))
+        self.assertNotIn('starting,', str(cm.exception))
+
+    def test_wait_for_fifo(self):
+        fifo = os.path.join(self.base_dir.path, 'fifo')
+        os.mkfifo(fifo)
+        reader = subprocess.Popen(['cat', fifo], stdout=subprocess.PIPE)
+        self.addCleanup(reader.wait)
+        with open(fifo, 'w') as f:
+            fifos = self.wait_for_fifo(Process(reader), self.base_dir.path)
+            self.assertEqual(fifos, [os.path.realpath(fifo)])
+            f.write('data')
+        self.assertEqual(reader.stdout.read(), b'data')
+
+    def test_wait_for_requests(self):
+        server = self.add_server(MemcachedServer())
+        client = McrouterClient(server.getport())
+        client.connect()
+        self.addCleanup(client.disconnect)
+        client.set('key', 'value', noreply=True)
+        self.wait_for_requests(server, 1)
+        self.wait_for_requests(server, 1, command='set')
+        sock = socket.create_connection(('localhost', server.getport()))
+        self.addCleanup(sock.close)
+        sock.sendall(b'get key\r\nget key\r\n')
+        self.wait_for_requests(server, 2, command='get')
+        self.assertRaises(AssertionError, self.wait_for_requests, server, 4,
+                          timeout=0.1)
+
+    def test_wait_for_stat(self):
+        server = self.add_server(MemcachedServer())
+        client = McrouterClient(server.getport())
+        client.connect()
+        self.addCleanup(client.disconnect)
+        for i in range(3):
+            client.set('key{}'.format(i), 'value')
+        self.wait_for_stat(client, 'curr_items', 3)
+        self.wait_for_stat(client, 'set', lambda v: v == 3)
+        self.assertRaises(AssertionError, self.wait_for_stat, client,
+                          'curr_items', 4, timeout=0.1)
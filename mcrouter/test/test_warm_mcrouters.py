@@ -0,0 +1,100 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+from mcrouter.test.McrouterTestCase import McrouterTestCase
+from mcrouter.test.mock_servers import MemcachedServer
+from mcrouter.test.warm_mcrouters import WarmMcrouterPool
+
+
+class TestWarmMcrouterPool(McrouterTestCase):
+    config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
+    extra_args = ['--reconfiguration-delay-ms', '10']
+
+    def setUp(self):
+        self.pool = WarmMcrouterPool()
+        self.addCleanup(self.pool.shutdown)
+
+    def checkout(self, server, extra_args=None):
+        return self.pool.checkout(self.config, [server.getport()],
+                                  extra_args=extra_args or self.extra_args)
+
+    def test_reuse(self):
+        a = self.add_server(MemcachedServer())
+        mcrouter = self.checkout(a)
+        pid = mcrouter.proc.pid
+        self.assertTrue(mcrouter.set('key', 'a'))
+        self.pool.checkin(mcrouter)
+
+        b = self.add_server(MemcachedServer())
+        mcrouter = self.checkout(b)
+        self.assertEqual(mcrouter.proc.pid, pid)
+        self.assertIsNone(mcrouter.get('key'))
+        self.assertTrue(mcrouter.set('key', 'b'))
+        self.assertEqual(a.get_counters()['set'], 1)
+        self.assertEqual(b.get_counters()['set'], 1)
+        self.assertEqual(b.get_counters()['get'], 1)
+
+        stats = self.pool.stats()
+        self.assertEqual(stats['started'], 1)
+        self.assertEqual(stats['reused'], 1)
+        self.assertEqual(stats['reloads'], 1)
+        self.assertLess(stats['max_reload_seconds'], 10)
+
+    def test_same_ports_restart(self):
+        server = self.add_server(MemcachedServer())
+        mcrouter = self.checkout(server)
+        pid = mcrouter.proc.pid
+        self.pool.checkin(mcrouter)
+        mcrouter = self.checkout(server)
+        self.assertNotEqual(mcrouter.proc.pid, pid)
+        self.assertTrue(mcrouter.set('key', 'value'))
+        self.assertEqual(self.pool.stats()['started'], 2)
+        self.pool.checkin(mcrouter)
+
+    def test_keyed_by_args(self):
+        server = self.add_server(MemcachedServer())
+        mcrouter = self.checkout(server)
+        self.pool.checkin(mcrouter)
+        other = self.checkout(server, self.extra_args + ['--num-proxies', '2'])
+        self.assertNotEqual(other.proc.pid, mcrouter.proc.pid)
+        self.pool.checkin(other)
+        self.assertEqual(self.pool.stats()['idle'], 2)
+
+    def test_dead_router_dropped(self):
+        server = self.add_server(MemcachedServer())
+        mcrouter = self.checkout(server)
+        mcrouter.terminate()
+        self.pool.checkin(mcrouter)
+        self.assertEqual(self.pool.stats()['idle'], 0)
+
+
+class TestWarmMcrouterTestCase(McrouterTestCase):
+    config = './mcrouter/test/mcrouter_test_basic_1_1_1.json'
+    extra_args = ['--reconfiguration-delay-ms', '10']
+    warm_mcrouters = True
+    pids = []
+
+    def setUp(self):
+        self.server = self.add_server(MemcachedServer())
+        self.mcrouter = self.add_mcrouter(self.config,
+                                          extra_args=self.extra_args)
+        self.pids.append(self.mcrouter.proc.pid)
+
+    def check_isolated(self):
+        self.assertIsNone(self.mcrouter.get('key'))
+        self.assertTrue(self.mcrouter.set('key', 'value'))
+        self.assertEqual(self.server.get_counters()['set'], 1)
+
+    def test_1_first(self):
+        self.check_isolated()
+
+    def test_2_reused(self):
+        self.check_isolated()
+        self.assertEqual(len(set(self.pids)), 1)
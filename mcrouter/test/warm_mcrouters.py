@@ -0,0 +1,158 @@
+# Copyright (c) 2017-present, Facebook, Inc.
+#
+# This source code is licensed under the MIT license found in the LICENSE
+# file in the root directory of this source tree.
+
+"""
+Pool of warm mcrouter processes shared by the tests of one Python process.
+
+Starting mcrouter dominates the run time of many short tests.  A test case
+that sets warm_mcrouters = True gets its mcrouters from this pool instead:
+routers are keyed by (config, route, extra_args, replace_map) and, when a
+test is done with one, it is kept running.  The next test asking for the
+same key gets it back with the config re-rendered for that test's servers
+written over the router's config file; the file watcher picks it up and the
+router is handed out once '__mcrouter__.config_md5_digest' changed, i.e.
+the new config is live.  The time that took is kept in reload_seconds, so a
+run also measures config reload latency.
+
+A router whose config would not change (same ports as last time) is
+restarted instead, since it may still hold TKO state for those ports.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from __future__ import unicode_literals
+
+import atexit
+import os
+import tempfile
+import threading
+import time
+
+from mcrouter.test.MCProcess import (BaseDirectory, Mcrouter, replace_ports,
+                                     replace_strings)
+from mcrouter.test.latency import now
+
+DIGEST_KEY = '__mcrouter__.config_md5_digest'
+
+
+class WarmMcrouterPool(object):
+    def __init__(self, max_idle=2, reload_timeout=10):
+        self.max_idle = max_idle
+        self.reload_timeout = reload_timeout
+        self.idle = {}
+        self.lock = threading.Lock()
+        self.started = 0
+        self.reused = 0
+        self.reload_seconds = []
+
+    @staticmethod
+    def key(config, route=None, extra_args=None, replace_map=None):
+        return (os.path.abspath(config), route, tuple(extra_args or []),
+                tuple(sorted((replace_map or {}).items())))
+
+    @staticmethod
+    def render(config, substitute_ports=None, replace_map=None):
+        with open(config, 'r') as config_file:
+            content = config_file.read()
+        if replace_map:
+            content = replace_strings(content, replace_map)
+        if substitute_ports:
+            content = replace_ports(content, substitute_ports)
+        return content
+
+    def checkout(self, config, substitute_ports=None, route=None,
+                 extra_args=None, replace_map=None):
+        """A connected mcrouter running config rendered for these ports"""
+        key = self.key(config, route, extra_args, replace_map)
+        content = self.render(config, substitute_ports, replace_map)
+        with self.lock:
+            idle = self.idle.get(key, [])
+            mcrouter = idle.pop() if idle else None
+
+        if mcrouter is not None:
+            if mcrouter.is_alive() and self._swap_config(mcrouter, content):
+                with self.lock:
+                    self.reused += 1
+                return mcrouter
+            mcrouter.terminate()
+
+        base_dir = BaseDirectory('warm_mcrouter')
+        fd, path = tempfile.mkstemp(dir=base_dir.path)
+        with os.fdopen(fd, 'w') as config_file:
+            config_file.write(content)
+        mcrouter = Mcrouter(path, default_route=route,
+                            extra_args=list(extra_args or []),
+                            base_dir=base_dir)
+        mcrouter.warm_key = key
+        mcrouter.warm_config = content
+        mcrouter.ensure_connected()
+        with self.lock:
+            self.started += 1
+        return mcrouter
+
+    def checkin(self, mcrouter):
+        """Keeps mcrouter running for the next test, or stops it"""
+        if hasattr(mcrouter, 'socket'):
+            mcrouter.disconnect()
+        if mcrouter.proc is None or not mcrouter.is_alive():
+            mcrouter.terminate()
+            return
+        with self.lock:
+            idle = self.idle.setdefault(mcrouter.warm_key, [])
+            if len(idle) < self.max_idle:
+                idle.append(mcrouter)
+                return
+        mcrouter.terminate()
+
+    def _swap_config(self, mcrouter, content):
+        if content == mcrouter.warm_config:
+            return False
+        mcrouter.ensure_connected()
+        old_digest = mcrouter.get(DIGEST_KEY)
+        start = now()
+        # Rewritten in place, like change_config(): the watcher follows the
+        # inode of the config file
+        with open(mcrouter.config, 'w') as config_file:
+            config_file.write(content)
+
+        deadline = start + self.reload_timeout
+        interval = 0.001
+        while mcrouter.get(DIGEST_KEY) == old_digest:
+            if now() > deadline:
+                return False
+            time.sleep(interval)
+            interval = min(interval * 2, 0.05)
+        with self.lock:
+            self.reload_seconds.append(now() - start)
+
+        mcrouter.warm_config = content
+        mcrouter.deletes = mcrouter.others = mcrouter.reconnects = 0
+        mcrouter.latency = None
+        return True
+
+    def stats(self):
+        with self.lock:
+            reloads = sorted(self.reload_seconds)
+            return {
+                'started': self.started,
+                'reused': self.reused,
+                'idle': sum(len(idle) for idle in self.idle.values()),
+                'reloads': len(reloads),
+                'max_reload_seconds': reloads[-1] if reloads else None,
+                'median_reload_seconds':
+                    reloads[len(reloads) // 2] if reloads else None,
+            }
+
+    def shutdown(self):
+        with self.lock:
+            routers = [m for idle in self.idle.values() for m in idle]
+            self.idle = {}
+        for mcrouter in routers:
+            mcrouter.terminate()
+
+
+pool = WarmMcrouterPool()
+atexit.register(pool.shutdown)
@@ -220,7 +220,8 @@ std::vector<std::string> FifoReaderManager::getMatchedFiles() const {
     } else {
       fs::directory_iterator endIt; // default construction = end iterator.
       for (fs::directory_iterator it(directory_); it != endIt; ++it) {
-        if (fs::is_directory(it->status())) {
+        // Skip anything that is not a fifo (e.g. the fifo filter file).
+        if (it->status().type() != fs::fifo_file) {
           continue;
         }
         auto& path = it->path();
@@ -30,9 +30,10 @@ MessagePrinter::Options getOptions(const Settings& settings, McPiper* mcpiper) {
   options.quiet = settings.quiet;
   options.raw = settings.raw;
   options.script = settings.script;
+  options.ndjson = settings.ndjson;
   options.maxMessages = settings.maxMessages;
-  options.disableColor =
-      settings.raw || settings.script || !isatty(fileno(stdout));
+  options.disableColor = settings.raw || settings.script ||
+      settings.ndjson || !isatty(fileno(stdout));
 
   // Time Function
   static struct timeval prevTs = {0, 0};
@@ -172,6 +173,7 @@ void McPiper::run(Settings settings, std::ostream& targetOut) {
       snifferParser->resetParser();
     }
 
+    messagePrinter_->setConnectionId(connectionId);
     snifferParser->setAddresses(std::move(from), std::move(to));
     snifferParser->setCurrentMsgStartTime(msgStartTime);
     snifferParser->parse(data, typeId, packetId == 0 /* isFirstPacket */);
@@ -42,6 +42,7 @@ struct Settings {
   std::string protocol;
   bool raw{false};
   bool script{false};
+  bool ndjson{false};
 };
 
 class McPiper {
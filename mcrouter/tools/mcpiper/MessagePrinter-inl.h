@@ -192,6 +192,26 @@ folly::Optional<StyledString> MessagePrinter::filterAndBuildOutput(
     return folly::none;
   }
 
+  if (options_.ndjson) {
+    StyledString record;
+    record.append(serializeRecord(
+        msgId,
+        detail::getName<Message>(),
+        carbon::IsRequestTrait<Message>::value,
+        result,
+        key,
+        from,
+        to,
+        protocol,
+        message.flags(),
+        value.size(),
+        latencyUs));
+    if (!matchPattern(record)) {
+      return folly::none;
+    }
+    return record;
+  }
+
   StyledString out;
   out.append("\n");
 
@@ -331,24 +351,8 @@ folly::Optional<StyledString> MessagePrinter::filterAndBuildOutput(
     out.append("\n}\n", format_.dataOpColor);
   }
 
-  // Match pattern
-  if (filter_.pattern) {
-    auto matches = matchAll(out.text(), *filter_.pattern);
-    auto success = matches.empty() == filter_.invertMatch;
-
-    if (!success && afterMatchCount_ == 0) {
-      return folly::none;
-    }
-    if (!filter_.invertMatch) {
-      for (auto& m : matches) {
-        out.setFg(m.first, m.second, format_.matchColor);
-      }
-    }
-
-    // Reset after match
-    if (success && options_.numAfterMatch > 0) {
-      afterMatchCount_ = options_.numAfterMatch + 1;
-    }
+  if (!matchPattern(out)) {
+    return folly::none;
   }
 
   return out;
@@ -36,6 +36,28 @@ std::string describeAddress(const folly::SocketAddress& address) {
   return res;
 }
 
+/**
+ * Quotes s as a JSON string.  Bytes outside of printable ASCII are escaped
+ * one by one as \u00XX, so that binary keys survive the round trip.
+ */
+std::string jsonString(folly::StringPiece s) {
+  std::string out;
+  out.reserve(s.size() + 2);
+  out.push_back('"');
+  for (unsigned char c : s) {
+    if (c == '"' || c == '\\') {
+      out.push_back('\\');
+      out.push_back(c);
+    } else if (c < 0x20 || c >= 0x7f) {
+      out.append(folly::sformat("\\u{:04x}", static_cast<unsigned>(c)));
+    } else {
+      out.push_back(c);
+    }
+  }
+  out.push_back('"');
+  return out;
+}
+
 } // anonymous namespace
 
 MessagePrinter::MessagePrinter(
@@ -176,6 +198,81 @@ std::string MessagePrinter::serializeMessageHeader(
   return out;
 }
 
+std::string MessagePrinter::serializeRecord(
+    uint64_t msgId,
+    folly::StringPiece messageName,
+    bool isRequest,
+    mc_res_t result,
+    const std::string& key,
+    const folly::SocketAddress& from,
+    const folly::SocketAddress& to,
+    mc_protocol_t protocol,
+    uint64_t flags,
+    size_t valueSize,
+    int64_t latencyUs) const {
+  timeval ts;
+  gettimeofday(&ts, nullptr);
+
+  auto out = folly::sformat(
+      "{{\"ts_us\": {}, \"conn_id\": {}, \"reqid\": {}, \"dir\": \"{}\", "
+      "\"op\": {}",
+      static_cast<uint64_t>(ts.tv_sec) * 1000000 + ts.tv_usec,
+      connectionId_,
+      msgId,
+      isRequest ? "request" : "reply",
+      jsonString(messageName));
+  if (!isRequest) {
+    out.append(
+        folly::sformat(", \"result\": \"{}\"", mc_res_to_string(result)));
+  }
+  out.append(folly::sformat(
+      ", \"key\": {}, \"value_bytes\": {}, \"flags\": {}",
+      jsonString(key),
+      valueSize,
+      flags));
+  if (latencyUs > 0) {
+    out.append(folly::sformat(", \"rtt_us\": {}", latencyUs));
+  }
+  if (!from.empty()) {
+    out.append(
+        folly::sformat(", \"from\": {}", jsonString(describeAddress(from))));
+  }
+  if (!to.empty()) {
+    out.append(
+        folly::sformat(", \"to\": {}", jsonString(describeAddress(to))));
+  }
+  if (protocol != mc_unknown_protocol) {
+    out.append(folly::sformat(
+        ", \"protocol\": \"{}\"", mc_protocol_to_string(protocol)));
+  }
+  out.append("}\n");
+  return out;
+}
+
+bool MessagePrinter::matchPattern(StyledString& out) {
+  if (!filter_.pattern) {
+    return true;
+  }
+
+  auto matches = matchAll(out.text(), *filter_.pattern);
+  auto success = matches.empty() == filter_.invertMatch;
+
+  if (!success && afterMatchCount_ == 0) {
+    return false;
+  }
+  if (!filter_.invertMatch) {
+    for (auto& m : matches) {
+      out.setFg(m.first, m.second, format_.matchColor);
+    }
+  }
+
+  // Reset after match
+  if (success && options_.numAfterMatch > 0) {
+    afterMatchCount_ = options_.numAfterMatch + 1;
+  }
+  return true;
+}
+
 /**
  * Matches all the occurences of "pattern" in "text"
  *
@@ -58,6 +58,10 @@ class MessagePrinter {
 
     // Machine-readable JSON format (has no effect if raw is true)
     bool script{false};
+
+    // One compact JSON record per message and line, see serializeRecord()
+    // (has no effect if raw is true)
+    bool ndjson{false};
   };
 
   struct Stats {
@@ -101,6 +105,13 @@ class MessagePrinter {
     return stats_;
   }
 
+  /**
+   * Sets the id of the connection the next messages were read from.
+   */
+  void setConnectionId(uint64_t connectionId) noexcept {
+    connectionId_ = connectionId;
+  }
+
   template <class Message>
   folly::Optional<StyledString> filterAndBuildOutput(
       uint64_t msgId,
@@ -122,6 +133,7 @@ class MessagePrinter {
   AnsiColorCodeStream targetOut_;
   Stats stats_;
   uint32_t afterMatchCount_{0};
+  uint64_t connectionId_{0};
 
   // SnifferParser Callbacks
   template <class Request>
@@ -195,6 +207,35 @@ class MessagePrinter {
       folly::StringPiece messageName,
       mc_res_t result,
       const std::string& key);
+
+  /**
+   * Serializes a message as a single line JSON object:
+   *   {"ts_us": ..., "conn_id": ..., "reqid": ..., "dir": "request",
+   *    "op": "get", "key": "...", "value_bytes": ..., "flags": ...,
+   *    "from": "...", "to": "...", "protocol": "..."}
+   * Replies also have "result" and, when known, "rtt_us".  Key bytes
+   * outside of printable ASCII are escaped as \u00XX.
+   */
+  std::string serializeRecord(
+      uint64_t msgId,
+      folly::StringPiece messageName,
+      bool isRequest,
+      mc_res_t result,
+      const std::string& key,
+      const folly::SocketAddress& from,
+      const folly::SocketAddress& to,
+      mc_protocol_t protocol,
+      uint64_t flags,
+      size_t valueSize,
+      int64_t latencyUs) const;
+
+  /**
+   * Applies the match pattern (and numAfterMatch) to an output message,
+   * highlighting the matches.
+   *
+   * @return  True if the message should be printed.
+   */
+  bool matchPattern(StyledString& out);
 };
 
 } // memcache
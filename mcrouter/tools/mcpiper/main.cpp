@@ -116,7 +116,11 @@ Settings parseOptions(int argc, char** argv) {
       "ASCII protocol is not supported")(
       "script",
       po::bool_switch(&settings.script)->default_value(false),
-      "Machine-readable JSON output (useful for post-processing).");
+      "Machine-readable JSON output (useful for post-processing).")(
+      "ndjson",
+      po::bool_switch(&settings.ndjson)->default_value(false),
+      "One JSON object per message and line, with timestamp, connection "
+      "id, direction, operation, key, result and value size.");
 
   // Positional arguments - hidden from the help message
   po::options_description hiddenOpts("Hidden options");